@@ -0,0 +1,74 @@
+"""Compare the line chunker with the token-budgeted packing chunker.
+
+Usage: python benchmarks/bench_chunking.py [--sizes 200000,2000000,20000000] [--context-tokens 16385]
+
+For each synthetic dump, reports the number of chunks (= LLM requests per
+repository), the average tokens per chunk, how full the chunks are relative
+to the token budget, and how many files were cut across chunks, with and
+without pre-LLM triage and prompt compaction.
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from chunking import HEADER_LINE, TokenCounter, iter_line_chunks, plan_chunks
+from feature_analyzer import SYSTEM_PROMPT, FEATURE_PROMPT
+from synthetic import generate_dump
+from triage import FileTriage
+from compaction import compact_dump
+from repo_index import RepositoryDump
+
+LINE_CHUNK_SIZE = 12000
+COMPLETION_RESERVE = 1500
+
+
+def line_chunker_stats(code_content, budget, counter):
+    chunks = list(iter_line_chunks(code_content.split('\n'), LINE_CHUNK_SIZE))
+    tokens = [counter.count(chunk) for chunk in chunks]
+    # A chunk that does not open with (part of) a file header continues a file from the previous one
+    cut = sum(1 for chunk in chunks[1:] if not chunk.startswith((HEADER_LINE, 'File:')))
+    return len(chunks), sum(tokens), sum(tokens) / (len(chunks) * budget), cut
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', default='200000,2000000,20000000',
+                        help='Comma-separated dump sizes in bytes')
+    parser.add_argument('--context-tokens', type=int, default=16385)
+    parser.add_argument('--model', default='gpt-3.5-turbo')
+    args = parser.parse_args()
+
+    counter = TokenCounter(args.model)
+    overhead = counter.count(SYSTEM_PROMPT) + counter.count(f"{FEATURE_PROMPT}\n\nCode to analyze:\n") + 8
+    budget = args.context_tokens - overhead - COMPLETION_RESERVE
+    print(f"Token budget per chunk: {budget} ({'tiktoken' if counter.exact else 'estimated'} counts)")
+
+    for size in (int(s) for s in args.sizes.split(',')):
+        _, code_content = generate_dump(size, seed=size)
+        lines_count, lines_tokens, lines_fill, lines_cut = line_chunker_stats(code_content, budget, counter)
+        started = time.perf_counter()
+        plan = plan_chunks(code_content, budget, counter)
+        elapsed = time.perf_counter() - started
+        print(f"{len(code_content) / 1e6:8.2f} MB  lines: {lines_count:6d} chunks, {lines_tokens // max(1, lines_count):6d} tok/chunk, "
+              f"fill {lines_fill:4.0%}, {lines_cut:5d} files cut  |  packed: {len(plan):6d} chunks, "
+              f"{plan.total_tokens // max(1, len(plan)):6d} tok/chunk, fill {plan.fill_ratio:4.0%}, "
+              f"{plan.split_files:5d} files split ({elapsed:.2f}s)  requests -{1 - len(plan) / lines_count:.0%}")
+        dump = RepositoryDump.from_text(code_content)
+        report = FileTriage().run(dump)
+        triaged = plan_chunks(dump, budget, counter, report.keep)
+        print(f"{'':11}+ triage: {len(triaged):6d} chunks, {report.summary()}, "
+              f"requests -{1 - len(triaged) / lines_count:.0%}")
+        started = time.perf_counter()
+        compacted, compaction = compact_dump(dump, report.keep, counter)
+        elapsed = time.perf_counter() - started
+        packed = plan_chunks(compacted, budget, counter)
+        print(f"{'':11}+ compaction: {len(packed):6d} chunks, {compaction.summary()} ({elapsed:.2f}s), "
+              f"requests -{1 - len(packed) / lines_count:.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""Compare peak memory of in-memory and streaming (memory-mapped) dump processing.
+
+Usage: python benchmarks/bench_memory.py [--size-mb 500] [--keep]
+
+Writes a synthetic gitingest dump, then runs the rule scan and the chunker
+over it once per mode, each in a fresh interpreter, and reports the peak
+resident set size. No LLM requests are made: chunks are only counted.
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+SRC = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src')
+sys.path.insert(0, SRC)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from synthetic import write_dump
+
+CHUNK_SIZE = 12000
+
+
+def run_mode(mode: str, dump_path: str, tree_path: str):
+    """Body of the child process: process the dump and print one result line."""
+    import resource
+    from chunking import iter_line_chunks
+    from repo_index import RepositoryDump
+    from rules import RuleEngine, DEPLOYMENT_RULES, FRAMEWORK_RULES
+
+    with open(tree_path, encoding='utf-8') as f:
+        directory_structure = f.read()
+    started = time.perf_counter()
+    if mode == "streaming":
+        dump = RepositoryDump.open(dump_path, directory_structure)
+        chunks = iter_line_chunks(dump.iter_lines(), CHUNK_SIZE)
+    else:
+        # The pre-streaming flow: whole dump in memory, all chunks built up front
+        dump = RepositoryDump.from_file(dump_path, directory_structure)
+        chunks = list(iter_line_chunks(dump.data.decode('utf-8', 'replace').split('\n'), CHUNK_SIZE))
+
+    engine = RuleEngine({"deployment": DEPLOYMENT_RULES, "framework": FRAMEWORK_RULES})
+    labels = []
+    for table in ("deployment", "framework"):
+        signals = engine.signals(table, directory_structure, dump, "synthetic/repo")
+        labels.append(engine.first_match(table, signals))
+    count = sum(1 for _ in chunks)
+    dump.close()
+
+    peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"{mode}\t{peak_mb:.0f}\t{count}\t{time.perf_counter() - started:.1f}\t{'/'.join(labels)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--size-mb', type=int, default=500, help='Size of the synthetic dump')
+    parser.add_argument('--keep', action='store_true', help='Keep the generated dump in the temp directory')
+    parser.add_argument('--child', nargs=3, metavar=('MODE', 'DUMP', 'TREE'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_mode(*args.child)
+        return
+
+    workdir = tempfile.mkdtemp(prefix='bench_memory_')
+    dump_path = os.path.join(workdir, 'code_content.txt')
+    tree_path = os.path.join(workdir, 'directory_structure.txt')
+    print(f"Writing a {args.size_mb} MB synthetic dump to {dump_path}...")
+    directory_structure = write_dump(dump_path, args.size_mb * 1024 * 1024)
+    with open(tree_path, 'w', encoding='utf-8') as f:
+        f.write(directory_structure)
+
+    print(f"{'mode':<12}{'peak RSS':>12}{'chunks':>10}{'seconds':>10}  labels")
+    try:
+        for mode in ("in-memory", "streaming"):
+            output = subprocess.run([sys.executable, os.path.abspath(__file__), '--child', mode, dump_path, tree_path],
+                                    check=True, capture_output=True, text=True).stdout.strip().splitlines()[-1]
+            name, peak, count, seconds, labels = output.split('\t')
+            print(f"{name:<12}{peak + ' MB':>12}{count:>10}{seconds:>10}  {labels}")
+    finally:
+        if not args.keep:
+            for path in (dump_path, tree_path):
+                os.remove(path)
+            os.rmdir(workdir)
+
+
+if __name__ == "__main__":
+    main()
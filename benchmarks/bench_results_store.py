@@ -0,0 +1,107 @@
+"""Measure the results store against reloading analysis_results.csv for aggregate questions.
+
+Usage: python benchmarks/bench_results_store.py [--repos 100000] [--updates 5000]
+
+Records --repos synthetic results (feature shares and platforms skewed like
+real lists), then re-records --updates of them with changed results. It
+times feature prevalence by deployment platform and by framework from the
+store and from the exported CSV (read with csv.DictReader, as an analysis
+notebook would), checks that both agree, and times a feature query and the
+streaming CSV export. No LLM requests are made.
+"""
+import argparse
+import csv
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from results_store import FEATURES, ResultsStore
+
+DEPLOYMENTS = [("Unknown", 50), ("Vercel", 15), ("AWS", 10), ("Netlify", 8), ("Heroku", 6), ("Fly.io", 4),
+               ("Render", 4), ("Google Cloud", 3)]
+FRAMEWORKS = [("Unknown", 30), ("Next.js", 20), ("Express", 15), ("React", 12), ("Django", 8), ("Flask", 8),
+              ("FastAPI", 7)]
+
+
+def synthetic_row(rng: random.Random, repo: str, shares) -> dict:
+    row = {"repository": repo,
+           "deployment": rng.choices([name for name, _ in DEPLOYMENTS], [weight for _, weight in DEPLOYMENTS])[0],
+           "framework": rng.choices([name for name, _ in FRAMEWORKS], [weight for _, weight in FRAMEWORKS])[0]}
+    row.update({feature: int(rng.random() < share) for feature, share in zip(FEATURES, shares)})
+    return row
+
+
+def csv_prevalence(path: str, by: str) -> dict:
+    groups = {}
+    with open(path, newline='') as f:
+        for row in csv.DictReader(f):
+            counts = groups.setdefault(row[by], [0] * (len(FEATURES) + 1))
+            counts[-1] += 1
+            for index, feature in enumerate(FEATURES):
+                counts[index] += int(row[feature])
+    return {name: dict({"repositories": counts[-1]},
+                       **{feature: counts[index] / counts[-1] for index, feature in enumerate(FEATURES)})
+            for name, counts in groups.items()}
+
+
+def timed(func, *args, repeat: int = 5, **kwargs):
+    """(best seconds of repeat calls, last result)."""
+    best, result = float('inf'), None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func(*args, **kwargs)
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repos', type=int, default=100000, help='Number of repositories')
+    parser.add_argument('--updates', type=int, default=5000, help='Repositories re-recorded with a new result')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    shares = [rng.uniform(0.02, 0.6) for _ in FEATURES]
+    workdir = tempfile.mkdtemp(prefix='bench_results_store_')
+    try:
+        store = ResultsStore(os.path.join(workdir, "results.sqlite"), "bench")
+        started = time.perf_counter()
+        for index in range(args.repos):
+            store.record(f"o/r{index}", synthetic_row(rng, f"o/r{index}", shares))
+        recording = time.perf_counter() - started
+        started = time.perf_counter()
+        for _ in range(args.updates):
+            repo = f"o/r{rng.randrange(args.repos)}"
+            store.record(repo, synthetic_row(rng, repo, shares))
+        updating = time.perf_counter() - started
+        csv_path = os.path.join(workdir, "analysis_results.csv")
+        export_seconds, _ = timed(store.export_csv, csv_path, repeat=1)
+
+        print(f"{args.repos} repositories recorded at {args.repos / recording:.0f}/s, "
+              f"{args.updates} upserts at {args.updates / max(updating, 1e-9):.0f}/s")
+        print(f"{'question':<34}{'store ms':>10}{'CSV ms':>10}{'speedup':>10}")
+        for by in ("deployment", "framework"):
+            store_seconds, from_store = timed(store.prevalence, by)
+            csv_seconds, from_csv = timed(csv_prevalence, csv_path, by, repeat=1)
+            assert from_store.keys() == from_csv.keys() and all(
+                abs(from_store[name][key] - from_csv[name][key]) < 1e-9 for name in from_csv for key in from_csv[name]
+            ), "store and CSV aggregations differ"
+            print(f"{'prevalence by ' + by:<34}{store_seconds * 1000:>10.2f}{csv_seconds * 1000:>10.0f}"
+                  f"{csv_seconds / store_seconds:>9.0f}x")
+        query_seconds, matches = timed(store.repositories_with, ["caching", "database"], deployment="Vercel")
+        print(f"{'caching+database on Vercel':<34}{query_seconds * 1000:>10.2f}{'':>10}{'':>10}  ({len(matches)} repos)")
+        print(f"Streaming CSV export: {export_seconds:.2f}s; store {os.path.getsize(store.path) / 1024 / 1024:.1f} MB, "
+              f"CSV {os.path.getsize(csv_path) / 1024 / 1024:.1f} MB")
+        store.close()
+    finally:
+        shutil.rmtree(workdir)
+
+
+if __name__ == "__main__":
+    main()
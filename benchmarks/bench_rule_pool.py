@@ -0,0 +1,98 @@
+"""Measure how the rule-based detectors scale across worker processes.
+
+Usage: python benchmarks/bench_rule_pool.py [--repos 2000] [--size-kb 64] [--workers 1,2,4,8]
+
+Writes --repos synthetic dumps (directory structure + code content, as the
+scraping phase saves them), runs the detectors over all of them serially in
+this process and then through RulePool with each worker count, and reports
+throughput, speedup and parallel efficiency. Every pooled run is checked
+against the serial results. No LLM requests are made.
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from repo_index import RepositoryDump
+from results import apply_rules
+from rule_pool import RulePool, _Detectors
+from synthetic import generate_dump
+
+# Distinct dumps generated; the rest of the repositories reuse them under their own files
+DISTINCT_DUMPS = 32
+
+
+def write_repositories(workdir: str, repos: int, size_kb: int):
+    samples = [generate_dump(size_kb * 1024, seed=seed) for seed in range(min(repos, DISTINCT_DUMPS))]
+    jobs = []
+    for index in range(repos):
+        directory_structure, code_content = samples[index % len(samples)]
+        directory_path = os.path.join(workdir, f"o_r{index}_directory_structure.txt")
+        code_path = os.path.join(workdir, f"o_r{index}_code_content.txt")
+        with open(directory_path, 'w', encoding='utf-8') as f:
+            f.write(directory_structure)
+        with open(code_path, 'w', encoding='utf-8') as f:
+            f.write(code_content)
+        jobs.append((f"o/r{index}", directory_path, code_path))
+    return jobs
+
+
+def run_serial(jobs, detectors):
+    results = []
+    for repo, directory_path, code_path in jobs:
+        with open(directory_path, 'r', encoding='utf-8') as f:
+            directory_structure = f.read()
+        code_content = RepositoryDump.from_file(code_path, directory_structure)
+        row = apply_rules(detectors, repo, directory_structure, code_content)
+        results.append((row["deployment"], row["framework"]))
+    return results
+
+
+def run_pool(jobs, workers: int):
+    with RulePool(workers) as pool:
+        futures = [pool.submit(repo, code_path, directory_path=directory_path)
+                   for repo, directory_path, code_path in jobs]
+        results = [future.result() for future in futures]
+    return [(result.deployment, result.framework) for result in results]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repos', type=int, default=2000, help='Number of repositories')
+    parser.add_argument('--size-kb', type=int, default=64, help='Size of each code dump')
+    parser.add_argument('--workers', default=None,
+                        help='Comma-separated worker counts (default: powers of two up to the core count)')
+    args = parser.parse_args()
+
+    cores = os.cpu_count() or 1
+    counts = ([int(count) for count in args.workers.split(',')] if args.workers else
+              sorted({2 ** power for power in range(cores.bit_length()) if 2 ** power <= cores} | {cores}))
+    workdir = tempfile.mkdtemp(prefix='bench_rule_pool_')
+    try:
+        print(f"Writing {args.repos} repositories of {args.size_kb} KB to {workdir}...")
+        jobs = write_repositories(workdir, args.repos, args.size_kb)
+        started = time.perf_counter()
+        expected = run_serial(jobs, _Detectors())
+        serial = time.perf_counter() - started
+        print(f"{cores} core(s) available")
+        print(f"{'workers':<10}{'seconds':>10}{'repos/s':>10}{'speedup':>10}{'efficiency':>12}")
+        print(f"{'serial':<10}{serial:>10.2f}{args.repos / serial:>10.0f}{1.0:>10.2f}{'':>12}")
+        for workers in counts:
+            started = time.perf_counter()
+            results = run_pool(jobs, workers)
+            seconds = time.perf_counter() - started
+            assert results == expected, "pooled results differ from the serial run"
+            speedup = serial / seconds
+            print(f"{workers:<10}{seconds:>10.2f}{args.repos / seconds:>10.0f}{speedup:>10.2f}"
+                  f"{speedup / min(workers, cores):>11.0%}")
+    finally:
+        shutil.rmtree(workdir)
+
+
+if __name__ == "__main__":
+    main()
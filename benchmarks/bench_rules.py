@@ -0,0 +1,235 @@
+"""Benchmark the compiled rule engine against the original substring detectors.
+
+Usage: python benchmarks/bench_rules.py [--sizes 100000,1000000,10000000] [--repeat 3]
+
+Also checks on randomized inputs that both implementations return the same
+deployment and framework labels. The inputs have no file headers, so the
+file-scoped package.json rules fall back to the old global checks; on real
+dumps those rules only look inside package.json and may legitimately differ.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from rules import RuleEngine, DEPLOYMENT_RULES, FRAMEWORK_RULES, AHOCORASICK_AVAILABLE
+from synthetic import generate_dump, SIGNALS
+
+
+class LegacyDetectors:
+    """The detectors as they were before the rule engine, kept as the baseline."""
+
+    def determine_deployment_platform(self, directory_structure, code_content, repo):
+        def has_file(filename):
+            return filename.lower() in directory_structure.lower()
+        
+        def has_content(text):
+            return text.lower() in code_content.lower()
+        
+        # Streamlit - check both repo name and content
+        if "/streamlit" in repo.lower() or has_content("streamlit"):
+            return "Streamlit"
+
+        # Check for Vercel (strengthened checks)
+        if (has_file("vercel.json") or 
+            has_file(".vercel") or 
+            has_content(".vercel.app") or
+            has_content("vercel deploy") or
+            has_content("vercel.com") or
+            (has_file("next.config.js") and not has_content("aws")) or
+            (has_file("package.json") and has_content("vercel")) or
+            (has_file("package.json") and has_content("next.js"))):
+            return "Vercel"
+
+        # Check for Firebase (strengthened checks)
+        if (has_file("firebase.json") or
+            has_file(".firebaserc") or
+            has_content("firebase.initializeApp") or
+            has_content(".firebaseapp.com") or
+            has_content(".web.app") or
+            (has_content("firebase") and has_content("config")) or
+            (has_file("package.json") and has_content("firebase")) or
+            has_content("firebase deploy")):
+            return "Firebase"
+
+        # Rest of the checks remain the same...
+        if (has_file("serverless.yml") or
+            has_file("amplify.yml") or
+            has_file("buildspec.yml") or
+            has_file("cloudformation.yml") or
+            has_file("elastic-beanstalk") or
+            (has_file("docker-compose.yml") and has_content("aws-sdk"))):
+            return "AWS"
+
+        if ((has_file("_config.yml") and has_content("github.io")) or 
+            (has_content(".github.io") and has_content("gh-pages"))):
+            return "GitHub Pages"
+
+        if (has_file("netlify.toml") or
+            has_file(".netlify") or
+            has_content(".netlify.app")):
+            return "Netlify"
+
+        if (has_file("do.yaml") or
+            (has_content("digitalocean") and has_content("deploy"))):
+            return "Digital Ocean"
+
+        if ((has_file("app.yaml") and has_content("google")) or 
+            has_content("appspot.com")):
+            return "Google Cloud"
+
+        if (has_file("package.json") and 
+            has_content('"private": false') and 
+            has_content("npm publish")):
+            return "NPM"
+
+        if has_file("Procfile") or has_file("heroku.yml"):
+            return "Heroku"
+
+        if has_file("sandbox.config.json"):
+            return "CodeSandbox"
+        if has_file(".stackblitzrc"):
+            return "Stackblitz"
+        if has_file(".replit"):
+            return "Replit"
+        if has_file(".glitch-assets"):
+            return "Glitch"
+
+        # If no clear deployment indicators but has package.json, check for specific frameworks
+        if has_file("package.json"):
+            if has_content("next") or has_content("vercel"):
+                return "Vercel"
+            if has_content("firebase"):
+                return "Firebase"
+
+        return "Unknown"
+
+    def determine_framework(self, directory_structure, code_content):
+        def has_file(filename):
+            return filename.lower() in directory_structure.lower()
+        
+        def has_content(text):
+            return text.lower() in code_content.lower()
+
+        # Framework detection rules
+        if has_file("next.config.js"):
+            return "Next.js"
+        if has_file("nuxt.config.js"):
+            return "Nuxt.js"
+        if has_file("gatsby-config.js"):
+            return "Gatsby"
+        if has_file("angular.json"):
+            return "Angular"
+        if has_file("vue.config.js") or has_content("createapp") and has_content("vue"):
+            return "Vue"
+        if has_file("svelte.config.js"):
+            return "Svelte"
+        if has_file("remix.config.js"):
+            return "Remix"
+        if has_file("astro.config.mjs"):
+            return "Astro"
+        if has_content("streamlit") and has_content("st."):
+            return "Streamlit"
+        if has_file("django"):
+            return "Django"
+        if has_file("flask"):
+            return "Flask"
+        if has_file("express"):
+            return "Express"
+        if has_file("spring"):
+            return "Spring"
+        if has_file("laravel"):
+            return "Laravel"
+        if has_file("rails"):
+            return "Ruby on Rails"
+        
+        # Check package.json for dependencies
+        if has_file("package.json"):
+            content = code_content.lower()
+            if '"react"' in content and not any(f in content for f in ["next", "gatsby", "remix"]):
+                return "React"
+            if '"@angular' in content:
+                return "Angular"
+            if '"vue"' in content:
+                return "Vue"
+        
+        return "Unknown"
+
+
+def run_compiled(engine, directory_structure, code_content, repo):
+    deployment = engine.first_match("deployment", engine.signals("deployment", directory_structure, code_content, repo))
+    framework = engine.first_match("framework", engine.signals("framework", directory_structure, code_content))
+    return deployment, framework
+
+
+def run_legacy(legacy, directory_structure, code_content, repo):
+    return (legacy.determine_deployment_platform(directory_structure, code_content, repo),
+            legacy.determine_framework(directory_structure, code_content))
+
+
+# Directory entries that steer the detectors down different rule branches
+MARKER_FILES = ["vercel.json", "firebase.json", "next.config.js", "netlify.toml", "Procfile", "angular.json",
+                "app.yaml", "_config.yml", "docker-compose.yml", "serverless.yml", "django", ".replit"]
+EXTRA_CONTENT = ["Streamlit", "NEXT.js", "github.io", "gh-pages", "\"private\": false", "google",
+                 "digitalocean deploy", "\"vue\"", "\"@angular/core\"", "appspot.com", ".netlify.app"]
+
+
+def check_equivalence(trials: int = 300) -> int:
+    rng = random.Random(42)
+    engine = RuleEngine({"deployment": DEPLOYMENT_RULES, "framework": FRAMEWORK_RULES})
+    legacy = LegacyDetectors()
+    mismatches = 0
+    for trial in range(trials):
+        directory_structure = "\n".join(rng.sample(MARKER_FILES, rng.randint(0, 3)) + ["package.json"] * rng.randint(0, 1))
+        code_content = " ".join(rng.sample(EXTRA_CONTENT + SIGNALS, rng.randint(0, 4)))
+        repo = rng.choice(["owner/app", "owner/streamlit-demo"])
+        expected = run_legacy(legacy, directory_structure, code_content, repo)
+        actual = run_compiled(engine, directory_structure, code_content, repo)
+        if expected != actual:
+            mismatches += 1
+            print(f"MISMATCH {expected} != {actual}: {directory_structure!r} {code_content!r} {repo}")
+    return mismatches
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark deployment/framework detection')
+    parser.add_argument('--sizes', default='100000,1000000,10000000', help='Comma-separated dump sizes in bytes')
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    mismatches = check_equivalence()
+    print(f"Equivalence check: {mismatches} mismatches")
+    print(f"Aho-Corasick automaton: {'pyahocorasick' if AHOCORASICK_AVAILABLE else 'not installed, per-signal scans'}")
+
+    legacy = LegacyDetectors()
+    for size in (int(s) for s in args.sizes.split(',')):
+        directory_structure, code_content = generate_dump(size, seed=size, signal_rate=0)
+        timings = {}
+        for name, runner in (("legacy", lambda: run_legacy(legacy, directory_structure, code_content, "owner/app")),
+                             ("compiled", None)):
+            best = None
+            for _ in range(args.repeat):
+                if runner is None:
+                    # A fresh engine per repeat so the per-source memo does not hide the scan cost
+                    engine = RuleEngine({"deployment": DEPLOYMENT_RULES, "framework": FRAMEWORK_RULES})
+                    started = time.perf_counter()
+                    labels = run_compiled(engine, directory_structure, code_content, "owner/app")
+                else:
+                    started = time.perf_counter()
+                    labels = runner()
+                elapsed = time.perf_counter() - started
+                best = elapsed if best is None else min(best, elapsed)
+            timings[name] = (best, labels)
+        speedup = timings["legacy"][0] / timings["compiled"][0]
+        print(f"{len(code_content) / 1e6:8.2f} MB  legacy {timings['legacy'][0] * 1000:8.1f} ms  "
+              f"compiled {timings['compiled'][0] * 1000:8.1f} ms  speedup {speedup:5.1f}x  "
+              f"labels {timings['legacy'][1]} -> {timings['compiled'][1]}")
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,401 @@
+"""Benchmark every stage on its own and the pipeline end to end, against a fake LLM backend.
+
+Usage: python benchmarks/bench_suite.py [--sizes 10k,1m,10m] [--stages filter,chunk,rules,...] [--repeat 5]
+                                        [--latency-ms 50] [--error-rate 0.01] [--output results.json]
+                                        [--baseline baseline.json] [--tolerance 0.2]
+
+Writes synthetic gitingest dumps of each size (10k to 1g; "realistic" file
+mix by default) and runs each stage on them in a fresh interpreter:
+
+  filter      GitIngestScraper.filter_css_content on the raw dump text
+  index       building the RepositoryDump file index
+  triage      FileTriage over the indexed dump
+  compaction  compact_dump over every file
+  chunk       FeatureAnalyzer.chunk_code_by_files
+  rules       the determine_* detectors and directory features (apply_rules)
+  llm         one request per chunk against the fake server (fake_openai.py)
+  end_to_end  RepositoryPipeline over --repos distinct dumps of the size
+
+Each case reports p50/p99 wall time over --repeat runs, throughput in MB/s
+and items/s, per-item p50/p99 latency where items are timed on their own
+(LLM requests, repositories end to end), the peak of Python allocations
+traced by tracemalloc in one extra run, and the child's peak RSS. Dumps of
+STREAMING_BYTES and more are memory-mapped, as --streaming runs do.
+
+Results go to --output as JSON. Save one as the baseline and pass it with
+--baseline later: cases whose p50 time, allocation peak or peak RSS grew by
+more than --tolerance are reported, and the exit status is 1.
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import math
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Any, Dict, List, Optional
+
+SRC = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src')
+sys.path.insert(0, SRC)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from synthetic import MIXES, generate_dump, write_dump
+from fake_openai import start_server
+
+STAGES = ["filter", "index", "triage", "compaction", "chunk", "rules", "llm", "end_to_end"]
+# Stages that send requests, and therefore only run up to --llm-max-size
+LLM_STAGES = {"llm", "end_to_end"}
+SIZE_UNITS = {"k": 1024, "m": 1024 ** 2, "g": 1024 ** 3}
+# Dumps this large are memory-mapped instead of read into memory
+STREAMING_BYTES = 256 * 1024 ** 2
+# Lower is better for all of them
+COMPARED_METRICS = ["p50_seconds", "alloc_peak_bytes", "peak_rss_bytes"]
+MB = 1024 * 1024
+
+
+def parse_size(value: str) -> int:
+    value = value.strip().lower()
+    if value[-1:] in SIZE_UNITS:
+        return int(float(value[:-1]) * SIZE_UNITS[value[-1]])
+    return int(value)
+
+
+def format_size(size: int) -> str:
+    for unit, factor in (("g", SIZE_UNITS["g"]), ("m", SIZE_UNITS["m"]), ("k", SIZE_UNITS["k"])):
+        if size >= factor:
+            return f"{size / factor:g}{unit}"
+    return str(size)
+
+
+def percentile(values: List[float], q: float) -> Optional[float]:
+    """Nearest-rank percentile."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, math.ceil(q / 100 * len(ordered)) - 1))]
+
+
+class SyntheticBackend:
+    """Fetch backend handing the pipeline in-memory dumps, like the local mirror backend."""
+
+    name = "synthetic"
+
+    def __init__(self, dumps: Dict[str, tuple]):
+        self.dumps = dumps
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        pass
+
+    async def ingest(self, repo: str):
+        directory_structure, code_content = self.dumps[repo]
+        return {'directory_structure': directory_structure, 'textarea_content': code_content}
+
+
+def prepare_case(spec: Dict[str, Any], analyzer):
+    """A function running the stage once and returning (items, per-item latencies or None), and the bytes it covers."""
+    from analysis_cache import AnalysisCache
+    from compaction import compact_dump
+    from metrics import RunMetrics
+    from pipeline import RepositoryPipeline
+    from repo_index import RepositoryDump
+    from results import apply_rules
+    from scraper import GitIngestScraper
+
+    stage = spec["stage"]
+    streaming = spec["size"] >= STREAMING_BYTES
+    with open(spec["tree"], encoding='utf-8') as f:
+        directory_structure = f.read()
+
+    if stage == "end_to_end":
+        repos = [f"synthetic/repo{index}" for index in range(spec["repos"])]
+        # Distinct dumps, so the analysis cache cannot answer for later repositories
+        dumps = {repo: generate_dump(spec["size"], seed=spec["seed"] + index, mix=spec["mix"])
+                 for index, repo in enumerate(repos)}
+        workdir = os.path.join(spec["workdir"], f"end_to_end_{spec['size']}")
+        os.makedirs(workdir, exist_ok=True)
+
+        def run():
+            analyzer.analysis_cache = AnalysisCache(":memory:")
+            analyzer.metrics = RunMetrics()
+            RepositoryPipeline(analyzer, SyntheticBackend(dumps), workdir, save_intermediates=False).run(
+                [(repo, "Unknown") for repo in repos])
+            # Per-repository latency: its time in the stages, without queueing between them
+            repositories = analyzer.metrics.summary()["repositories"]
+            return len(repos), [sum(value for name, value in counters.items() if name.endswith("_seconds"))
+                                for counters in repositories.values()]
+        return run, sum(len(code_content) for _, code_content in dumps.values())
+
+    if streaming:
+        dump = RepositoryDump.open(spec["dump"], directory_structure)
+    else:
+        dump = RepositoryDump.from_file(spec["dump"], directory_structure)
+    size = len(dump.data)
+
+    if stage == "filter":
+        scraper = GitIngestScraper(spec["repo"])
+        if streaming:
+            # Large dumps are filtered file to file, as the streaming pipeline does
+            def run():
+                with open(os.devnull, 'wb') as out:
+                    dump.write_filtered(out, scraper.keep_file_body)
+                return len(dump), None
+        else:
+            raw = dump.data.decode('utf-8')
+
+            def run():
+                scraper.filter_css_content(raw)
+                return len(dump), None
+    elif stage == "index":
+        def run():
+            if streaming:
+                RepositoryDump.open(spec["dump"], directory_structure).close()
+            else:
+                RepositoryDump(dump.data, directory_structure)
+            return len(dump), None
+    elif stage == "triage":
+        def run():
+            return analyzer.triage.run(dump, spec["repo"]).files, None
+    elif stage == "compaction":
+        def run():
+            compacted, report = compact_dump(dump, None, analyzer.token_counter, spec["repo"])
+            compacted.close()
+            return report.files, None
+    elif stage == "chunk":
+        def run():
+            if streaming:
+                return sum(1 for _ in analyzer.iter_code_chunks(dump)), None
+            return len(analyzer.chunk_code_by_files(dump)), None
+    elif stage == "rules":
+        def run():
+            # The engine memoizes signals of the last texts it saw; every run has to scan again
+            analyzer.rule_engine._memo.clear()
+            apply_rules(analyzer, spec["repo"], directory_structure, dump)
+            return len(dump), None
+    elif stage == "llm":
+        chunks = analyzer.chunk_code_by_files(dump)
+
+        async def timed(llm, chunk_num, chunk):
+            started = time.perf_counter()
+            await analyzer._request_chunk_async(llm, chunk_num, chunk)
+            return time.perf_counter() - started
+
+        async def requests():
+            async with analyzer.create_llm_client() as llm:
+                return await asyncio.gather(*(timed(llm, chunk_num, chunk)
+                                              for chunk_num, chunk in enumerate(chunks, 1)))
+
+        def run():
+            return len(chunks), list(asyncio.run(requests()))
+    else:
+        raise ValueError(f"Unknown stage: {stage}")
+    return run, size
+
+
+def run_case(spec: Dict[str, Any]) -> Dict[str, Any]:
+    """Body of the child process: time one stage on one dump."""
+    os.environ.setdefault("OPENAI_API_KEY", "bench")
+    os.environ["OPENAI_BASE_URL"] = spec["base_url"]
+    import log
+    from feature_analyzer import FeatureAnalyzer
+    from metrics import peak_rss_bytes
+
+    log.set_level("warning")
+    samples, latencies = [], []
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        analyzer = FeatureAnalyzer(cache_path=":memory:", max_in_flight=spec["llm_concurrency"],
+                                   streaming=spec["size"] >= STREAMING_BYTES)
+        run, size = prepare_case(spec, analyzer)
+        for _ in range(spec["repeat"]):
+            started = time.perf_counter()
+            items, item_latencies = run()
+            samples.append(time.perf_counter() - started)
+            latencies.extend(item_latencies or [])
+        alloc_peak = None
+        if spec["tracemalloc"]:
+            tracemalloc.start()
+            run()
+            alloc_peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+    p50 = percentile(samples, 50)
+    return {
+        "stage": spec["stage"],
+        "size_bytes": spec["size"],
+        "bytes": size,
+        "items": items,
+        "repeat": spec["repeat"],
+        "seconds": samples,
+        "p50_seconds": p50,
+        "p99_seconds": percentile(samples, 99),
+        "throughput_mb_s": size / MB / p50 if p50 else None,
+        "items_per_s": items / p50 if p50 else None,
+        "item_p50_seconds": percentile(latencies, 50),
+        "item_p99_seconds": percentile(latencies, 99),
+        "alloc_peak_bytes": alloc_peak,
+        "peak_rss_bytes": peak_rss_bytes(),
+    }
+
+
+def run_child(spec: Dict[str, Any]) -> Dict[str, Any]:
+    completed = subprocess.run([sys.executable, os.path.abspath(__file__), '--child', json.dumps(spec)],
+                               capture_output=True, text=True)
+    lines = completed.stdout.strip().splitlines()
+    if completed.returncode != 0 or not lines:
+        error = (completed.stderr.strip().splitlines() or ["no output"])[-1]
+        return {"stage": spec["stage"], "size_bytes": spec["size"], "error": error}
+    return json.loads(lines[-1])
+
+
+def print_result(result: Dict[str, Any]):
+    def value(name, scale=1.0, digits=3):
+        return f"{result[name] * scale:.{digits}f}" if result.get(name) is not None else "-"
+
+    name = f"{result['stage']:<12}{format_size(result['size_bytes']):>7}"
+    if "error" in result:
+        print(f"{name}  ERROR: {result['error']}")
+        return
+    print(f"{name}{value('p50_seconds'):>10}{value('p99_seconds'):>10}{value('throughput_mb_s', digits=1):>10}"
+          f"{value('items_per_s', digits=1):>10}{value('item_p50_seconds'):>10}{value('item_p99_seconds'):>10}"
+          f"{value('alloc_peak_bytes', 1 / MB, 1):>11}{value('peak_rss_bytes', 1 / MB, 0):>10}")
+
+
+def compare(results: List[Dict[str, Any]], baseline: Dict[str, Any], tolerance: float) -> int:
+    """Print the change of every compared metric against the baseline; returns the number of regressions."""
+    base = {(result["stage"], result["size_bytes"]): result for result in baseline["results"] if "error" not in result}
+    regressions = 0
+    print(f"\n{'stage':<12}{'size':>7}  {'metric':<18}{'baseline':>14}{'now':>14}{'change':>9}")
+    for result in results:
+        previous = base.get((result["stage"], result["size_bytes"]))
+        if previous is None or "error" in result:
+            continue
+        for metric in COMPARED_METRICS:
+            if not previous.get(metric) or result.get(metric) is None:
+                continue
+            change = result[metric] / previous[metric] - 1
+            verdict = "REGRESSION" if change > tolerance else "improved" if change < -tolerance else ""
+            regressions += verdict == "REGRESSION"
+            print(f"{result['stage']:<12}{format_size(result['size_bytes']):>7}  {metric:<18}"
+                  f"{previous[metric]:>14.4g}{result[metric]:>14.4g}{change:>+9.0%}  {verdict}")
+    return regressions
+
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=SRC, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', default='10k,1m,10m', help='Comma-separated dump sizes, e.g. 10k,1m,100m,1g')
+    parser.add_argument('--stages', default=','.join(STAGES), help='Comma-separated stages to run')
+    parser.add_argument('--repeat', type=int, default=5, help='Timed runs per case')
+    parser.add_argument('--mix', choices=list(MIXES), default='realistic', help='File mix of the synthetic dumps')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repos', type=int, default=8, help='Repositories in the end-to-end runs')
+    parser.add_argument('--llm-max-size', type=parse_size, default=parse_size('4m'),
+                        help='Largest dump size sent to the (fake) LLM by the llm and end_to_end stages')
+    parser.add_argument('--llm-concurrency', type=int, default=4, help='In-flight requests per repository')
+    parser.add_argument('--latency-ms', type=float, default=50.0, help='Fake server latency per request')
+    parser.add_argument('--jitter-ms', type=float, default=10.0, help='Fake server latency jitter')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Share of requests failing with HTTP 500')
+    parser.add_argument('--rate-limit-rate', type=float, default=0.0, help='Share of requests failing with HTTP 429')
+    parser.add_argument('--base-url', default=None,
+                        help='Use an already running OpenAI-compatible server instead of starting fake_openai.py')
+    parser.add_argument('--no-tracemalloc', action='store_true',
+                        help='Skip the traced run (slow on very large dumps); alloc_peak_bytes is then null')
+    parser.add_argument('--output', default='bench_results.json', help='Where to write the JSON results')
+    parser.add_argument('--baseline', default=None, help='Earlier results to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help='Relative growth of a compared metric reported as a regression')
+    parser.add_argument('--child', default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(run_case(json.loads(args.child))))
+        return
+
+    sizes = [parse_size(size) for size in args.sizes.split(',') if size.strip()]
+    stages = [stage.strip() for stage in args.stages.split(',') if stage.strip()]
+    unknown = set(stages) - set(STAGES)
+    if unknown:
+        parser.error(f"unknown stage(s): {', '.join(sorted(unknown))}")
+
+    config = {key: getattr(args, key) for key in ("mix", "seed", "repeat", "repos", "llm_concurrency", "latency_ms",
+                                                   "jitter_ms", "error_rate", "rate_limit_rate")}
+    server = None
+    base_url = args.base_url
+    if base_url is None:
+        server = start_server(latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, error_rate=args.error_rate,
+                              rate_limit_rate=args.rate_limit_rate, seed=args.seed)
+        base_url = server.base_url
+
+    workdir = tempfile.mkdtemp(prefix='bench_suite_')
+    results = []
+    try:
+        print(f"{os.cpu_count() or 1} core(s), Python {platform.python_version()}, fake LLM at {base_url}")
+        print(f"{'stage':<12}{'size':>7}{'p50 s':>10}{'p99 s':>10}{'MB/s':>10}{'items/s':>10}"
+              f"{'item p50':>10}{'item p99':>10}{'alloc MB':>11}{'RSS MB':>10}")
+        for size in sizes:
+            dump_path = os.path.join(workdir, f"dump_{size}.txt")
+            tree_path = os.path.join(workdir, f"tree_{size}.txt")
+            directory_structure = write_dump(dump_path, size, seed=args.seed, mix=args.mix)
+            with open(tree_path, 'w', encoding='utf-8') as f:
+                f.write(directory_structure)
+            for stage in stages:
+                if stage in LLM_STAGES and size > args.llm_max_size:
+                    continue
+                result = run_child({
+                    "stage": stage, "size": size, "dump": dump_path, "tree": tree_path, "repo": "synthetic/repo",
+                    "repeat": args.repeat, "repos": args.repos, "seed": args.seed, "mix": args.mix,
+                    "base_url": base_url, "llm_concurrency": args.llm_concurrency, "workdir": workdir,
+                    "tracemalloc": not args.no_tracemalloc,
+                })
+                results.append(result)
+                print_result(result)
+            os.remove(dump_path)
+            os.remove(tree_path)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+        if server is not None:
+            server.shutdown()
+
+    report = {
+        "meta": {
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "revision": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "fake_server": server.stats if server is not None else None,
+        },
+        "config": config,
+        "results": results,
+    }
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+        if baseline.get("config") != config:
+            print(f"[WARNING] The baseline was run with different settings: {baseline.get('config')}")
+        regressions = compare(results, baseline, args.tolerance)
+        print(f"\n{regressions} regression(s) beyond {args.tolerance:.0%}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,307 @@
+"""Local OpenAI-compatible chat-completions and batch server for benchmarks and tests.
+
+Usage: python benchmarks/fake_openai.py [--port 8767] [--latency-ms 200] [--jitter-ms 50]
+                                        [--error-rate 0.01] [--rate-limit-rate 0.02]
+                                        [--batch-polls 2] [--batch-outcome completed]
+
+Point the analyzer at it with OPENAI_BASE_URL=http://127.0.0.1:8767/v1 (any
+OPENAI_API_KEY works). Every request waits latency +/- jitter, then fails
+with a 429 (with Retry-After) at --rate-limit-rate, with a 500 at
+--error-rate, or answers. A feature is reported present when its name
+appears in the code, so answers are deterministic and cacheable; packed
+requests get one answer per section. Usage and rate-limit headers are
+filled in like the real API's. start_server() runs it in a thread; tests
+can script the statuses of the next requests through `statuses`.
+
+The batch endpoints (POST /v1/files, GET /v1/files/<id>/content, POST
+/v1/batches, GET /v1/batches/<id>) accept a JSONL file of chat-completion
+requests and return JSONL results with the same answers, without latency.
+A batch finishes on its --batch-polls'th retrieval with --batch-outcome:
+"completed" answers every request (a share of --error-rate of them with a
+500 in the error file), "expired" answers the first half and reports the
+rest as batch_expired in the error file, "failed" answers none.
+"""
+import argparse
+import email.parser
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+
+COMPLETION_TOKENS = 50
+BATCH_OUTCOMES = ("completed", "expired", "failed")
+FEATURE_KEY = re.compile(r'"([a-z_]+)": \{"present"')
+SECTION = re.compile(r'^### SECTION (\S+) ###$', re.MULTILINE)
+
+
+class FakeOpenAIServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, latency_ms: float = 0.0, jitter_ms: float = 0.0, error_rate: float = 0.0,
+                 rate_limit_rate: float = 0.0, seed: Optional[int] = None, batch_polls: int = 1,
+                 batch_outcome: str = "completed"):
+        super().__init__(address, FakeOpenAIHandler)
+        self.latency = latency_ms / 1000
+        self.jitter = jitter_ms / 1000
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.batch_polls = batch_polls
+        self.batch_outcome = batch_outcome
+        # Statuses (429, 500 or 200) of the next chat-completion requests, one each, before random outcomes
+        self.statuses: List[int] = []
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.stats = {"requests": 0, "rate_limited": 0, "errors": 0, "files": 0, "batches": 0}
+        self.files: Dict[str, Dict[str, Any]] = {}
+        self.batches: Dict[str, Dict[str, Any]] = {}
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def draw(self) -> Tuple[float, int]:
+        """(delay in seconds, status: 429, 500 or 200) for one request."""
+        with self.lock:
+            self.stats["requests"] += 1
+            delay = max(0.0, self.latency + self.random.uniform(-self.jitter, self.jitter))
+            outcome = self.random.random()
+            if self.statuses:
+                return delay, self.statuses.pop(0)
+            if outcome < self.rate_limit_rate:
+                return delay, 429
+            return delay, 500 if outcome < self.rate_limit_rate + self.error_rate else 200
+
+    def count(self, outcome: str):
+        with self.lock:
+            self.stats[outcome] += 1
+
+    def add_file(self, content: bytes, filename: str, purpose: str) -> Dict[str, Any]:
+        with self.lock:
+            return self.files[self._store_file(content, filename, purpose)]
+
+    def create_batch(self, input_file_id: str, endpoint: str, completion_window: str) -> Dict[str, Any]:
+        with self.lock:
+            self.stats["batches"] += 1
+            batch_id = f"batch_{self.stats['batches']}"
+            now = int(time.time())
+            self.batches[batch_id] = {
+                "id": batch_id, "object": "batch", "endpoint": endpoint, "errors": None,
+                "input_file_id": input_file_id, "completion_window": completion_window, "status": "validating",
+                "output_file_id": None, "error_file_id": None, "created_at": now, "in_progress_at": None,
+                "expires_at": now + 24 * 3600, "completed_at": None, "failed_at": None, "expired_at": None,
+                "request_counts": {"total": 0, "completed": 0, "failed": 0}, "metadata": None, "polls": 0,
+            }
+        return self.batches[batch_id]
+
+    def retrieve_batch(self, batch_id: str) -> Dict[str, Any]:
+        """The batch after one more poll; it runs to its outcome on the batch_polls'th one."""
+        with self.lock:
+            batch = self.batches[batch_id]
+            batch["polls"] += 1
+            if batch["status"] in ("validating", "in_progress"):
+                if batch["polls"] >= self.batch_polls:
+                    self._finish_batch(batch)
+                else:
+                    batch["status"], batch["in_progress_at"] = "in_progress", int(time.time())
+        return batch
+
+    def _finish_batch(self, batch: Dict[str, Any]):
+        requests = [json.loads(line) for line in self.files[batch["input_file_id"]]["content"].splitlines()
+                    if line.strip()]
+        now = int(time.time())
+        batch["request_counts"]["total"] = len(requests)
+        if self.batch_outcome == "failed":
+            batch["status"], batch["failed_at"] = "failed", now
+            batch["errors"] = {"object": "list", "data": [{"code": "invalid_request", "line": None,
+                                                           "message": "The batch failed", "param": None}]}
+            return
+        answered = len(requests) if self.batch_outcome == "completed" else len(requests) // 2
+        outputs, errors = [], []
+        for index, request in enumerate(requests):
+            result = {"id": f"batch_req_{index}", "custom_id": request["custom_id"], "response": None, "error": None}
+            if index >= answered:
+                result["error"] = {"code": "batch_expired", "message": "This request could not be executed before "
+                                                                       "the completion window expired."}
+                errors.append(result)
+            elif self.random.random() < self.error_rate:
+                result["response"] = {"status_code": 500, "request_id": f"req_{index}",
+                                      "body": {"error": {"message": "The server had an error",
+                                                         "type": "server_error"}}}
+                errors.append(result)
+            else:
+                result["response"] = {"status_code": 200, "request_id": f"req_{index}",
+                                      "body": completion(request["body"], f"chatcmpl-{batch['id']}-{index}")}
+                outputs.append(result)
+        for key, results in (("output_file_id", outputs), ("error_file_id", errors)):
+            if results:
+                content = "".join(json.dumps(result) + "\n" for result in results).encode('utf-8')
+                batch[key] = self._store_file(content, f"{batch['id']}_{key[:-8]}.jsonl", "batch_output")
+        batch["request_counts"]["completed"], batch["request_counts"]["failed"] = len(outputs), len(errors)
+        batch["status"] = self.batch_outcome
+        batch["completed_at" if self.batch_outcome == "completed" else "expired_at"] = now
+
+    def _store_file(self, content: bytes, filename: str, purpose: str) -> str:
+        # Called under the lock
+        self.stats["files"] += 1
+        file_id = f"file-{self.stats['files']}"
+        self.files[file_id] = {"id": file_id, "object": "file", "bytes": len(content),
+                               "created_at": int(time.time()), "filename": filename, "purpose": purpose,
+                               "status": "processed", "content": content}
+        return file_id
+
+
+def answer(code: str, features) -> dict:
+    lowered = code.lower()
+    return {feature: {"present": feature in lowered, "details": f"{feature} found" if feature in lowered else "",
+                      "improvements": ""} for feature in features}
+
+
+def completion_content(prompt: str) -> str:
+    features = list(dict.fromkeys(FEATURE_KEY.findall(prompt)))
+    code = prompt.split("Code to analyze:", 1)[-1]
+    parts = SECTION.split(code)
+    if len(parts) > 1:
+        # parts = [preamble, id1, code1, id2, code2, ...]
+        return json.dumps({parts[i]: answer(parts[i + 1], features) for i in range(1, len(parts), 2)})
+    return json.dumps(answer(code, features))
+
+
+def completion(request: dict, completion_id: str) -> dict:
+    """The chat.completion object answering a request body."""
+    prompt = "\n".join(message.get("content", "") for message in request.get("messages", []))
+    prompt_tokens = len(prompt) // 4 + 1
+    return {
+        "id": completion_id,
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": request.get("model", "fake"),
+        "choices": [{"index": 0, "finish_reason": "stop",
+                     "message": {"role": "assistant", "content": completion_content(prompt)}}],
+        "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": COMPLETION_TOKENS,
+                  "total_tokens": prompt_tokens + COMPLETION_TOKENS},
+    }
+
+
+def parse_multipart(content_type: str, body: bytes) -> Dict[str, Tuple[Optional[str], bytes]]:
+    """Form field name -> (filename, value) of a multipart/form-data body."""
+    message = email.parser.BytesParser().parsebytes(f"Content-Type: {content_type}\r\n\r\n".encode() + body)
+    return {part.get_param("name", header="content-disposition"): (part.get_filename(), part.get_payload(decode=True))
+            for part in message.get_payload()}
+
+
+class FakeOpenAIHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status: int, payload: dict, headers: Optional[dict] = None):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _not_found(self):
+        self._send(404, {"error": {"message": f"unknown path {self.path}", "type": "invalid_request_error"}})
+
+    def _send_batch(self, batch: Dict[str, Any]):
+        self._send(200, {key: value for key, value in batch.items() if key != "polls"})
+
+    def do_GET(self):
+        server = self.server
+        parts = self.path.rstrip("/").split("/")
+        if len(parts) == 5 and parts[2] == "files" and parts[4] == "content" and parts[3] in server.files:
+            content = server.files[parts[3]]["content"]
+            self.send_response(200)
+            self.send_header("Content-Type", "application/octet-stream")
+            self.send_header("Content-Length", str(len(content)))
+            self.end_headers()
+            self.wfile.write(content)
+        elif len(parts) == 4 and parts[2] == "files" and parts[3] in server.files:
+            self._send(200, {key: value for key, value in server.files[parts[3]].items() if key != "content"})
+        elif len(parts) == 4 and parts[2] == "batches" and parts[3] in server.batches:
+            self._send_batch(server.retrieve_batch(parts[3]))
+        else:
+            self._not_found()
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        if self.path.endswith("/files"):
+            fields = parse_multipart(self.headers.get("Content-Type", ""), body)
+            filename, content = fields.get("file", (None, None))
+            if content is None:
+                self._send(400, {"error": {"message": "missing file", "type": "invalid_request_error"}})
+                return
+            purpose = fields.get("purpose", (None, b""))[1].decode()
+            stored = self.server.add_file(content, filename or "upload.jsonl", purpose)
+            self._send(200, {key: value for key, value in stored.items() if key != "content"})
+            return
+        request = json.loads(body or b'{}')
+        if self.path.endswith("/batches"):
+            if request.get("input_file_id") not in self.server.files:
+                self._send(400, {"error": {"message": "unknown input_file_id", "type": "invalid_request_error"}})
+                return
+            self._send_batch(self.server.create_batch(request["input_file_id"], request.get("endpoint", ""),
+                                                      request.get("completion_window", "24h")))
+            return
+        if not self.path.endswith("/chat/completions"):
+            self._not_found()
+            return
+        server = self.server
+        delay, status = server.draw()
+        time.sleep(delay)
+        if status == 429:
+            server.count("rate_limited")
+            self._send(429, {"error": {"message": "Rate limit reached", "type": "requests"}},
+                       {"retry-after": "0.2", "x-ratelimit-remaining-requests": "0",
+                        "x-ratelimit-reset-requests": "200ms"})
+            return
+        if status == 500:
+            server.count("errors")
+            self._send(500, {"error": {"message": "The server had an error", "type": "server_error"}})
+            return
+        self._send(200, completion(request, f"chatcmpl-{server.stats['requests']}"),
+                   {"x-ratelimit-limit-requests": "10000", "x-ratelimit-remaining-requests": "9999",
+                    "x-ratelimit-reset-requests": "6ms"})
+
+
+def start_server(port: int = 0, **options) -> FakeOpenAIServer:
+    """Serve in a daemon thread (port 0: any free port); call shutdown() when done."""
+    server = FakeOpenAIServer(("127.0.0.1", port), **options)
+    # A short poll interval lets shutdown() return promptly (tests start a server each)
+    threading.Thread(target=server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--port', type=int, default=8767)
+    parser.add_argument('--latency-ms', type=float, default=200.0, help='Mean time to answer a request')
+    parser.add_argument('--jitter-ms', type=float, default=50.0, help='Uniform jitter around the latency')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Share of requests failing with HTTP 500')
+    parser.add_argument('--rate-limit-rate', type=float, default=0.0, help='Share of requests failing with HTTP 429')
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--batch-polls', type=int, default=2, help='Retrievals after which a batch job finishes')
+    parser.add_argument('--batch-outcome', choices=BATCH_OUTCOMES, default='completed',
+                        help='How batch jobs end')
+    args = parser.parse_args()
+    server = FakeOpenAIServer(("127.0.0.1", args.port), args.latency_ms, args.jitter_ms, args.error_rate,
+                              args.rate_limit_rate, args.seed, args.batch_polls, args.batch_outcome)
+    print(f"Serving on {server.base_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    print(json.dumps(server.stats))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+import random
+from typing import Iterator, List, Tuple
+
+HEADER = '=' * 48
+
+# (path template, weight, line generator name, (min, max) lines per file)
+FILE_MIX = [
+    ("src/components/{name}.jsx", 20, "js", (20, 400)),
+    ("src/pages/{name}.js", 10, "js", (20, 400)),
+    ("src/lib/{name}.ts", 12, "js", (20, 400)),
+    ("server/{name}.py", 10, "py", (20, 400)),
+    ("api/{name}.go", 4, "go", (20, 400)),
+    ("docs/{name}.md", 6, "md", (20, 400)),
+    ("config/{name}.json", 4, "json", (20, 400)),
+    ("public/{name}.min.js", 2, "minified", (20, 400)),
+    ("styles/{name}.css", 3, "css", (20, 400)),
+]
+
+# Closer to real repositories: tests, vendored dependencies, lockfiles, CI and
+# container configs and assets next to the source, with their typical sizes
+REALISTIC_MIX = [
+    ("src/components/{name}.tsx", 18, "js", (20, 300)),
+    ("src/lib/{name}.ts", 10, "js", (20, 400)),
+    ("server/{name}.py", 10, "py", (20, 500)),
+    ("tests/test_{name}.py", 8, "test", (10, 200)),
+    ("api/{name}.go", 4, "go", (20, 400)),
+    ("node_modules/{name}/index.js", 8, "js", (50, 1500)),
+    ("vendor/{name}.min.js", 2, "minified", (1, 20)),
+    ("packages/{name}/package-lock.json", 1, "lock", (1000, 6000)),
+    ("docs/{name}.md", 6, "md", (5, 120)),
+    ("config/{name}.json", 3, "json", (5, 60)),
+    (".github/workflows/{name}.yml", 1, "yaml", (10, 60)),
+    ("docker/{name}/Dockerfile", 1, "docker", (5, 30)),
+    ("assets/{name}.svg", 2, "svg", (5, 80)),
+    ("styles/{name}.css", 3, "css", (20, 300)),
+]
+
+MIXES = {"default": FILE_MIX, "realistic": REALISTIC_MIX}
+
+WORDS = ["user", "data", "value", "config", "state", "props", "item", "list", "result", "request",
+         "response", "session", "token", "cache", "query", "record", "event", "handler", "client", "server"]
+
+# Sprinkled in so the rule detectors have something to find
+SIGNALS = ["firebase.initializeApp(config)", "redis.createClient()", "import openai", "vercel deploy",
+           "socket.io", "createApp(App)", "st.title('demo')", "npm publish", "aws-sdk", "kafkajs"]
+
+
+def _identifier(rng):
+    return rng.choice(WORDS) + rng.choice(WORDS).title()
+
+
+def _line(kind, rng):
+    a, b = _identifier(rng), _identifier(rng)
+    if kind == "js":
+        return rng.choice([
+            f"const {a} = await fetch{b}({rng.choice(WORDS)});",
+            f"export function {a}({b}) {{ return {b}.{rng.choice(WORDS)}; }}",
+            f"import {{ {a} }} from './{b}';",
+            f"  if (!{a}) {{ throw new Error('{b} missing'); }}",
+            f"// TODO: refactor {a} once {b} lands",
+        ])
+    if kind == "py":
+        return rng.choice([
+            f"def {a}({b}):",
+            f"    return {b}.get('{rng.choice(WORDS)}')",
+            f"from {rng.choice(WORDS)} import {a}",
+            f"    # {a} handles {b}",
+        ])
+    if kind == "go":
+        return rng.choice([f"func {a}({b} string) error {{", f"\treturn {b}.{a}()", "}"])
+    if kind == "md":
+        return f"The {a} module talks to {b} and caches the {rng.choice(WORDS)}."
+    if kind == "json":
+        return f'  "{a}": "{b}",'
+    if kind == "css":
+        return f".{a} {{ color: #{rng.randrange(0xFFFFFF):06x}; }}"
+    if kind == "minified":
+        return ";".join(f"var {_identifier(rng)}={rng.randrange(1000)}" for _ in range(60))
+    if kind == "test":
+        return rng.choice([f"def test_{a}():", f"    assert {a}({b}) == {rng.randrange(100)}",
+                           f"    {b} = make_{rng.choice(WORDS)}()", f"from app.{rng.choice(WORDS)} import {a}"])
+    if kind == "lock":
+        integrity = "".join(rng.choice("ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+/")
+                            for _ in range(86))
+        return (f'    "node_modules/{a.lower()}": {{"version": "{rng.randrange(10)}.{rng.randrange(30)}.'
+                f'{rng.randrange(20)}", "integrity": "sha512-{integrity}=="}},')
+    if kind == "yaml":
+        return rng.choice(["      - uses: actions/checkout@v4", f"      - run: npm run {rng.choice(WORDS)}",
+                           f"    {a}: ${{{{ secrets.{b.upper()} }}}}", f"  {a}:"])
+    if kind == "docker":
+        return rng.choice(["FROM python:3.11-slim", f"RUN pip install {a.lower()}", "COPY . /app",
+                           f"ENV {a.upper()}={b}"])
+    if kind == "svg":
+        return f'<path d="M{rng.randrange(512)} {rng.randrange(512)}L{rng.randrange(512)} {rng.randrange(512)}Z"/>'
+    return a
+
+
+PACKAGE_JSON = f"{HEADER}\nFile: package.json\n{HEADER}\n{{\n  \"name\": \"synthetic\",\n  \"dependencies\": {{\"react\": \"18\"}}\n}}\n"
+
+
+def iter_files(rng: random.Random, target_bytes: int, signal_rate: float = 0.002,
+               mix: str = "default") -> Iterator[Tuple[str, str]]:
+    """Yield (path, gitingest block) pairs until about target_bytes have been produced."""
+    templates, weights, kinds, line_counts = zip(*MIXES[mix])
+    yield "package.json", PACKAGE_JSON
+    size = len(PACKAGE_JSON)
+    index = 0
+    while size < target_bytes:
+        choice = rng.choices(range(len(templates)), weights=weights)[0]
+        path = templates[choice].format(name=f"{_identifier(rng)}{index}")
+        index += 1
+        lines = []
+        for _ in range(rng.randint(*line_counts[choice])):
+            if rng.random() < signal_rate:
+                lines.append(rng.choice(SIGNALS))
+            else:
+                lines.append(_line(kinds[choice], rng))
+        body = "\n".join(lines)
+        part = f"{HEADER}\nFile: {path}\n{HEADER}\n{body}\n"
+        yield path, part
+        size += len(part)
+
+
+def generate_dump(target_bytes: int, seed: int = 0, signal_rate: float = 0.002,
+                  mix: str = "default") -> Tuple[str, str]:
+    """Build a synthetic (directory_structure, code_content) pair in gitingest format."""
+    paths: List[str] = ["README.md"]
+    parts = []
+    for path, part in iter_files(random.Random(seed), target_bytes, signal_rate, mix):
+        paths.append(path)
+        parts.append(part)
+    return directory_tree("synthetic-repo", paths), "\n".join(parts)
+
+
+def write_dump(path: str, target_bytes: int, seed: int = 0, signal_rate: float = 0.002,
+               distinct_bytes: int = 32 * 1024 * 1024, mix: str = "default") -> str:
+    """Write a synthetic dump of about target_bytes to path and return its directory structure.
+
+    Only distinct_bytes of file bodies are generated; larger dumps repeat
+    them under new paths, which keeps generating hundreds of MB fast.
+    """
+    files = list(iter_files(random.Random(seed), min(target_bytes, distinct_bytes), signal_rate, mix))
+    paths: List[str] = ["README.md"]
+    written = 0
+    with open(path, "w", encoding="utf-8") as f:
+        copy = 0
+        while written < target_bytes:
+            for index, (file_path, part) in enumerate(files):
+                if copy:
+                    renamed = f"copy{copy}/{file_path}"
+                    part = part.replace(f"File: {file_path}\n", f"File: {renamed}\n", 1)
+                    file_path = renamed
+                if written:
+                    written += f.write("\n")
+                written += f.write(part)
+                paths.append(file_path)
+                if written >= target_bytes:
+                    break
+            copy += 1
+    return directory_tree("synthetic-repo", paths)
+
+
+def directory_tree(root: str, paths: List[str]) -> str:
+    """Render paths the way gitingest draws its directory structure."""
+    tree = {}
+    for path in paths:
+        node = tree
+        for part in path.split('/'):
+            node = node.setdefault(part, {})
+
+    lines = ["Directory structure:", f"└── {root}/"]
+
+    def walk(node, prefix):
+        names = sorted(node)
+        for position, name in enumerate(names):
+            last = position == len(names) - 1
+            child = node[name]
+            lines.append(f"{prefix}{'└── ' if last else '├── '}{name}{'/' if child else ''}")
+            if child:
+                walk(child, prefix + ('    ' if last else '│   '))
+
+    walk(tree, "    ")
+    return "\n".join(lines)
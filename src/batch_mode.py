@@ -0,0 +1,193 @@
+"""Offline batch mode: chunk requests go through a batch endpoint instead of one call each.
+
+Every chunk request analyze_with_llm would send (and the analysis cache
+cannot answer) is written to JSONL batch files under temp/batch/, with the
+chunk's cache key as a stable custom_id. The files are uploaded, submitted
+as batch jobs and polled until they finish. Each answer is validated like
+an online one and stored in the analysis cache, so the normal analysis pass
+afterwards merges them as cache hits and writes the CSV unchanged. Failed
+or missing answers are sent online during that pass.
+
+Progress (files, batch ids, the features each request asked about) is kept
+in temp/batch/state.json. A restarted run resumes polling instead of
+submitting again, and the state is removed once the results are written.
+"""
+import json
+import os
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+DEFAULT_BATCH_DIR = os.path.join("temp", "batch")
+BATCH_ENDPOINT = "/v1/chat/completions"
+# Per-file limits of the OpenAI batch API, with some headroom
+MAX_BATCH_REQUESTS = 50000
+MAX_BATCH_BYTES = 190 * 1024 * 1024
+TERMINAL_STATUSES = {"completed", "failed", "expired", "cancelled"}
+
+
+class BatchState:
+    """JSON file of the current batch run: config, repositories, batch files and per-request features."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.data: Dict[str, Any] = {}
+        if os.path.exists(path):
+            with open(path, encoding='utf-8') as f:
+                self.data = json.load(f)
+
+    def pending(self, config: str) -> bool:
+        return bool(self.data) and self.data.get("config") == config
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.data, f)
+        os.replace(temp_path, self.path)
+
+    def clear(self):
+        self.data = {}
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+class BatchRunner:
+    """Builds, submits, polls and ingests the batch jobs of one run."""
+
+    def __init__(self, analyzer, batch_dir: str = DEFAULT_BATCH_DIR, poll_interval: float = 60.0):
+        self.analyzer = analyzer
+        self.batch_dir = batch_dir
+        self.poll_interval = poll_interval
+        self.client = analyzer.client
+        self.config = analyzer.config_fingerprint()
+        self.state = BatchState(os.path.join(batch_dir, "state.json"))
+
+    def pending_repositories(self) -> Optional[List[str]]:
+        """Repositories of an unfinished batch run with this configuration, or None."""
+        return self.state.data["repositories"] if self.state.pending(self.config) else None
+
+    def build(self, requests: Iterable[Tuple[str, str, Optional[List[str]], Dict[str, Any]]],
+              repositories: List[str]):
+        """Write (repo, custom_id, features, body) requests into batch files; identical chunks are written once."""
+        os.makedirs(self.batch_dir, exist_ok=True)
+        features: Dict[str, Optional[List[str]]] = {}
+        batches: List[Dict[str, Any]] = []
+        output = None
+        count = size = 0
+        for _, custom_id, asked, body in requests:
+            if custom_id in features:
+                continue
+            features[custom_id] = asked
+            line = json.dumps({"custom_id": custom_id, "method": "POST", "url": BATCH_ENDPOINT, "body": body}) + "\n"
+            encoded = line.encode('utf-8')
+            if output is None or count >= MAX_BATCH_REQUESTS or size + len(encoded) > MAX_BATCH_BYTES:
+                if output is not None:
+                    output.close()
+                path = os.path.join(self.batch_dir, f"requests_{len(batches) + 1:03d}.jsonl")
+                batches.append({"input": path, "requests": 0, "file_id": None, "batch_id": None,
+                                "status": "built", "ingested": False})
+                output = open(path, 'wb')
+                count = size = 0
+            output.write(encoded)
+            batches[-1]["requests"] += 1
+            count += 1
+            size += len(encoded)
+        if output is not None:
+            output.close()
+        self.state.data = {"config": self.config, "repositories": repositories, "batches": batches,
+                           "features": features}
+        self.state.save()
+        print(f"[BATCH] Wrote {len(features)} request(s) into {len(batches)} batch file(s) in {self.batch_dir}")
+
+    def submit(self):
+        for batch in self.state.data["batches"]:
+            if batch["batch_id"]:
+                continue
+            if not batch["file_id"]:
+                with open(batch["input"], 'rb') as f:
+                    batch["file_id"] = self.client.files.create(file=f, purpose="batch").id
+                self.state.save()
+            job = self.client.batches.create(input_file_id=batch["file_id"], endpoint=BATCH_ENDPOINT,
+                                             completion_window="24h")
+            batch["batch_id"], batch["status"] = job.id, job.status
+            self.state.save()
+            print(f"[BATCH] Submitted {batch['input']} ({batch['requests']} requests) as {job.id}")
+
+    def poll(self):
+        """Wait until every batch job has reached a terminal status."""
+        while True:
+            waiting = []
+            for batch in self.state.data["batches"]:
+                if batch["status"] in TERMINAL_STATUSES:
+                    continue
+                job = self.client.batches.retrieve(batch["batch_id"])
+                batch["status"] = job.status
+                batch["output_file_id"] = job.output_file_id
+                batch["error_file_id"] = job.error_file_id
+                if job.status not in TERMINAL_STATUSES:
+                    counts = job.request_counts
+                    waiting.append(f"{job.id} {job.status}"
+                                   + (f" {counts.completed + counts.failed}/{counts.total}" if counts else ""))
+            self.state.save()
+            if not waiting:
+                return
+            print(f"[BATCH] Waiting {self.poll_interval:.0f}s for: {', '.join(waiting)}")
+            time.sleep(self.poll_interval)
+
+    def _ingest_lines(self, text: str) -> Tuple[int, int]:
+        stored = failed = 0
+        features = self.state.data["features"]
+        for line in text.splitlines():
+            if not line.strip():
+                continue
+            result = json.loads(line)
+            custom_id = result.get("custom_id")
+            response = result.get("response") or {}
+            if custom_id not in features or result.get("error") or response.get("status_code") != 200:
+                failed += 1
+                continue
+            try:
+                content = response["body"]["choices"][0]["message"]["content"]
+            except (KeyError, IndexError, TypeError):
+                failed += 1
+                continue
+            if self.analyzer.store_batch_answer(custom_id, content, features[custom_id]):
+                stored += 1
+            else:
+                failed += 1
+        return stored, failed
+
+    def ingest(self):
+        """Validate the answers of finished batch jobs into the analysis cache."""
+        for batch in self.state.data["batches"]:
+            if batch["ingested"]:
+                continue
+            stored = failed = 0
+            for file_id in (batch.get("output_file_id"), batch.get("error_file_id")):
+                if file_id:
+                    counts = self._ingest_lines(self.client.files.content(file_id).text)
+                    stored, failed = stored + counts[0], failed + counts[1]
+            batch["ingested"] = True
+            self.state.save()
+            missing = batch["requests"] - stored - failed
+            print(f"[BATCH] {batch['batch_id']} ({batch['status']}): {stored} answer(s) stored, {failed} failed"
+                  f"{f', {missing} missing' if missing > 0 else ''}; failed and missing chunks are sent online")
+
+    def run(self, requests, repositories: List[str]):
+        """Build (unless resuming), submit, poll and ingest."""
+        if not self.state.pending(self.config):
+            self.build(requests, repositories)
+        else:
+            print(f"[BATCH] Resuming the batch run in {self.state.path}")
+        if not self.state.data["batches"]:
+            return
+        self.submit()
+        self.poll()
+        self.ingest()
+
+    def finish(self):
+        """Forget the finished run (and remove its request files) so the next one builds new batches."""
+        for batch in self.state.data.get("batches", []):
+            if os.path.exists(batch["input"]):
+                os.remove(batch["input"])
+        self.state.clear()
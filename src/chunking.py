@@ -0,0 +1,253 @@
+"""Splitting code dumps into chunks for the LLM.
+
+Two strategies:
+    iter_line_chunks  the original character-budget line splitter
+    plan_chunks       packs whole files into token-budgeted chunks (best-fit
+                      decreasing) and splits only files larger than a chunk,
+                      preferring blank lines and top-level statements as cut points
+"""
+import bisect
+from typing import Iterable, Iterator, List, NamedTuple, Optional, Union
+from repo_index import RepositoryDump
+
+try:
+    import tiktoken
+    TIKTOKEN_AVAILABLE = True
+except ImportError:
+    TIKTOKEN_AVAILABLE = False
+
+HEADER_LINE = '=' * 48
+
+# Fallback estimate when tiktoken (or its encoding files) is unavailable;
+# code averages a bit more than 3 characters per token, so this errs on the safe side
+CHARS_PER_TOKEN = 3
+
+
+def iter_line_chunks(lines: Iterable[str], chunk_size: int) -> Iterator[str]:
+    """Group lines into chunks of about chunk_size characters, preferring file boundaries.
+
+    Lines are consumed lazily, so only the chunk being built is held in memory.
+    """
+    current_chunk = []
+    current_size = 0
+    for line in lines:
+        line_size = len(line)
+
+        # If adding this line would exceed chunk size, start a new chunk
+        if current_size + line_size > chunk_size and current_chunk:
+            yield '\n'.join(current_chunk)
+            current_chunk = []
+            current_size = 0
+
+        current_chunk.append(line)
+        current_size += line_size
+
+        # When we hit a file header, consider starting a new chunk
+        if line.startswith(HEADER_LINE) and current_size > chunk_size / 2:
+            yield '\n'.join(current_chunk)
+            current_chunk = []
+            current_size = 0
+
+    # Add the last chunk if it exists
+    if current_chunk:
+        yield '\n'.join(current_chunk)
+
+
+class TokenCounter:
+    """Counts tokens with the model's tiktoken encoding, or estimates them."""
+
+    def __init__(self, model: str):
+        self.encoding = None
+        if TIKTOKEN_AVAILABLE:
+            try:
+                self.encoding = tiktoken.encoding_for_model(model)
+            except Exception as e:
+                # Unknown model or the encoding could not be downloaded
+                print(f"[WARNING] tiktoken encoding unavailable for {model}, estimating tokens ({type(e).__name__})")
+
+    @property
+    def exact(self) -> bool:
+        return self.encoding is not None
+
+    def count(self, text: str) -> int:
+        if self.encoding is not None:
+            return len(self.encoding.encode(text, disallowed_special=()))
+        return len(text) // CHARS_PER_TOKEN + 1 if text else 0
+
+
+class ChunkItem(NamedTuple):
+    path: Optional[str]  # None for text before the first file header
+    start: int           # byte range of the body (or of the raw text when path is None)
+    end: int
+    tokens: int          # header included
+    part: int = 1
+    parts: int = 1
+
+
+def _header(path: str, part: int, parts: int) -> str:
+    suffix = f" (part {part}/{parts})" if parts > 1 else ""
+    return f"{HEADER_LINE}\nFile: {path}{suffix}\n{HEADER_LINE}\n"
+
+
+def _cut_score(previous: bytes, line: bytes) -> int:
+    """How good a place the start of `line` is to split a file (0 = mid-statement)."""
+    top_level = bool(line) and line[:1] not in b' \t})]'
+    if not previous.strip():
+        return 2 if top_level else 1
+    if top_level and previous[:1] in b'})]':
+        return 2
+    return 0
+
+
+def _utf8_boundary(data, position: int, start: int) -> int:
+    # Never cut inside a multi-byte character
+    while position > start and (data[position] & 0xC0) == 0x80:
+        position -= 1
+    return position
+
+
+def _split_body(data, start: int, end: int, budget: int, counter: TokenCounter) -> List[tuple]:
+    """Split data[start:end] into (start, end, tokens) pieces of at most `budget` tokens."""
+    pieces = []
+    piece_start = start
+    piece_tokens = 0
+    candidates = []  # (offset, tokens before offset, score) inside the current piece
+    previous = b''
+    position = start
+    while position < end:
+        newline = data.find(b'\n', position, end)
+        line_end = end if newline < 0 else newline
+        line = data[position:line_end]
+        line_tokens = counter.count(line.decode('utf-8', 'replace')) + 1
+
+        while piece_tokens + line_tokens > budget and position > piece_start:
+            best = None
+            for candidate in candidates:
+                if candidate[1] >= budget / 2 and (best is None or candidate[2] >= best[2]):
+                    best = candidate
+            cut, cut_tokens = (best[0], best[1]) if best and best[2] else (position, piece_tokens)
+            pieces.append((piece_start, cut - 1, cut_tokens))
+            piece_start = cut
+            piece_tokens -= cut_tokens
+            candidates = [(o, t - cut_tokens, s) for o, t, s in candidates if o > cut]
+
+        if position > piece_start:
+            candidates.append((position, piece_tokens, _cut_score(previous, line)))
+
+        if line_tokens > budget:
+            # A single line (e.g. minified code) larger than a chunk is cut by size
+            if position > piece_start:
+                pieces.append((piece_start, position - 1, piece_tokens))
+            # Bytes are not tokens: aim below the budget so uneven parts still fit
+            parts = -(-line_tokens // max(1, budget * 9 // 10))
+            step = max(1, -(-(line_end - position) // parts))
+            cursor = position
+            while cursor < line_end:
+                cut = min(line_end, cursor + step)
+                if cut < line_end:
+                    cut = _utf8_boundary(data, cut, cursor + 1)
+                pieces.append((cursor, cut, counter.count(data[cursor:cut].decode('utf-8', 'replace'))))
+                cursor = cut
+            piece_start = line_end + 1
+            piece_tokens = 0
+            candidates = []
+        else:
+            piece_tokens += line_tokens
+        previous = line
+        position = line_end + 1
+
+    if piece_start < end or not pieces:
+        pieces.append((piece_start, end, piece_tokens))
+    return pieces
+
+
+class ChunkPlan:
+    """Assignment of files (or parts of files) to chunks, computed before any chunk text is built."""
+
+    def __init__(self, dump: RepositoryDump, chunks: List[List[ChunkItem]], budget: int):
+        self.dump = dump
+        self.chunks = chunks
+        self.budget = budget
+
+    def __len__(self):
+        return len(self.chunks)
+
+    @property
+    def total_tokens(self) -> int:
+        return sum(item.tokens for chunk in self.chunks for item in chunk)
+
+    @property
+    def fill_ratio(self) -> float:
+        """Share of the token budget of all chunks that is actually used."""
+        return self.total_tokens / (len(self.chunks) * self.budget) if self.chunks else 0.0
+
+    @property
+    def split_files(self) -> int:
+        return sum(1 for chunk in self.chunks for item in chunk if item.part == 1 and item.parts > 1)
+
+    def render(self, chunk: List[ChunkItem]) -> str:
+        data = self.dump.data
+        blocks = []
+        for item in chunk:
+            body = data[item.start:item.end].decode('utf-8', 'replace')
+            blocks.append(body if item.path is None else _header(item.path, item.part, item.parts) + body)
+        return '\n'.join(blocks)
+
+    def iter_chunks(self) -> Iterator[str]:
+        """Chunk texts in order, built one at a time from the dump."""
+        for chunk in self.chunks:
+            yield self.render(chunk)
+
+
+def _items(dump: RepositoryDump, budget: int, counter: TokenCounter, keep=None,
+           include_preamble: bool = True) -> Iterator[ChunkItem]:
+    data = dump.data
+    if include_preamble and dump.preamble_length and data[:dump.preamble_length].strip():
+        tokens = counter.count(data[:dump.preamble_length].decode('utf-8', 'replace'))
+        if tokens <= budget:
+            yield ChunkItem(None, 0, dump.preamble_length, tokens)
+        else:
+            for start, end, tokens in _split_body(data, 0, dump.preamble_length, budget, counter):
+                yield ChunkItem(None, start, end, tokens)
+    for entry in dump:
+        if keep is not None and not keep(entry):
+            continue
+        header_tokens = counter.count(_header(entry.path, 1, 1)) + 4
+        body_end = entry.offset + entry.length
+        tokens = header_tokens + counter.count(dump.text(entry))
+        if tokens <= budget:
+            yield ChunkItem(entry.path, entry.offset, body_end, tokens)
+            continue
+        pieces = _split_body(data, entry.offset, body_end, budget - header_tokens, counter)
+        for part, (start, end, piece_tokens) in enumerate(pieces, 1):
+            yield ChunkItem(entry.path, start, end, header_tokens + piece_tokens, part, len(pieces))
+
+
+def plan_chunks(code_content: Union[str, RepositoryDump], budget: int, counter: TokenCounter,
+                keep=None, include_preamble: bool = True) -> ChunkPlan:
+    """Pack files into as few chunks of at most `budget` tokens as the heuristic finds.
+
+    Files for which keep(entry) is False are left out, and so is the text
+    before the first file header when include_preamble is False.
+
+    Best-fit decreasing: items are placed largest first into the chunk whose
+    remaining budget fits them most tightly. Chunks come out ordered by their
+    first file, and files keep their dump order inside a chunk.
+    """
+    dump = RepositoryDump.coerce(code_content)
+    items = list(_items(dump, budget, counter, keep, include_preamble))
+    order = sorted(range(len(items)), key=lambda i: -items[i].tokens)
+    remaining: List[tuple] = []  # sorted (remaining budget, bin index)
+    bins: List[List[int]] = []
+    for index in order:
+        tokens = items[index].tokens
+        position = bisect.bisect_left(remaining, (tokens, -1))
+        if position < len(remaining):
+            left, bin_index = remaining.pop(position)
+        else:
+            left, bin_index = budget, len(bins)
+            bins.append([])
+        bins[bin_index].append(index)
+        bisect.insort(remaining, (left - tokens, bin_index))
+    chunks = [[items[i] for i in sorted(indices)] for indices in sorted(bins, key=min)]
+    return ChunkPlan(dump, chunks, budget)
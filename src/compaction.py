@@ -0,0 +1,239 @@
+"""Prompt compaction: shrink file bodies before they are chunked for the LLM.
+
+Comments (license headers included), Python docstrings, the tails of long
+string literals, encoded blobs, long numeric data literals, blank lines,
+trailing whitespace and deep indentation cost tokens without telling the
+model which features a repository implements. Compaction removes or
+shortens them per language, recognized by file extension, and keeps
+imports, identifiers, config keys, call sites and the start of every
+string. Files in a language it does not know only lose whitespace.
+
+compact_dump runs after triage and before chunk planning, so packing fills
+each request with the compacted files; the report records the token counts
+before and after.
+"""
+import csv
+import io
+import math
+import os
+import re
+import tempfile
+from typing import Dict, Iterable, List, Optional, Tuple
+from repo_index import RepositoryDump
+
+# String literals longer than this keep only their first STRING_KEEP_CHARS characters
+MAX_STRING_CHARS = 160
+STRING_KEEP_CHARS = 80
+# Runs of base64/hex-like characters at least this long are replaced by their length
+MIN_BLOB_CHARS = 64
+# Comma-separated numbers in a row before a data literal is cut after its first few
+MIN_NUMBER_RUN = 16
+NUMBER_RUN_KEEP = 4
+
+DOUBLE_QUOTED = r'"(?:\\.|[^"\\\n])*"'
+SINGLE_QUOTED = r"'(?:\\.|[^'\\\n])*'"
+BACKTICK = r'`(?:\\.|[^`\\])*`'
+TRIPLE_QUOTED = r'"""[\s\S]*?"""|' + r"'''[\s\S]*?'''"
+SLASH_COMMENT = r'//[^\n]*'
+BLOCK_COMMENT = r'/\*[\s\S]*?\*/'
+# "#" starts a comment only at the start of a line or after whitespace ($#, ${#x}, url#anchor do not)
+HASH_COMMENT = r'(?<!\S)#[^\n]*'
+DASH_COMMENT = r'--[^\n]*'
+MARKUP_COMMENT = r'<!--[\s\S]*?-->'
+# A triple-quoted string on the line after "def ...:" or "class ...:"
+DOCSTRING = r'(?<=:)[ \t]*(?:\n[ \t]*)+[rRuU]?(?:' + TRIPLE_QUOTED + r')'
+# ... or the first statement of a module, once the comments above it are gone
+MODULE_DOCSTRING = re.compile(r'\A\s*[rRuU]?(?:' + TRIPLE_QUOTED + r')')
+
+# Language family -> (comment patterns, string patterns, drop docstrings)
+FAMILIES = {
+    "c": ([SLASH_COMMENT, BLOCK_COMMENT], [DOUBLE_QUOTED, SINGLE_QUOTED, BACKTICK], False),
+    "php": ([SLASH_COMMENT, BLOCK_COMMENT, HASH_COMMENT], [DOUBLE_QUOTED, SINGLE_QUOTED], False),
+    "python": ([HASH_COMMENT], [TRIPLE_QUOTED, DOUBLE_QUOTED, SINGLE_QUOTED], True),
+    "hash": ([HASH_COMMENT], [DOUBLE_QUOTED, SINGLE_QUOTED], False),
+    "css": ([BLOCK_COMMENT], [DOUBLE_QUOTED, SINGLE_QUOTED], False),
+    "sql": ([DASH_COMMENT, BLOCK_COMMENT], [SINGLE_QUOTED], False),
+    # Prose around markup has apostrophes, so only comments are recognized
+    "markup": ([MARKUP_COMMENT], [], False),
+    "json": ([], [DOUBLE_QUOTED], False),
+}
+
+EXTENSION_FAMILIES = {
+    **dict.fromkeys((".js", ".jsx", ".mjs", ".cjs", ".ts", ".tsx", ".java", ".go", ".c", ".h", ".cc", ".cpp",
+                     ".hpp", ".cs", ".kt", ".kts", ".swift", ".rs", ".scala", ".dart", ".groovy", ".gradle",
+                     ".proto"), "c"),
+    ".php": "php",
+    **dict.fromkeys((".py", ".pyw", ".pyi"), "python"),
+    **dict.fromkeys((".rb", ".sh", ".bash", ".zsh", ".yml", ".yaml", ".toml", ".pl", ".r", ".cfg", ".conf",
+                     ".tf", ".hcl", ".ps1", ".env"), "hash"),
+    **dict.fromkeys((".css", ".scss", ".less"), "css"),
+    ".sql": "sql",
+    **dict.fromkeys((".html", ".htm", ".xml", ".vue", ".svelte", ".md", ".csproj", ".plist", ".xaml"), "markup"),
+    ".json": "json",
+}
+
+NAME_FAMILIES = {
+    **dict.fromkeys(("dockerfile", "makefile", "procfile", "gemfile", "rakefile", "requirements.txt",
+                     ".gitignore", ".dockerignore", ".env"), "hash"),
+}
+
+BLOB = re.compile(r'[A-Za-z0-9+/_\-]{%d,}={0,2}' % MIN_BLOB_CHARS)
+NUMBER = r'[-+]?(?:0[xX][0-9a-fA-F]+|\d+(?:\.\d*)?(?:[eE][-+]?\d+)?)'
+NUMBER_RUN = re.compile(r'(?:%s[ \t]*,\s*){%d,}' % (NUMBER, MIN_NUMBER_RUN))
+NUMBER_ITEM = re.compile(r'%s[ \t]*,\s*' % NUMBER)
+
+_patterns: Dict[str, re.Pattern] = {}
+
+
+def family_of(path: str) -> Optional[str]:
+    name = path.rsplit('/', 1)[-1].lower()
+    if name in NAME_FAMILIES:
+        return NAME_FAMILIES[name]
+    if name.startswith(".env.") or name.startswith("dockerfile."):
+        return "hash"
+    return EXTENSION_FAMILIES.get(os.path.splitext(name)[1])
+
+
+def _pattern(family: str) -> re.Pattern:
+    """One alternation per family, so strings are consumed before any comment marker inside them."""
+    if family not in _patterns:
+        comments, strings, docstrings = FAMILIES[family]
+        alternatives = ([f'(?P<docstring>{DOCSTRING})'] if docstrings else []) + \
+            [f'(?P<string>{"|".join(strings)})'] * bool(strings) + \
+            [f'(?P<comment>{"|".join(comments)})'] * bool(comments)
+        _patterns[family] = re.compile('|'.join(alternatives))
+    return _patterns[family]
+
+
+def _shorten_literal(match: re.Match) -> str:
+    if match.lastgroup == "comment":
+        return ""
+    text = match.group()
+    if match.lastgroup == "docstring":
+        # Keep the line break in front of it
+        return "\n"
+    if len(text) <= MAX_STRING_CHARS:
+        return text
+    quote = 3 if text[:3] in ('"""', "'''") else 1
+    return f"{text[:quote + STRING_KEEP_CHARS]}...{text[-quote:]}"
+
+
+def _replace_blob(match: re.Match) -> str:
+    text = match.group()
+    # Long paths or separator lines are not encoded data
+    if not any(c.isdigit() for c in text) or not any(c.isalpha() for c in text):
+        return text
+    return f"<{len(text)} chars of encoded data>"
+
+
+def _cut_number_run(match: re.Match) -> str:
+    items = NUMBER_ITEM.findall(match.group())
+    return "".join(items[:NUMBER_RUN_KEEP]) + f"... ({len(items) - NUMBER_RUN_KEEP} more), "
+
+
+def _compact_whitespace(text: str) -> str:
+    """Drop blank lines and trailing whitespace; shrink each indentation level to one space."""
+    lines = []
+    widths = []
+    for line in text.split('\n'):
+        line = line.rstrip()
+        if not line:
+            continue
+        stripped = line.lstrip()
+        width = len(line[:len(line) - len(stripped)].expandtabs(4))
+        lines.append((width, stripped))
+        if width:
+            widths.append(width)
+    unit = 0
+    for width in set(widths):
+        unit = math.gcd(unit, width)
+    unit = unit or 1
+    return '\n'.join(' ' * (width // unit) + stripped for width, stripped in lines)
+
+
+def compact_text(path: str, text: str) -> str:
+    """The compacted body of one file; `path` selects the language rules."""
+    family = family_of(path)
+    if family is not None:
+        text = _pattern(family).sub(_shorten_literal, text)
+        if FAMILIES[family][2]:
+            text = MODULE_DOCSTRING.sub('', text)
+    text = BLOB.sub(_replace_blob, text)
+    text = NUMBER_RUN.sub(_cut_number_run, text)
+    return _compact_whitespace(text)
+
+
+class CompactionReport:
+    """Size of one repository's LLM-bound files before and after compaction."""
+
+    def __init__(self, repo: Optional[str] = None):
+        self.repo = repo
+        self.files = 0
+        self.bytes = 0
+        self.compacted_bytes = 0
+        self.tokens = 0
+        self.compacted_tokens = 0
+
+    @property
+    def saved(self) -> float:
+        return 1 - self.compacted_tokens / self.tokens if self.tokens else 0.0
+
+    def summary(self) -> str:
+        return (f"Compacted {self.files} files from {self.tokens} to {self.compacted_tokens} tokens "
+                f"(-{self.saved:.0%}), {self.bytes / 1024:.0f} -> {self.compacted_bytes / 1024:.0f} KB")
+
+    def row(self) -> Dict[str, object]:
+        return {
+            "repository": self.repo or "",
+            "files": self.files,
+            "bytes": self.bytes,
+            "compacted_bytes": self.compacted_bytes,
+            "tokens": self.tokens,
+            "compacted_tokens": self.compacted_tokens,
+        }
+
+
+def compact_dump(dump: RepositoryDump, keep=None, token_counter=None,
+                 repo: Optional[str] = None) -> Tuple[RepositoryDump, CompactionReport]:
+    """New dump with the files keep(entry) selects (all by default), their bodies compacted.
+
+    Headers are copied unchanged, so paths and the index stay the same. A
+    memory-mapped dump is compacted into a memory-mapped temporary file,
+    keeping peak memory bounded for streaming analysis.
+    """
+    report = CompactionReport(repo)
+    out = tempfile.TemporaryFile() if dump.streaming else io.BytesIO()
+    data = dump.data
+    out.write(data[:dump.preamble_length])
+    entries = [entry for entry in dump if keep is None or keep(entry)]
+    for index, entry in enumerate(entries):
+        text = dump.text(entry)
+        compacted = compact_text(entry.path, text)
+        body = compacted.encode('utf-8', 'surrogatepass')
+        out.write(data[entry.header_offset:entry.offset])
+        out.write(body)
+        if index + 1 < len(entries):
+            out.write(b'\n')
+        report.files += 1
+        report.bytes += entry.length
+        report.compacted_bytes += len(body)
+        if token_counter is not None:
+            report.tokens += token_counter.count(text)
+            report.compacted_tokens += token_counter.count(compacted)
+        dump.release(entry)
+    if isinstance(out, io.BytesIO):
+        return RepositoryDump(out.getvalue(), dump.directory_structure), report
+    out.flush()
+    out.seek(0)
+    return RepositoryDump.map_file(out, dump.directory_structure), report
+
+
+def write_compaction_report(path: str, reports: Iterable[CompactionReport]) -> List[CompactionReport]:
+    """Write one CSV row per repository and return the reports written."""
+    reports = list(reports)
+    with open(path, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=list(CompactionReport().row()))
+        writer.writeheader()
+        for report in reports:
+            writer.writerow(report.row())
+    return reports
@@ -0,0 +1,392 @@
+"""Corpus store: scraped repositories kept compressed and full-text indexed in one SQLite file.
+
+Replaces the temp/<owner>_<repo>_directory_structure.txt / _code_content.txt
+pairs. Every file body of a filtered dump is stored once per distinct
+content (a blob addressed by its SHA-256, so forks and vendored copies
+share storage), compressed with zstd when the zstandard package is
+installed and zlib otherwise. Per repository, the store keeps the
+directory structure, the file list in dump order and the first and last
+scrape times. get() rebuilds the dump byte for byte, so content hashes and
+results match a run that used the text files.
+
+Bodies are also indexed in a contentless FTS5 table, which makes questions
+like "which repositories reference kafkajs" an index lookup:
+
+    python src/corpus_store.py search kafkajs
+    python src/corpus_store.py import temp --repos repos.txt   # migrate saved text files
+    python src/corpus_store.py stats
+    python src/corpus_store.py export owner/repo               # write the text files back
+"""
+import argparse
+import hashlib
+import io
+import os
+import re
+import sqlite3
+import tempfile
+import threading
+import time
+import zlib
+from typing import Any, Dict, List, Optional, Pattern, Tuple, Union
+from repo_index import FileEntry, RepositoryDump, SEPARATOR
+
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
+
+DEFAULT_CORPUS_PATH = os.path.join("temp", "corpus.sqlite")
+ZSTD_LEVEL = 10
+ZLIB_LEVEL = 6
+# Words as FTS5's default unicode61 tokenizer splits them (underscores separate words)
+WORD = re.compile(r'[^\W_]+')
+
+
+def compress(data: bytes) -> Tuple[str, bytes]:
+    """(codec, compressed bytes); tiny or incompressible data is stored as is."""
+    if ZSTD_AVAILABLE:
+        codec, packed = "zstd", zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(data)
+    else:
+        codec, packed = "zlib", zlib.compress(data, ZLIB_LEVEL)
+    return (codec, packed) if len(packed) < len(data) else ("raw", data)
+
+
+def decompress(codec: str, data: bytes) -> bytes:
+    if codec == "raw":
+        return data
+    if codec == "zlib":
+        return zlib.decompress(data)
+    if codec == "zstd":
+        if not ZSTD_AVAILABLE:
+            raise RuntimeError("This corpus was written with zstd compression; install the zstandard package")
+        return zstandard.ZstdDecompressor().decompress(data)
+    raise ValueError(f"Unknown codec: {codec}")
+
+
+def canonical_header(path: str) -> bytes:
+    return SEPARATOR + b'\nFile: ' + path.encode('utf-8', 'surrogatepass') + b'\n' + SEPARATOR + b'\n'
+
+
+def phrase_query(text: str) -> Tuple[str, Optional[Pattern]]:
+    """(FTS5 query, pattern) for a phrase: the query finds bodies holding all its words, the pattern
+    (None for a single word) checks that they appear in a row."""
+    words = WORD.findall(text)
+    if not words:
+        raise ValueError(f"Nothing to search for in {text!r}")
+    query = " ".join(f'"{word}"' for word in words)
+    if len(words) == 1:
+        return query, None
+    return query, re.compile(r'(?<![^\W_])' + r'[\W_]+'.join(map(re.escape, words)) + r'(?![^\W_])', re.IGNORECASE)
+
+
+class CorpusStore:
+    """SQLite corpus of repositories: compressed, deduplicated file bodies and an FTS5 index over them."""
+
+    def __init__(self, path: str = DEFAULT_CORPUS_PATH):
+        if path != ":memory:" and os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS repositories ("
+            " repo TEXT PRIMARY KEY, first_scraped REAL NOT NULL, scraped REAL NOT NULL, codec TEXT NOT NULL,"
+            " directory_structure BLOB NOT NULL, preamble BLOB NOT NULL, files INTEGER NOT NULL,"
+            " bytes INTEGER NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS blobs ("
+            " id INTEGER PRIMARY KEY, digest BLOB NOT NULL UNIQUE, codec TEXT NOT NULL, size INTEGER NOT NULL,"
+            " data BLOB NOT NULL)"
+        )
+        # header and tail (the bytes up to the next header) are NULL when they are the
+        # standard gitingest header of the path and the newline between files
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS files ("
+            " repo TEXT NOT NULL, position INTEGER NOT NULL, path TEXT NOT NULL, blob INTEGER NOT NULL, header BLOB,"
+            " tail BLOB, PRIMARY KEY (repo, position)) WITHOUT ROWID"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS files_blob ON files(blob)")
+        # Contentless: the index refers to blob ids and stores no second copy of the text. Without
+        # token positions (detail=none) it is about a quarter of the size; phrases are checked on
+        # the candidate bodies instead
+        self._conn.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS blob_text USING fts5(body, content='', detail=none)")
+
+    def __contains__(self, repo: str) -> bool:
+        with self._lock:
+            return self._conn.execute("SELECT 1 FROM repositories WHERE repo = ?", (repo,)).fetchone() is not None
+
+    def repositories(self) -> List[str]:
+        with self._lock:
+            return [repo for repo, in self._conn.execute("SELECT repo FROM repositories ORDER BY repo")]
+
+    def scraped(self, repo: str) -> Optional[Tuple[float, float]]:
+        """(first, last) scrape time of a repository, or None."""
+        with self._lock:
+            return self._conn.execute("SELECT first_scraped, scraped FROM repositories WHERE repo = ?",
+                                      (repo,)).fetchone()
+
+    def put(self, repo: str, directory_structure: str, code_content: Union[str, RepositoryDump]) -> int:
+        """Store (or replace) a repository's filtered dump; returns its size in bytes."""
+        dump = RepositoryDump.coerce(code_content)
+        data = dump.data
+        codec, tree = compress(directory_structure.encode('utf-8', 'surrogatepass'))
+        preamble = bytes(data[:dump.preamble_length])
+        # Hashing happens outside the lock; bodies are read again (and compressed) only when new,
+        # so a streaming dump is never held in memory
+        entries = list(dump)
+        files = []
+        for index, entry in enumerate(entries):
+            header = bytes(data[entry.header_offset:entry.offset])
+            last = index + 1 == len(entries)
+            tail = bytes(data[entry.offset + entry.length:len(data) if last else entries[index + 1].header_offset])
+            files.append((entry, hashlib.sha256(dump.raw(entry)).digest(),
+                          None if header == canonical_header(entry.path) else header,
+                          None if tail == (b'' if last else b'\n') else tail))
+            dump.release(entry)
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                old_blobs = {blob for blob, in self._conn.execute("SELECT blob FROM files WHERE repo = ?", (repo,))}
+                self._conn.execute("DELETE FROM files WHERE repo = ?", (repo,))
+                rows = []
+                for position, (entry, digest, header, tail) in enumerate(files):
+                    rows.append((repo, position, entry.path, self._blob_id(digest, dump, entry), header, tail))
+                self._conn.executemany(
+                    "INSERT INTO files (repo, position, path, blob, header, tail) VALUES (?, ?, ?, ?, ?, ?)", rows)
+                first = self._conn.execute("SELECT first_scraped FROM repositories WHERE repo = ?",
+                                           (repo,)).fetchone()
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO repositories (repo, first_scraped, scraped, codec, directory_structure,"
+                    " preamble, files, bytes) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (repo, first[0] if first else now, now, codec, tree, preamble, len(files), len(data)),
+                )
+                self._drop_orphans(old_blobs - {row[3] for row in rows})
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return len(data)
+
+    def _blob_id(self, digest: bytes, dump: RepositoryDump, entry: FileEntry) -> int:
+        found = self._conn.execute("SELECT id FROM blobs WHERE digest = ?", (digest,)).fetchone()
+        if found is not None:
+            return found[0]
+        body = dump.raw(entry)
+        dump.release(entry)
+        codec, packed = compress(body)
+        blob_id = self._conn.execute("INSERT INTO blobs (digest, codec, size, data) VALUES (?, ?, ?, ?)",
+                                     (digest, codec, len(body), packed)).lastrowid
+        self._conn.execute("INSERT INTO blob_text (rowid, body) VALUES (?, ?)",
+                           (blob_id, body.decode('utf-8', 'replace')))
+        return blob_id
+
+    def _drop_orphans(self, blob_ids):
+        """Delete blobs no file refers to any more, and their index entries."""
+        for blob_id in blob_ids:
+            if self._conn.execute("SELECT 1 FROM files WHERE blob = ? LIMIT 1", (blob_id,)).fetchone():
+                continue
+            codec, packed = self._conn.execute("SELECT codec, data FROM blobs WHERE id = ?", (blob_id,)).fetchone()
+            # A contentless index needs the indexed text to remove an entry
+            self._conn.execute("INSERT INTO blob_text (blob_text, rowid, body) VALUES ('delete', ?, ?)",
+                               (blob_id, decompress(codec, packed).decode('utf-8', 'replace')))
+            self._conn.execute("DELETE FROM blobs WHERE id = ?", (blob_id,))
+
+    def delete(self, repo: str):
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                old_blobs = {blob for blob, in self._conn.execute("SELECT blob FROM files WHERE repo = ?", (repo,))}
+                self._conn.execute("DELETE FROM files WHERE repo = ?", (repo,))
+                self._conn.execute("DELETE FROM repositories WHERE repo = ?", (repo,))
+                self._drop_orphans(old_blobs)
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def get(self, repo: str, streaming: bool = False) -> Optional[Tuple[str, RepositoryDump]]:
+        """(directory structure, indexed dump) as put() received them, or None.
+
+        With streaming, the dump is rebuilt into a memory-mapped temporary
+        file instead of memory; close it when done.
+        """
+        with self._lock:
+            found = self._conn.execute("SELECT codec, directory_structure, preamble FROM repositories WHERE repo = ?",
+                                       (repo,)).fetchone()
+            if found is None:
+                return None
+            rows = self._conn.execute(
+                "SELECT f.path, f.header, f.tail, b.codec, b.data FROM files f JOIN blobs b ON b.id = f.blob"
+                " WHERE f.repo = ? ORDER BY f.position", (repo,)).fetchall()
+        codec, tree, preamble = found
+        directory_structure = decompress(codec, tree).decode('utf-8', 'surrogatepass')
+        out = tempfile.TemporaryFile() if streaming else io.BytesIO()
+        out.write(preamble)
+        for index, (path, header, tail, body_codec, packed) in enumerate(rows):
+            out.write(header if header is not None else canonical_header(path))
+            out.write(decompress(body_codec, packed))
+            if tail is not None:
+                out.write(tail)
+            elif index + 1 < len(rows):
+                out.write(b'\n')
+        if isinstance(out, io.BytesIO):
+            return directory_structure, RepositoryDump(out.getvalue(), directory_structure)
+        out.flush()
+        out.seek(0)
+        return directory_structure, RepositoryDump.map_file(out, directory_structure)
+
+    def search(self, query: str, raw: bool = False, limit: Optional[int] = None) -> List[Tuple[str, str]]:
+        """(repository, path) of every file whose body contains a phrase (case-insensitive, whole words).
+
+        With raw, query is FTS5 syntax over single words instead, e.g. "kafka* NOT test".
+        """
+        fts_query, pattern = (query, None) if raw else phrase_query(query)
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT f.repo, f.path, f.blob FROM blob_text JOIN files f ON f.blob = blob_text.rowid"
+                " WHERE blob_text MATCH ? ORDER BY f.repo, f.position", (fts_query,)).fetchall()
+            if pattern is not None:
+                matching = set()
+                for blob_id in {blob for _, _, blob in rows}:
+                    codec, packed = self._conn.execute("SELECT codec, data FROM blobs WHERE id = ?",
+                                                       (blob_id,)).fetchone()
+                    if pattern.search(decompress(codec, packed).decode('utf-8', 'replace')):
+                        matching.add(blob_id)
+                rows = [row for row in rows if row[2] in matching]
+        return [(repo, path) for repo, path, _ in rows[:limit]]
+
+    def repositories_matching(self, query: str, raw: bool = False) -> List[str]:
+        return list(dict.fromkeys(repo for repo, _ in self.search(query, raw)))
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            repos, dump_bytes = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(bytes), 0) FROM repositories").fetchone()
+            files = self._conn.execute("SELECT COUNT(*) FROM files").fetchone()[0]
+            blobs, body_bytes, stored_bytes = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0), COALESCE(SUM(LENGTH(data)), 0) FROM blobs").fetchone()
+            page_size = self._conn.execute("PRAGMA page_size").fetchone()[0]
+            # Pages in use, wherever they are (database file or write-ahead log)
+            pages = self._conn.execute("PRAGMA page_count").fetchone()[0] - \
+                self._conn.execute("PRAGMA freelist_count").fetchone()[0]
+        return {
+            "repositories": repos,
+            "files": files,
+            "blobs": blobs,
+            "dump_bytes": dump_bytes,
+            "unique_body_bytes": body_bytes,
+            "compressed_body_bytes": stored_bytes,
+            "corpus_bytes": pages * page_size,
+            "ratio": dump_bytes / (pages * page_size) if pages else None,
+        }
+
+    def optimize(self):
+        """Merge the index segments and fold the write-ahead log back in, e.g. after a bulk import."""
+        with self._lock:
+            self._conn.execute("INSERT INTO blob_text (blob_text) VALUES ('optimize')")
+            self._conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def read_saved(dumps_dir: str, repo: str) -> Optional[Tuple[str, RepositoryDump]]:
+    """The text files main.py saves for a repository, or None when they are missing."""
+    base_filename = os.path.join(dumps_dir, repo.replace('/', '_'))
+    try:
+        with open(f'{base_filename}_directory_structure.txt', 'r', encoding='utf-8') as f:
+            directory_structure = f.read()
+        return directory_structure, RepositoryDump.open(f'{base_filename}_code_content.txt', directory_structure)
+    except FileNotFoundError:
+        return None
+
+
+def saved_repositories(dumps_dir: str) -> List[str]:
+    """owner/repo names guessed from saved file names (the first underscore is taken as the slash)."""
+    suffix = "_code_content.txt"
+    return sorted(name[:-len(suffix)].replace('_', '/', 1) for name in os.listdir(dumps_dir)
+                  if name.endswith(suffix))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--corpus', default=DEFAULT_CORPUS_PATH, help='Corpus file')
+    commands = parser.add_subparsers(dest='command', required=True)
+    importer = commands.add_parser('import', help='Store the text files saved by earlier runs')
+    importer.add_argument('dumps', nargs='?', default='temp', help='Directory holding the saved text files')
+    importer.add_argument('--repos', default=None,
+                          help='Repository list (owner/repo | deployment lines) naming the files; '
+                               'otherwise names are guessed from the file names')
+    search = commands.add_parser('search', help='Repositories (and files) whose code contains a phrase')
+    search.add_argument('query')
+    search.add_argument('--files', action='store_true', help='List every matching file, not only repositories')
+    search.add_argument('--fts', action='store_true', help='Treat the query as FTS5 syntax (e.g. "kafka* NOT test")')
+    commands.add_parser('stats', help='Size of the corpus')
+    export = commands.add_parser('export', help='Write a repository back as text files')
+    export.add_argument('repo')
+    export.add_argument('--output-dir', default='temp')
+    args = parser.parse_args()
+
+    corpus = CorpusStore(args.corpus)
+    if args.command == 'import':
+        if args.repos:
+            with open(args.repos, 'r') as f:
+                repos = [line.split('|')[0].strip() for line in f if line.strip()]
+        else:
+            repos = saved_repositories(args.dumps)
+        started = time.perf_counter()
+        stored = 0
+        for repo in repos:
+            saved = read_saved(args.dumps, repo)
+            if saved is None:
+                print(f"[CORPUS] No saved files for {repo}")
+                continue
+            directory_structure, dump = saved
+            with dump:
+                corpus.put(repo, directory_structure, dump)
+            stored += 1
+        corpus.optimize()
+        print(f"[CORPUS] Stored {stored} repositories in {time.perf_counter() - started:.1f}s")
+    elif args.command == 'search':
+        started = time.perf_counter()
+        if args.files:
+            matches = corpus.search(args.query, args.fts)
+            for repo, path in matches:
+                print(f"{repo}\t{path}")
+        else:
+            matches = corpus.repositories_matching(args.query, args.fts)
+            for repo in matches:
+                print(repo)
+        print(f"[CORPUS] {len(matches)} match(es) in {(time.perf_counter() - started) * 1000:.1f} ms")
+        return
+    elif args.command == 'export':
+        found = corpus.get(args.repo)
+        if found is None:
+            print(f"[CORPUS] {args.repo} is not in {args.corpus}")
+            return
+        directory_structure, dump = found
+        base_filename = os.path.join(args.output_dir, args.repo.replace('/', '_'))
+        os.makedirs(args.output_dir, exist_ok=True)
+        with open(f'{base_filename}_directory_structure.txt', 'w', encoding='utf-8') as f:
+            f.write(directory_structure)
+        with open(f'{base_filename}_code_content.txt', 'wb') as f:
+            f.write(dump.data)
+        print(f"[CORPUS] Wrote {base_filename}_directory_structure.txt and _code_content.txt")
+        return
+    stats = corpus.stats()
+    ratio = f" (dumps:corpus {stats['ratio']:.1f}:1)" if stats['ratio'] else ""
+    print(f"[CORPUS] {stats['repositories']} repositories, {stats['files']} files ({stats['blobs']} distinct), "
+          f"{stats['dump_bytes'] / 1024 / 1024:.1f} MB of dumps in a "
+          f"{stats['corpus_bytes'] / 1024 / 1024:.1f} MB corpus{ratio}; "
+          f"bodies compressed with {'zstd' if ZSTD_AVAILABLE else 'zlib'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,272 @@
+"""Cross-repository deduplication: each unique file is analyzed once, whichever repositories contain it.
+
+A global content store keeps every file seen in any repository by content
+digest, and every analyzed chunk as a group of the files it held. MinHash
+signatures with LSH banding map near-duplicates (a vendored library with a
+different version banner, a fork's reformatted copy) onto the digest first
+seen. A repository reuses a stored group whenever it contains all of the
+group's files, whatever their paths, so a shared file is sent to the LLM
+once and its result is attributed to every repository containing it.
+
+Files already known from other repositories are packed into chunks of their
+own, so the groups they form stay reusable by the next repository sharing them.
+"""
+import csv
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+from incremental import file_digest
+from repo_index import FileEntry, RepositoryDump
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+DEFAULT_CONTENT_STORE_PATH = os.path.join("temp", "content_store.sqlite")
+
+NUM_PERM = 64
+LSH_BANDS = 16                  # 16 bands of 4 rows: a file 90% similar is a candidate ~99.9% of the time
+SHINGLE_TOKENS = 5
+NEAR_DUPLICATE_THRESHOLD = 0.9  # estimated Jaccard similarity of the token shingles
+
+_TOKEN = re.compile(rb'\w+')
+_PRIME = (1 << 61) - 1
+_MAX_HASH = np.uint64((1 << 64) - 1) if NUMPY_AVAILABLE else None
+if NUMPY_AVAILABLE:
+    # Fixed seeds: signatures are stored and compared across runs
+    _rng = np.random.RandomState(20240601)
+    _PERM_A = _rng.randint(1, 1 << 31, size=NUM_PERM).astype(np.uint64)
+    _PERM_B = _rng.randint(0, 1 << 31, size=NUM_PERM).astype(np.uint64)
+    _SHINGLE_MIX = _rng.randint(1, 1 << 31, size=SHINGLE_TOKENS).astype(np.uint64) * np.uint64(2) + np.uint64(1)
+
+
+def minhash(data: bytes) -> Optional["np.ndarray"]:
+    """MinHash signature of a file's token shingles; None for files too short to compare."""
+    tokens = _TOKEN.findall(data.lower())
+    if not NUMPY_AVAILABLE or len(tokens) < SHINGLE_TOKENS * 2:
+        return None
+    hashes = np.array([zlib.crc32(token) for token in tokens], dtype=np.uint64)
+    count = len(hashes) - SHINGLE_TOKENS + 1
+    # uint64 arithmetic wraps, which is all a shingle hash needs
+    shingles = np.zeros(count, dtype=np.uint64)
+    for offset in range(SHINGLE_TOKENS):
+        shingles += hashes[offset:offset + count] * _SHINGLE_MIX[offset]
+    shingles = np.unique(shingles >> np.uint64(32))
+    signature = np.full(NUM_PERM, _MAX_HASH, dtype=np.uint64)
+    for start in range(0, len(shingles), 4096):
+        block = shingles[start:start + 4096, None]
+        signature = np.minimum(signature, ((block * _PERM_A + _PERM_B) % np.uint64(_PRIME)).min(axis=0))
+    return signature
+
+
+def _band_keys(signature: "np.ndarray") -> List[Tuple[int, str]]:
+    rows = NUM_PERM // LSH_BANDS
+    return [(band, hashlib.blake2b(signature[band * rows:(band + 1) * rows].tobytes(), digest_size=8).hexdigest())
+            for band in range(LSH_BANDS)]
+
+
+class StoredGroup(NamedTuple):
+    id: int
+    files: List[Tuple[str, int, int]]   # (canonical digest, part, parts) of every file piece in the chunk
+    features: Optional[List[str]]       # features the chunk was asked about (None = all)
+    analysis: Dict[str, Any]            # parsed LLM answer
+
+
+class ContentStore:
+    """SQLite store of file digests (with MinHash LSH buckets) and analyzed chunk groups."""
+
+    def __init__(self, path: str = DEFAULT_CONTENT_STORE_PATH, threshold: float = NEAR_DUPLICATE_THRESHOLD):
+        if path != ":memory:" and os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.path = path
+        self.threshold = threshold
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(
+            "CREATE TABLE IF NOT EXISTS files (digest TEXT PRIMARY KEY, canonical TEXT NOT NULL, signature BLOB);"
+            "CREATE TABLE IF NOT EXISTS lsh (band INTEGER NOT NULL, bucket TEXT NOT NULL, digest TEXT NOT NULL);"
+            "CREATE INDEX IF NOT EXISTS lsh_bucket ON lsh (band, bucket);"
+            "CREATE TABLE IF NOT EXISTS groups (id INTEGER PRIMARY KEY, version TEXT NOT NULL, files TEXT NOT NULL,"
+            " features TEXT, analysis TEXT NOT NULL, updated REAL NOT NULL);"
+            "CREATE TABLE IF NOT EXISTS members (digest TEXT NOT NULL, group_id INTEGER NOT NULL);"
+            "CREATE INDEX IF NOT EXISTS members_digest ON members (digest);"
+        )
+
+    def _near_duplicate(self, signature: "np.ndarray") -> Optional[str]:
+        candidates = set()
+        for band, bucket in _band_keys(signature):
+            candidates.update(row[0] for row in self._conn.execute(
+                "SELECT digest FROM lsh WHERE band = ? AND bucket = ?", (band, bucket)))
+        best, best_similarity = None, self.threshold
+        for digest in candidates:
+            canonical, blob = self._conn.execute(
+                "SELECT canonical, signature FROM files WHERE digest = ?", (digest,)).fetchone()
+            similarity = float(np.mean(np.frombuffer(blob, dtype=np.uint64) == signature))
+            if similarity >= best_similarity:
+                best, best_similarity = canonical, similarity
+        return best
+
+    def resolve(self, digest: str, read) -> Tuple[str, str]:
+        """Canonical digest of a file and how it was found: "exact", "near" or "new".
+
+        read() returns the file's bytes; it is only called for digests not seen before.
+        """
+        with self._lock:
+            found = self._conn.execute("SELECT canonical FROM files WHERE digest = ?", (digest,)).fetchone()
+            if found:
+                return found[0], "exact"
+            signature = minhash(read())
+            canonical = self._near_duplicate(signature) if signature is not None else None
+            kind = "near" if canonical else "new"
+            self._conn.execute("INSERT INTO files (digest, canonical, signature) VALUES (?, ?, ?)",
+                               (digest, canonical or digest, signature.tobytes() if signature is not None else None))
+            if signature is not None:
+                self._conn.executemany("INSERT INTO lsh (band, bucket, digest) VALUES (?, ?, ?)",
+                                       [(band, bucket, digest) for band, bucket in _band_keys(signature)])
+            return canonical or digest, kind
+
+    def groups_within(self, digests: Set[str], version: str) -> List[StoredGroup]:
+        """Stored groups of this model/prompt version whose files all appear in `digests`."""
+        ids: Set[int] = set()
+        digest_list = list(digests)
+        with self._lock:
+            for start in range(0, len(digest_list), 500):
+                part = digest_list[start:start + 500]
+                ids.update(row[0] for row in self._conn.execute(
+                    f"SELECT group_id FROM members WHERE digest IN ({', '.join('?' * len(part))})", part))
+            rows = [self._conn.execute("SELECT id, files, features, analysis FROM groups WHERE id = ? AND version = ?",
+                                       (group_id, version)).fetchone() for group_id in sorted(ids)]
+        groups = []
+        for row in rows:
+            if row is None:
+                continue
+            files = [tuple(piece) for piece in json.loads(row[1])]
+            if all(piece[0] in digests for piece in files):
+                groups.append(StoredGroup(row[0], files, json.loads(row[2]) if row[2] else None, json.loads(row[3])))
+        return groups
+
+    def add_group(self, version: str, files: List[Tuple[str, int, int]], features: Optional[List[str]],
+                  analysis: Dict[str, Any]) -> int:
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT INTO groups (version, files, features, analysis, updated) VALUES (?, ?, ?, ?, ?)",
+                (version, json.dumps(files), json.dumps(features) if features is not None else None,
+                 json.dumps(analysis), time.time()),
+            )
+            self._conn.executemany("INSERT INTO members (digest, group_id) VALUES (?, ?)",
+                                   [(digest, cursor.lastrowid) for digest in {piece[0] for piece in files}])
+            return cursor.lastrowid
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class DedupLedger:
+    """Which files of one repository the content store does not cover yet, and the groups to add.
+
+    Same interface as incremental.IncrementalLedger: `stable` holds the stored
+    results to merge, keep(entry) selects the files to chunk and record()
+    stores each answered chunk.
+    """
+
+    def __init__(self, store: ContentStore, repo: str, version: str, dump: RepositoryDump,
+                 keep=None, needed: Optional[Iterable[str]] = None):
+        self.store = store
+        self.repo = repo
+        self.version = version
+        self.canonical: Dict[str, str] = {}
+        self.kinds: Dict[str, str] = {}
+        for entry in dump:
+            if keep is not None and not keep(entry):
+                continue
+            read = lambda entry=entry: bytes(dump.data[entry.offset:entry.offset + entry.length])
+            self.canonical[entry.path], self.kinds[entry.path] = store.resolve(file_digest(dump, entry), read)
+        needed = set(needed) if needed is not None else None
+
+        # Largest groups first; a group is only taken when it covers a piece not covered yet
+        self.stable: List[StoredGroup] = []
+        pieces: Set[Tuple[str, int, int]] = set()
+        groups = store.groups_within(set(self.canonical.values()), version)
+        for group in sorted(groups, key=lambda group: (-len(group.files), group.id)):
+            covers = group.features is None or (needed is not None and needed <= set(group.features))
+            if covers and not pieces.issuperset(group.files):
+                self.stable.append(group)
+                pieces.update(group.files)
+        # A file split across chunks is covered only when every part is
+        parts: Dict[str, Set[int]] = {}
+        counts: Dict[str, int] = {}
+        for digest, part, total in pieces:
+            parts.setdefault(digest, set()).add(part)
+            counts[digest] = total
+        covered = {digest for digest, seen in parts.items() if len(seen) == counts[digest]}
+        self.dirty = {path for path, digest in self.canonical.items() if digest not in covered}
+        self.reused_files = len(self.canonical) - len(self.dirty)
+        self.analyzed = 0
+        self.plan = None
+
+    def keep(self, entry: FileEntry) -> bool:
+        return entry.path in self.dirty
+
+    def shared(self, entry: FileEntry) -> bool:
+        """Files to analyze that other repositories (or earlier runs) have too."""
+        return entry.path in self.dirty and self.kinds[entry.path] != "new"
+
+    def unique(self, entry: FileEntry) -> bool:
+        return entry.path in self.dirty and self.kinds[entry.path] == "new"
+
+    def count(self, kind: str) -> int:
+        return sum(1 for value in self.kinds.values() if value == kind)
+
+    def summary(self) -> str:
+        return (f"{self.count('exact')} file(s) seen before, {self.count('near')} near-duplicate(s), "
+                f"{self.count('new')} new; {self.reused_files}/{len(self.canonical)} covered by "
+                f"{len(self.stable)} stored chunk result(s)")
+
+    def record(self, chunk_num: int, analysis: Dict[str, Any], features: Optional[List[str]] = None):
+        """Store the answer for chunk `chunk_num` (1-based, in plan order) for every repository."""
+        files = [(self.canonical[item.path], item.part, item.parts) for item in self.plan.chunks[chunk_num - 1]
+                 if item.path is not None]
+        self.analyzed += 1
+        if files:
+            self.store.add_group(self.version, files, features, analysis)
+
+    def commit(self):
+        # Groups are stored as soon as they are answered, so concurrent repositories can reuse them
+        pass
+
+    def row(self) -> Dict[str, Any]:
+        files = len(self.canonical)
+        return {
+            "repository": self.repo,
+            "files": files,
+            "seen_before": self.count("exact"),
+            "near_duplicates": self.count("near"),
+            "new_files": self.count("new"),
+            "reused_files": self.reused_files,
+            "dedup_ratio": f"{self.reused_files / files:.3f}" if files else "0.000",
+            "reused_results": len(self.stable),
+            "analyzed_chunks": self.analyzed,
+        }
+
+
+def write_dedup_report(path: str, ledgers: Iterable[DedupLedger]) -> List[Dict[str, Any]]:
+    """Write one CSV row per repository and return the rows written."""
+    rows = [ledger.row() for ledger in ledgers]
+    if not rows:
+        return rows
+    with open(path, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+        writer.writeheader()
+        writer.writerows(rows)
+    return rows
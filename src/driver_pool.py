@@ -0,0 +1,126 @@
+import queue
+import threading
+from contextlib import contextmanager
+from selenium import webdriver
+from selenium.common.exceptions import WebDriverException
+
+# Resource types gitingest pages load that we never read
+BLOCKED_RESOURCE_PATTERNS = [
+    "*.css", "*.png", "*.jpg", "*.jpeg", "*.gif", "*.webp", "*.svg", "*.ico",
+    "*.woff", "*.woff2", "*.ttf", "*.otf", "*.eot",
+]
+
+
+def build_headless_driver():
+    """Start a headless Chrome that skips images, fonts and stylesheets."""
+    options = webdriver.ChromeOptions()
+    options.add_argument("--headless=new")
+    options.add_argument("--disable-gpu")
+    options.add_argument("--disable-extensions")
+    options.add_argument("--disable-dev-shm-usage")
+    options.add_argument("--no-sandbox")
+    options.add_argument("--blink-settings=imagesEnabled=false")
+    options.add_experimental_option("prefs", {
+        "profile.managed_default_content_settings.images": 2,
+        "profile.managed_default_content_settings.stylesheets": 2,
+        "profile.managed_default_content_settings.fonts": 2,
+    })
+    driver = webdriver.Chrome(options=options)
+    # Content settings do not cover web fonts loaded from CSS, so block by URL as well
+    driver.execute_cdp_cmd("Network.enable", {})
+    driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": BLOCKED_RESOURCE_PATTERNS})
+    return driver
+
+
+class PooledDriver:
+    def __init__(self, driver):
+        self.driver = driver
+        self.pages = 0
+
+
+class DriverPool:
+    """Bounded pool of long-lived WebDriver instances shared by scraper threads.
+
+    Drivers are created lazily up to `size` and recycled after a crash or
+    after serving `max_pages` pages. Call close() (or use the pool as a
+    context manager) to shut every browser down.
+    """
+
+    def __init__(self, size: int = 4, max_pages: int = 25, driver_factory=build_headless_driver):
+        if size < 1:
+            raise ValueError("DriverPool size must be at least 1")
+        self.size = size
+        self.max_pages = max_pages
+        self.driver_factory = driver_factory
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+        self._lock = threading.Lock()
+        self._live = set()
+        self._closed = False
+        self.created = 0
+        self.recycled = 0
+
+    def acquire(self, timeout=None) -> PooledDriver:
+        if self._closed:
+            raise RuntimeError("DriverPool is closed")
+        if not self._slots.acquire(timeout=timeout):
+            raise TimeoutError("Timed out waiting for a free WebDriver")
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        try:
+            pooled = PooledDriver(self.driver_factory())
+        except Exception:
+            self._slots.release()
+            raise
+        with self._lock:
+            self._live.add(pooled)
+            self.created += 1
+        return pooled
+
+    def release(self, pooled: PooledDriver, broken: bool = False):
+        pooled.pages += 1
+        if broken or self._closed or (self.max_pages and pooled.pages >= self.max_pages):
+            self._discard(pooled)
+            if not self._closed:
+                self.recycled += 1
+        else:
+            self._idle.put(pooled)
+        self._slots.release()
+
+    @contextmanager
+    def driver(self, timeout=None):
+        """Borrow a driver; it is recycled if the body raises a WebDriverException."""
+        pooled = self.acquire(timeout=timeout)
+        broken = False
+        try:
+            yield pooled.driver
+        except WebDriverException:
+            broken = True
+            raise
+        finally:
+            self.release(pooled, broken=broken)
+
+    def _discard(self, pooled: PooledDriver):
+        with self._lock:
+            self._live.discard(pooled)
+        try:
+            pooled.driver.quit()
+        except Exception as e:
+            print(f"[POOL] Error closing driver: {str(e)}")
+
+    def close(self):
+        self._closed = True
+        with self._lock:
+            live = list(self._live)
+        for pooled in live:
+            self._discard(pooled)
+        while not self._idle.empty():
+            self._idle.get_nowait()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
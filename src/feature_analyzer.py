@@ -1,38 +1,209 @@
 import openai
-from typing import Dict, List, Any
+from typing import Dict, Iterable, Iterator, List, Any, Optional, Union
 import os
 import json
+import asyncio
 from dotenv import load_dotenv
 import sys
 import argparse
+import hashlib
+import time
+import log
+from llm_client import RateLimiter, RateLimitedLLMClient
+from analysis_cache import AnalysisCache, DEFAULT_CACHE_PATH, cache_key
+from repo_index import RepositoryDump
+from chunking import ChunkPlan, iter_line_chunks, plan_chunks, TokenCounter
+from triage import FileTriage, TriageReport
+from compaction import CompactionReport, compact_dump
+from manifests import DEPENDENCY_FEATURES, manifest_features
+from local_classifier import LocalClassifier
+from incremental import ChunkResultStore, IncrementalLedger
+from dedup import ContentStore, DedupLedger
+from request_packing import RequestPacker
+from metrics import RunMetrics
+from corpus_store import CorpusStore, DEFAULT_CORPUS_PATH
+from rules import RuleEngine, DEPLOYMENT_RULES, FRAMEWORK_RULES, directory_rules
+
+SYSTEM_PROMPT = "You are a code analysis expert. Analyze the code and return ONLY valid JSON matching the exact format specified. Do not include any additional text or formatting."
+
+FEATURE_INSTRUCTIONS = """Analyze the following code snippet and determine if it implements any of these features. For each feature:
+1. Indicate if it's present
+2. Provide details about the implementation if found
+3. Suggest specific improvements or implementations if needed (e.g., "Should implement Redis caching for user sessions" or "Needs S3 bucket for file uploads")"""
+
+PACKED_INSTRUCTIONS = """The code below comes from several unrelated repositories, in sections that each start with a line "### SECTION <id> ###". Analyze every section on its own: code in one section never counts for another."""
+
+# (number in the full prompt, JSON key, description)
+LLM_FEATURES = [
+    (1, "authentication", "Authentication (user login, signup, JWT, sessions)"),
+    (2, "realtime_events", "Realtime Events (websockets, server-sent events)"),
+    (3, "storage", "Storage (file uploads, cloud storage)"),
+    (4, "caching", "Caching (Redis, in-memory)"),
+    (5, "ai_implementation", "AI Implementation (ML models, AI APIs)"),
+    (6, "database", "Database Operations (any data persistence)"),
+    (7, "microservices", "Microservices Architecture (service separation)"),
+    (8, "monolith", "Monolithic Architecture (single application)"),
+    (9, "api_exposed", "API Endpoints (REST, GraphQL)"),
+    (11, "message_queues", "Message Queues (RabbitMQ, Kafka)"),
+    (12, "background_jobs", "Background Jobs (workers, scheduled tasks)"),
+    (13, "sensitive_data", "Sensitive Data Handling (PII, encryption)"),
+    (14, "external_apis", "External API Dependencies"),
+]
+
+
+def _feature_prompt(entries) -> str:
+    features = "\n".join(f"{number}. {description}" for number, _, description in entries)
+    schema = ",\n".join(f'    "{key}": {{"present": false, "details": "", "improvements": ""}}' for _, key, _ in entries)
+    return (f"{FEATURE_INSTRUCTIONS}\n\nFeatures to analyze:\n{features}\n\n"
+            f"Return your analysis in this exact JSON format:\n{{\n{schema}\n}}")
+
+
+FEATURE_PROMPT = _feature_prompt(LLM_FEATURES)
+
+
+def build_feature_prompt(features: Optional[Iterable[str]] = None) -> str:
+    """Prompt and JSON schema covering only the given features (all when None)."""
+    if features is None:
+        return FEATURE_PROMPT
+    wanted = set(features)
+    selected = [(key, description) for _, key, description in LLM_FEATURES if key in wanted]
+    return _feature_prompt([(number, key, description) for number, (key, description) in enumerate(selected, 1)])
+
+
+def prompt_version(feature_prompt: str) -> str:
+    return hashlib.sha256((SYSTEM_PROMPT + feature_prompt).encode('utf-8')).hexdigest()[:16]
+
+
+# Part of every cache key, so editing either prompt invalidates cached analyses
+PROMPT_VERSION = prompt_version(FEATURE_PROMPT)
+
+# Features to check via directory structure
+DIRECTORY_FEATURES = {
+    "already_deployed": ["docker-compose.yml", "kubernetes", "deploy.sh", ".env.production"],
+    "has_frontend": ["src/frontend", "public", "index.html", "components", "pages"],
+    "has_cicd": [".github/workflows", "jenkins", "gitlab-ci.yml", ".travis.yml"],
+    "multiple_environments": [".env.", "config/environments"],
+    "uses_containerization": ["dockerfile", "docker-compose", "kubernetes"],
+    "uses_iac": ["terraform", "cloudformation", "pulumi", "ansible"],
+    "high_availability": ["kubernetes", "docker-swarm", "load-balancer"],
+}
+
+
+def _closing_chunks(chunks: Iterator[str], dump: RepositoryDump) -> Iterator[str]:
+    """Yield the lazily built chunks, closing the dump they are read from when done or abandoned."""
+    with dump:
+        yield from chunks
+
+
+def _close_chunks(code_chunks: Iterable[str]):
+    close = getattr(code_chunks, 'close', None)
+    if close is not None:
+        close()
+
 
 class FeatureAnalyzer:
-    def __init__(self):
+    def __init__(self, max_in_flight: int = 1, requests_per_minute: Optional[float] = None,
+                 tokens_per_minute: Optional[float] = None, cache_path: str = DEFAULT_CACHE_PATH,
+                 cache_max_bytes: int = 512 * 1024 * 1024, streaming: bool = False,
+                 chunker: str = "packed", context_tokens: int = 16385, triage: bool = True,
+                 early_stop: bool = False, manifest_fast_path: bool = True,
+                 classifier_path: Optional[str] = None, classifier_mode: str = "gate",
+                 classifier_confidence: float = 0.9, incremental_path: Optional[str] = None,
+                 dedup_path: Optional[str] = None, pack_sections: int = 0, compaction: bool = True):
         # Load environment variables from .env file
         load_dotenv()
 
         api_key = os.getenv('OPENAI_API_KEY')
-        if not api_key:
+        offline = classifier_path is not None and classifier_mode == "only"
+        if not api_key and not offline:
             raise ValueError("OPENAI_API_KEY not found in environment variables. Please check your .env file.")
+        if not api_key:
+            # Classifier-only runs never send a request; the clients just need a key to construct
+            api_key = "offline"
 
+        self.api_key = api_key
         self.client = openai.OpenAI(api_key=api_key)
 
         # Configure analysis settings
         self.max_tokens = 4000
         self.model = "gpt-3.5-turbo"
-        self.chunk_size = 12000
-        self.analysis_cache = {}
+        self.chunk_size = 12000  # characters, used by the "lines" chunker
+        self.analysis_cache = AnalysisCache(cache_path, max_bytes=cache_max_bytes)
+
+        # The "packed" chunker fills chunks up to the model's context window
+        self.chunker = chunker
+        self.context_tokens = context_tokens
+        self.completion_reserve = 1500
+        self.token_counter = TokenCounter(self.model)
+
+        # Lockfiles, vendored, minified, generated and duplicate files are kept away from the LLM
+        self.triage = FileTriage() if triage else None
+        self.triage_reports: List[TriageReport] = []
+
+        # Comments, docstrings, long literals and whitespace are compacted away before chunking
+        self.compaction = compaction
+        self.compaction_reports: List[CompactionReport] = []
+
+        # Requests in flight at once; all of them go through the rate-limited async client
+        self.max_in_flight = max_in_flight
+        self.rate_limiter = RateLimiter(requests_per_minute, tokens_per_minute)
+
+        # Streaming mode chunks lazily and merges results one batch at a time
+        self.streaming = streaming
+        self.batch_size = max(16, max_in_flight * 4)
+
+        # Early stop narrows each request to the features not yet found and ends
+        # a repository's analysis once all are found; small batches react sooner
+        self.early_stop = early_stop
+        if early_stop:
+            self.batch_size = max(1, max_in_flight)
+
+        # Features proven by declared dependencies are settled without asking the LLM;
+        # feature_sources records per repository whether the manifest or the LLM decided
+        self.manifest_fast_path = manifest_fast_path
+        self.feature_sources: List[Dict[str, str]] = []
+
+        # Offline classifier (see local_classifier.py): "gate" settles the features it is
+        # confident about and escalates the rest to the LLM, "only" never calls the LLM
+        self.classifier_path = classifier_path
+        self.classifier = LocalClassifier.load(classifier_path) if classifier_path else None
+        self.classifier_mode = classifier_mode
+        self.classifier_confidence = classifier_confidence
+
+        # Per-file incremental analysis: stored chunk results are reused while their files are unchanged
+        self.chunk_results = None
+        if incremental_path:
+            if chunker == "packed":
+                self.chunk_results = ChunkResultStore(incremental_path)
+            else:
+                print("[WARNING] Incremental analysis needs the packed chunker; analyzing every file")
+
+        # Cross-repository deduplication: a file shared by several repositories is analyzed once.
+        # It covers re-analysis of the same repository too, so it takes over from the per-repository store
+        self.content_store = None
+        self.dedup_ledgers: List[DedupLedger] = []
+        if dedup_path:
+            if chunker == "packed":
+                self.content_store = ContentStore(dedup_path)
+            else:
+                print("[WARNING] Deduplication needs the packed chunker; analyzing every file")
+
+        # Request packing: small chunks of concurrently analyzed repositories share one request
+        # (async analysis only, i.e. the streaming pipeline)
+        self.packer = RequestPacker(self, pack_sections) if pack_sections > 1 else None
+
+        # Per-repository stage timings, token usage and cache counters (see metrics.py)
+        self.metrics = RunMetrics()
 
         # Features to check via directory structure
-        self.directory_features = {
-            "already_deployed": ["docker-compose.yml", "kubernetes", "deploy.sh", ".env.production"],
-            "has_frontend": ["src/frontend", "public", "index.html", "components", "pages"],
-            "has_cicd": [".github/workflows", "jenkins", "gitlab-ci.yml", ".travis.yml"],
-            "multiple_environments": [".env.", "config/environments"],
-            "uses_containerization": ["dockerfile", "docker-compose", "kubernetes"],
-            "uses_iac": ["terraform", "cloudformation", "pulumi", "ansible"],
-            "high_availability": ["kubernetes", "docker-swarm", "load-balancer"],
-        }
+        self.directory_features = DIRECTORY_FEATURES
+
+        # Rule tables are compiled once into per-source multi-pattern matchers
+        self.rule_engine = RuleEngine({
+            "deployment": DEPLOYMENT_RULES,
+            "framework": FRAMEWORK_RULES,
+            "directory": directory_rules(self.directory_features),
+        })
 
         # Features to analyze via LLM
         self.llm_features = {
@@ -51,193 +222,580 @@ class FeatureAnalyzer:
             "external_apis": {"present": False, "details": [], "improvements": []}
         }
 
-    def chunk_code_by_files(self, code_content: str) -> List[str]:
+    def config_settings(self) -> Dict[str, Any]:
+        """Every setting that can change a repository's results."""
+        config = {
+            "model": self.model,
+            "prompt": PROMPT_VERSION,
+            "chunker": self.chunker,
+            "chunk_size": self.chunk_size,
+            "context_tokens": self.context_tokens,
+            "triage": self.triage is not None,
+            "compaction": self.compaction,
+            "early_stop": self.early_stop,
+            "manifests": DEPENDENCY_FEATURES if self.manifest_fast_path else None,
+            "classifier": None,
+            # Reused chunk results stand in for fresh ones, near duplicates for the files they resemble
+            "incremental": self.chunk_results is not None,
+            "dedup": [self.content_store.threshold] if self.content_store is not None else None,
+        }
+        if self.classifier is not None:
+            with open(self.classifier_path, 'rb') as f:
+                model_digest = hashlib.sha256(f.read()).hexdigest()
+            config["classifier"] = [model_digest, self.classifier_mode, self.classifier_confidence]
+        return config
+
+    def config_fingerprint(self) -> str:
+        """Digest of config_settings(), keying results per configuration (see run_manifest.py)."""
+        return hashlib.sha256(json.dumps(self.config_settings(), sort_keys=True).encode('utf-8')).hexdigest()[:16]
+
+    def chunk_code_by_files(self, code_content: Union[str, RepositoryDump], keep=None) -> List[str]:
         """Split code content into chunks based on file headers and size limits."""
-        print("\n[DEBUG] Chunking code content...")
-        chunks = []
-        current_chunk = []
-        current_size = 0
-
-        lines = code_content.split('\n')
-        for line_num, line in enumerate(lines):
-            line_size = len(line)
-
-            # If adding this line would exceed chunk size, start a new chunk
-            if current_size + line_size > self.chunk_size and current_chunk:
-                chunks.append('\n'.join(current_chunk))
-                current_chunk = []
-                current_size = 0
-
-            current_chunk.append(line)
-            current_size += line_size
-
-            # When we hit a file header, consider starting a new chunk
-            if line.startswith('=' * 48) and current_size > self.chunk_size / 2:
-                chunks.append('\n'.join(current_chunk))
-                current_chunk = []
-                current_size = 0
-
-        # Add the last chunk if it exists
-        if current_chunk:
-            chunks.append('\n'.join(current_chunk))
-
-        print(f"[DEBUG] Created {len(chunks)} total chunks")
+        log.debug("\n[DEBUG] Chunking code content...")
+        chunks = list(self.iter_code_chunks(code_content, keep))
+        log.debug(f"[DEBUG] Created {len(chunks)} total chunks")
         return chunks
 
-    def analyze_with_llm(self, code_content: str) -> Dict[str, Any]:
-        print("\n[ANALYSIS] Starting LLM analysis...")
-        code_chunks = self.chunk_code_by_files(code_content)
+    def chunk_token_budget(self) -> int:
+        """Tokens left for code in one request after the prompts and the expected answer."""
+        overhead = sum(self.token_counter.count(message["content"]) + 4 for message in self._build_messages(""))
+        return self.context_tokens - overhead - self.completion_reserve
+
+    def plan_code_chunks(self, code_content: Union[str, RepositoryDump], keep=None, separate=None) -> ChunkPlan:
+        """Pack the files keep(entry) selects; files separate(entry) selects go into chunks of their own after them."""
+        plan = plan_chunks(code_content, self.chunk_token_budget(), self.token_counter, keep)
+        if separate is not None:
+            rest = plan_chunks(plan.dump, plan.budget, self.token_counter, separate, include_preamble=False)
+            plan = ChunkPlan(plan.dump, plan.chunks + rest.chunks, plan.budget)
+        log.info(f"[CHUNK] Packed {plan.total_tokens} tokens into {len(plan)} chunks of up to {plan.budget} tokens "
+                 f"(fill ratio {plan.fill_ratio:.0%}, {plan.split_files} oversized file(s) split"
+                 f"{'' if self.token_counter.exact else ', estimated token counts'})")
+        return plan
+
+    def iter_code_chunks(self, code_content: Union[str, RepositoryDump], keep=None) -> Iterator[str]:
+        """Same chunks as chunk_code_by_files, produced lazily for streaming analysis.
+
+        keep(entry) -> False leaves a file out (see triage_files).
+        """
+        if self.chunker == "packed":
+            # Only file sizes are kept while planning; chunk texts are built on demand
+            return self.plan_code_chunks(code_content, keep).iter_chunks()
+        # An indexed dump is decoded one segment at a time instead of split as a whole
+        if isinstance(code_content, RepositoryDump) or keep is not None:
+            lines = RepositoryDump.coerce(code_content).iter_lines(keep)
+        else:
+            lines = code_content.split('\n')
+        return iter_line_chunks(lines, self.chunk_size)
+
+    def triage_files(self, code_content: RepositoryDump, repo: Optional[str] = None) -> Optional[TriageReport]:
+        """Decide which files reach the LLM; None when triage is disabled."""
+        if self.triage is None:
+            return None
+        report = self.triage.run(code_content, repo)
+        print(f"[TRIAGE] {report.summary()}")
+        self.triage_reports.append(report)
+        return report
+
+    def compact_files(self, code_content: RepositoryDump, repo: Optional[str] = None, keep=None) -> RepositoryDump:
+        """Dump of the files keep(entry) selects with their bodies compacted (see compaction.py)."""
+        compacted, report = compact_dump(code_content, keep, self.token_counter, repo)
+        print(f"[COMPACT] {report.summary()}")
+        self.compaction_reports.append(report)
+        return compacted
+
+    def incremental_ledger(self, code_content: RepositoryDump, repo: Optional[str], keep=None,
+                           settled: Optional[Dict[str, Dict[str, Any]]] = None) -> Optional[IncrementalLedger]:
+        """Stored chunk results of `repo` still valid for its current files; None when not incremental."""
+        if self.chunk_results is None or not repo:
+            return None
+        needed = [feature for feature in self.llm_features if feature not in (settled or {})]
+        ledger = IncrementalLedger(self.chunk_results, repo, f"{self.model}:{PROMPT_VERSION}", code_content,
+                                   keep, needed if settled else None)
+        print(f"[INCREMENTAL] {ledger.summary()}")
+        return ledger
+
+    def dedup_ledger(self, code_content: RepositoryDump, repo: Optional[str], keep=None,
+                     settled: Optional[Dict[str, Dict[str, Any]]] = None) -> Optional[DedupLedger]:
+        """Stored results from any repository that cover files of `repo`; None without a content store."""
+        if self.content_store is None:
+            return None
+        needed = [feature for feature in self.llm_features if feature not in (settled or {})]
+        ledger = DedupLedger(self.content_store, repo or "", f"{self.model}:{PROMPT_VERSION}", code_content,
+                             keep, needed if settled else None)
+        print(f"[DEDUP] {ledger.summary()}")
+        self.dedup_ledgers.append(ledger)
+        return ledger
+
+    def prepare_chunks(self, code_content: Union[str, RepositoryDump], repo: Optional[str] = None,
+                       settled: Optional[Dict[str, Dict[str, Any]]] = None):
+        """Triage and chunk a dump for analyze_chunks; returns (chunks, incremental or dedup ledger or None)."""
+        keep = None
+        if self.triage is not None:
+            code_content = RepositoryDump.coerce(code_content)
+            keep = self.triage_files(code_content, repo).keep
+        if not self.compaction:
+            return self._chunk_dump(code_content, repo, keep, settled)
+        # The compacted dump holds only the files triage kept; it is closed once its chunks are built
+        compacted = self.compact_files(RepositoryDump.coerce(code_content), repo, keep)
+        try:
+            chunks, ledger = self._chunk_dump(compacted, repo, None, settled)
+        except BaseException:
+            compacted.close()
+            raise
+        if isinstance(chunks, list):
+            compacted.close()
+            return chunks, ledger
+        return _closing_chunks(chunks, compacted), ledger
+
+    def _chunk_dump(self, code_content: Union[str, RepositoryDump], repo: Optional[str], keep,
+                    settled: Optional[Dict[str, Dict[str, Any]]]):
+        if self.content_store is not None:
+            code_content = RepositoryDump.coerce(code_content)
+            ledger = self.dedup_ledger(code_content, repo, keep, settled)
+            # Files other repositories share are packed apart from this repository's own,
+            # so the chunk results stored for them can be reused elsewhere
+            ledger.plan = self.plan_code_chunks(code_content, ledger.shared, ledger.unique)
+            chunks = ledger.plan.iter_chunks()
+            return (chunks if self.streaming else list(chunks)), ledger
+        if self.chunk_results is not None and repo:
+            code_content = RepositoryDump.coerce(code_content)
+            ledger = self.incremental_ledger(code_content, repo, keep, settled)
+            # Only files without a reusable stored result are chunked; the plan maps chunks back to files
+            ledger.plan = self.plan_code_chunks(code_content, ledger.keep)
+            chunks = ledger.plan.iter_chunks()
+            return (chunks if self.streaming else list(chunks)), ledger
+        if self.streaming:
+            # Chunks are generated while earlier batches are being analyzed
+            return self.iter_code_chunks(code_content, keep), None
+        code_chunks = self.chunk_code_by_files(code_content, keep)
         if not code_chunks:
             print("[WARNING] No valid code chunks found for analysis!")
+        return code_chunks, None
+
+    def resolve_from_manifests(self, code_content: Union[str, RepositoryDump]) -> Dict[str, List[str]]:
+        """Features proven present by dependency manifests, with their evidence; {} when disabled."""
+        if not self.manifest_fast_path:
+            return {}
+        started = time.perf_counter()
+        evidence = {feature: found for feature, found in manifest_features(code_content).items()
+                    if feature in self.llm_features}
+        elapsed = (time.perf_counter() - started) * 1e6
+        settled = ", ".join(f"{feature} ({found[0]})" for feature, found in evidence.items())
+        print(f"[MANIFEST] {len(evidence)} feature(s) settled from dependency manifests in {elapsed:.0f} µs"
+              + (f": {settled}" if settled else ""))
+        return evidence
+
+    def classify_features(self, code_content: Union[str, RepositoryDump],
+                          settled: Dict[str, Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+        """Features the local classifier decides, skipping those already settled; {} without a model."""
+        if self.classifier is None:
+            return {}
+        decided = {}
+        for feature, probability in self.classifier.predict(code_content).items():
+            if feature not in self.llm_features or feature in settled:
+                continue
+            present = probability >= 0.5
+            if self.classifier_mode == "only" or max(probability, 1 - probability) >= self.classifier_confidence:
+                details = [f"Local classifier (p={probability:.2f})"] if present else []
+                decided[feature] = {"present": present, "details": details, "source": "classifier"}
+        escalated = len(self.llm_features) - len(settled) - len(decided)
+        print(f"[CLASSIFIER] {len(decided)} feature(s) decided locally, {escalated} escalated to the LLM")
+        return decided
+
+    def settle_features(self, code_content: Union[str, RepositoryDump]) -> Dict[str, Dict[str, Any]]:
+        """Features decided without the LLM: declared dependencies first, then the local classifier."""
+        settled = {feature: {"present": True, "details": [f"Declared dependency: {', '.join(found)}"],
+                             "source": "manifest"}
+                   for feature, found in self.resolve_from_manifests(code_content).items()}
+        settled.update(self.classify_features(code_content, settled))
+        return settled
+
+    def needs_llm(self, settled: Dict[str, Dict[str, Any]]) -> bool:
+        return len(settled) < len(self.llm_features)
+
+    def _empty_analysis(self, settled: Optional[Dict[str, Dict[str, Any]]] = None) -> Dict[str, Any]:
+        analysis = {feature: {"present": False, "details": []} for feature in self.llm_features}
+        for feature, decision in (settled or {}).items():
+            analysis[feature] = {"present": decision["present"], "details": list(decision["details"])}
+        return analysis
+
+    def _build_messages(self, chunk: str, features: Optional[List[str]] = None) -> List[Dict[str, str]]:
+        return [
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": f"{build_feature_prompt(features)}\n\nCode to analyze:\n{chunk}"}
+        ]
+
+    def _build_packed_messages(self, sections: List[tuple], features: Optional[List[str]] = None) -> List[Dict[str, str]]:
+        """Messages for (section id, chunk) pairs answered with one JSON object per section id."""
+        example = ", ".join(f'"{section_id}": {{...}}' for section_id, _ in sections[:2]) or '"s1": {...}'
+        code = "\n".join(f"### SECTION {section_id} ###\n{chunk}" for section_id, chunk in sections)
+        return [
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": f"{PACKED_INSTRUCTIONS}\n\n{build_feature_prompt(features)}\n\n"
+                                        f"Return one such object per section, keyed by section id: {{{example}}}\n\n"
+                                        f"Code to analyze:\n{code}"}
+        ]
+
+    def _cache_key(self, chunk: str, features: Optional[List[str]] = None) -> str:
+        version = PROMPT_VERSION if features is None else prompt_version(build_feature_prompt(features))
+        return cache_key(self.model, version, chunk)
+
+    def _precheck_chunk(self, chunk_num: int, chunk: str) -> bool:
+        """Return False for chunks that should not be sent to the API."""
+        log.info(f"\n[CHUNK {chunk_num}] Processing chunk ({len(chunk)} characters)")
+
+        # Skip small chunks that are just headers
+        if len(chunk.strip()) < 100:
+            log.info(f"[CHUNK {chunk_num}] Skipping small chunk")
+            return False
+        return True
+
+    def _parse_chunk_response(self, chunk_num: int, raw_response: str,
+                              features: Optional[List[str]] = None) -> Optional[Dict[str, Any]]:
+        """Parse and validate one API response, returning None if it is unusable."""
+        log.debug(f"[CHUNK {chunk_num}] Raw API response:\n{raw_response}")
+
+        try:
+            # Parse JSON while preserving details text formatting
+            chunk_analysis = json.loads(raw_response)
+        except json.JSONDecodeError as e:
+            print(f"[CHUNK {chunk_num}] JSON DECODE ERROR: {str(e)}")
+            log.debug(f"[CHUNK {chunk_num}] Invalid JSON content: {raw_response}")
+            return None
+
+        # Normalize JSON keys only
+        chunk_analysis = {k.strip().lower(): v for k, v in chunk_analysis.items()}
+
+        if log.enabled(log.DEBUG):
+            print(f"[CHUNK {chunk_num}] Parsed JSON: {json.dumps(chunk_analysis, indent=2)}")
+        return self._validate_analysis(f"[CHUNK {chunk_num}]", chunk_analysis, features)
+
+    def _parse_packed_response(self, label: str, raw_response: str, section_ids: List[str],
+                               features: Optional[List[str]] = None) -> Dict[str, Optional[Dict[str, Any]]]:
+        """Split a packed response into per-section analyses; a section failing validation maps to None."""
+        log.debug(f"{label} Raw API response:\n{raw_response}")
+        try:
+            packed = json.loads(raw_response)
+        except json.JSONDecodeError as e:
+            print(f"{label} JSON DECODE ERROR: {str(e)}")
+            return {}
+        if not isinstance(packed, dict):
+            print(f"{label} Expected a JSON object keyed by section id")
+            return {}
+        packed = {str(k).strip().lower(): v for k, v in packed.items()}
+        answers = {}
+        for section_id in section_ids:
+            section = packed.get(section_id)
+            if not isinstance(section, dict):
+                print(f"{label} Missing section {section_id} in response")
+                answers[section_id] = None
+                continue
+            section = {k.strip().lower(): v for k, v in section.items()}
+            answers[section_id] = self._validate_analysis(f"{label} [{section_id}]", section, features)
+        return answers
+
+    def _validate_analysis(self, label: str, chunk_analysis: Dict[str, Any],
+                           features: Optional[List[str]] = None) -> Optional[Dict[str, Any]]:
+        # Validate feature structure
+        required_features = ['authentication', 'database', 'caching', 'storage', 'microservices']
+        if features is not None:
+            # A narrowed prompt only asks about (and validates) the unresolved features
+            required_features = [f for f in features if f in required_features] or list(features)
+        missing_features = [f for f in required_features if f not in chunk_analysis]
+
+        if missing_features:
+            print(f"{label} Missing features in response: {missing_features}")
+            print(f"{label} Available keys: {list(chunk_analysis.keys())}")
+            return None
+
+        # Validate feature format
+        valid = True
+        for feature in required_features:
+            if not isinstance(chunk_analysis[feature], dict) or not isinstance(chunk_analysis[feature].get('present'), bool):
+                print(f"{label} Invalid format for {feature}")
+                valid = False
+        if not valid:
+            return None
+
+        return chunk_analysis
+
+    async def _analyze_chunk_async(self, llm: RateLimitedLLMClient, chunk_num: int, chunk: str,
+                                   features: Optional[List[str]] = None,
+                                   packer: Optional[RequestPacker] = None) -> Optional[Dict[str, Any]]:
+        if not self._precheck_chunk(chunk_num, chunk):
+            return None
+        tokens = await asyncio.to_thread(packer.small_tokens_of, chunk) if packer is not None else None
+        if tokens is not None:
+            log.info(f"[CHUNK {chunk_num}] Waiting to share a request with other small chunks...")
+            return await packer.submit(llm, chunk_num, chunk, tokens, features)
+        return await self._request_chunk_async(llm, chunk_num, chunk, features)
+
+    async def _request_chunk_async(self, llm: RateLimitedLLMClient, chunk_num: int, chunk: str,
+                                   features: Optional[List[str]] = None) -> Optional[Dict[str, Any]]:
+        try:
+            log.info(f"[CHUNK {chunk_num}] Queued for OpenAI API...")
+            raw_response = await llm.complete(
+                self._build_messages(chunk, features),
+                label=f"[CHUNK {chunk_num}]",
+                model=self.model,
+                temperature=0,
+                response_format={"type": "json_object"}
+            )
+            return self._parse_chunk_response(chunk_num, raw_response, features)
+        except Exception as e:
+            print(f"[CHUNK {chunk_num}] UNEXPECTED ERROR: {str(e)}")
+            return None
+
+    async def _analyze_pending_async(self, llm: RateLimitedLLMClient, pending: List[tuple],
+                                     features: Optional[List[str]] = None,
+                                     packer: Optional[RequestPacker] = None) -> List[Optional[Dict[str, Any]]]:
+        return await asyncio.gather(
+            *(self._analyze_chunk_async(llm, chunk_num, chunk, features, packer) for chunk_num, chunk in pending)
+        )
+
+    async def _analyze_chunks_async(self, pending: List[tuple],
+                                    features: Optional[List[str]] = None) -> List[Optional[Dict[str, Any]]]:
+        # The client is bound to this event loop; the rate limiter outlives it
+        async with self.create_llm_client() as llm:
+            results = await self._analyze_pending_async(llm, pending, features)
+            if llm.retries:
+                print(f"[ANALYSIS] {llm.retries} request(s) retried after rate limiting or server errors")
+            return results
+
+    def _lookup_cached(self, batch: List[tuple], features: Optional[List[str]] = None):
+        """Split (chunk_num, chunk) pairs into cached analyses and the pairs still to send."""
+        cache_keys = [self._cache_key(chunk, features) for _, chunk in batch]
+        chunk_results = [self.analysis_cache.get(key) for key in cache_keys]
+        pending = []
+        for (chunk_num, chunk), cached in zip(batch, chunk_results):
+            if cached is not None:
+                log.info(f"[CHUNK {chunk_num}] Using cached analysis")
+            else:
+                pending.append((chunk_num, chunk))
+        return cache_keys, chunk_results, pending
 
-        combined_analysis = {
-            "authentication": {"present": False, "details": []},
-            "realtime_events": {"present": False, "details": []},
-            "storage": {"present": False, "details": []},
-            "caching": {"present": False, "details": []},
-            "ai_implementation": {"present": False, "details": []},
-            "database": {"present": False, "details": []},
-            "microservices": {"present": False, "details": []},
-            "monolith": {"present": False, "details": []},
-            "api_exposed": {"present": False, "details": []},
-            "message_queues": {"present": False, "details": []},
-            "background_jobs": {"present": False, "details": []},
-            "sensitive_data": {"present": False, "details": []},
-            "external_apis": {"present": False, "details": []}
-        }
-
-        prompt = """Analyze the following code snippet and determine if it implements any of these features. For each feature:
-1. Indicate if it's present
-2. Provide details about the implementation if found
-3. Suggest specific improvements or implementations if needed (e.g., "Should implement Redis caching for user sessions" or "Needs S3 bucket for file uploads")
-
-Features to analyze:
-1. Authentication (user login, signup, JWT, sessions)
-2. Realtime Events (websockets, server-sent events)
-3. Storage (file uploads, cloud storage)
-4. Caching (Redis, in-memory)
-5. AI Implementation (ML models, AI APIs)
-6. Database Operations (any data persistence)
-7. Microservices Architecture (service separation)
-8. Monolithic Architecture (single application)
-9. API Endpoints (REST, GraphQL)
-11. Message Queues (RabbitMQ, Kafka)
-12. Background Jobs (workers, scheduled tasks)
-13. Sensitive Data Handling (PII, encryption)
-14. External API Dependencies
-
-Return your analysis in this exact JSON format:
-{
-    "authentication": {"present": false, "details": "", "improvements": ""},
-    "realtime_events": {"present": false, "details": "", "improvements": ""},
-    "storage": {"present": false, "details": "", "improvements": ""},
-    "caching": {"present": false, "details": "", "improvements": ""},
-    "ai_implementation": {"present": false, "details": "", "improvements": ""},
-    "database": {"present": false, "details": "", "improvements": ""},
-    "microservices": {"present": false, "details": "", "improvements": ""},
-    "monolith": {"present": false, "details": "", "improvements": ""},
-    "api_exposed": {"present": false, "details": "", "improvements": ""},
-    "message_queues": {"present": false, "details": "", "improvements": ""},
-    "background_jobs": {"present": false, "details": "", "improvements": ""},
-    "sensitive_data": {"present": false, "details": "", "improvements": ""},
-    "external_apis": {"present": false, "details": "", "improvements": ""}
-}"""
-
+    def _iter_batches(self, code_chunks: Iterable[str]) -> Iterator[List[tuple]]:
+        """Number the chunks and group them so only one batch is held in memory at a time."""
+        batch = []
         for chunk_num, chunk in enumerate(code_chunks, 1):
-            # Check cache first
-            cache_key = hash(chunk)
-            if cache_key in self.analysis_cache:
-                print(f"[CHUNK {chunk_num}] Using cached analysis")
-                chunk_analysis = self.analysis_cache[cache_key]
+            batch.append((chunk_num, chunk))
+            if len(batch) >= self.batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def _merge_batch(self, combined_analysis: Dict[str, Any], batch: List[tuple], cache_keys: List[str],
+                     chunk_results: List[Optional[Dict[str, Any]]], pending: List[tuple],
+                     fresh_results: List[Optional[Dict[str, Any]]], features: Optional[List[str]] = None,
+                     ledger: Optional[Union[IncrementalLedger, DedupLedger]] = None):
+        fresh = {}
+        for (chunk_num, _), chunk_analysis in zip(pending, fresh_results):
+            fresh[chunk_num] = chunk_analysis
+
+        # Merge in chunk order so concurrent runs produce the same output as serial ones
+        merged = 0
+        for (chunk_num, _), key, cached in zip(batch, cache_keys, chunk_results):
+            chunk_analysis = fresh.get(chunk_num, cached)
+            if chunk_analysis is None:
                 continue
-
-            chunk_analysis = None
             try:
-                print(f"\n[CHUNK {chunk_num}] Processing chunk ({len(chunk)} characters)")
-
-                # Skip small chunks that are just headers
-                if len(chunk.strip()) < 100:
-                    print(f"[CHUNK {chunk_num}] Skipping small chunk")
-                    continue
-
-                print(f"[CHUNK {chunk_num}] Sending to OpenAI API...")
-
-                response = self.client.chat.completions.create(
-                    model=self.model,  # Use cheaper model
-                    messages=[
-                        {
-                            "role": "system",
-                            "content": "You are a code analysis expert. Analyze the code and return ONLY valid JSON matching the exact format specified. Do not include any additional text or formatting."
-                        },
-                        {"role": "user", "content": f"{prompt}\n\nCode to analyze:\n{chunk}"}
-                    ],
-                    temperature=0,
-                    response_format={"type": "json_object"}
-                )
-
-                raw_response = response.choices[0].message.content
-                print(f"[CHUNK {chunk_num}] Raw API response:\n{raw_response}")
-
-                # Parse JSON while preserving details text formatting
-                chunk_analysis = json.loads(raw_response)
-
-                # Normalize JSON keys only
-                chunk_analysis = {k.strip().lower(): v for k, v in chunk_analysis.items()}
-
-                print(f"[CHUNK {chunk_num}] Parsed JSON: {json.dumps(chunk_analysis, indent=2)}")
-
-                # Validate feature structure
-                required_features = ['authentication', 'database', 'caching', 'storage', 'microservices']
-                missing_features = [f for f in required_features if f not in chunk_analysis]
-
-                if missing_features:
-                    print(f"[CHUNK {chunk_num}] Missing features in response: {missing_features}")
-                    print(f"[CHUNK {chunk_num}] Available keys: {list(chunk_analysis.keys())}")
-                    continue
-
-                # Validate feature format
-                valid = True
-                for feature in required_features:
-                    if not isinstance(chunk_analysis[feature].get('present'), bool):
-                        print(f"[CHUNK {chunk_num}] Invalid format for {feature}")
-                        valid = False
-                if not valid:
-                    continue
-
-                # Merge results
-                for feature in combined_analysis:
+                for feature in features or combined_analysis:
                     if chunk_analysis[feature]["present"]:
                         combined_analysis[feature]["present"] = True
                         combined_analysis[feature]["details"].append(
                             chunk_analysis[feature]["details"]
                         )
+                merged += 1
+                if ledger is not None:
+                    ledger.record(chunk_num, chunk_analysis, features)
 
                 # Cache the successful response
-                self.analysis_cache[cache_key] = chunk_analysis
-
-            except json.JSONDecodeError as e:
-                print(f"[CHUNK {chunk_num}] JSON DECODE ERROR: {str(e)}")
-                print(f"[CHUNK {chunk_num}] Invalid JSON content: {raw_response}")
+                if chunk_num in fresh:
+                    self.analysis_cache.put(key, chunk_analysis)
             except KeyError as e:
                 print(f"[CHUNK {chunk_num}] KEY ERROR: {str(e)}")
-                if chunk_analysis:
-                    print(f"[CHUNK {chunk_num}] Available features: {list(chunk_analysis.keys())}")
-            except Exception as e:
-                print(f"[CHUNK {chunk_num}] UNEXPECTED ERROR: {str(e)}")
-                print(f"[CHUNK {chunk_num}] Response dump: {vars(response)}")
+                print(f"[CHUNK {chunk_num}] Available features: {list(chunk_analysis.keys())}")
+        return merged
+
+    def _merge_stored(self, combined_analysis: Dict[str, Any],
+                      ledger: Optional[Union[IncrementalLedger, DedupLedger]], settled: Dict[str, Dict[str, Any]]) -> int:
+        """Merge the reusable stored chunk results; returns how many there were."""
+        if ledger is None:
+            return 0
+        for record in ledger.stable:
+            for feature in record.features or combined_analysis:
+                if feature in settled or feature not in combined_analysis:
+                    continue
+                if record.analysis.get(feature, {}).get("present"):
+                    combined_analysis[feature]["present"] = True
+                    combined_analysis[feature]["details"].append(record.analysis[feature]["details"])
+        return len(ledger.stable)
 
+    def _finalize_analysis(self, combined_analysis: Dict[str, Any], total: int, cached: int,
+                           settled: Dict[str, Dict[str, Any]], answered: int, repo: Optional[str] = None) -> Dict[str, Any]:
         # Clean up details
         print("\n[ANALYSIS] Combining results...")
+        sources = {"repository": repo or ""}
         for feature in combined_analysis:
+            # "none" when no chunk got a usable answer, so the absence is not a decision
+            source = settled[feature]["source"] if feature in settled else "llm" if answered else "none"
+            combined_analysis[feature]["source"] = sources[feature] = source
             if combined_analysis[feature]["details"]:
+                # dict.fromkeys de-duplicates while keeping chunk order
                 combined_analysis[feature]["details"] = "\n".join(
-                    set(combined_analysis[feature]["details"])
+                    dict.fromkeys(combined_analysis[feature]["details"])
                 )
             else:
                 combined_analysis[feature]["details"] = "Not found"
 
+        self.metrics.add("chunks", total, repo)
+        self.metrics.add("cache_hits", cached, repo)
+        self.metrics.add("cache_misses", total - cached, repo)
+        stats = self.analysis_cache.stats()
+        print(f"[CACHE] {cached}/{total} chunks served from cache "
+              f"(run total: {stats['hits']} hits, {stats['misses']} misses)")
+        self.feature_sources.append(sources)
         return combined_analysis
 
+    def _unresolved_features(self, combined_analysis: Dict[str, Any], analyzed: int,
+                             settled: Dict[str, Dict[str, Any]]) -> Optional[List[str]]:
+        """Features the next request still has to ask about: None for all of them, [] when done.
+
+        Merging is an OR, so a feature found present can never flip back and
+        need not be asked about again.
+        """
+        unresolved = [feature for feature in combined_analysis if feature not in settled
+                      and not (self.early_stop and combined_analysis[feature]["present"])]
+        if not unresolved:
+            print(f"[ANALYSIS] All features resolved after {analyzed} chunks; skipping the rest")
+        return None if len(unresolved) == len(combined_analysis) else unresolved
+
+    def analyze_chunks(self, code_chunks: Iterable[str], settled: Optional[Dict[str, Dict[str, Any]]] = None,
+                       repo: Optional[str] = None,
+                       ledger: Optional[Union[IncrementalLedger, DedupLedger]] = None) -> Dict[str, Any]:
+        """Analyze chunks batch by batch; code_chunks may be a lazy generator.
+
+        Features in `settled` (see settle_features) are never asked about; with a
+        ledger (see prepare_chunks), its stored chunk results are merged first.
+        """
+        settled = settled or {}
+        combined_analysis = self._empty_analysis(settled)
+        total = cached = 0
+        answered = self._merge_stored(combined_analysis, ledger, settled)
+        try:
+            for batch in self._iter_batches(code_chunks):
+                features = self._unresolved_features(combined_analysis, total, settled)
+                if features == []:
+                    break
+                # Cached analyses are merged exactly like fresh ones; only misses reach the API
+                cache_keys, chunk_results, pending = self._lookup_cached(batch, features)
+                # Every request, even one at a time, goes through the rate-limited client (--rpm/--tpm, backoff)
+                fresh_results = asyncio.run(self._analyze_chunks_async(pending, features)) if pending else []
+                answered += self._merge_batch(combined_analysis, batch, cache_keys, chunk_results, pending,
+                                              fresh_results, features, ledger)
+                total += len(batch)
+                cached += len(batch) - len(pending)
+        finally:
+            # Stopping early leaves lazy chunks unconsumed; closing them releases the dump they read
+            _close_chunks(code_chunks)
+        if ledger is not None:
+            ledger.commit()
+        return self._finalize_analysis(combined_analysis, total, cached, settled, answered, repo)
+
+    async def analyze_chunks_async(self, code_chunks: Iterable[str], llm: RateLimitedLLMClient,
+                                   settled: Optional[Dict[str, Dict[str, Any]]] = None,
+                                   repo: Optional[str] = None,
+                                   ledger: Optional[Union[IncrementalLedger, DedupLedger]] = None) -> Dict[str, Any]:
+        """Async variant of analyze_chunks for callers that already run an event loop.
+
+        Building chunks (lazy chunks are rendered and token-counted as they are
+        drawn), cache lookups, merging and ledger writes run in worker threads,
+        so other repositories' requests keep flowing meanwhile.
+        """
+        settled = settled or {}
+        combined_analysis = self._empty_analysis(settled)
+        total = cached = 0
+        answered = self._merge_stored(combined_analysis, ledger, settled)
+        batches = self._iter_batches(code_chunks)
+        try:
+            while True:
+                batch = await asyncio.to_thread(next, batches, None)
+                if batch is None:
+                    break
+                features = self._unresolved_features(combined_analysis, total, settled)
+                if features == []:
+                    break
+                cache_keys, chunk_results, pending = await asyncio.to_thread(self._lookup_cached, batch, features)
+                fresh_results = await self._analyze_pending_async(llm, pending, features, self.packer)
+                answered += await asyncio.to_thread(self._merge_batch, combined_analysis, batch, cache_keys,
+                                                    chunk_results, pending, fresh_results, features, ledger)
+                total += len(batch)
+                cached += len(batch) - len(pending)
+        finally:
+            batches.close()
+            _close_chunks(code_chunks)
+        if ledger is not None:
+            await asyncio.to_thread(ledger.commit)
+        return await asyncio.to_thread(self._finalize_analysis, combined_analysis, total, cached, settled,
+                                       answered, repo)
+
+    def create_llm_client(self, max_in_flight: Optional[int] = None) -> RateLimitedLLMClient:
+        """Async client sharing this analyzer's rate limits; create it inside the event loop."""
+        return RateLimitedLLMClient(self.api_key, self.rate_limiter, max_in_flight=max_in_flight or self.max_in_flight,
+                                    metrics=self.metrics)
+
+    def analyze_with_llm(self, code_content: Union[str, RepositoryDump], repo: Optional[str] = None) -> Dict[str, Any]:
+        print("\n[ANALYSIS] Starting LLM analysis...")
+        if self.triage is not None or self.manifest_fast_path or self.classifier is not None:
+            code_content = RepositoryDump.coerce(code_content)
+        with self.metrics.stage("chunk", repo):
+            settled = self.settle_features(code_content)
+            if self.needs_llm(settled):
+                code_chunks, ledger = self.prepare_chunks(code_content, repo, settled)
+            else:
+                code_chunks, ledger = [], None
+        with self.metrics.stage("llm", repo):
+            return self.analyze_chunks(code_chunks, settled, repo, ledger)
+
+    def batch_requests(self, code_content: Union[str, RepositoryDump], repo: Optional[str] = None) -> List[tuple]:
+        """The (custom_id, features, request body) triples analyze_with_llm would send for a repository.
+
+        Chunks the analysis cache already answers are left out; the custom_id
+        is the chunk's cache key, so a batch answer becomes a cache hit.
+        """
+        code_content = RepositoryDump.coerce(code_content)
+        settled = self.settle_features(code_content)
+        if not self.needs_llm(settled):
+            return []
+        # Triage and compaction are reported when the repository is analyzed
+        reports, compactions = len(self.triage_reports), len(self.compaction_reports)
+        code_chunks, _ = self.prepare_chunks(code_content, repo, settled)
+        del self.triage_reports[reports:]
+        del self.compaction_reports[compactions:]
+        features = self._unresolved_features(self._empty_analysis(settled), 0, settled)
+        requests = []
+        for chunk in code_chunks:
+            key = self._cache_key(chunk, features)
+            # Same skip as _precheck_chunk
+            if len(chunk.strip()) < 100 or key in self.analysis_cache:
+                continue
+            requests.append((key, features, {
+                "model": self.model,
+                "messages": self._build_messages(chunk, features),
+                "temperature": 0,
+                "response_format": {"type": "json_object"},
+            }))
+        return requests
+
+    def store_batch_answer(self, custom_id: str, raw_response: str, features: Optional[List[str]] = None) -> bool:
+        """Validate one batch answer and cache it under its chunk's key; False when unusable."""
+        chunk_analysis = self._parse_chunk_response(custom_id[:12], raw_response, features)
+        if chunk_analysis is None:
+            return False
+        self.analysis_cache.put(custom_id, chunk_analysis)
+        return True
+
     def analyze_project(self, directory_content: str, code_content: str) -> Dict[str, Any]:
         # Get directory analysis using traditional method
         dir_features = self.analyze_directory_structure(directory_content)
@@ -265,18 +823,8 @@ Return your analysis in this exact JSON format:
 
     def analyze_directory_structure(self, directory_content: str) -> Dict[str, bool]:
         """Analyze directory structure for infrastructure and deployment patterns."""
-        found_features = {feature: False for feature in self.directory_features}
-
-        # Convert to lowercase for case-insensitive matching
-        directory_content = directory_content.lower()
-
-        for feature, patterns in self.directory_features.items():
-            for pattern in patterns:
-                if pattern.lower() in directory_content:
-                    found_features[feature] = True
-                    break
-
-        return found_features
+        signals = self.rule_engine.signals("directory", directory_structure=directory_content)
+        return self.rule_engine.matching_labels("directory", signals)
 
     def analyze_code_content(self, code_content):
         found_features = {feature: False for feature in self.features}
@@ -294,145 +842,21 @@ Return your analysis in this exact JSON format:
         return found_features
 
     def determine_deployment_platform(self, directory_structure, code_content, repo):
-        def has_file(filename):
-            return filename.lower() in directory_structure.lower()
-        
-        def has_content(text):
-            return text.lower() in code_content.lower()
-        
-        # Streamlit - check both repo name and content
-        if "/streamlit" in repo.lower() or has_content("streamlit"):
-            return "Streamlit"
-
-        # Check for Vercel (strengthened checks)
-        if (has_file("vercel.json") or 
-            has_file(".vercel") or 
-            has_content(".vercel.app") or
-            has_content("vercel deploy") or
-            has_content("vercel.com") or
-            (has_file("next.config.js") and not has_content("aws")) or
-            (has_file("package.json") and has_content("vercel")) or
-            (has_file("package.json") and has_content("next.js"))):
-            return "Vercel"
-
-        # Check for Firebase (strengthened checks)
-        if (has_file("firebase.json") or
-            has_file(".firebaserc") or
-            has_content("firebase.initializeApp") or
-            has_content(".firebaseapp.com") or
-            has_content(".web.app") or
-            (has_content("firebase") and has_content("config")) or
-            (has_file("package.json") and has_content("firebase")) or
-            has_content("firebase deploy")):
-            return "Firebase"
-
-        # Rest of the checks remain the same...
-        if (has_file("serverless.yml") or
-            has_file("amplify.yml") or
-            has_file("buildspec.yml") or
-            has_file("cloudformation.yml") or
-            has_file("elastic-beanstalk") or
-            (has_file("docker-compose.yml") and has_content("aws-sdk"))):
-            return "AWS"
-
-        if ((has_file("_config.yml") and has_content("github.io")) or 
-            (has_content(".github.io") and has_content("gh-pages"))):
-            return "GitHub Pages"
-
-        if (has_file("netlify.toml") or
-            has_file(".netlify") or
-            has_content(".netlify.app")):
-            return "Netlify"
-
-        if (has_file("do.yaml") or
-            (has_content("digitalocean") and has_content("deploy"))):
-            return "Digital Ocean"
-
-        if ((has_file("app.yaml") and has_content("google")) or 
-            has_content("appspot.com")):
-            return "Google Cloud"
-
-        if (has_file("package.json") and 
-            has_content('"private": false') and 
-            has_content("npm publish")):
-            return "NPM"
-
-        if has_file("Procfile") or has_file("heroku.yml"):
-            return "Heroku"
-
-        if has_file("sandbox.config.json"):
-            return "CodeSandbox"
-        if has_file(".stackblitzrc"):
-            return "Stackblitz"
-        if has_file(".replit"):
-            return "Replit"
-        if has_file(".glitch-assets"):
-            return "Glitch"
-
-        # If no clear deployment indicators but has package.json, check for specific frameworks
-        if has_file("package.json"):
-            if has_content("next") or has_content("vercel"):
-                return "Vercel"
-            if has_content("firebase"):
-                return "Firebase"
-
-        return "Unknown"
+        # Ordered rule table in rules.py; the first matching platform wins
+        signals = self.rule_engine.signals("deployment", directory_structure, code_content, repo)
+        return self.rule_engine.first_match("deployment", signals)
 
     def determine_framework(self, directory_structure, code_content):
-        def has_file(filename):
-            return filename.lower() in directory_structure.lower()
-        
-        def has_content(text):
-            return text.lower() in code_content.lower()
-
-        # Framework detection rules
-        if has_file("next.config.js"):
-            return "Next.js"
-        if has_file("nuxt.config.js"):
-            return "Nuxt.js"
-        if has_file("gatsby-config.js"):
-            return "Gatsby"
-        if has_file("angular.json"):
-            return "Angular"
-        if has_file("vue.config.js") or has_content("createapp") and has_content("vue"):
-            return "Vue"
-        if has_file("svelte.config.js"):
-            return "Svelte"
-        if has_file("remix.config.js"):
-            return "Remix"
-        if has_file("astro.config.mjs"):
-            return "Astro"
-        if has_content("streamlit") and has_content("st."):
-            return "Streamlit"
-        if has_file("django"):
-            return "Django"
-        if has_file("flask"):
-            return "Flask"
-        if has_file("express"):
-            return "Express"
-        if has_file("spring"):
-            return "Spring"
-        if has_file("laravel"):
-            return "Laravel"
-        if has_file("rails"):
-            return "Ruby on Rails"
-        
-        # Check package.json for dependencies
-        if has_file("package.json"):
-            content = code_content.lower()
-            if '"react"' in content and not any(f in content for f in ["next", "gatsby", "remix"]):
-                return "React"
-            if '"@angular' in content:
-                return "Angular"
-            if '"vue"' in content:
-                return "Vue"
-        
-        return "Unknown"
+        signals = self.rule_engine.signals("framework", directory_structure, code_content)
+        return self.rule_engine.first_match("framework", signals)
 
 if __name__ == "__main__":
     try:
         parser = argparse.ArgumentParser(description='Analyze repository features')
         parser.add_argument('repo', help='Repository in format owner/repo')
+        parser.add_argument('--corpus', nargs='?', const=DEFAULT_CORPUS_PATH, default=None, metavar='PATH',
+                            help=f'Read the repository from the corpus store (default: {DEFAULT_CORPUS_PATH}) '
+                                 'instead of the temp/ text files')
         args = parser.parse_args()
 
         # Convert repo name to file format and construct paths
@@ -441,28 +865,35 @@ if __name__ == "__main__":
         directory_file = os.path.join(temp_dir, f"{base_filename}_directory_structure.txt")
         code_file = os.path.join(temp_dir, f"{base_filename}_code_content.txt")
 
-        # Check if files exist
-        if not os.path.exists(directory_file):
-            print(f"Error: Directory structure file not found: {directory_file}")
-            sys.exit(1)
-        if not os.path.exists(code_file):
-            print(f"Error: Code content file not found: {code_file}")
-            sys.exit(1)
-
-        # Read directory structure
-        with open(directory_file, 'r', encoding='utf-8') as f:
-            directory_content = f.read()
+        if args.corpus:
+            saved = CorpusStore(args.corpus).get(args.repo)
+            if saved is None:
+                print(f"Error: {args.repo} is not in the corpus {args.corpus}")
+                sys.exit(1)
+            directory_content, code_content = saved
             print(f"Read directory structure ({len(directory_content)} characters)")
-
-        # Read code content
-        with open(code_file, 'r', encoding='utf-8') as f:
-            code_content = f.read()
-            print(f"Read code content ({len(code_content)} characters)")
+        else:
+            # Check if files exist
+            if not os.path.exists(directory_file):
+                print(f"Error: Directory structure file not found: {directory_file}")
+                sys.exit(1)
+            if not os.path.exists(code_file):
+                print(f"Error: Code content file not found: {code_file}")
+                sys.exit(1)
+
+            # Read directory structure
+            with open(directory_file, 'r', encoding='utf-8') as f:
+                directory_content = f.read()
+                print(f"Read directory structure ({len(directory_content)} characters)")
+
+            # Read and index code content
+            code_content = RepositoryDump.from_file(code_file, directory_content)
+        print(f"Read code content ({len(code_content.data)} bytes, {len(code_content)} files)")
 
         # Run analysis
         analyzer = FeatureAnalyzer()
         dir_results = analyzer.analyze_directory_structure(directory_content)
-        code_results = analyzer.analyze_with_llm(code_content)
+        code_results = analyzer.analyze_with_llm(code_content, args.repo)
 
         # Combine results
         combined_results = {
@@ -0,0 +1,142 @@
+import asyncio
+from typing import Callable, Optional
+import httpx
+from driver_pool import DriverPool
+from scraper import GitIngestScraper
+from local_ingest import LocalIngestBackend
+
+try:
+    import h2  # noqa: F401  (enables HTTP/2 in httpx)
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+DEFAULT_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/122.0 Safari/537.36",
+    "Accept": "text/html,application/xhtml+xml",
+}
+
+
+class HttpFetchBackend:
+    """Fetch gitingest pages over plain async HTTP with a shared connection pool."""
+
+    name = "http"
+
+    def __init__(self, max_concurrency: int = 16, timeout: float = 120.0, http2: bool = True):
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.http2 = http2 and HTTP2_AVAILABLE
+        if http2 and not HTTP2_AVAILABLE:
+            print("[HTTP] h2 package not installed, falling back to HTTP/1.1 keep-alive")
+        self._semaphore = None
+        self._client = None
+
+    async def __aenter__(self):
+        # Created here so it belongs to the event loop that runs the fetches
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self._client = httpx.AsyncClient(
+            http2=self.http2,
+            headers=DEFAULT_HEADERS,
+            timeout=httpx.Timeout(self.timeout, connect=10.0),
+            limits=httpx.Limits(
+                max_connections=self.max_concurrency,
+                max_keepalive_connections=self.max_concurrency,
+            ),
+            follow_redirects=True,
+        )
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.aclose()
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def fetch(self, url: str) -> Optional[str]:
+        async with self._semaphore:
+            try:
+                response = await self._client.get(url)
+                response.raise_for_status()
+                return response.text
+            except httpx.HTTPError as e:
+                print(f"[HTTP] Error fetching {url}: {str(e)}")
+                return None
+
+
+class SeleniumFetchBackend:
+    """Fetch pages with pooled browsers, for pages that only render with JavaScript."""
+
+    name = "selenium"
+
+    def __init__(self, pool: DriverPool):
+        self.pool = pool
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.aclose()
+
+    async def aclose(self):
+        self.pool.close()
+
+    def _fetch_blocking(self, url: str) -> Optional[str]:
+        with self.pool.driver() as driver:
+            scraper = GitIngestScraper("", driver=driver)
+            return scraper.fetch_page(url)
+
+    async def fetch(self, url: str) -> Optional[str]:
+        # Selenium is blocking; the pool size bounds how many threads wait on browsers
+        return await asyncio.to_thread(self._fetch_blocking, url)
+
+
+class FallbackFetchBackend:
+    """Try the primary backend first and use the fallback when its page is unusable."""
+
+    def __init__(self, primary, fallback, accept: Callable[[Optional[str]], bool] = GitIngestScraper.has_repository_data):
+        self.primary = primary
+        self.fallback = fallback
+        self.accept = accept
+        self.name = f"{primary.name}+{fallback.name}"
+        self.fallbacks_used = 0
+
+    async def __aenter__(self):
+        await self.primary.__aenter__()
+        await self.fallback.__aenter__()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.aclose()
+
+    async def aclose(self):
+        await self.primary.aclose()
+        await self.fallback.aclose()
+
+    async def fetch(self, url: str) -> Optional[str]:
+        html = await self.primary.fetch(url)
+        if self.accept(html):
+            return html
+        print(f"[FETCH] {self.primary.name} page incomplete for {url}, retrying with {self.fallback.name}")
+        self.fallbacks_used += 1
+        return await self.fallback.fetch(url)
+
+
+def build_fetch_backend(kind: str = "http", workers: int = 4, pages_per_driver: int = 25,
+                        http_concurrency: int = 16, local_root: Optional[str] = None):
+    """Create the fetch backend selected on the command line."""
+    if kind == "selenium":
+        return SeleniumFetchBackend(DriverPool(size=workers, max_pages=pages_per_driver))
+    if kind == "http":
+        # Browsers are only started if a page actually needs the fallback
+        return FallbackFetchBackend(
+            HttpFetchBackend(max_concurrency=http_concurrency),
+            SeleniumFetchBackend(DriverPool(size=workers, max_pages=pages_per_driver)),
+        )
+    if kind == "http-only":
+        return HttpFetchBackend(max_concurrency=http_concurrency)
+    if kind == "local":
+        # Mirrors on disk: no gitingest page is fetched or parsed
+        return LocalIngestBackend(local_root or ".", max_concurrency=http_concurrency)
+    raise ValueError(f"Unknown fetch backend: {kind}")
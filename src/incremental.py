@@ -0,0 +1,115 @@
+"""Incremental re-analysis: only new or modified files go back to the LLM.
+
+Every analyzed chunk is stored per repository together with the content hash
+of each file it contained. On the next analysis of the repository, a stored
+chunk is reused as long as all of its files still exist unchanged (and it
+was asked about every feature still needed). Only files not covered by a
+reusable chunk are re-chunked and sent. Chunks that held a modified or
+deleted file are dropped, which removes a deleted file's contribution from
+the merged feature vector.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional
+from repo_index import FileEntry, RepositoryDump, SEGMENT_SIZE
+
+DEFAULT_INCREMENTAL_PATH = os.path.join("temp", "chunk_results.sqlite")
+
+
+def file_digest(dump: RepositoryDump, entry: FileEntry) -> str:
+    digest = hashlib.blake2b(digest_size=16)
+    end = entry.offset + entry.length
+    for position in range(entry.offset, end, SEGMENT_SIZE):
+        digest.update(dump.data[position:min(end, position + SEGMENT_SIZE)])
+    return digest.hexdigest()
+
+
+class ChunkRecord(NamedTuple):
+    files: Dict[str, str]             # path -> content hash
+    features: Optional[List[str]]     # features the chunk was asked about (None = all)
+    analysis: Dict[str, Any]          # parsed LLM answer
+
+
+class ChunkResultStore:
+    """SQLite table of repository -> analyzed chunks, per model and prompt version."""
+
+    def __init__(self, path: str = DEFAULT_INCREMENTAL_PATH):
+        if path != ":memory:" and os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS chunk_results ("
+            " repo TEXT PRIMARY KEY, version TEXT NOT NULL, chunks TEXT NOT NULL, updated REAL NOT NULL)"
+        )
+
+    def load(self, repo: str, version: str) -> List[ChunkRecord]:
+        with self._lock:
+            found = self._conn.execute(
+                "SELECT chunks FROM chunk_results WHERE repo = ? AND version = ?", (repo, version)
+            ).fetchone()
+        return [ChunkRecord(*record) for record in json.loads(found[0])] if found else []
+
+    def save(self, repo: str, version: str, records: Iterable[ChunkRecord]):
+        chunks = json.dumps([list(record) for record in records])
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO chunk_results (repo, version, chunks, updated) VALUES (?, ?, ?, ?)",
+                (repo, version, chunks, time.time()),
+            )
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class IncrementalLedger:
+    """Which files of one repository need fresh analysis, and the chunk results to store afterwards."""
+
+    def __init__(self, store: ChunkResultStore, repo: str, version: str, dump: RepositoryDump,
+                 keep=None, needed: Optional[Iterable[str]] = None):
+        self.store = store
+        self.repo = repo
+        self.version = version
+        self.hashes = {entry.path: file_digest(dump, entry) for entry in dump if keep is None or keep(entry)}
+        needed = set(needed) if needed is not None else None
+
+        stored = store.load(repo, version)
+        self.stable: List[ChunkRecord] = []
+        invalid = set()
+        for record in stored:
+            unchanged = all(self.hashes.get(path) == digest for path, digest in record.files.items())
+            covers = record.features is None or (needed is not None and needed <= set(record.features))
+            if unchanged and covers:
+                self.stable.append(record)
+            else:
+                invalid.update(record.files)
+        covered = {path for record in self.stable for path in record.files} - invalid
+        self.dirty = set(self.hashes) - covered
+        self.dropped = len(stored) - len(self.stable)
+        self.fresh: List[ChunkRecord] = []
+        self.plan = None
+
+    def keep(self, entry: FileEntry) -> bool:
+        return entry.path in self.dirty
+
+    def summary(self) -> str:
+        return (f"{len(self.dirty)}/{len(self.hashes)} files new, changed or sharing a chunk with a changed file; "
+                f"reusing {len(self.stable)} stored chunk result(s), dropping {self.dropped}")
+
+    def record(self, chunk_num: int, analysis: Dict[str, Any], features: Optional[List[str]] = None):
+        """Remember the answer for chunk `chunk_num` (1-based, in plan order)."""
+        files = {item.path: self.hashes[item.path] for item in self.plan.chunks[chunk_num - 1]
+                 if item.path is not None}
+        if files:
+            self.fresh.append(ChunkRecord(files, features, analysis))
+
+    def commit(self):
+        self.store.save(self.repo, self.version, self.stable + self.fresh)
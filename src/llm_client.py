@@ -0,0 +1,187 @@
+import asyncio
+import random
+import re
+import time
+from typing import Any, Dict, List, Optional
+import openai
+
+# Completion budget assumed per request when charging the tokens-per-minute bucket
+DEFAULT_COMPLETION_TOKENS = 600
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token for code and English)."""
+    return len(text) // 4 + 1
+
+
+def parse_reset_seconds(value: Optional[str]) -> Optional[float]:
+    """Parse OpenAI reset headers such as '1s', '6m0s', '20ms' or '0.5'."""
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    total = 0.0
+    matched = False
+    for amount, unit in re.findall(r'([\d.]+)(ms|h|m|s)', value):
+        matched = True
+        total += float(amount) * {"ms": 0.001, "s": 1, "m": 60, "h": 3600}[unit]
+    return total if matched else None
+
+
+class TokenBucket:
+    """Token bucket refilled continuously at `per_minute` units per minute.
+
+    A bucket with no rate never blocks. State is plain numbers so one bucket
+    can be shared by successive event loops (one per analyzed repository).
+    """
+
+    def __init__(self, per_minute: Optional[float] = None):
+        self.per_minute = per_minute
+        self.capacity = per_minute or 0
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+
+    def _refill(self):
+        now = time.monotonic()
+        if self.per_minute:
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.per_minute / 60)
+        self.updated = now
+        return now
+
+    async def acquire(self, amount: float = 1):
+        while True:
+            now = self._refill()
+            if now < self.blocked_until:
+                await asyncio.sleep(self.blocked_until - now)
+                continue
+            if not self.per_minute:
+                return
+            # A single request larger than the bucket waits for a full bucket
+            amount = min(amount, self.capacity)
+            if self.tokens >= amount:
+                self.tokens -= amount
+                return
+            await asyncio.sleep((amount - self.tokens) * 60 / self.per_minute)
+
+    def sync(self, limit: Optional[int], remaining: Optional[int], reset_seconds: Optional[float]):
+        """Align the bucket with the rate-limit state reported by the server."""
+        self._refill()
+        if limit and not self.per_minute:
+            # Adopt the server's limit when none was configured
+            self.per_minute = float(limit)
+            self.capacity = float(limit)
+            self.tokens = float(limit)
+        if remaining is not None and self.per_minute:
+            self.tokens = min(self.tokens, float(remaining))
+        if remaining == 0 and reset_seconds:
+            self.blocked_until = max(self.blocked_until, time.monotonic() + reset_seconds)
+
+    def pause(self, seconds: float):
+        self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+
+
+class RateLimiter:
+    """Requests-per-minute and tokens-per-minute limits for one API key."""
+
+    def __init__(self, requests_per_minute: Optional[float] = None, tokens_per_minute: Optional[float] = None):
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+
+    async def acquire(self, token_count: int):
+        await self.requests.acquire(1)
+        await self.tokens.acquire(token_count)
+
+    def update_from_headers(self, headers):
+        def to_int(name):
+            try:
+                return int(headers.get(name))
+            except (TypeError, ValueError):
+                return None
+
+        self.requests.sync(
+            to_int("x-ratelimit-limit-requests"),
+            to_int("x-ratelimit-remaining-requests"),
+            parse_reset_seconds(headers.get("x-ratelimit-reset-requests")),
+        )
+        self.tokens.sync(
+            to_int("x-ratelimit-limit-tokens"),
+            to_int("x-ratelimit-remaining-tokens"),
+            parse_reset_seconds(headers.get("x-ratelimit-reset-tokens")),
+        )
+
+    def pause(self, seconds: float):
+        self.requests.pause(seconds)
+
+
+class RateLimitedLLMClient:
+    """Async chat-completions client with bounded concurrency, rate limits and retries.
+
+    429, 5xx, timeouts and connection errors are retried with full-jitter
+    exponential backoff, honouring Retry-After when the server sends it.
+    Requests, token usage and retries are counted in `metrics` (a
+    metrics.RunMetrics) when given. Use one instance per event loop.
+    """
+
+    def __init__(self, api_key: str, limiter: RateLimiter, max_in_flight: int = 8, max_retries: int = 6,
+                 base_delay: float = 1.0, max_delay: float = 60.0, base_url: Optional[str] = None, metrics=None):
+        self.client = openai.AsyncOpenAI(api_key=api_key, base_url=base_url, max_retries=0)
+        self.limiter = limiter
+        self.semaphore = asyncio.Semaphore(max_in_flight)
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.retries = 0
+        self.metrics = metrics
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.client.close()
+
+    def _backoff(self, attempt: int, retry_after: Optional[float]) -> float:
+        if retry_after is not None:
+            return retry_after + random.uniform(0, self.base_delay)
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    async def complete(self, messages: List[Dict[str, str]], label: str = "", **kwargs: Any) -> str:
+        prompt_tokens = sum(estimate_tokens(m["content"]) for m in messages)
+        attempt = 0
+        while True:
+            await self.limiter.acquire(prompt_tokens + DEFAULT_COMPLETION_TOKENS)
+            retry_after = None
+            async with self.semaphore:
+                try:
+                    raw = await self.client.chat.completions.with_raw_response.create(messages=messages, **kwargs)
+                    self.limiter.update_from_headers(raw.headers)
+                    response = raw.parse()
+                    if self.metrics is not None:
+                        self.metrics.add("llm_requests")
+                        if response.usage is not None:
+                            self.metrics.add("prompt_tokens", response.usage.prompt_tokens)
+                            self.metrics.add("completion_tokens", response.usage.completion_tokens)
+                    return response.choices[0].message.content
+                except openai.APIStatusError as e:
+                    self.limiter.update_from_headers(e.response.headers)
+                    if e.status_code != 429 and e.status_code < 500:
+                        raise
+                    retry_after = parse_reset_seconds(e.response.headers.get("retry-after"))
+                    error = f"HTTP {e.status_code}"
+                except openai.APIConnectionError as e:
+                    error = type(e).__name__
+
+            if attempt >= self.max_retries:
+                raise RuntimeError(f"Giving up after {attempt + 1} attempts ({error})")
+            delay = self._backoff(attempt, retry_after)
+            if retry_after is not None:
+                # Everyone else should wait too, not just this request
+                self.limiter.pause(retry_after)
+            print(f"{label} {error}, retrying in {delay:.1f}s (attempt {attempt + 1}/{self.max_retries})")
+            self.retries += 1
+            if self.metrics is not None:
+                self.metrics.add("retries")
+            attempt += 1
+            await asyncio.sleep(delay)
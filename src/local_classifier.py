@@ -0,0 +1,249 @@
+"""Offline per-feature classifier: hashed identifier n-grams + logistic regression in NumPy.
+
+Trained on the Yes/No labels of datasets/dataset.csv and the code dumps the
+scraper saved for those repositories (temp/<owner>_<repo>_code_content.txt).
+FeatureAnalyzer uses it either in place of the LLM or as a confidence-gated
+front where only uncertain features are escalated.
+
+Usage:
+    python src/local_classifier.py train [--dataset datasets/dataset.csv] [--dumps temp] [--model temp/local_classifier.npz]
+    python src/local_classifier.py evaluate [--folds 5]
+"""
+import argparse
+import csv
+import os
+import re
+import zlib
+from collections import Counter
+from typing import Dict, List, Optional, Sequence, Tuple
+from repo_index import RepositoryDump
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+DEFAULT_MODEL_PATH = os.path.join("temp", "local_classifier.npz")
+DEFAULT_DATASET_PATH = os.path.join("datasets", "dataset.csv")
+
+N_BUCKETS = 1 << 18
+# Only the head of each file is read; imports and setup code carry most of the signal
+FILE_SAMPLE_BYTES = 16 * 1024
+
+_TOKEN = re.compile(rb'[a-z_$@][a-z0-9_$\-]{1,40}')
+_PATH_TOKEN = re.compile(r'[a-z0-9_]+')
+
+# (bucket indices, weights) of one repository, L2-normalized
+HashedVector = Tuple["np.ndarray", "np.ndarray"]
+
+
+def _bucket(token: bytes) -> int:
+    # crc32 rather than hash(): bucket ids must be stable across processes
+    return zlib.crc32(token) % N_BUCKETS
+
+
+def hashed_features(code_content) -> HashedVector:
+    """Identifier unigrams and bigrams from file heads, plus path tokens, hashed into N_BUCKETS."""
+    dump = RepositoryDump.coerce(code_content)
+    counts: Counter = Counter({b"__dump__": 1})  # never empty
+    for entry in dump:
+        counts.update(b"path:" + token.encode() for token in _PATH_TOKEN.findall(entry.path.lower()))
+        head = bytes(dump.data[entry.offset:entry.offset + min(entry.length, FILE_SAMPLE_BYTES)]).lower()
+        tokens = _TOKEN.findall(head)
+        counts.update(tokens)
+        counts.update(a + b" " + b for a, b in zip(tokens, tokens[1:]))
+    buckets: Dict[int, float] = {}
+    for token, count in counts.items():
+        bucket = _bucket(token)
+        buckets[bucket] = buckets.get(bucket, 0.0) + float(np.log1p(count))
+    indices = np.fromiter(buckets.keys(), dtype=np.int32, count=len(buckets))
+    values = np.fromiter(buckets.values(), dtype=np.float32, count=len(buckets))
+    values /= max(float(np.linalg.norm(values)), 1e-12)
+    return indices, values
+
+
+def _stack(vectors: Sequence[HashedVector]):
+    """Concatenate sparse rows into (indices, values, row of each value, row start offsets)."""
+    lengths = np.array([len(indices) for indices, _ in vectors], dtype=np.int64)
+    starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+    indices = np.concatenate([indices for indices, _ in vectors])
+    values = np.concatenate([values for _, values in vectors])
+    rows = np.repeat(np.arange(len(vectors)), lengths)
+    return indices, values, rows, starts
+
+
+def _sigmoid(z):
+    return 1.0 / (1.0 + np.exp(-np.clip(z, -30, 30)))
+
+
+class LocalClassifier:
+    """One logistic regression per feature over a shared hashed feature space."""
+
+    def __init__(self, features: Sequence[str], weights=None, bias=None):
+        if not NUMPY_AVAILABLE:
+            raise ImportError("numpy is required for the local classifier (pip install numpy)")
+        self.features = list(features)
+        self.weights = weights if weights is not None else np.zeros((N_BUCKETS, len(self.features)), np.float32)
+        self.bias = bias if bias is not None else np.zeros(len(self.features), np.float32)
+
+    @classmethod
+    def load(cls, path: str = DEFAULT_MODEL_PATH) -> 'LocalClassifier':
+        with np.load(path) as model:
+            return cls([str(feature) for feature in model["features"]], model["weights"], model["bias"])
+
+    def save(self, path: str = DEFAULT_MODEL_PATH):
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as f:
+            np.savez_compressed(f, features=np.array(self.features), weights=self.weights, bias=self.bias)
+
+    def _scores(self, indices, values, starts):
+        contributions = self.weights[indices] * values[:, None]
+        return np.add.reduceat(contributions, starts, axis=0) + self.bias
+
+    def fit(self, vectors: Sequence[HashedVector], labels, mask, epochs: int = 1000,
+            learning_rate: float = 10.0, l2: float = 1e-4) -> 'LocalClassifier':
+        """Full-batch gradient descent; mask is 0 where a label is missing."""
+        indices, values, rows, starts = _stack(vectors)
+        # Train over the buckets that occur in the data only, then scatter into the full table
+        active, columns = np.unique(indices, return_inverse=True)
+        labels = np.asarray(labels, np.float32)
+        mask = np.asarray(mask, np.float32)
+        counts = np.maximum(mask.sum(axis=0), 1.0)
+        # Start from each feature's prior so rare features are not pushed to 0.5
+        prior = np.clip((labels * mask).sum(axis=0) / counts, 0.02, 0.98)
+        bias = np.log(prior / (1 - prior)).astype(np.float32)
+        weights = np.zeros((len(active), len(self.features)), np.float32)
+        for _ in range(epochs):
+            scores = np.add.reduceat(weights[columns] * values[:, None], starts, axis=0) + bias
+            error = (_sigmoid(scores) - labels) * mask / counts
+            contributions = error[rows] * values[:, None]
+            gradient = np.stack([np.bincount(columns, contributions[:, label], minlength=len(active))
+                                 for label in range(len(self.features))], axis=1)
+            weights -= learning_rate * (gradient + l2 * weights)
+            bias -= learning_rate * error.sum(axis=0)
+        self.weights = np.zeros((N_BUCKETS, len(self.features)), np.float32)
+        self.weights[active] = weights
+        self.bias = bias
+        return self
+
+    def predict_proba(self, vectors: Sequence[HashedVector]):
+        indices, values, _, starts = _stack(vectors)
+        return _sigmoid(self._scores(indices, values, starts))
+
+    def predict(self, code_content) -> Dict[str, float]:
+        """Probability that each feature is present in one repository."""
+        probabilities = self.predict_proba([hashed_features(code_content)])[0]
+        return dict(zip(self.features, probabilities.tolist()))
+
+
+def read_labels(dataset_path: str = DEFAULT_DATASET_PATH, features: Optional[Sequence[str]] = None):
+    """Repositories with their Yes/No labels as (repos, features, labels, mask)."""
+    with open(dataset_path, newline='', encoding='utf-8') as f:
+        rows = list(csv.DictReader(f))
+    if features is None:
+        # Every column holding only Yes/No values (deployment and framework are categorical)
+        columns = rows[0].keys() if rows else []
+        features = [column for column in columns
+                    if all(row[column].strip().lower() in ("yes", "no", "") for row in rows)]
+    labels = [[1.0 if row.get(feature, "").strip().lower() == "yes" else 0.0 for feature in features] for row in rows]
+    mask = [[1.0 if row.get(feature, "").strip().lower() in ("yes", "no") else 0.0 for feature in features]
+            for row in rows]
+    return [row["repository"] for row in rows], list(features), labels, mask
+
+
+def dump_path(dumps_dir: str, repo: str) -> str:
+    return os.path.join(dumps_dir, f"{repo.replace('/', '_')}_code_content.txt")
+
+
+def load_training_set(dataset_path: str, dumps_dir: str, features: Optional[Sequence[str]] = None):
+    """Vectorize the saved dump of every labeled repository; repositories without a dump are skipped."""
+    repos, features, labels, mask = read_labels(dataset_path, features)
+    kept, vectors, kept_labels, kept_mask = [], [], [], []
+    for repo, row_labels, row_mask in zip(repos, labels, mask):
+        path = dump_path(dumps_dir, repo)
+        if not os.path.exists(path):
+            print(f"[WARNING] No code dump for {repo} ({path}); skipping")
+            continue
+        with RepositoryDump.open(path) as dump:
+            vectors.append(hashed_features(dump))
+        kept.append(repo)
+        kept_labels.append(row_labels)
+        kept_mask.append(row_mask)
+    return kept, features, vectors, np.array(kept_labels, np.float32), np.array(kept_mask, np.float32)
+
+
+def cross_validate(features: Sequence[str], vectors: Sequence[HashedVector], labels, mask,
+                   folds: int = 5, confidence: float = 0.9, **fit_options) -> List[Dict[str, object]]:
+    """Per-feature k-fold accuracy, next to the majority-class baseline and the confident share."""
+    folds = max(2, min(folds, len(vectors)))
+    order = np.random.default_rng(0).permutation(len(vectors))
+    probabilities = np.zeros(labels.shape, np.float32)
+    for fold in range(folds):
+        test = order[fold::folds]
+        train = np.setdiff1d(order, test)
+        model = LocalClassifier(features).fit([vectors[i] for i in train], labels[train], mask[train], **fit_options)
+        probabilities[test] = model.predict_proba([vectors[i] for i in test])
+
+    report = []
+    for column, feature in enumerate(features):
+        known = mask[:, column] > 0
+        truth = labels[known, column] > 0.5
+        predicted = probabilities[known, column] >= 0.5
+        confident = np.maximum(probabilities[known, column], 1 - probabilities[known, column]) >= confidence
+        majority = max(truth.mean(), 1 - truth.mean()) if len(truth) else 0.0
+        report.append({
+            "feature": feature,
+            "labeled": int(known.sum()),
+            "positives": int(truth.sum()),
+            "accuracy": round(float((predicted == truth).mean()) if len(truth) else 0.0, 3),
+            "majority_baseline": round(float(majority), 3),
+            "confident_share": round(float(confident.mean()) if len(truth) else 0.0, 3),
+            "confident_accuracy": round(float((predicted == truth)[confident].mean()) if confident.any() else 0.0, 3),
+        })
+    return report
+
+
+def print_report(report: List[Dict[str, object]], confidence: float):
+    print(f"\n{'feature':<24}{'labeled':>8}{'pos':>5}{'accuracy':>10}{'baseline':>10}"
+          f"{'conf>=' + format(confidence, '.2f'):>12}{'conf acc':>10}")
+    for row in report:
+        print(f"{row['feature']:<24}{row['labeled']:>8}{row['positives']:>5}{row['accuracy']:>10.1%}"
+              f"{row['majority_baseline']:>10.1%}{row['confident_share']:>12.1%}{row['confident_accuracy']:>10.1%}")
+
+
+def write_report(path: str, report: List[Dict[str, object]]):
+    with open(path, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=list(report[0]))
+        writer.writeheader()
+        writer.writerows(report)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Train or evaluate the offline feature classifier')
+    parser.add_argument('command', choices=['train', 'evaluate'])
+    parser.add_argument('--dataset', default=DEFAULT_DATASET_PATH, help='Labeled CSV (Yes/No per feature)')
+    parser.add_argument('--dumps', default='temp', help='Directory holding <owner>_<repo>_code_content.txt dumps')
+    parser.add_argument('--model', default=DEFAULT_MODEL_PATH, help='Where the trained model is written')
+    parser.add_argument('--folds', type=int, default=5, help='Cross-validation folds for the accuracy report')
+    parser.add_argument('--confidence', type=float, default=0.9,
+                        help='Probability (of present or absent) above which a prediction counts as confident')
+    parser.add_argument('--epochs', type=int, default=1000)
+    args = parser.parse_args()
+
+    repos, features, vectors, labels, mask = load_training_set(args.dataset, args.dumps)
+    if len(repos) < 2:
+        print(f"[ERROR] Need at least 2 labeled repositories with saved dumps in {args.dumps}, found {len(repos)}")
+        raise SystemExit(1)
+    print(f"Loaded {len(repos)} labeled repositories, {len(features)} features")
+
+    report = cross_validate(features, vectors, labels, mask, args.folds, args.confidence, epochs=args.epochs)
+    print_report(report, args.confidence)
+    report_path = os.path.join(os.path.dirname(args.model) or '.', "classifier_report.csv")
+    write_report(report_path, report)
+    print(f"\nPer-feature accuracy written to {report_path}")
+
+    if args.command == 'train':
+        LocalClassifier(features).fit(vectors, labels, mask, epochs=args.epochs).save(args.model)
+        print(f"Model saved to {args.model}")
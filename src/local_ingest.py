@@ -0,0 +1,375 @@
+"""Local ingestion: build gitingest-format dumps from mirrors instead of scraping gitingest.com.
+
+A repository owner/repo is looked up under a mirror root as a checkout
+(<root>/owner/repo), a bare repository (<root>/owner/repo.git, read with
+`git archive`) or a tarball (<root>/owner/repo.tar.gz, .tgz, .tar, ...).
+Checkouts are walked with .gitignore honored (ignored directories are
+never entered) and their files read by a thread pool; archives are read
+in one streaming pass with the .gitignore files they contain applied
+afterwards.
+
+Files are sniffed cheaply: oversized files are never opened, skipped
+extensions (see GitIngestScraper.skip_extensions) keep their header with an
+empty body, as filter_css_content would leave them, and files with a NUL
+byte near the start are treated as binary and left out of the dump. The
+result is the same {'directory_structure', 'textarea_content'} pair
+GitIngestScraper.parse_repository_data returns.
+"""
+import asyncio
+import os
+import re
+import subprocess
+import tarfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from scraper import GitIngestScraper
+
+HEADER = '=' * 48
+TARBALL_SUFFIXES = (".tar.gz", ".tgz", ".tar", ".tar.bz2", ".tbz2", ".tar.xz", ".txz")
+# Files larger than this are listed in the directory structure but not read
+DEFAULT_MAX_FILE_BYTES = 1024 * 1024
+# Bytes inspected for a NUL byte to tell binary files apart
+SNIFF_BYTES = 8192
+# Files read per thread pool task
+READ_BATCH = 64
+
+
+def _glob_to_regex(pattern: str) -> str:
+    regex = []
+    index = 0
+    while index < len(pattern):
+        char = pattern[index]
+        if pattern.startswith('**/', index):
+            regex.append('(?:.*/)?')
+            index += 3
+            continue
+        if pattern.startswith('/**', index) and index + 3 == len(pattern):
+            regex.append('/.*')
+            break
+        if pattern.startswith('**', index):
+            regex.append('.*')
+            index += 2
+            continue
+        if char == '*':
+            regex.append('[^/]*')
+        elif char == '?':
+            regex.append('[^/]')
+        elif char == '[':
+            end = pattern.find(']', index + 2)
+            if end < 0:
+                regex.append(re.escape(char))
+            else:
+                body = pattern[index + 1:end]
+                regex.append('[' + ('^' + body[1:] if body[:1] == '!' else body) + ']')
+                index = end
+        elif char == '\\' and index + 1 < len(pattern):
+            index += 1
+            regex.append(re.escape(pattern[index]))
+        else:
+            regex.append(re.escape(char))
+        index += 1
+    return ''.join(regex)
+
+
+class GitIgnore:
+    """The .gitignore rules of one tree; the last rule matching a path decides, as in git."""
+
+    def __init__(self):
+        self.rules: List[Tuple[str, re.Pattern, bool, bool]] = []  # (base directory, regex, negated, directories only)
+
+    def add(self, base: str, text: str):
+        """Add the rules of the .gitignore file in directory `base` ('' for the root)."""
+        for line in text.splitlines():
+            line = line.rstrip()
+            if not line or line.startswith('#'):
+                continue
+            negated = line.startswith('!')
+            if negated:
+                line = line[1:]
+            dir_only = line.endswith('/')
+            line = line.rstrip('/')
+            if not line:
+                continue
+            # A pattern with a slash (other than a trailing one) is relative to its .gitignore
+            anchored = '/' in line
+            regex = _glob_to_regex(line.lstrip('/'))
+            if not anchored:
+                regex = '(?:.*/)?' + regex
+            self.rules.append((base, re.compile(regex), negated, dir_only))
+
+    def ignored(self, path: str, is_dir: bool = False) -> bool:
+        result = False
+        for base, regex, negated, dir_only in self.rules:
+            if dir_only and not is_dir:
+                continue
+            if base:
+                if not path.startswith(base + '/'):
+                    continue
+                relative = path[len(base) + 1:]
+            else:
+                relative = path
+            if regex.fullmatch(relative):
+                result = not negated
+        return result
+
+    def ignored_path(self, path: str) -> bool:
+        """Whether a file is ignored itself or lies in an ignored directory."""
+        parts = path.split('/')
+        for depth in range(1, len(parts)):
+            if self.ignored('/'.join(parts[:depth]), is_dir=True):
+                return True
+        return self.ignored(path)
+
+
+def directory_tree(root: str, paths: Iterable[str]) -> str:
+    """Draw paths the way gitingest's 'Directory structure:' does."""
+    tree: Dict[str, dict] = {}
+    for path in paths:
+        node = tree
+        for part in path.split('/'):
+            node = node.setdefault(part, {})
+
+    lines = ["Directory structure:", f"└── {root}/"]
+
+    def walk(node, prefix):
+        names = sorted(node)
+        for position, name in enumerate(names):
+            last = position == len(names) - 1
+            child = node[name]
+            lines.append(f"{prefix}{'└── ' if last else '├── '}{name}{'/' if child else ''}")
+            if child:
+                walk(child, prefix + ('    ' if last else '│   '))
+
+    walk(tree, "    ")
+    return "\n".join(lines)
+
+
+class IngestStats:
+    def __init__(self):
+        self.files = 0
+        self.read = 0
+        self.bytes = 0
+        self.binary = 0
+        self.oversized = 0
+        self.ignored = 0
+
+    def summary(self) -> str:
+        return (f"{self.files} files, {self.read} read ({self.bytes / 1024:.0f} KB), {self.binary} binary, "
+                f"{self.oversized} oversized, {self.ignored} ignored by .gitignore")
+
+
+class LocalIngester:
+    """Turns a checkout, bare repository or tarball into gitingest's directory structure and dump."""
+
+    def __init__(self, skip_extensions: Iterable[str], max_file_bytes: int = DEFAULT_MAX_FILE_BYTES,
+                 executor: Optional[ThreadPoolExecutor] = None):
+        self.skip_extensions = tuple(skip_extensions)
+        self.max_file_bytes = max_file_bytes
+        self.executor = executor
+        self.stats = IngestStats()
+
+    def _classify(self, path: str, size: int) -> Optional[str]:
+        """Why a file body is not read ('skipped', 'oversized'), or None to read it."""
+        if path.endswith(self.skip_extensions):
+            return "skipped"
+        if size > self.max_file_bytes:
+            return "oversized"
+        return None
+
+    @staticmethod
+    def _is_binary(data: bytes) -> bool:
+        return b'\0' in data[:SNIFF_BYTES]
+
+    def _walk(self, root: str, stats: IngestStats) -> List[Tuple[str, str, int]]:
+        """(relative path, absolute path, size) of every file not ignored, in sorted order."""
+        ignore = GitIgnore()
+        files = []
+        pending = ['']
+        while pending:
+            relative_dir = pending.pop()
+            directory = os.path.join(root, relative_dir) if relative_dir else root
+            gitignore = os.path.join(directory, '.gitignore')
+            if os.path.isfile(gitignore):
+                with open(gitignore, encoding='utf-8', errors='replace') as f:
+                    ignore.add(relative_dir, f.read())
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    if entry.name == '.git':
+                        continue
+                    path = f"{relative_dir}/{entry.name}" if relative_dir else entry.name
+                    if entry.is_dir(follow_symlinks=False):
+                        if ignore.ignored(path, is_dir=True):
+                            stats.ignored += 1
+                        else:
+                            pending.append(path)
+                    elif entry.is_file(follow_symlinks=False):
+                        if ignore.ignored(path):
+                            stats.ignored += 1
+                        else:
+                            files.append((path, entry.path, entry.stat(follow_symlinks=False).st_size))
+        files.sort()
+        return files
+
+    def _read(self, item: Tuple[str, str, int]) -> Tuple[str, Optional[bytes], Optional[str]]:
+        path, absolute, size = item
+        reason = self._classify(path, size)
+        if reason is not None:
+            return path, None, reason
+        with open(absolute, 'rb') as f:
+            data = f.read(self.max_file_bytes + 1)
+        return (path, None, "binary") if self._is_binary(data) else (path, data, None)
+
+    def _read_batch(self, batch: List[Tuple[str, str, int]]) -> List[Tuple[str, Optional[bytes], Optional[str]]]:
+        return [self._read(item) for item in batch]
+
+    def _read_directory(self, root: str, stats: IngestStats) -> Iterator[Tuple[str, Optional[bytes], Optional[str]]]:
+        files = self._walk(root, stats)
+        if self.executor is None:
+            return map(self._read, files)
+        # File reads release the GIL, so a thread pool overlaps them; batches keep the per-task overhead small
+        batches = [files[start:start + READ_BATCH] for start in range(0, len(files), READ_BATCH)]
+        return (item for batch in self.executor.map(self._read_batch, batches) for item in batch)
+
+    def _read_tar(self, archive: tarfile.TarFile, stats: IngestStats) -> Iterator[Tuple[str, Optional[bytes], Optional[str]]]:
+        """One streaming pass over an archive; its .gitignore files apply once every member has been seen."""
+        members = []
+        gitignores = []
+        for member in archive:
+            if not member.isfile():
+                continue
+            path = member.name
+            while path.startswith('./'):
+                path = path[2:]
+            if not path or path.startswith('.git/') or '/.git/' in path:
+                continue
+            reason = self._classify(path, member.size)
+            data = None
+            if reason is None or path.endswith('.gitignore'):
+                data = archive.extractfile(member).read()
+                if path == '.gitignore' or path.endswith('/.gitignore'):
+                    gitignores.append((path, data))
+                if reason is None and self._is_binary(data):
+                    reason, data = "binary", None
+            members.append((path, data, reason))
+        # Tarballs of a checkout usually hold a single top-level folder
+        prefix = ''
+        tops = {path.split('/', 1)[0] for path, _, _ in members}
+        if len(tops) == 1 and all('/' in path for path, _, _ in members):
+            prefix = tops.pop() + '/'
+        ignore = GitIgnore()
+        for path, data in sorted(gitignores, key=lambda item: item[0].count('/')):
+            ignore.add(os.path.dirname(path[len(prefix):]), data.decode('utf-8', 'replace'))
+        kept = []
+        for path, data, reason in sorted(members):
+            path = path[len(prefix):]
+            if ignore.rules and ignore.ignored_path(path):
+                stats.ignored += 1
+                continue
+            kept.append((path, data, reason))
+        return iter(kept)
+
+    def _read_bare(self, git_dir: str, stats: IngestStats):
+        process = subprocess.Popen(['git', f'--git-dir={git_dir}', 'archive', '--format=tar', 'HEAD'],
+                                   stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        try:
+            with tarfile.open(fileobj=process.stdout, mode='r|') as archive:
+                return self._read_tar(archive, stats)
+        finally:
+            process.stdout.close()
+            stderr = process.stderr.read()
+            process.stderr.close()
+            if process.wait() != 0:
+                raise RuntimeError(f"git archive failed for {git_dir}: {stderr.decode('utf-8', 'replace').strip()}")
+
+    @staticmethod
+    def is_bare(path: str) -> bool:
+        return os.path.isfile(os.path.join(path, 'HEAD')) and os.path.isdir(os.path.join(path, 'objects')) \
+            and not os.path.exists(os.path.join(path, '.git'))
+
+    def ingest(self, source: str, name: str) -> Dict[str, str]:
+        """Directory structure and code dump of a checkout, bare repository or tarball."""
+        stats = self.stats = IngestStats()
+        if os.path.isdir(source):
+            items = self._read_bare(source, stats) if self.is_bare(source) else self._read_directory(source, stats)
+        else:
+            with tarfile.open(source, mode='r|*') as archive:
+                items = self._read_tar(archive, stats)
+        paths = []
+        blocks = []
+        for path, data, reason in items:
+            stats.files += 1
+            paths.append(path)
+            if reason == "binary" or reason == "oversized":
+                setattr(stats, reason, getattr(stats, reason) + 1)
+                continue
+            body = ''
+            if data is not None:
+                stats.read += 1
+                stats.bytes += len(data)
+                body = data.decode('utf-8', 'replace')
+            blocks.append(f"{HEADER}\nFile: {path}\n{HEADER}\n{body}\n")
+        return {
+            'directory_structure': directory_tree(name, paths),
+            'textarea_content': "\n".join(blocks),
+        }
+
+
+class LocalIngestBackend:
+    """Fetch backend reading repositories from local mirrors; ingest() replaces fetch() plus parsing."""
+
+    name = "local"
+
+    def __init__(self, root: str, max_concurrency: int = 16, read_workers: int = 16,
+                 max_file_bytes: int = DEFAULT_MAX_FILE_BYTES):
+        self.root = root
+        self.read_workers = read_workers
+        self.max_file_bytes = max_file_bytes
+        self.max_concurrency = max_concurrency
+        self._semaphore = None
+        self._executor = None
+
+    async def __aenter__(self):
+        # Created in the running loop, like HttpFetchBackend's
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self._executor = ThreadPoolExecutor(max_workers=self.read_workers, thread_name_prefix='ingest')
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.aclose()
+
+    async def aclose(self):
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def resolve(self, repo: str) -> Optional[str]:
+        """Checkout, bare repository or tarball of owner/repo under the mirror root (or repo as a path)."""
+        base = os.path.join(self.root, repo)
+        for candidate in [base, base + '.git'] + [base + suffix for suffix in TARBALL_SUFFIXES] + [repo]:
+            if os.path.exists(candidate):
+                return candidate
+        return None
+
+    def _ingest_blocking(self, repo: str, source: str) -> Dict[str, str]:
+        started = time.perf_counter()
+        ingester = LocalIngester(GitIngestScraper(repo).skip_extensions, self.max_file_bytes, self._executor)
+        results = ingester.ingest(source, repo.replace('/', '-'))
+        print(f"[LOCAL] Ingested {repo} from {source} in {time.perf_counter() - started:.2f}s: "
+              f"{ingester.stats.summary()}")
+        return results
+
+    async def ingest(self, repo: str) -> Optional[Dict[str, str]]:
+        """The parsed repository data (as GitIngestScraper.parse_repository_data returns it), or None."""
+        source = self.resolve(repo)
+        if source is None:
+            print(f"[LOCAL] No checkout, bare repository or tarball for {repo} under {self.root}")
+            return None
+        async with self._semaphore:
+            try:
+                results = await asyncio.to_thread(self._ingest_blocking, repo, source)
+            except (OSError, tarfile.TarError, RuntimeError) as e:
+                print(f"[LOCAL] Error ingesting {repo} from {source}: {str(e)}")
+                return None
+        # Nothing readable counts as a failed fetch, like an empty gitingest page
+        return results if results['textarea_content'] else None
@@ -0,0 +1,32 @@
+"""Log level for the chatty per-chunk output.
+
+Progress lines ([CHUNK n] Sending..., Using cached analysis) print at
+"info", raw API responses and parsed JSON only at "debug", so large runs
+stop paying for writing every response. "warning" silences both; summaries,
+warnings and errors always print.
+"""
+DEBUG = 10
+INFO = 20
+WARNING = 30
+LEVELS = {"debug": DEBUG, "info": INFO, "warning": WARNING}
+
+level = INFO
+
+
+def set_level(name: str):
+    global level
+    level = LEVELS[name]
+
+
+def enabled(at: int) -> bool:
+    return level <= at
+
+
+def debug(message: str):
+    if level <= DEBUG:
+        print(message)
+
+
+def info(message: str):
+    if level <= INFO:
+        print(message)
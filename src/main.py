@@ -1,128 +1,239 @@
+import contextlib
 import csv
 import os
 import sys
 import argparse
-from scraper import GitIngestScraper
+import asyncio
+import log
+from scraper import GitIngestScraper, GITINGEST_URL
+from fetchers import build_fetch_backend
 from feature_analyzer import FeatureAnalyzer
+from analysis_cache import DEFAULT_CACHE_PATH
+from repo_index import RepositoryDump
+from local_classifier import DEFAULT_MODEL_PATH
+from incremental import DEFAULT_INCREMENTAL_PATH
+from dedup import DEFAULT_CONTENT_STORE_PATH
+from batch_mode import BatchRunner, DEFAULT_BATCH_DIR
+from run_manifest import DEFAULT_MANIFEST_PATH, RunManifest, content_hash, open_results_csv, upsert_results_csv
+from results import CSV_HEADERS, apply_rules, add_code_features, write_compaction_summary, write_dedup_summary, \
+    write_feature_sources, write_metrics_summary, write_triage_summary
+from pipeline import RepositoryPipeline, DEFAULT_STAGE_WORKERS
+from rule_pool import RulePool, rule_row
+from metrics import RunMetrics, text_bytes
+from corpus_store import CorpusStore, DEFAULT_CORPUS_PATH
+from results_store import ResultsStore, DEFAULT_RESULTS_PATH
 
-def scrape_repositories(repo_data, output_dir):
-    print("\n=== Phase 1: Scraping Repositories ===")
-    successful_repos = []
+def save_scraped_repository(repo, html, output_dir, base_url=GITINGEST_URL, corpus=None):
+    """Parse a fetched gitingest page and save its files."""
+    scraper = GitIngestScraper(repo, base_url=base_url)
+    return save_repository_data(scraper, repo, scraper.parse_repository_data(html), output_dir, corpus)
 
-    for repo, deployment in repo_data:
-        print(f"\nScraping {repo}...")
-        try:
-            scraper = GitIngestScraper(repo)
-            results = scraper.scrape()
+def save_repository_data(scraper, repo, results, output_dir, corpus=None):
+    """Save parsed repository data (from a gitingest page or a local mirror); returns the filtered size in bytes.
 
-            if not results:
-                print(f"Failed to fetch data for {repo}")
-                continue
+    With a corpus_store.CorpusStore, the data goes there instead of the text files.
+    """
+    if not results['directory_structure'] or not results['textarea_content']:
+        return None
 
-            # Save scraped data
-            base_filename = os.path.join(output_dir, repo.replace('/', '_'))
-            with open(f'{base_filename}_directory_structure.txt', 'w', encoding='utf-8') as f:
-                f.write(results['directory_structure'])
-            with open(f'{base_filename}_code_content.txt', 'w', encoding='utf-8') as f:
-                filtered_content = scraper.filter_css_content(results['textarea_content'])
-                f.write(filtered_content)
+    if corpus is not None:
+        return corpus.put(repo, results['directory_structure'],
+                          scraper.filter_dump(results['textarea_content'], results['directory_structure']))
 
-            successful_repos.append((repo, deployment))
-            print(f"Successfully scraped {repo}")
+    # Save scraped data
+    base_filename = os.path.join(output_dir, repo.replace('/', '_'))
+    with open(f'{base_filename}_directory_structure.txt', 'w', encoding='utf-8') as f:
+        f.write(results['directory_structure'])
+    with open(f'{base_filename}_code_content.txt', 'w', encoding='utf-8') as f:
+        filtered_content = scraper.filter_css_content(results['textarea_content'])
+        f.write(filtered_content)
+    return text_bytes(filtered_content)
 
-        except Exception as e:
-            print(f"Error scraping {repo}: {str(e)}")
-            continue
+async def scrape_repository(repo, output_dir, backend, base_url=GITINGEST_URL, metrics=None, corpus=None):
+    print(f"\nScraping {repo}...")
+    metrics = metrics or RunMetrics()
+    if hasattr(backend, 'ingest'):
+        # A local mirror yields the parsed data directly
+        with metrics.stage("fetch", repo, profile=False):
+            results = await backend.ingest(repo)
+        if results:
+            metrics.add("bytes_in", text_bytes(results['textarea_content']), repo)
+            with metrics.stage("filter", repo, profile=False):
+                saved = await asyncio.to_thread(metrics.profiled("filter", save_repository_data),
+                                                GitIngestScraper(repo, base_url=base_url), repo, results, output_dir,
+                                                corpus)
+        if not results or saved is None:
+            print(f"Failed to fetch data for {repo}")
+            return False
+        metrics.add("bytes_out", saved, repo)
+        print(f"Successfully scraped {repo}")
+        return True
+
+    with metrics.stage("fetch", repo, profile=False):
+        html = await backend.fetch(GitIngestScraper(repo, base_url=base_url).base_url)
+    if not html:
+        print(f"Failed to fetch data for {repo}")
+        return False
+    metrics.add("bytes_in", text_bytes(html), repo)
+
+    # Parsing multi-MB pages is CPU-bound, keep it off the event loop
+    with metrics.stage("filter", repo, profile=False):
+        saved = await asyncio.to_thread(metrics.profiled("filter", save_scraped_repository),
+                                        repo, html, output_dir, base_url, corpus)
+    if saved is None:
+        print(f"Failed to fetch data for {repo}")
+        return False
+    metrics.add("bytes_out", saved, repo)
+
+    print(f"Successfully scraped {repo}")
+    return True
+
+async def scrape_repositories_async(repo_data, output_dir, backend, base_url=GITINGEST_URL, metrics=None,
+                                    corpus=None):
+    async with backend:
+        results = await asyncio.gather(
+            *(scrape_repository(repo, output_dir, backend, base_url, metrics, corpus) for repo, _ in repo_data),
+            return_exceptions=True
+        )
+
+    succeeded = []
+    for (repo, deployment), result in zip(repo_data, results):
+        if isinstance(result, Exception):
+            print(f"Error scraping {repo}: {str(result)}")
+        elif result:
+            succeeded.append((repo, deployment))
+    return succeeded
 
-        finally:
-            if 'scraper' in locals():
-                del scraper  # Ensure browser is closed
+def scrape_repositories(repo_data, output_dir, workers=4, pages_per_driver=25, base_url=GITINGEST_URL,
+                        backend="http", http_concurrency=16, local_root=None, metrics=None, corpus=None):
+    print("\n=== Phase 1: Scraping Repositories ===")
+    fetch_backend = build_fetch_backend(backend, workers, pages_per_driver, http_concurrency, local_root)
+    metrics = metrics or RunMetrics()
+    # Results keep the input order regardless of completion order
+    with metrics.profile("event_loop"):
+        return asyncio.run(scrape_repositories_async(repo_data, output_dir, fetch_backend, base_url, metrics,
+                                                     corpus))
+
+def saved_repository_paths(output_dir, repo):
+    """(directory structure, code content) files saved by the scraping phase."""
+    base_filename = os.path.join(output_dir, repo.replace('/', '_'))
+    return f'{base_filename}_directory_structure.txt', f'{base_filename}_code_content.txt'
 
-    return successful_repos
+def load_saved_repository(output_dir, repo, streaming=False, corpus=None):
+    """Directory structure and indexed code dump saved by the scraping phase."""
+    if corpus is not None:
+        saved = corpus.get(repo, streaming)
+        if saved is None:
+            raise FileNotFoundError(f"{repo} is not in the corpus {corpus.path}")
+        return saved
+    directory_path, code_path = saved_repository_paths(output_dir, repo)
+    with open(directory_path, 'r', encoding='utf-8') as f:
+        directory_structure = f.read()
+    # Indexed once; filtering, chunking and the detectors all work per file
+    if streaming:
+        return directory_structure, RepositoryDump.open(code_path, directory_structure)
+    return directory_structure, RepositoryDump.from_file(code_path, directory_structure)
 
-def analyze_repositories(repo_data, output_dir):
+def submit_rules(rule_pool, repo_data, output_dir, with_hash, corpus=None):
+    """Queue the rule-based detectors of every repository on the pool; futures in input order."""
+    futures = []
+    for repo, _ in repo_data:
+        if corpus is not None:
+            # Workers read the repository from the pool's corpus
+            futures.append(rule_pool.submit(repo, None, with_hash=with_hash))
+            continue
+        directory_path, code_path = saved_repository_paths(output_dir, repo)
+        futures.append(rule_pool.submit(repo, code_path, directory_path=directory_path, with_hash=with_hash))
+    return futures
+
+def analyze_repositories(repo_data, output_dir, analyzer_options=None, analyzer=None, manifest=None, rule_pool=None,
+                         corpus=None, results_store=None):
     print("\n=== Phase 2: Analyzing Repositories ===")
     
-    # Initialize CSV headers and analyzer
-    infrastructure_features = [
-        "already_deployed",
-        "has_frontend",
-        "has_cicd",
-        "multiple_environments",
-        "uses_containerization",
-        "uses_iac",
-        "high_availability"
-    ] # Existing features
-    code_features = [
-        "authentication",
-        "realtime_events",
-        "storage",
-        "caching",
-        "ai_implementation",
-        "database",
-        "microservices",
-        "monolith",
-        "api_exposed",
-        "message_queues",
-        "background_jobs",
-        "sensitive_data",
-        "external_apis"
-    ] # Existing features
-    csv_headers = ["repository", "deployment", "framework"] + infrastructure_features + code_features
-    
     csv_path = os.path.join(output_dir, "analysis_results.csv")
-    with open(csv_path, 'w', newline='') as csvfile:
-        writer = csv.DictWriter(csvfile, fieldnames=csv_headers)
+    if manifest is None:
+        csvfile = open(csv_path, 'w', newline='')
+        writer = csv.DictWriter(csvfile, fieldnames=CSV_HEADERS)
         writer.writeheader()
-        
-        analyzer = FeatureAnalyzer()
-        for repo, _ in repo_data:  # Ignore the deployment value from repo_data
+    else:
+        # Rows are appended; finished repositories keep theirs
+        csvfile, writer = open_results_csv(csv_path, CSV_HEADERS)
+    with csvfile:
+        analyzer = analyzer or FeatureAnalyzer(**(analyzer_options or {}))
+        # With a rule pool, the detectors (and content hashes) of all repositories run ahead in worker processes
+        rule_futures = submit_rules(rule_pool, repo_data, output_dir, manifest is not None, corpus) \
+            if rule_pool else None
+        for index, (repo, _) in enumerate(repo_data):  # Ignore the deployment value from repo_data
             print(f"\nAnalyzing {repo}...")
             try:
-                base_filename = os.path.join(output_dir, repo.replace('/', '_'))
-                
+                # Time spent waiting on the rule pool, apart from applying its results below
+                with analyzer.metrics.stage("rules_wait", repo, profile=False):
+                    rules = rule_futures[index].result() if rule_futures else None
                 # Read the saved files
-                with open(f'{base_filename}_directory_structure.txt', 'r', encoding='utf-8') as f:
-                    directory_structure = f.read()
-                with open(f'{base_filename}_code_content.txt', 'r', encoding='utf-8') as f:
-                    code_content = f.read()
-                
-                # Determine deployment platform
-                deployment = analyzer.determine_deployment_platform(directory_structure, code_content, repo)
-                
-                # Create row data with detected deployment
-                row_data = {
-                    "repository": repo,
-                    "deployment": deployment
-                }
-                
-                # Rest of the analysis remains the same
-                dir_results = analyzer.analyze_directory_structure(directory_structure)
-                code_results = analyzer.analyze_with_llm(code_content)
+                directory_structure, code_content = load_saved_repository(output_dir, repo, analyzer.streaming, corpus)
                 
-                # Add features to row
-                for feature in infrastructure_features:
-                    row_data[feature] = 1 if dir_results.get(feature, False) else 0
-                
-                for feature in code_features:
-                    row_data[feature] = 1 if code_results.get(feature, {}).get("present", False) else 0
-                
-                framework = analyzer.determine_framework(directory_structure, code_content)
-                row_data["framework"] = framework
+                with code_content:
+                    digest = None
+                    if manifest is not None:
+                        digest = rules.content_hash if rules else content_hash(directory_structure, code_content)
+                        if manifest.is_done(repo, digest):
+                            print(f"[RESUME] {repo}: content and configuration unchanged; keeping the previous row")
+                            continue
+                        manifest.start(repo, "analyze")
+                    # Deployment, framework and directory features come from the rule-based detectors
+                    with analyzer.metrics.stage("rules", repo):
+                        if rules:
+                            row_data = rule_row(repo, rules)
+                        else:
+                            row_data = apply_rules(analyzer, repo, directory_structure, code_content)
+                    code_results = analyzer.analyze_with_llm(code_content, repo)
+                add_code_features(row_data, code_results)
                 
                 writer.writerow(row_data)
-                print(f"Added analysis results for {repo} (Detected deployment: {deployment})")
+                csvfile.flush()
+                if manifest is not None:
+                    manifest.complete(repo, row_data, digest)
+                if results_store is not None:
+                    results_store.record(repo, row_data, code_results, digest)
+                print(f"Added analysis results for {repo} (Detected deployment: {row_data['deployment']})")
                 
             except Exception as e:
                 print(f"Error analyzing {repo}: {str(e)}")
+                if manifest is not None:
+                    manifest.fail(repo, "analyze", str(e))
                 continue
+
+        write_triage_summary(analyzer, output_dir)
+        write_compaction_summary(analyzer, output_dir)
+        write_feature_sources(analyzer, output_dir)
+        write_dedup_summary(analyzer, output_dir)
+        write_metrics_summary(analyzer, output_dir)
+        stats = analyzer.analysis_cache.stats()
+        print(f"\n[CACHE] {stats['hits']} hits, {stats['misses']} misses ({stats['hit_rate']:.0%} hit rate), "
+              f"{stats['entries']} entries, {stats['evictions']} evicted")
     
     return csv_path
 
-def process_repositories(input_file):
-    output_dir = "temp"
-    os.makedirs(output_dir, exist_ok=True)
+def batch_chunk_requests(repo_data, output_dir, analyzer, manifest, corpus=None):
+    """Yield (repo, custom_id, features, body) for every chunk request the analysis pass would send."""
+    for repo, _ in repo_data:
+        try:
+            directory_structure, code_content = load_saved_repository(output_dir, repo, analyzer.streaming, corpus)
+            with code_content:
+                if manifest.is_done(repo, content_hash(directory_structure, code_content)):
+                    continue
+                for custom_id, features, body in analyzer.batch_requests(code_content, repo):
+                    yield repo, custom_id, features, body
+        except Exception as e:
+            # The repository is analyzed online instead
+            print(f"[BATCH] Error preparing {repo}: {str(e)}")
+
+def run_batch(repo_data, output_dir, analyzer, manifest, batch_runner, corpus=None):
+    print("\n=== Phase 2a: Batch Analysis ===")
+    batch_runner.run(batch_chunk_requests(repo_data, output_dir, analyzer, manifest, corpus),
+                     [repo for repo, _ in repo_data])
 
+def read_repo_list(input_file):
     # Read repository names and deployment info from file
     repo_data = []
     with open(input_file, 'r') as f:
@@ -133,25 +244,245 @@ def process_repositories(input_file):
                     repo = parts[0].strip()
                     deployment = parts[1].strip()
                     repo_data.append((repo, deployment))  # Store both repo and deployment
+    return repo_data
+
+def rule_pool_for(rule_workers, analyzer, corpus=None):
+    """A RulePool (rule_workers=0: one process per core), or a no-op context when rules run in-process."""
+    if rule_workers is None:
+        return contextlib.nullcontext()
+    return RulePool(rule_workers, analyzer.directory_features, corpus.path if corpus is not None else None)
+
+def process_repositories(input_file, workers=4, pages_per_driver=25, base_url=GITINGEST_URL,
+                         backend="http", http_concurrency=16, analyzer_options=None,
+                         phased=False, stage_workers=None, queue_size=4, save_intermediates=True,
+                         manifest_path=DEFAULT_MANIFEST_PATH, fresh=False, recheck=False,
+                         batch=False, batch_dir=DEFAULT_BATCH_DIR, poll_interval=60.0, rule_workers=None,
+                         local_root=None, profile_dir=None, corpus_path=None, results_path=DEFAULT_RESULTS_PATH):
+    output_dir = "temp"
+    os.makedirs(output_dir, exist_ok=True)
+    repo_data = read_repo_list(input_file)
+    # Scraped repositories go to the corpus store instead of text files
+    corpus = CorpusStore(corpus_path) if corpus_path else None
+
+    analyzer_options = dict(analyzer_options or {})
+    if batch:
+        # Batch requests are re-derived when their answers are merged, so chunking must not depend
+        # on earlier answers (early stop) or on what earlier repositories stored (dedup)
+        phased = True
+        for option, name in (("early_stop", "--early-stop"), ("dedup_path", "--dedup")):
+            if analyzer_options.get(option):
+                print(f"[WARNING] {name} is not supported in batch mode; ignoring it")
+                analyzer_options[option] = None if option == "dedup_path" else False
+
+    # The run manifest makes re-runs skip repositories finished with the same configuration
+    analyzer = FeatureAnalyzer(**analyzer_options)
+    if profile_dir:
+        analyzer.metrics.enable_profiling(profile_dir)
+    manifest = RunManifest(manifest_path, analyzer.config_fingerprint())
+    # Every finished row is also upserted, with its history, into the queryable results store
+    results_store = ResultsStore(results_path, analyzer.config_fingerprint(), analyzer.config_settings())
+    if fresh:
+        manifest.clear()
+        csv_path = os.path.join(output_dir, "analysis_results.csv")
+        if os.path.exists(csv_path):
+            os.remove(csv_path)
+
+    if not phased:
+        print("\n=== Scraping and Analyzing Repositories ===")
+        stage_workers = dict({"fetch": http_concurrency}, **(stage_workers or {}))
+        with rule_pool_for(rule_workers, analyzer, corpus) as rule_pool:
+            pipeline = RepositoryPipeline(
+                analyzer,
+                build_fetch_backend(backend, workers, pages_per_driver, http_concurrency, local_root),
+                output_dir,
+                base_url=base_url,
+                stage_workers=stage_workers,
+                queue_size=queue_size,
+                save_intermediates=save_intermediates,
+                manifest=manifest,
+                recheck=recheck,
+                rule_pool=rule_pool,
+                corpus=corpus,
+                results_store=results_store,
+            )
+            csv_path = pipeline.run(repo_data)
+        print(f"\nAnalysis complete! Results saved to {csv_path}")
+        return
 
-    # Phase 1: Scrape all repositories
-    successful_repos = scrape_repositories(repo_data, output_dir)
-    print(f"\nSuccessfully scraped {len(successful_repos)} out of {len(repo_data)} repositories")
+    # Phase 1: Scrape all repositories (finished ones only when rechecking their content)
+    to_scrape = repo_data if recheck else [(repo, deployment) for repo, deployment in repo_data
+                                          if not manifest.is_done(repo)]
+    if len(to_scrape) < len(repo_data):
+        print(f"[RESUME] Skipping {len(repo_data) - len(to_scrape)} repositories already analyzed with this "
+              f"configuration; {len(to_scrape)} to go")
+    batch_runner = BatchRunner(analyzer, batch_dir, poll_interval) if batch else None
+    if batch_runner is not None and fresh:
+        batch_runner.finish()
+    pending_batch = batch_runner.pending_repositories() if batch else None
+    if pending_batch is not None:
+        # An interrupted batch run works on what was scraped for it
+        successful_repos = [(repo, deployment) for repo, deployment in to_scrape if repo in set(pending_batch)]
+        print(f"[BATCH] Resuming a batch run over {len(successful_repos)} scraped repositories; not scraping again")
+    else:
+        successful_repos = scrape_repositories(to_scrape, output_dir, workers, pages_per_driver, base_url,
+                                               backend, http_concurrency, local_root,
+                                               analyzer.metrics, corpus) if to_scrape else []
+        print(f"\nSuccessfully scraped {len(successful_repos)} out of {len(to_scrape)} repositories")
+        for repo, _ in set(to_scrape) - set(successful_repos):
+            manifest.fail(repo, "fetch", "scraping failed")
+    if batch_runner is not None and successful_repos:
+        run_batch(successful_repos, output_dir, analyzer, manifest, batch_runner, corpus)
 
     # Phase 2: Analyze all repositories
-    if successful_repos:
-        csv_path = analyze_repositories(successful_repos, output_dir)
+    if successful_repos or len(to_scrape) < len(repo_data):
+        with rule_pool_for(rule_workers, analyzer, corpus) as rule_pool:
+            csv_path = analyze_repositories(successful_repos, output_dir, analyzer=analyzer, manifest=manifest,
+                                            rule_pool=rule_pool, corpus=corpus, results_store=results_store)
+        # One pass over the whole list also restores rows of finished repositories skipped this run
+        upsert_results_csv(csv_path, CSV_HEADERS, manifest.done_rows(repo for repo, _ in repo_data))
+        if batch_runner is not None:
+            batch_runner.finish()
         print(f"\nAnalysis complete! Results saved to {csv_path}")
     else:
         print("\nNo repositories were successfully scraped. Analysis cancelled.")
 
+def parse_stage_workers(value):
+    """Parse 'fetch=16,llm=4' into a dict of per-stage worker counts."""
+    workers = {}
+    for part in value.split(','):
+        if not part.strip():
+            continue
+        name, _, count = part.partition('=')
+        if name.strip() not in DEFAULT_STAGE_WORKERS or not count.strip().isdigit():
+            raise argparse.ArgumentTypeError(f"Invalid stage worker setting: {part}")
+        workers[name.strip()] = int(count)
+    return workers
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description='Analyze multiple repositories and generate CSV report')
     parser.add_argument('input_file', help='Text file containing owner/repo entries, one per line')
+    parser.add_argument('--backend', choices=['http', 'http-only', 'selenium', 'local'], default='http',
+                        help='How to fetch gitingest pages: plain HTTP with a browser fallback, HTTP only, or browsers '
+                             'only; or build the dumps locally from mirrors under --local-root')
+    parser.add_argument('--local-root', default=None, metavar='DIR',
+                        help='Mirror root for --backend local: owner/repo is read from DIR/owner/repo (checkout), '
+                             'DIR/owner/repo.git (bare repository) or DIR/owner/repo.tar.gz (tarball)')
+    parser.add_argument('--http-concurrency', type=int, default=16,
+                        help='Maximum number of in-flight HTTP fetches')
+    parser.add_argument('--workers', type=int, default=4, help='Number of browsers used to scrape in parallel')
+    parser.add_argument('--pages-per-driver', type=int, default=25,
+                        help='Restart a browser after it has served this many pages (0 = never)')
+    parser.add_argument('--gitingest-url', default=GITINGEST_URL,
+                        help='Base URL of the gitingest site (e.g. a local stand-in)')
+    parser.add_argument('--llm-concurrency', type=int, default=1,
+                        help='Maximum number of in-flight LLM requests per repository (1 = serial)')
+    parser.add_argument('--rpm', type=float, default=None,
+                        help='Requests-per-minute limit for the LLM API (default: learn from response headers)')
+    parser.add_argument('--tpm', type=float, default=None,
+                        help='Tokens-per-minute limit for the LLM API (default: learn from response headers)')
+    parser.add_argument('--cache-path', default=DEFAULT_CACHE_PATH,
+                        help='SQLite file caching LLM chunk analyses across runs (":memory:" for this run only)')
+    parser.add_argument('--cache-max-mb', type=int, default=512,
+                        help='Size limit of the analysis cache; least recently used entries are evicted')
+    parser.add_argument('--phased', action='store_true',
+                        help='Scrape every repository before analyzing any (the old two-phase flow)')
+    parser.add_argument('--stage-workers', type=parse_stage_workers, default=None,
+                        help='Per-stage worker counts for the pipeline, e.g. fetch=16,filter=2,chunk=2,llm=4,rules=2')
+    parser.add_argument('--queue-size', type=int, default=4,
+                        help='Capacity of the queues between pipeline stages')
+    parser.add_argument('--no-save-intermediates', action='store_true',
+                        help='Do not write temp/*_directory_structure.txt and *_code_content.txt files')
+    parser.add_argument('--chunker', choices=['packed', 'lines'], default='packed',
+                        help='How code is split for the LLM: whole files packed up to the token budget, or fixed-size line chunks')
+    parser.add_argument('--context-tokens', type=int, default=16385,
+                        help='Context window of the model; packed chunks fill it minus the prompt and the expected answer')
+    parser.add_argument('--early-stop', action='store_true',
+                        help='Ask only about features not yet found and stop analyzing a repository once all are found')
+    parser.add_argument('--no-triage', action='store_true',
+                        help='Send every file to the LLM instead of skipping lockfiles, vendored, minified, generated and duplicate files')
+    parser.add_argument('--no-compaction', action='store_true',
+                        help='Send file bodies verbatim instead of stripping comments, docstrings, long literals and whitespace')
+    parser.add_argument('--no-manifest-fast-path', action='store_true',
+                        help='Ask the LLM about every feature instead of settling those proven by declared dependencies')
+    parser.add_argument('--classifier', nargs='?', const=DEFAULT_MODEL_PATH, default=None, metavar='MODEL',
+                        help=f'Use the offline classifier trained by local_classifier.py (default model: {DEFAULT_MODEL_PATH})')
+    parser.add_argument('--classifier-mode', choices=['gate', 'only'], default='gate',
+                        help='gate: escalate only low-confidence features to the LLM; only: never call the LLM')
+    parser.add_argument('--classifier-confidence', type=float, default=0.9,
+                        help='Probability (of present or absent) at which a classifier prediction is trusted in gate mode')
+    parser.add_argument('--incremental', nargs='?', const=DEFAULT_INCREMENTAL_PATH, default=None, metavar='PATH',
+                        help=f'Store per-file chunk results (default: {DEFAULT_INCREMENTAL_PATH}) and re-send only '
+                             'new or modified files when a repository is analyzed again')
+    parser.add_argument('--dedup', nargs='?', const=DEFAULT_CONTENT_STORE_PATH, default=None, metavar='PATH',
+                        help=f'Global content store of file digests and chunk results (default: '
+                             f'{DEFAULT_CONTENT_STORE_PATH}): files shared by several repositories, exactly or as '
+                             'near-duplicates, are analyzed once and their results reused by every repository')
+    parser.add_argument('--pack-small-repos', nargs='?', type=int, const=8, default=0, metavar='N',
+                        help='Pack small chunks (under ~2000 tokens, typically the only chunk of a small repository) '
+                             'of up to N repositories into one request with a keyed JSON answer per repository '
+                             '(default N: 8; streaming pipeline only)')
+    parser.add_argument('--streaming', action='store_true',
+                        help='Memory-map code dumps and chunk/analyze them incrementally (bounded memory for huge repositories)')
+    parser.add_argument('--manifest-path', default=DEFAULT_MANIFEST_PATH,
+                        help='SQLite run manifest recording per-repository progress across runs')
+    parser.add_argument('--recheck', action='store_true',
+                        help='Fetch finished repositories again and re-analyze those whose content changed')
+    parser.add_argument('--fresh', action='store_true',
+                        help='Forget earlier runs: clear the run manifest and start a new results CSV')
+    parser.add_argument('--rule-workers', nargs='?', type=int, const=0, default=None, metavar='N',
+                        help='Run the rule-based detectors in N worker processes on memory-mapped dumps '
+                             '(no value: one per core)')
+    parser.add_argument('--batch', nargs='?', const=DEFAULT_BATCH_DIR, default=None, metavar='DIR',
+                        help=f'Send chunk requests as offline batch jobs (JSONL files in DIR, default: {DEFAULT_BATCH_DIR}), '
+                             'poll until they finish, then merge the answers; resumable across restarts (implies --phased)')
+    parser.add_argument('--batch-poll-interval', type=float, default=60.0,
+                        help='Seconds between batch status checks')
+    parser.add_argument('--log-level', choices=list(log.LEVELS), default='info',
+                        help='debug: also print raw API responses and parsed JSON; warning: drop the per-chunk progress lines')
+    parser.add_argument('--corpus', nargs='?', const=DEFAULT_CORPUS_PATH, default=None, metavar='PATH',
+                        help=f'Keep scraped repositories in a compressed, full-text indexed SQLite corpus (default: '
+                             f'{DEFAULT_CORPUS_PATH}) instead of temp/*_directory_structure.txt and *_code_content.txt')
+    parser.add_argument('--results-path', default=DEFAULT_RESULTS_PATH,
+                        help='SQLite results store keeping every repository\'s current result, its history per '
+                             'analyzer configuration and the LLM\'s details (query it with src/results_store.py)')
+    parser.add_argument('--profile', nargs='?', const=os.path.join('temp', 'profile'), default=None, metavar='DIR',
+                        help='Write cProfile statistics and tracemalloc snapshots per stage to DIR (default: temp/profile)')
     args = parser.parse_args()
 
+    if args.backend == 'local' and not args.local_root:
+        parser.error("--backend local needs --local-root")
+    log.set_level(args.log_level)
+
     if not os.path.exists(args.input_file):
         print(f"Error: Input file '{args.input_file}' not found")
         sys.exit(1)
 
-    process_repositories(args.input_file)
+    analyzer_options = {
+        "max_in_flight": args.llm_concurrency,
+        "requests_per_minute": args.rpm,
+        "tokens_per_minute": args.tpm,
+        "cache_path": args.cache_path,
+        "cache_max_bytes": args.cache_max_mb * 1024 * 1024,
+        "streaming": args.streaming,
+        "chunker": args.chunker,
+        "context_tokens": args.context_tokens,
+        "triage": not args.no_triage,
+        "compaction": not args.no_compaction,
+        "early_stop": args.early_stop,
+        "manifest_fast_path": not args.no_manifest_fast_path,
+        "classifier_path": args.classifier,
+        "classifier_mode": args.classifier_mode,
+        "classifier_confidence": args.classifier_confidence,
+        "incremental_path": args.incremental,
+        "dedup_path": args.dedup,
+        "pack_sections": args.pack_small_repos,
+    }
+    process_repositories(args.input_file, args.workers, args.pages_per_driver, args.gitingest_url,
+                         args.backend, args.http_concurrency, analyzer_options,
+                         phased=args.phased, stage_workers=args.stage_workers, queue_size=args.queue_size,
+                         save_intermediates=not args.no_save_intermediates,
+                         manifest_path=args.manifest_path, fresh=args.fresh, recheck=args.recheck,
+                         batch=args.batch is not None, batch_dir=args.batch or DEFAULT_BATCH_DIR,
+                         poll_interval=args.batch_poll_interval, rule_workers=args.rule_workers,
+                         local_root=args.local_root, profile_dir=args.profile, corpus_path=args.corpus,
+                         results_path=args.results_path)
@@ -0,0 +1,289 @@
+"""Dependency-manifest fast path: features that can be read off declared dependencies.
+
+Parses package.json, requirements*.txt, pyproject.toml, go.mod and Gemfile
+files in a gitingest dump and maps dependency names to LLM features through
+a curated table. A declared dependency proves a feature is present; it
+never proves one absent, so unresolved features still go to the LLM.
+
+Only runtime dependencies count: development, test, peer and optional
+dependencies (and indirect Go requirements) may never be used by the
+project's own code. Names that do not settle a feature on their own (ws,
+itsdangerous, golang.org/x/crypto) are left out of the table.
+"""
+import json
+import re
+import tomllib
+from typing import Dict, Iterator, List, Optional, Tuple
+from repo_index import FileEntry, RepositoryDump
+
+# Manifests under these directories describe someone else's project
+IGNORED_DIRECTORIES = ("node_modules/", "vendor/", "third_party/", "site-packages/")
+
+# ecosystem -> feature -> dependency names; a trailing '*' matches a prefix
+DEPENDENCY_FEATURES: Dict[str, Dict[str, List[str]]] = {
+    "npm": {
+        "database": ["prisma", "@prisma/client", "mongoose", "mongodb", "pg", "mysql", "mysql2", "sqlite3",
+                     "better-sqlite3", "sequelize", "typeorm", "knex", "drizzle-orm", "@supabase/supabase-js",
+                     "@planetscale/database", "@neondatabase/serverless", "dynamoose", "@aws-sdk/client-dynamodb"],
+        "caching": ["redis", "ioredis", "@upstash/redis", "node-cache", "memcached", "keyv", "cache-manager",
+                    "@keyv/redis", "apicache"],
+        "message_queues": ["kafkajs", "amqplib", "amqp-connection-manager", "bullmq", "bull", "bee-queue",
+                           "@aws-sdk/client-sqs", "sqs-consumer", "nats", "mqtt", "@google-cloud/pubsub",
+                           "@azure/service-bus", "rhea"],
+        "background_jobs": ["bull", "bullmq", "bee-queue", "agenda", "node-cron", "cron", "node-schedule",
+                            "@trigger.dev/sdk", "inngest", "graphile-worker"],
+        "storage": ["multer", "@aws-sdk/client-s3", "@aws-sdk/s3-request-presigner", "@google-cloud/storage",
+                    "cloudinary", "minio", "@azure/storage-blob", "uploadthing", "formidable", "busboy"],
+        "ai_implementation": ["openai", "@anthropic-ai/sdk", "langchain", "@langchain/*", "ai", "@ai-sdk/*",
+                              "@tensorflow/tfjs", "@tensorflow/tfjs-node", "@huggingface/inference", "cohere-ai",
+                              "replicate", "groq-sdk", "@google/generative-ai", "@mistralai/mistralai",
+                              "llamaindex", "onnxruntime-node", "brain.js"],
+        "authentication": ["passport", "passport-*", "jsonwebtoken", "jose", "next-auth", "@auth/*", "bcrypt",
+                           "bcryptjs", "argon2", "@clerk/*", "@auth0/*", "express-session", "express-jwt",
+                           "@supabase/auth-helpers-*", "@supabase/ssr", "lucia", "firebase-auth", "@okta/*",
+                           "iron-session", "better-auth"],
+        "external_apis": ["stripe", "@stripe/stripe-js", "twilio", "@sendgrid/mail", "googleapis", "@octokit/*",
+                          "octokit", "mailgun.js", "@slack/web-api", "resend", "@mailchimp/*", "plaid",
+                          "@paypal/*", "algoliasearch", "@googlemaps/*"],
+        "realtime_events": ["socket.io", "socket.io-client", "pusher", "pusher-js", "ably", "sockjs",
+                            "sockjs-client", "@supabase/realtime-js", "@liveblocks/*", "partykit",
+                            "graphql-ws", "subscriptions-transport-ws", "eventsource"],
+    },
+    "pypi": {
+        "database": ["sqlalchemy", "psycopg2", "psycopg2-binary", "psycopg", "pymongo", "motor", "peewee",
+                     "tortoise-orm", "asyncpg", "mysqlclient", "pymysql", "sqlmodel", "alembic", "mongoengine",
+                     "aiosqlite", "databases", "supabase", "prisma", "flask-sqlalchemy", "pony"],
+        "caching": ["redis", "django-redis", "flask-caching", "cachetools", "aiocache", "pymemcache",
+                    "python-memcached", "diskcache", "aioredis", "django-cacheops"],
+        "message_queues": ["kafka-python", "confluent-kafka", "aiokafka", "pika", "aio-pika", "kombu",
+                           "nats-py", "paho-mqtt", "google-cloud-pubsub", "azure-servicebus"],
+        "background_jobs": ["celery", "rq", "apscheduler", "dramatiq", "huey", "arq", "django-q",
+                            "django-celery-beat", "schedule", "taskiq"],
+        "storage": ["google-cloud-storage", "azure-storage-blob", "minio", "django-storages", "cloudinary",
+                    "s3fs", "aioboto3", "smart-open"],
+        "ai_implementation": ["openai", "anthropic", "langchain", "langchain-*", "llama-index", "transformers",
+                              "torch", "tensorflow", "keras", "scikit-learn", "sklearn", "xgboost", "lightgbm",
+                              "sentence-transformers", "huggingface-hub", "cohere", "replicate",
+                              "google-generativeai", "groq", "mistralai", "spacy", "onnxruntime", "tiktoken"],
+        "authentication": ["flask-login", "django-allauth", "pyjwt", "python-jose", "authlib",
+                           "flask-jwt-extended", "djangorestframework-simplejwt", "passlib", "fastapi-users",
+                           "bcrypt", "argon2-cffi", "flask-security", "flask-security-too", "social-auth-core",
+                           "django-oauth-toolkit"],
+        "external_apis": ["stripe", "twilio", "sendgrid", "tweepy", "googlemaps", "pygithub",
+                          "slack-sdk", "slack-bolt", "google-api-python-client", "mailchimp3", "plaid-python",
+                          "praw", "spotipy"],
+        "realtime_events": ["websockets", "python-socketio", "flask-socketio", "channels", "django-channels",
+                            "sse-starlette", "pusher", "ably"],
+    },
+    "go": {
+        "database": ["gorm.io/gorm", "github.com/jackc/pgx", "github.com/lib/pq", "go.mongodb.org/mongo-driver",
+                     "github.com/go-sql-driver/mysql", "github.com/mattn/go-sqlite3", "github.com/jmoiron/sqlx",
+                     "entgo.io/ent", "github.com/uptrace/bun"],
+        "caching": ["github.com/go-redis/redis", "github.com/redis/go-redis", "github.com/bradfitz/gomemcache",
+                    "github.com/patrickmn/go-cache", "github.com/allegro/bigcache", "github.com/dgraph-io/ristretto"],
+        "message_queues": ["github.com/segmentio/kafka-go", "github.com/confluentinc/confluent-kafka-go",
+                           "github.com/rabbitmq/amqp091-go", "github.com/streadway/amqp", "github.com/nats-io/nats.go",
+                           "github.com/ibm/sarama", "github.com/shopify/sarama", "cloud.google.com/go/pubsub"],
+        "background_jobs": ["github.com/hibiken/asynq", "github.com/robfig/cron", "github.com/go-co-op/gocron",
+                            "github.com/riverqueue/river"],
+        "storage": ["cloud.google.com/go/storage", "github.com/minio/minio-go",
+                    "github.com/aws/aws-sdk-go-v2/service/s3", "github.com/azure/azure-sdk-for-go/sdk/storage/azblob"],
+        "ai_implementation": ["github.com/sashabaranov/go-openai", "github.com/tmc/langchaingo",
+                              "github.com/anthropics/anthropic-sdk-go", "github.com/openai/openai-go",
+                              "github.com/google/generative-ai-go"],
+        "authentication": ["github.com/golang-jwt/jwt", "github.com/dgrijalva/jwt-go", "golang.org/x/oauth2",
+                           "github.com/markbates/goth", "github.com/coreos/go-oidc"],
+        "external_apis": ["github.com/stripe/stripe-go", "github.com/google/go-github", "github.com/slack-go/slack",
+                          "github.com/twilio/twilio-go", "github.com/sendgrid/sendgrid-go"],
+        "realtime_events": ["github.com/gorilla/websocket", "nhooyr.io/websocket", "github.com/coder/websocket",
+                            "github.com/centrifugal/centrifuge"],
+    },
+    "gem": {
+        "database": ["pg", "mysql2", "sqlite3", "activerecord", "mongoid", "sequel"],
+        "caching": ["redis", "dalli", "redis-rails", "redis-store", "hiredis"],
+        "message_queues": ["bunny", "ruby-kafka", "rdkafka", "sneakers", "karafka"],
+        "background_jobs": ["sidekiq", "resque", "delayed_job", "delayed_job_active_record", "good_job",
+                            "whenever", "sidekiq-cron", "solid_queue", "que"],
+        "storage": ["aws-sdk-s3", "carrierwave", "shrine", "paperclip", "google-cloud-storage",
+                    "azure-storage-blob", "activestorage", "fog-aws"],
+        "ai_implementation": ["ruby-openai", "openai", "langchainrb", "anthropic"],
+        "authentication": ["devise", "omniauth", "omniauth-*", "jwt", "bcrypt", "sorcery", "doorkeeper",
+                           "rodauth", "clearance", "knock"],
+        "external_apis": ["stripe", "twilio-ruby", "octokit", "sendgrid-ruby", "slack-ruby-client", "mailgun-ruby"],
+        "realtime_events": ["actioncable", "faye-websocket", "pusher", "anycable", "websocket-driver"],
+    },
+}
+
+
+class _FeatureTable:
+    """Exact-name and prefix lookups for one ecosystem."""
+
+    def __init__(self, features: Dict[str, List[str]]):
+        self.exact: Dict[str, List[str]] = {}
+        self.prefixes: List[Tuple[str, str]] = []
+        for feature, names in features.items():
+            for name in names:
+                if name.endswith('*'):
+                    self.prefixes.append((name[:-1], feature))
+                else:
+                    self.exact.setdefault(name, []).append(feature)
+
+    def features(self, dependency: str) -> List[str]:
+        found = list(self.exact.get(dependency, ()))
+        found.extend(feature for prefix, feature in self.prefixes if dependency.startswith(prefix))
+        return found
+
+
+FEATURE_TABLES = {ecosystem: _FeatureTable(features) for ecosystem, features in DEPENDENCY_FEATURES.items()}
+
+
+def normalize_python_name(name: str) -> str:
+    """PEP 503 normalization (Flask_SQLAlchemy -> flask-sqlalchemy)."""
+    return re.sub(r'[-_.]+', '-', name).lower()
+
+
+_REQUIREMENT_NAME = re.compile(r'\s*([A-Za-z0-9][A-Za-z0-9._-]*)')
+
+
+def _requirement_name(requirement: str) -> Optional[str]:
+    match = _REQUIREMENT_NAME.match(requirement)
+    return normalize_python_name(match.group(1)) if match else None
+
+
+def parse_package_json(text: str) -> List[str]:
+    try:
+        data = json.loads(text)
+    except ValueError:
+        return []
+    if not isinstance(data, dict):
+        return []
+    dependencies = data.get("dependencies")
+    return [name.lower() for name in dependencies] if isinstance(dependencies, dict) else []
+
+
+def parse_requirements(text: str) -> List[str]:
+    names = []
+    for line in text.splitlines():
+        line = line.split('#', 1)[0].strip()
+        # Options (-r, -e, --index-url) and URLs are not package names
+        if not line or line.startswith('-') or '://' in line.split(' ', 1)[0]:
+            continue
+        name = _requirement_name(line)
+        if name:
+            names.append(name)
+    return names
+
+
+def parse_pyproject(text: str) -> List[str]:
+    try:
+        data = tomllib.loads(text)
+    except (tomllib.TOMLDecodeError, UnicodeError):
+        return []
+    # Optional dependencies (extras) and Poetry's dev-dependencies and groups are left out
+    requirements = data.get("project", {}).get("dependencies", [])
+    names = [name for name in map(_requirement_name, requirements) if name]
+    poetry = data.get("tool", {}).get("poetry", {})
+    names.extend(normalize_python_name(name) for name in poetry.get("dependencies", {}) if name.lower() != "python")
+    return names
+
+
+_GO_MAJOR_VERSION = re.compile(r'/v\d+$')
+
+
+def parse_go_mod(text: str) -> List[str]:
+    names = []
+    in_block = False
+    for line in text.splitlines():
+        line, _, comment = line.partition('//')
+        line = line.strip()
+        if in_block:
+            if line.startswith(')'):
+                in_block = False
+                continue
+        elif line.startswith('require'):
+            line = line[len('require'):].strip()
+            if line.startswith('('):
+                in_block = True
+                continue
+        else:
+            continue
+        # Indirect requirements are dependencies of dependencies
+        if line and comment.strip() != "indirect":
+            names.append(_GO_MAJOR_VERSION.sub('', line.split()[0].lower()))
+    return names
+
+
+_GEM = re.compile(r'''^\s*gem\s+['"]([^'"]+)['"](.*)$''')
+_GEM_GROUP = re.compile(r'^\s*group\s+(.*?)\s+do\b')
+_BLOCK_START = re.compile(r'\bdo\s*(\|[^|]*\|)?\s*$')
+_DEV_GROUPS = re.compile(r':(development|test)\b|\b(development|test):')
+_RUNTIME_GROUPS = re.compile(r':(default|production)\b')
+
+
+def _dev_group(groups: str) -> bool:
+    return bool(_DEV_GROUPS.search(groups)) and not _RUNTIME_GROUPS.search(groups)
+
+
+def parse_gemfile(text: str) -> List[str]:
+    names = []
+    # One entry per open do-block: whether it is a development/test group
+    blocks: List[bool] = []
+    for line in text.splitlines():
+        line = line.split('#', 1)[0]
+        group = _GEM_GROUP.match(line)
+        if group:
+            blocks.append(_dev_group(group.group(1)))
+            continue
+        if re.match(r'\s*end\b', line):
+            if blocks:
+                blocks.pop()
+            continue
+        gem = _GEM.match(line)
+        if gem:
+            # gem "rspec", group: :test
+            if not any(blocks) and not _dev_group(gem.group(2)):
+                names.append(gem.group(1).lower())
+        elif _BLOCK_START.search(line):
+            blocks.append(False)
+    return names
+
+
+# requirements-dev.txt, requirements/test.txt and the like; only runtime requirements count
+_DEV_REQUIREMENTS = re.compile(r'dev|test|doc|lint|ci\b|build|typing')
+
+# (file name test, ecosystem, parser)
+MANIFESTS = [
+    (lambda name: name == "package.json", "npm", parse_package_json),
+    (lambda name: name.startswith("requirements") and name.endswith(".txt")
+     and not _DEV_REQUIREMENTS.search(name[len("requirements"):-len(".txt")]), "pypi", parse_requirements),
+    (lambda name: name == "pyproject.toml", "pypi", parse_pyproject),
+    (lambda name: name == "go.mod", "go", parse_go_mod),
+    (lambda name: name == "gemfile", "gem", parse_gemfile),
+]
+
+
+def iter_manifests(dump: RepositoryDump) -> Iterator[Tuple[FileEntry, str, object]]:
+    """Yield (entry, ecosystem, parser) for every dependency manifest of the project itself."""
+    for entry in dump:
+        path = entry.path.lower()
+        if any(f"/{directory}" in f"/{path}" for directory in IGNORED_DIRECTORIES):
+            continue
+        name = path.rsplit('/', 1)[-1]
+        for matches, ecosystem, parser in MANIFESTS:
+            if matches(name):
+                yield entry, ecosystem, parser
+                break
+
+
+def manifest_features(code_content) -> Dict[str, List[str]]:
+    """Map each feature proven by a declared dependency to its evidence, e.g. 'redis (package.json)'."""
+    dump = RepositoryDump.coerce(code_content)
+    evidence: Dict[str, List[str]] = {}
+    for entry, ecosystem, parser in iter_manifests(dump):
+        table = FEATURE_TABLES[ecosystem]
+        for dependency in parser(dump.text(entry)):
+            for feature in table.features(dependency):
+                found = f"{dependency} ({entry.path})"
+                if found not in evidence.setdefault(feature, []):
+                    evidence[feature].append(found)
+    return evidence
@@ -0,0 +1,256 @@
+"""Run metrics: per-repository and per-stage timings and counters, exported as JSON and Prometheus text.
+
+Stages are fetch, filter, chunk, llm and rules, whichever flow runs them,
+plus rules_wait, the time the sequential flow waits on the rule pool.
+Counters are attributed to the repository in `current_repo`, a context
+variable set by whoever works on a repository; asyncio tasks and
+asyncio.to_thread inherit it, so the LLM client and worker threads need no
+repository argument. A packed request is counted for the repository whose
+chunk sent it.
+
+With a StageProfiler (--profile), blocking stage work is also run under
+cProfile and tracemalloc, and every stage gets a .prof file, the top
+functions as text and the tracemalloc snapshot taken when the stage held
+the most traced memory.
+"""
+import cProfile
+import io
+import json
+import os
+import pstats
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Optional
+
+try:
+    import resource
+    RESOURCE_AVAILABLE = True
+except ImportError:
+    RESOURCE_AVAILABLE = False
+
+STAGES = ("fetch", "filter", "chunk", "llm", "rules", "rules_wait")
+PROMETHEUS_PREFIX = "repo_analyzer"
+# Frames kept per tracemalloc allocation
+TRACEMALLOC_FRAMES = 10
+
+current_repo: ContextVar[Optional[str]] = ContextVar("current_repo", default=None)
+
+
+def peak_rss_bytes() -> Optional[int]:
+    """Peak resident set size of this process so far (None where the platform cannot tell)."""
+    if not RESOURCE_AVAILABLE:
+        return None
+    # ru_maxrss is in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def text_bytes(text: str) -> int:
+    """UTF-8 size of text, without encoding it when it is ASCII."""
+    return len(text) if text.isascii() else len(text.encode('utf-8', 'surrogatepass'))
+
+
+class StageProfiler:
+    """cProfile statistics and tracemalloc snapshots per stage, written to a directory."""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.stats: Dict[str, pstats.Stats] = {}
+        self.snapshots: Dict[str, tuple] = {}  # stage -> (traced bytes, snapshot)
+        self.skipped = 0
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(TRACEMALLOC_FRAMES)
+
+    @contextmanager
+    def profile(self, stage: str):
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Only one profiler can be active at a time on some Python versions
+            profiler = None
+            self.skipped += 1
+        try:
+            yield
+        finally:
+            if profiler is not None:
+                profiler.disable()
+                self._merge(stage, profiler)
+            self._snapshot(stage)
+
+    def _merge(self, stage: str, profiler: cProfile.Profile):
+        with self._lock:
+            try:
+                if stage in self.stats:
+                    self.stats[stage].add(profiler)
+                else:
+                    self.stats[stage] = pstats.Stats(profiler)
+            except TypeError:
+                # Nothing was recorded
+                pass
+
+    def _snapshot(self, stage: str):
+        traced, _ = tracemalloc.get_traced_memory()
+        with self._lock:
+            if traced <= self.snapshots.get(stage, (-1, None))[0]:
+                return
+            self.snapshots[stage] = (traced, tracemalloc.take_snapshot())
+
+    def write(self):
+        for stage, stats in self.stats.items():
+            stats.dump_stats(os.path.join(self.directory, f"{stage}.prof"))
+            text = io.StringIO()
+            stats.stream = text
+            stats.sort_stats("cumulative").print_stats(40)
+            with open(os.path.join(self.directory, f"{stage}.txt"), 'w', encoding='utf-8') as f:
+                f.write(text.getvalue())
+        for stage, (traced, snapshot) in self.snapshots.items():
+            snapshot.dump(os.path.join(self.directory, f"{stage}.tracemalloc"))
+            with open(os.path.join(self.directory, f"{stage}.tracemalloc.txt"), 'w', encoding='utf-8') as f:
+                f.write(f"{traced} bytes traced when the snapshot was taken\n")
+                for statistic in snapshot.statistics("lineno")[:40]:
+                    f.write(f"{statistic}\n")
+
+
+class RunMetrics:
+    """Per-repository counters and stage timings of one run."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.repositories: Dict[str, Dict[str, float]] = {}
+        self.totals: Dict[str, float] = {}
+        self.stage_peak_rss: Dict[str, int] = {}
+        self.profiler: Optional[StageProfiler] = None
+        self._lock = threading.Lock()
+
+    def enable_profiling(self, directory: str):
+        self.profiler = StageProfiler(directory)
+
+    def add(self, name: str, value: float = 1, repo: Optional[str] = None):
+        repo = repo or current_repo.get() or ""
+        with self._lock:
+            counters = self.repositories.setdefault(repo, {})
+            counters[name] = counters.get(name, 0) + value
+            self.totals[name] = self.totals.get(name, 0) + value
+
+    @contextmanager
+    def profile(self, stage: str):
+        """Profile the work of a stage done in this thread (a no-op without --profile)."""
+        if self.profiler is None:
+            yield
+            return
+        with self.profiler.profile(stage):
+            yield
+
+    def profiled(self, stage: str, func):
+        """func wrapped to profile its calls under `stage`, for work handed to asyncio.to_thread."""
+        if self.profiler is None:
+            return func
+
+        def run(*args, **kwargs):
+            with self.profile(stage):
+                return func(*args, **kwargs)
+        return run
+
+    @contextmanager
+    def stage(self, name: str, repo: Optional[str] = None, profile: bool = True):
+        """Time a repository's pass through a stage; profile=False where it awaits other work in between."""
+        repo = repo or current_repo.get()
+        token = current_repo.set(repo)
+        started = time.perf_counter()
+        try:
+            if profile:
+                with self.profile(name):
+                    yield
+            else:
+                yield
+        finally:
+            self.add(f"{name}_seconds", time.perf_counter() - started, repo)
+            current_repo.reset(token)
+            rss = peak_rss_bytes()
+            if rss is not None:
+                with self._lock:
+                    self.stage_peak_rss[name] = max(self.stage_peak_rss.get(name, 0), rss)
+
+    def summary(self) -> Dict[str, Any]:
+        with self._lock:
+            repositories = {repo: dict(counters) for repo, counters in self.repositories.items() if repo}
+            totals = dict(self.totals)
+        hits, misses = totals.get("cache_hits", 0), totals.get("cache_misses", 0)
+        stages = {}
+        for name in STAGES:
+            seconds = [counters[f"{name}_seconds"] for counters in repositories.values()
+                       if f"{name}_seconds" in counters]
+            if seconds:
+                stages[name] = {
+                    "repositories": len(seconds),
+                    "seconds": sum(seconds),
+                    "mean_seconds": sum(seconds) / len(seconds),
+                    "max_seconds": max(seconds),
+                    "peak_rss_bytes": self.stage_peak_rss.get(name),
+                }
+        return {
+            "wall_seconds": time.perf_counter() - self.started,
+            "peak_rss_bytes": peak_rss_bytes(),
+            "cache_hit_rate": hits / (hits + misses) if hits + misses else None,
+            "totals": totals,
+            "stages": stages,
+            "repositories": repositories,
+        }
+
+    def write_json(self, path: str, summary: Optional[Dict[str, Any]] = None):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(summary or self.summary(), f, indent=2, sort_keys=True)
+
+    def write_prometheus(self, path: str, summary: Optional[Dict[str, Any]] = None):
+        """Prometheus text exposition format, e.g. for node_exporter's textfile collector."""
+        summary = summary or self.summary()
+        lines = []
+
+        def metric(name: str, kind: str, help_text: str, samples):
+            lines.append(f"# HELP {PROMETHEUS_PREFIX}_{name} {help_text}")
+            lines.append(f"# TYPE {PROMETHEUS_PREFIX}_{name} {kind}")
+            for labels, value in samples:
+                label_text = ",".join(f'{key}="{_escape(str(label))}"' for key, label in labels.items())
+                lines.append(f"{PROMETHEUS_PREFIX}_{name}{{{label_text}}} {value}" if label_text
+                             else f"{PROMETHEUS_PREFIX}_{name} {value}")
+
+        metric("wall_seconds", "gauge", "Wall time of the run", [({}, summary["wall_seconds"])])
+        if summary["peak_rss_bytes"] is not None:
+            metric("peak_rss_bytes", "gauge", "Peak resident set size of the run", [({}, summary["peak_rss_bytes"])])
+        if summary["cache_hit_rate"] is not None:
+            metric("cache_hit_ratio", "gauge", "Share of chunks served from the analysis cache",
+                   [({}, summary["cache_hit_rate"])])
+        metric("stage_seconds_total", "counter", "Wall time spent per stage, summed over repositories",
+               [({"stage": name}, stage["seconds"]) for name, stage in summary["stages"].items()])
+        counters = sorted(name for name in summary["totals"] if not name.endswith("_seconds"))
+        for name in counters:
+            metric(f"{name}_total", "counter", f"Run total of {name.replace('_', ' ')}",
+                   [({}, summary["totals"][name])])
+        metric("repository_stage_seconds", "gauge", "Wall time per repository and stage",
+               [({"repository": repo, "stage": name}, counters_[f"{name}_seconds"])
+                for repo, counters_ in sorted(summary["repositories"].items())
+                for name in STAGES if f"{name}_seconds" in counters_])
+        for name in counters:
+            metric(f"repository_{name}", "gauge", f"{name.replace('_', ' ').capitalize()} per repository",
+                   [({"repository": repo}, counters_[name])
+                    for repo, counters_ in sorted(summary["repositories"].items()) if name in counters_])
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write("\n".join(lines) + "\n")
+
+    def write(self, output_dir: str) -> Dict[str, Any]:
+        """Write metrics.json, metrics.prom and, with --profile, the stage profiles; returns the summary."""
+        summary = self.summary()
+        self.write_json(os.path.join(output_dir, "metrics.json"), summary)
+        self.write_prometheus(os.path.join(output_dir, "metrics.prom"), summary)
+        if self.profiler is not None:
+            self.profiler.write()
+        return summary
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
@@ -0,0 +1,377 @@
+import asyncio
+import csv
+import os
+import tempfile
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from scraper import GitIngestScraper, GITINGEST_URL
+from repo_index import RepositoryDump
+from results import CSV_HEADERS, apply_rules, add_code_features, write_compaction_summary, write_dedup_summary, \
+    write_feature_sources, write_metrics_summary, write_triage_summary
+from run_manifest import RunManifest, content_hash, open_results_csv, upsert_results_csv
+from rule_pool import rule_row
+from metrics import text_bytes
+
+DEFAULT_STAGE_WORKERS = {"fetch": 16, "filter": 2, "chunk": 2, "llm": 4, "rules": 2}
+
+# Marks the end of a stage's input; each worker consumes exactly one
+_DONE = object()
+
+
+class Stage:
+    """One pipeline step: `workers` tasks applying `func` to items from a bounded queue.
+
+    func returns the item for the next stage, or None to drop it (e.g. a
+    failed fetch). Exceptions drop the item and are counted as failures;
+    on_error is called with the dropped item so it can release what it holds.
+    """
+
+    def __init__(self, name: str, func: Callable[[Dict[str, Any]], Awaitable[Optional[Dict[str, Any]]]],
+                 workers: int = 1, queue_size: int = 4,
+                 on_error: Optional[Callable[[Dict[str, Any]], None]] = None):
+        self.name = name
+        self.func = func
+        self.on_error = on_error
+        self.workers = max(1, workers)
+        self.queue_size = queue_size
+        self.processed = 0
+        self.failed = 0
+        self.busy_seconds = 0.0
+
+    async def _worker(self, inbox: asyncio.Queue, outbox: asyncio.Queue):
+        while True:
+            item = await inbox.get()
+            if item is _DONE:
+                return
+            started = time.perf_counter()
+            try:
+                result = await self.func(item)
+            except Exception as e:
+                print(f"[{self.name.upper()}] Error processing {item.get('repo')}: {str(e)}")
+                result = None
+                self.failed += 1
+                if self.on_error is not None:
+                    self.on_error(item)
+            self.busy_seconds += time.perf_counter() - started
+            self.processed += 1
+            if result is not None:
+                # Blocks while the next stage is saturated (backpressure)
+                await outbox.put(result)
+
+    async def run(self, inbox: asyncio.Queue, outbox: asyncio.Queue, downstream_workers: int):
+        await asyncio.gather(*(self._worker(inbox, outbox) for _ in range(self.workers)))
+        for _ in range(downstream_workers):
+            await outbox.put(_DONE)
+
+
+async def run_stages(items: List[Dict[str, Any]], stages: List[Stage],
+                     sink: Callable[[Dict[str, Any]], None]) -> int:
+    """Push items through the stages and hand every finished item to sink as it completes.
+
+    Returns the number of items the sink failed on; like a failing stage, a
+    failing sink drops the item instead of aborting the run.
+    """
+    queues = [asyncio.Queue(maxsize=stage.queue_size) for stage in stages]
+    results = asyncio.Queue(maxsize=stages[-1].queue_size)
+
+    async def feed():
+        for item in items:
+            await queues[0].put(item)
+        for _ in range(stages[0].workers):
+            await queues[0].put(_DONE)
+
+    sink_failed = 0
+
+    async def drain():
+        nonlocal sink_failed
+        while True:
+            item = await results.get()
+            if item is _DONE:
+                return
+            try:
+                sink(item)
+            except Exception as e:
+                print(f"[WRITE] Error processing {item.get('repo')}: {str(e)}")
+                sink_failed += 1
+
+    runners = []
+    for index, stage in enumerate(stages):
+        outbox = queues[index + 1] if index + 1 < len(stages) else results
+        downstream = stages[index + 1].workers if index + 1 < len(stages) else 1
+        runners.append(stage.run(queues[index], outbox, downstream))
+    await asyncio.gather(feed(), drain(), *runners)
+    return sink_failed
+
+
+class RepositoryPipeline:
+    """Streaming fetch -> filter -> chunk -> LLM -> rules -> CSV pipeline.
+
+    Every stage has its own worker count and a bounded input queue, so the
+    scraper and the LLM API are busy at the same time and a repository's
+    row is written as soon as it finishes.
+
+    With a run manifest, repositories finished with the same configuration
+    are skipped (or, with recheck, skipped once their content hash matches),
+    and rows are appended to the CSV instead of rewriting it.
+    """
+
+    def __init__(self, analyzer, backend, output_dir: str, base_url: str = GITINGEST_URL,
+                 stage_workers: Optional[Dict[str, int]] = None, queue_size: int = 4,
+                 save_intermediates: bool = True, manifest: Optional[RunManifest] = None,
+                 recheck: bool = False, rule_pool=None, corpus=None, results_store=None):
+        self.analyzer = analyzer
+        self.backend = backend
+        self.output_dir = output_dir
+        self.base_url = base_url
+        self.stage_workers = dict(DEFAULT_STAGE_WORKERS, **(stage_workers or {}))
+        # The in-flight bound is sized for the configured LLM workers; with request packing,
+        # more repositories wait in the LLM stage at once so their small chunks can share requests
+        self.llm_client_workers = self.stage_workers["llm"]
+        if analyzer.packer is not None:
+            self.stage_workers["llm"] = max(self.stage_workers["llm"], analyzer.packer.max_sections * 2)
+        self.queue_size = queue_size
+        self.save_intermediates = save_intermediates
+        self.manifest = manifest
+        self.recheck = recheck
+        # Optional rule_pool.RulePool: the detectors run in worker processes on the dump file
+        self.rule_pool = rule_pool
+        # Optional corpus_store.CorpusStore replacing the intermediate text files
+        self.corpus = corpus
+        if corpus is not None:
+            self.save_intermediates = False
+        # Optional results_store.ResultsStore receiving every finished row
+        self.results_store = results_store
+        self.metrics = analyzer.metrics
+        self.llm = None
+        self.write_failed = 0
+
+    def _parse(self, repo: str, html: str) -> Optional[Dict[str, Any]]:
+        results = GitIngestScraper(repo, base_url=self.base_url).parse_repository_data(html)
+        if not results['directory_structure'] or not results['textarea_content']:
+            return None
+        return results
+
+    async def fetch(self, job):
+        print(f"\nScraping {job['repo']}...")
+        if hasattr(self.backend, 'ingest'):
+            # A local mirror yields the parsed data directly
+            results = await self.backend.ingest(job['repo'])
+            if results:
+                self.metrics.add("bytes_in", text_bytes(results['textarea_content']))
+        else:
+            html = await self.backend.fetch(GitIngestScraper(job['repo'], base_url=self.base_url).base_url)
+            if html:
+                self.metrics.add("bytes_in", text_bytes(html))
+            results = await asyncio.to_thread(self.metrics.profiled("fetch", self._parse), job['repo'], html) \
+                if html else None
+        if not results:
+            print(f"Failed to fetch data for {job['repo']}")
+            return None
+        job['directory_structure'] = results['directory_structure']
+        job['raw_content'] = results['textarea_content']
+        print(f"Successfully scraped {job['repo']}")
+        return job
+
+    def _filter_and_save(self, job):
+        scraper = GitIngestScraper(job['repo'], base_url=self.base_url)
+        base_filename = os.path.join(self.output_dir, job['repo'].replace('/', '_'))
+        if self.save_intermediates:
+            with open(f'{base_filename}_directory_structure.txt', 'w', encoding='utf-8') as f:
+                f.write(job['directory_structure'])
+        if self.analyzer.streaming:
+            job = self._filter_to_file(job, scraper, base_filename)
+        else:
+            # The indexed dump is shared by the chunk, LLM and rules stages
+            job['code_content'] = scraper.filter_dump(job.pop('raw_content'), job['directory_structure'])
+            if self.save_intermediates:
+                job['code_path'] = f'{base_filename}_code_content.txt'
+                with open(job['code_path'], 'wb') as f:
+                    f.write(job['code_content'].data)
+        if self.corpus is not None:
+            self.corpus.put(job['repo'], job['directory_structure'], job['code_content'])
+        return job
+
+    def _filter_to_file(self, job, scraper, base_filename):
+        # The filtered dump goes to disk and is memory-mapped back, so the
+        # later stages never hold more than a segment or a batch of chunks
+        if self.save_intermediates:
+            path = f'{base_filename}_code_content.txt'
+        else:
+            fd, path = tempfile.mkstemp(prefix='dump_', suffix='.txt', dir=self.output_dir)
+            os.close(fd)
+            job['spill_path'] = path
+        scraper.write_filtered_dump(job.pop('raw_content'), path)
+        job['code_path'] = path
+        job['code_content'] = RepositoryDump.open(path, job['directory_structure'])
+        return job
+
+    def _release(self, job):
+        # Also called for repositories dropped by a failing stage, which may hold neither
+        if 'code_content' in job:
+            job['code_content'].close()
+        spill_path = job.pop('spill_path', None)
+        if spill_path is not None and os.path.exists(spill_path):
+            os.remove(spill_path)
+
+    async def filter(self, job):
+        job = await asyncio.to_thread(self.metrics.profiled("filter", self._filter_and_save), job)
+        self.metrics.add("bytes_out", len(job['code_content'].data))
+        if self.manifest is not None:
+            job['content_hash'] = await asyncio.to_thread(self.metrics.profiled("filter", content_hash),
+                                                          job['directory_structure'], job['code_content'])
+            if job.get('previous_hash') == job['content_hash']:
+                print(f"[RESUME] {job['repo']}: content and configuration unchanged; keeping the previous row")
+                self._release(job)
+                self.manifest.keep(job['repo'])
+                job['unchanged'] = True
+                return None
+            self.manifest.set_content_hash(job['repo'], job['content_hash'])
+        return job
+
+    def _prepare(self, job):
+        job['settled'] = self.analyzer.settle_features(job['code_content'])
+        if not self.analyzer.needs_llm(job['settled']):
+            return [], None
+        return self.analyzer.prepare_chunks(job['code_content'], job['repo'], job['settled'])
+
+    async def chunk(self, job):
+        # In streaming mode the chunks are produced lazily while the LLM stage consumes them
+        job['chunks'], job['ledger'] = await asyncio.to_thread(self.metrics.profiled("chunk", self._prepare), job)
+        return job
+
+    async def analyze(self, job):
+        print(f"\n[ANALYSIS] Starting LLM analysis of {job['repo']}...")
+        job['code_results'] = await self.analyzer.analyze_chunks_async(job.pop('chunks'), self.llm,
+                                                                       job.pop('settled'), job['repo'],
+                                                                       job.pop('ledger'))
+        return job
+
+    def _rules(self, job):
+        try:
+            row_data = apply_rules(self.analyzer, job['repo'], job['directory_structure'], job['code_content'])
+        finally:
+            self._release(job)
+        return add_code_features(row_data, job['code_results'])
+
+    async def _pooled_rules(self, job):
+        # Workers memory-map the dump file themselves; only its path crosses the process boundary
+        try:
+            result = await asyncio.wrap_future(self.rule_pool.submit(
+                job['repo'], job['code_path'], directory_structure=job['directory_structure']))
+        finally:
+            self._release(job)
+        return add_code_features(rule_row(job['repo'], result), job['code_results'])
+
+    async def rules(self, job):
+        if self.rule_pool is not None and 'code_path' in job:
+            row = await self._pooled_rules(job)
+        else:
+            row = await asyncio.to_thread(self.metrics.profiled("rules", self._rules), job)
+        return {'repo': job['repo'], 'row': row, 'content_hash': job.get('content_hash'),
+                'code_results': job['code_results']}
+
+    def _tracked(self, name: str, func):
+        """Record in the run manifest which stage a repository reached and where it failed."""
+        if self.manifest is None:
+            return func
+
+        async def run(job):
+            self.manifest.start(job['repo'], name)
+            try:
+                result = await func(job)
+            except Exception as e:
+                self.manifest.fail(job['repo'], name, str(e))
+                raise
+            if result is None and not job.get('unchanged'):
+                self.manifest.fail(job['repo'], name, "no result")
+            return result
+        return run
+
+    def _measured(self, name: str, func):
+        """Time each repository's pass through a stage and attribute the counters recorded meanwhile to it."""
+        async def run(job):
+            with self.metrics.stage(name, job['repo'], profile=False):
+                return await func(job)
+        return run
+
+    def stages(self) -> List[Stage]:
+        workers = self.stage_workers
+        return [
+            Stage(name, self._tracked(name, self._measured(name, func)), workers[name], self.queue_size,
+                  on_error=self._release)
+            for name, func in (("fetch", self.fetch), ("filter", self.filter), ("chunk", self.chunk),
+                               ("llm", self.analyze), ("rules", self.rules))
+        ]
+
+    def _pending_jobs(self, repo_data) -> List[Dict[str, Any]]:
+        jobs = [{'repo': repo, 'deployment': deployment} for repo, deployment in repo_data]
+        if self.manifest is None:
+            return jobs
+        if self.recheck:
+            # Stage tracking overwrites the status, so remember what was finished before the run
+            for job in jobs:
+                if self.manifest.is_done(job['repo']):
+                    job['previous_hash'] = self.manifest.get(job['repo'])["content_hash"]
+            return jobs
+        pending = [job for job in jobs if not self.manifest.is_done(job['repo'])]
+        if len(pending) < len(jobs):
+            print(f"[RESUME] Skipping {len(jobs) - len(pending)} repositories already analyzed with this "
+                  f"configuration; {len(pending)} to go")
+        return pending
+
+    async def _run(self, repo_data, writer, csvfile) -> List[Stage]:
+        jobs = self._pending_jobs(repo_data)
+        stages = self.stages()
+
+        def write_row(item):
+            writer.writerow(item['row'])
+            csvfile.flush()
+            if self.manifest is not None:
+                self.manifest.complete(item['repo'], item['row'], item['content_hash'])
+            if self.results_store is not None:
+                self.results_store.record(item['repo'], item['row'], item['code_results'], item['content_hash'])
+            print(f"Added analysis results for {item['repo']} (Detected deployment: {item['row']['deployment']})")
+
+        # One client for the whole run so the in-flight bound covers all repositories
+        self.llm = self.analyzer.create_llm_client(self.analyzer.max_in_flight * self.llm_client_workers)
+        async with self.backend, self.llm:
+            # Blocking stage work is profiled in its threads; this covers the coroutines
+            with self.metrics.profile("event_loop"):
+                try:
+                    self.write_failed = await run_stages(jobs, stages, write_row)
+                finally:
+                    if self.analyzer.packer is not None:
+                        await self.analyzer.packer.close(self.llm)
+        return stages
+
+    def run(self, repo_data) -> str:
+        csv_path = os.path.join(self.output_dir, "analysis_results.csv")
+        if self.manifest is None:
+            csvfile = open(csv_path, 'w', newline='')
+            writer = csv.DictWriter(csvfile, fieldnames=CSV_HEADERS)
+            writer.writeheader()
+        else:
+            csvfile, writer = open_results_csv(csv_path, CSV_HEADERS)
+        with csvfile:
+            stages = asyncio.run(self._run(repo_data, writer, csvfile))
+        if self.manifest is not None:
+            upsert_results_csv(csv_path, CSV_HEADERS, self.manifest.done_rows(repo for repo, _ in repo_data))
+
+        write_triage_summary(self.analyzer, self.output_dir)
+        write_compaction_summary(self.analyzer, self.output_dir)
+        write_feature_sources(self.analyzer, self.output_dir)
+        write_dedup_summary(self.analyzer, self.output_dir)
+        write_metrics_summary(self.analyzer, self.output_dir)
+
+        print("\n=== Pipeline Summary ===")
+        for stage in stages:
+            print(f"{stage.name}: {stage.processed} processed, {stage.failed} failed, "
+                  f"{stage.busy_seconds:.1f}s busy across {stage.workers} worker(s)")
+        if self.write_failed:
+            print(f"write: {self.write_failed} failed")
+        if self.analyzer.packer is not None:
+            print(f"[PACK] {self.analyzer.packer.summary()}")
+        if self.manifest is not None:
+            statuses = self.manifest.summary(repo for repo, _ in repo_data)
+            print("Run manifest: " + ", ".join(f"{count} {status}" for status, count in sorted(statuses.items())))
+        return csv_path
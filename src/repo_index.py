@@ -0,0 +1,329 @@
+import mmap
+import os
+from typing import BinaryIO, Dict, Iterator, List, NamedTuple, Optional, Union
+
+SEPARATOR = b'=' * 48
+FILE_MARKER = b'\nFile:'
+
+# Streaming reads work on segments of this size, so memory stays bounded
+SEGMENT_SIZE = 1 << 20
+
+
+class FileEntry(NamedTuple):
+    path: str
+    header_offset: int  # start of the '=' * 48 line opening the file
+    offset: int         # first byte of the file body
+    length: int         # body length in bytes, without the newline before the next header
+    extension: str
+    size: int           # whole block, header included
+
+
+class PathTrie:
+    """Directory tree parsed from gitingest's 'Directory structure:' drawing."""
+
+    def __init__(self):
+        self.root: Dict[str, dict] = {}
+
+    @classmethod
+    def from_directory_structure(cls, directory_structure: str) -> 'PathTrie':
+        trie = cls()
+        stack: List[str] = []
+        for line in directory_structure.split('\n'):
+            marker = max(line.find('├── '), line.find('└── '))
+            if marker < 0:
+                continue
+            depth = marker // 4
+            name = line[marker + 4:].strip()
+            is_dir = name.endswith('/')
+            name = name.rstrip('/')
+            del stack[depth:]
+            stack.append(name)
+            # The first level is the repository folder itself
+            parts = stack[1:]
+            if parts:
+                trie.insert('/'.join(parts), is_dir=is_dir)
+        return trie
+
+    def insert(self, path: str, is_dir: bool = False):
+        node = self.root
+        for part in path.strip('/').split('/'):
+            node = node.setdefault(part, {})
+        if not is_dir:
+            node.setdefault(None, True)
+
+    def _node(self, path: str) -> Optional[dict]:
+        node = self.root
+        for part in path.strip('/').split('/'):
+            if part not in node:
+                return None
+            node = node[part]
+        return node
+
+    def __contains__(self, path: str) -> bool:
+        return self._node(path) is not None
+
+    def is_dir(self, path: str) -> bool:
+        node = self._node(path)
+        return node is not None and any(key is not None for key in node)
+
+    def paths(self, prefix: str = '') -> Iterator[str]:
+        """Yield every file path, optionally below a directory prefix."""
+        start = self._node(prefix) if prefix else self.root
+        if start is None:
+            return
+        stack = [(prefix.strip('/'), start)]
+        while stack:
+            base, node = stack.pop()
+            for name, child in sorted(((k, v) for k, v in node.items() if k is not None), reverse=True):
+                path = f"{base}/{name}" if base else name
+                if None in child:
+                    yield path
+                stack.append((path, child))
+
+    def files_named(self, name: str) -> List[str]:
+        return [path for path in self.paths() if path.rsplit('/', 1)[-1] == name]
+
+
+class RepositoryDump:
+    """Index over a gitingest code dump: file path -> byte range, built in one pass.
+
+    The dump is kept as UTF-8 bytes and files are decoded only when asked
+    for, so per-file checks touch kilobytes instead of the whole dump.
+    RepositoryDump.open() memory-maps a file instead of reading it; all
+    iteration then works segment by segment, so peak memory is bounded by
+    the segment and chunk sizes rather than by the size of the repository.
+    """
+
+    def __init__(self, data: Union[bytes, mmap.mmap], directory_structure: Optional[str] = None):
+        self.data = data
+        self.directory_structure = directory_structure
+        self._file = None
+        self.preamble_length = 0
+        self.files: Dict[str, FileEntry] = {}
+        self._entries: List[FileEntry] = []
+        self._by_name: Dict[str, List[FileEntry]] = {}
+        self._tree = None
+        self._build_index()
+
+    @classmethod
+    def from_text(cls, text: str, directory_structure: Optional[str] = None) -> 'RepositoryDump':
+        return cls(text.encode('utf-8', 'surrogatepass'), directory_structure)
+
+    @classmethod
+    def from_file(cls, path: str, directory_structure: Optional[str] = None) -> 'RepositoryDump':
+        with open(path, 'rb') as f:
+            return cls(f.read(), directory_structure)
+
+    @classmethod
+    def open(cls, path: str, directory_structure: Optional[str] = None) -> 'RepositoryDump':
+        """Memory-map a dump file; call close() (or use as a context manager) when done."""
+        return cls.map_file(open(path, 'rb'), directory_structure)
+
+    @classmethod
+    def map_file(cls, f: BinaryIO, directory_structure: Optional[str] = None) -> 'RepositoryDump':
+        """Memory-map an open binary file, which the dump then owns and closes."""
+        if os.fstat(f.fileno()).st_size == 0:
+            f.close()
+            return cls(b'', directory_structure)
+        dump = cls(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ), directory_structure)
+        dump._file = f
+        return dump
+
+    def close(self):
+        if isinstance(self.data, mmap.mmap):
+            self.data.close()
+            self.data = b''
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    @property
+    def streaming(self) -> bool:
+        return isinstance(self.data, mmap.mmap)
+
+    def _release(self, start: int, end: int):
+        """Drop mapped pages of a range already read so they stop counting towards RSS."""
+        if not self.streaming or not hasattr(mmap, 'MADV_DONTNEED'):
+            return
+        start = -(-start // mmap.PAGESIZE) * mmap.PAGESIZE
+        end = end // mmap.PAGESIZE * mmap.PAGESIZE if end < len(self.data) else len(self.data)
+        if end > start:
+            self.data.madvise(mmap.MADV_DONTNEED, start, end - start)
+
+    @classmethod
+    def coerce(cls, code_content: Union[str, 'RepositoryDump'], directory_structure: Optional[str] = None) -> 'RepositoryDump':
+        if isinstance(code_content, RepositoryDump):
+            return code_content
+        return cls.from_text(code_content, directory_structure)
+
+    def _header_starts(self) -> Iterator[int]:
+        data = self.data
+        first_newline = data.find(b'\n')
+        if data[:len(SEPARATOR)] == SEPARATOR and data[first_newline + 1:first_newline + 6] == b'File:':
+            yield 0
+        position = data.find(FILE_MARKER)
+        released = 0
+        while position >= 0:
+            line_start = data.rfind(b'\n', 0, position) + 1
+            if line_start > 0 and data[line_start:line_start + len(SEPARATOR)] == SEPARATOR:
+                yield line_start
+            if position - released > SEGMENT_SIZE:
+                self._release(released, line_start)
+                released = line_start
+            position = data.find(FILE_MARKER, position + 1)
+
+    def _build_index(self):
+        data = self.data
+        starts = list(self._header_starts())
+        self.preamble_length = starts[0] if starts else len(data)
+        released = 0
+        for index, header_start in enumerate(starts):
+            if header_start - released > SEGMENT_SIZE:
+                self._release(released, header_start)
+                released = header_start
+            block_end = starts[index + 1] if index + 1 < len(starts) else len(data)
+            file_line_start = data.find(b'\n', header_start) + 1
+            file_line_end = data.find(b'\n', file_line_start)
+            if file_line_end < 0 or file_line_end > block_end:
+                file_line_end = block_end
+            closing_end = data.find(b'\n', file_line_end + 1) if file_line_end < block_end else -1
+            body_start = closing_end + 1 if 0 <= closing_end < block_end else block_end
+            body_end = block_end - 1 if index + 1 < len(starts) else block_end
+            path = data[file_line_start + len(b'File:'):file_line_end].decode('utf-8', 'replace').strip()
+            entry = FileEntry(
+                path=path,
+                header_offset=header_start,
+                offset=body_start,
+                length=max(0, body_end - body_start),
+                extension=os.path.splitext(path)[1].lower(),
+                size=block_end - header_start,
+            )
+            self._entries.append(entry)
+            self.files[path] = entry
+            self._by_name.setdefault(path.rsplit('/', 1)[-1].lower(), []).append(entry)
+        # Indexing touched every page; they are read back from the page cache on demand
+        self._release(0, len(data))
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __iter__(self) -> Iterator[FileEntry]:
+        return iter(self._entries)
+
+    @property
+    def tree(self) -> PathTrie:
+        if self._tree is None:
+            if self.directory_structure:
+                self._tree = PathTrie.from_directory_structure(self.directory_structure)
+            else:
+                self._tree = PathTrie()
+                for entry in self._entries:
+                    self._tree.insert(entry.path)
+        return self._tree
+
+    def raw(self, entry: FileEntry) -> bytes:
+        return self.data[entry.offset:entry.offset + entry.length]
+
+    def release(self, entry: FileEntry):
+        """Let the mapped pages of a file that has been read go (streaming dumps only)."""
+        self._release(entry.header_offset, entry.offset + entry.length)
+
+    def text(self, path: Union[str, FileEntry]) -> str:
+        entry = path if isinstance(path, FileEntry) else self.files[path]
+        return self.raw(entry).decode('utf-8', 'replace')
+
+    def files_named(self, name: str) -> List[FileEntry]:
+        return self._by_name.get(name.lower(), [])
+
+    def file_contains(self, name: str, needle: str) -> bool:
+        """Case-insensitive search restricted to files with the given base name."""
+        pattern = needle.lower().encode('utf-8')
+        return any(pattern in self.raw(entry).lower() for entry in self.files_named(name))
+
+    def iter_lowered_windows(self, overlap: int = 0, window: int = SEGMENT_SIZE) -> Iterator[str]:
+        """Lowercased windows of the dump for ASCII signal matching.
+
+        Consecutive windows share `overlap` bytes so a pattern up to
+        overlap + 1 bytes long is never split. latin-1 keeps one char per byte.
+        """
+        size = len(self.data)
+        start = 0
+        while start < size:
+            end = min(size, start + window)
+            yield self.data[max(0, start - overlap):end].lower().decode('latin-1')
+            self._release(max(0, start - overlap), end - overlap)
+            start = end
+
+    def _iter_segment_lines(self, start: int, end: int) -> Iterator[str]:
+        """Lines of data[start:end] as split('\\n') would give them, read segment by segment."""
+        carry = b''
+        for position in range(start, end, SEGMENT_SIZE):
+            segment = carry + self.data[position:min(end, position + SEGMENT_SIZE)]
+            self._release(position, min(end, position + SEGMENT_SIZE))
+            cut = segment.rfind(b'\n')
+            if cut < 0:
+                # A line longer than a segment is carried until its end shows up
+                carry = segment
+                continue
+            yield from segment[:cut].decode('utf-8', 'replace').split('\n')
+            carry = segment[cut + 1:]
+        yield carry.decode('utf-8', 'replace')
+
+    def blocks(self) -> Iterator[tuple]:
+        """Yield (entry or None, start, end) byte ranges covering the dump in order."""
+        if self.preamble_length:
+            yield None, 0, self.preamble_length
+        for entry in self._entries:
+            yield entry, entry.header_offset, entry.header_offset + entry.size
+
+    def iter_lines(self, keep=None) -> Iterator[str]:
+        """Same lines as text.split('\\n'), decoded one file at a time.
+
+        keep(entry) -> False leaves a file out entirely, header included.
+        """
+        blocks = [block for block in self.blocks() if keep is None or block[0] is None or keep(block[0])]
+        blocks = blocks or [(None, 0, 0)]
+        last = len(blocks) - 1
+        for index, (_, start, end) in enumerate(blocks):
+            if index != last:
+                # Every block but the last ends with the newline before the next header
+                end -= 1
+            yield from self._iter_segment_lines(start, end)
+
+    def render(self, keep_body=lambda entry: True) -> str:
+        """Reassemble the dump, dropping the bodies of files for which keep_body is False."""
+        return self.render_bytes(keep_body).decode('utf-8', 'replace')
+
+    def filtered(self, keep_body) -> 'RepositoryDump':
+        """New indexed dump without the bodies of files for which keep_body is False."""
+        return RepositoryDump(self.render_bytes(keep_body), self.directory_structure)
+
+    def _kept_ranges(self, keep_body) -> Iterator[tuple]:
+        yield 0, self.preamble_length
+        last = len(self._entries) - 1
+        for index, entry in enumerate(self._entries):
+            if keep_body(entry):
+                yield entry.header_offset, entry.header_offset + entry.size
+                continue
+            header_end = entry.offset
+            if index == last and header_end > entry.header_offset and self.data[header_end - 1:header_end] == b'\n':
+                header_end -= 1
+            yield entry.header_offset, header_end
+
+    def render_bytes(self, keep_body=lambda entry: True) -> bytes:
+        return b''.join(self.data[start:end] for start, end in self._kept_ranges(keep_body))
+
+    def write_filtered(self, out: BinaryIO, keep_body=lambda entry: True) -> int:
+        """Stream the filtered dump to a binary file without building it in memory."""
+        written = 0
+        for start, end in self._kept_ranges(keep_body):
+            for position in range(start, end, SEGMENT_SIZE):
+                written += out.write(self.data[position:min(end, position + SEGMENT_SIZE)])
+                self._release(position, min(end, position + SEGMENT_SIZE))
+        return written
@@ -0,0 +1,152 @@
+"""Cross-repository request packing: small chunks of several repositories share one LLM request.
+
+A tiny repository yields a single under-filled chunk, so the system and
+feature prompts dominate the cost of its request. The packer holds small
+chunks (from any repository being analyzed concurrently) for a moment,
+sends them together as delimited sections and asks for one JSON answer per
+section id. Each section's answer is validated on its own. Sections that
+fail are re-split into smaller packs, down to an ordinary single-chunk request.
+"""
+import asyncio
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+# Expected answer size per section: the JSON schema filled in for every feature
+SECTION_ANSWER_TOKENS = 700
+DEFAULT_SMALL_CHUNK_TOKENS = 2000
+
+
+class _Section:
+    def __init__(self, chunk_num: int, chunk: str, tokens: int):
+        self.chunk_num = chunk_num
+        self.chunk = chunk
+        self.tokens = tokens
+        self.future: asyncio.Future = asyncio.get_running_loop().create_future()
+
+
+class RequestPacker:
+    """Groups small chunks asked about the same features into packed requests.
+
+    analyzer provides token_counter, context_tokens, _build_packed_messages,
+    _parse_packed_response and _request_chunk_async (the single-chunk request).
+    """
+
+    def __init__(self, analyzer, max_sections: int = 8, small_tokens: int = DEFAULT_SMALL_CHUNK_TOKENS,
+                 linger: float = 0.5):
+        self.analyzer = analyzer
+        self.max_sections = max(2, max_sections)
+        self.small_tokens = small_tokens
+        self.linger = linger
+        self._pending: Dict[Optional[Tuple[str, ...]], List[_Section]] = {}
+        self._timers: Dict[Optional[Tuple[str, ...]], asyncio.TimerHandle] = {}
+        self._overhead: Dict[Optional[Tuple[str, ...]], int] = {}
+        # The event loop only keeps weak references to tasks; hold the sends until they finish
+        self._tasks: Set[asyncio.Task] = set()
+        self.requests = 0
+        self.sections = 0
+        self.resplits = 0
+
+    def _capacity(self, features: Optional[List[str]], count: int) -> int:
+        key = tuple(features) if features is not None else None
+        if key not in self._overhead:
+            self._overhead[key] = sum(self.analyzer.token_counter.count(message["content"]) + 4
+                                      for message in self.analyzer._build_packed_messages([], features))
+        return self.analyzer.context_tokens - self._overhead[key] - count * (SECTION_ANSWER_TOKENS + 8)
+
+    def small_tokens_of(self, chunk: str) -> Optional[int]:
+        """Token count of a chunk small enough to pack, else None."""
+        # Most chunks fill the budget; skip counting those
+        if len(chunk) > self.small_tokens * 8:
+            return None
+        tokens = self.analyzer.token_counter.count(chunk)
+        return tokens if tokens <= self.small_tokens else None
+
+    async def submit(self, llm, chunk_num: int, chunk: str, tokens: int,
+                     features: Optional[List[str]] = None) -> Optional[Dict[str, Any]]:
+        """Analyze a small chunk as one section of a packed request; returns its parsed answer."""
+        key = tuple(features) if features is not None else None
+        section = _Section(chunk_num, chunk, tokens)
+        pending = self._pending.setdefault(key, [])
+        if pending and (len(pending) + 1 > self.max_sections or
+                        sum(s.tokens for s in pending) + tokens > self._capacity(features, len(pending) + 1)):
+            self._flush(llm, key, features)
+            pending = self._pending.setdefault(key, [])
+        pending.append(section)
+        if len(pending) >= self.max_sections:
+            self._flush(llm, key, features)
+        elif key not in self._timers:
+            self._timers[key] = asyncio.get_running_loop().call_later(self.linger, self._flush, llm, key, features)
+        return await section.future
+
+    def _flush(self, llm, key, features):
+        timer = self._timers.pop(key, None)
+        if timer is not None:
+            timer.cancel()
+        sections = self._pending.pop(key, [])
+        if sections:
+            task = asyncio.ensure_future(self._send_all(llm, sections, features))
+            self._tasks.add(task)
+            task.add_done_callback(self._task_done)
+
+    def _task_done(self, task: asyncio.Task):
+        self._tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            print(f"[PACK] UNEXPECTED ERROR: {str(task.exception())}")
+
+    async def _send_all(self, llm, sections: List[_Section], features: Optional[List[str]]):
+        try:
+            await self._send(llm, sections, features)
+        finally:
+            # Nobody awaiting a section may hang, whatever went wrong
+            for section in sections:
+                if not section.future.done():
+                    section.future.set_result(None)
+
+    async def _send(self, llm, sections: List[_Section], features: Optional[List[str]]):
+        if len(sections) == 1:
+            section = sections[0]
+            section.future.set_result(
+                await self.analyzer._request_chunk_async(llm, section.chunk_num, section.chunk, features))
+            return
+        self.requests += 1
+        self.sections += len(sections)
+        label = f"[PACK {self.requests}]"
+        ids = [f"s{index}" for index in range(1, len(sections) + 1)]
+        print(f"{label} Queued {len(sections)} chunks from small repositories "
+              f"({sum(s.tokens for s in sections)} tokens) as one request...")
+        try:
+            raw_response = await llm.complete(
+                self.analyzer._build_packed_messages(list(zip(ids, (s.chunk for s in sections))), features),
+                label=label,
+                model=self.analyzer.model,
+                temperature=0,
+                response_format={"type": "json_object"}
+            )
+            answers = self.analyzer._parse_packed_response(label, raw_response, ids, features)
+        except Exception as e:
+            print(f"{label} UNEXPECTED ERROR: {str(e)}")
+            answers = {}
+
+        failed = []
+        for section_id, section in zip(ids, sections):
+            if answers.get(section_id) is not None:
+                section.future.set_result(answers[section_id])
+            else:
+                failed.append(section)
+        if failed:
+            # Halve the failed sections; a single one falls back to an ordinary request
+            self.resplits += 1
+            print(f"{label} {len(failed)}/{len(sections)} section(s) failed validation; re-splitting")
+            middle = (len(failed) + 1) // 2
+            await asyncio.gather(*(self._send(llm, part, features) for part in (failed[:middle], failed[middle:])
+                                   if part))
+
+    async def close(self, llm):
+        """Send whatever is still pending and wait for every packed request to finish."""
+        for key in list(self._pending):
+            self._flush(llm, key, list(key) if key is not None else None)
+        # Failures are reported by _task_done
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def summary(self) -> str:
+        return (f"{self.sections} small chunk(s) sent in {self.requests} packed request(s), "
+                f"{self.resplits} re-split after failed validation")
@@ -0,0 +1,123 @@
+import csv
+import os
+from typing import Any, Dict
+from triage import write_triage_report
+from dedup import write_dedup_report
+from compaction import write_compaction_report
+
+INFRASTRUCTURE_FEATURES = [
+    "already_deployed",
+    "has_frontend",
+    "has_cicd",
+    "multiple_environments",
+    "uses_containerization",
+    "uses_iac",
+    "high_availability"
+]
+
+CODE_FEATURES = [
+    "authentication",
+    "realtime_events",
+    "storage",
+    "caching",
+    "ai_implementation",
+    "database",
+    "microservices",
+    "monolith",
+    "api_exposed",
+    "message_queues",
+    "background_jobs",
+    "sensitive_data",
+    "external_apis"
+]
+
+CSV_HEADERS = ["repository", "deployment", "framework"] + INFRASTRUCTURE_FEATURES + CODE_FEATURES
+
+
+def apply_rules(analyzer, repo: str, directory_structure: str, code_content: str) -> Dict[str, Any]:
+    """Run the rule-based detectors and return the non-LLM part of a CSV row."""
+    row_data = {
+        "repository": repo,
+        "deployment": analyzer.determine_deployment_platform(directory_structure, code_content, repo)
+    }
+    dir_results = analyzer.analyze_directory_structure(directory_structure)
+    for feature in INFRASTRUCTURE_FEATURES:
+        row_data[feature] = 1 if dir_results.get(feature, False) else 0
+    row_data["framework"] = analyzer.determine_framework(directory_structure, code_content)
+    return row_data
+
+
+def add_code_features(row_data: Dict[str, Any], code_results: Dict[str, Any]) -> Dict[str, Any]:
+    for feature in CODE_FEATURES:
+        row_data[feature] = 1 if code_results.get(feature, {}).get("present", False) else 0
+    return row_data
+
+
+def write_triage_summary(analyzer, output_dir: str):
+    """Write temp/triage_report.csv and print the run totals of what triage kept from the LLM."""
+    if not analyzer.triage_reports:
+        return
+    path = os.path.join(output_dir, "triage_report.csv")
+    reports = write_triage_report(path, analyzer.triage_reports)
+    skipped_bytes = sum(report.skipped_bytes for report in reports)
+    total_bytes = sum(report.bytes for report in reports)
+    skipped_tokens = sum(report.skipped_tokens for report in reports)
+    print(f"\n[TRIAGE] Skipped {skipped_bytes / 1024:.0f}/{total_bytes / 1024:.0f} KB (~{skipped_tokens} tokens) "
+          f"across {len(reports)} repositories; per-repository report in {path}")
+
+
+def write_compaction_summary(analyzer, output_dir: str):
+    """Write temp/compaction_report.csv and print the run's token counts before and after compaction."""
+    if not analyzer.compaction_reports:
+        return
+    path = os.path.join(output_dir, "compaction_report.csv")
+    reports = write_compaction_report(path, analyzer.compaction_reports)
+    tokens = sum(report.tokens for report in reports)
+    compacted = sum(report.compacted_tokens for report in reports)
+    print(f"\n[COMPACT] {tokens} -> {compacted} tokens ({1 - compacted / tokens if tokens else 0:.0%} saved) "
+          f"across {len(reports)} repositories; per-repository report in {path}")
+
+
+def write_feature_sources(analyzer, output_dir: str):
+    """Write temp/feature_sources.csv: per repository and feature, what decided it (manifest, classifier, llm)."""
+    if not analyzer.feature_sources:
+        return
+    path = os.path.join(output_dir, "feature_sources.csv")
+    with open(path, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=["repository"] + CODE_FEATURES)
+        writer.writeheader()
+        writer.writerows(analyzer.feature_sources)
+    settled = sum(1 for sources in analyzer.feature_sources for feature in CODE_FEATURES
+                  if sources.get(feature) == "manifest")
+    print(f"\n[MANIFEST] {settled} feature(s) across {len(analyzer.feature_sources)} repositories settled "
+          f"from dependency manifests; per-feature sources in {path}")
+
+
+def write_dedup_summary(analyzer, output_dir: str):
+    """Write temp/dedup_report.csv and print the run's dedup ratio and the API calls it saved."""
+    if not analyzer.dedup_ledgers:
+        return
+    path = os.path.join(output_dir, "dedup_report.csv")
+    rows = write_dedup_report(path, analyzer.dedup_ledgers)
+    files = sum(row["files"] for row in rows)
+    reused = sum(row["reused_files"] for row in rows)
+    saved = sum(row["reused_results"] for row in rows)
+    analyzed = sum(row["analyzed_chunks"] for row in rows)
+    print(f"\n[DEDUP] {reused}/{files} files ({reused / files if files else 0:.0%}) covered by results stored for "
+          f"other repositories or runs; {saved} API call(s) saved, {analyzed} chunk(s) analyzed across "
+          f"{len(rows)} repositories; per-repository report in {path}")
+
+
+def write_metrics_summary(analyzer, output_dir: str):
+    """Write temp/metrics.json and temp/metrics.prom (plus --profile output) and print the stage timings."""
+    summary = analyzer.metrics.write(output_dir)
+    totals = summary["totals"]
+    stages = ", ".join(f"{name} {stage['seconds']:.1f}s" for name, stage in summary["stages"].items())
+    hit_rate = summary["cache_hit_rate"]
+    print(f"\n[METRICS] {stages or 'no stages timed'}; {totals.get('llm_requests', 0):.0f} LLM request(s), "
+          f"{totals.get('prompt_tokens', 0):.0f} prompt + {totals.get('completion_tokens', 0):.0f} completion tokens, "
+          f"{totals.get('retries', 0):.0f} retries"
+          f"{f', {hit_rate:.0%} cache hit rate' if hit_rate is not None else ''}; "
+          f"metrics in {os.path.join(output_dir, 'metrics.json')} and metrics.prom")
+    if analyzer.metrics.profiler is not None:
+        print(f"[PROFILE] Stage profiles and tracemalloc snapshots in {analyzer.metrics.profiler.directory}")
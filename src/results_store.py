@@ -0,0 +1,447 @@
+"""Results store: per-repository analysis results with history, queryable without reloading the CSV.
+
+Every finished repository is upserted into a SQLite file next to the run
+manifest. A new version is recorded whenever a repository's result changes,
+together with the analyzer configuration that produced it (its fingerprint
+and settings) and the content hash of the scraped input, so earlier results
+stay available per configuration. The `current` table holds one compact row
+per repository: deployment and framework as ids into a label table and the
+feature matrix packed into one integer (bit i set when FEATURES[i] was
+detected). The LLM's details and improvements texts, which the CSV drops, are
+kept compressed with each version.
+
+Aggregations run over `current`, e.g. feature prevalence by deployment
+platform for 100k repositories in a few milliseconds:
+
+    python src/results_store.py prevalence --by deployment
+    python src/results_store.py query caching database --deployment Vercel
+    python src/results_store.py history owner/repo
+    python src/results_store.py export results.csv [--details]   # or results.parquet (needs pyarrow)
+"""
+import argparse
+import csv
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+import zlib
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+from results import CODE_FEATURES, CSV_HEADERS, INFRASTRUCTURE_FEATURES
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+DEFAULT_RESULTS_PATH = os.path.join("temp", "results.sqlite")
+FEATURES = INFRASTRUCTURE_FEATURES + CODE_FEATURES
+# Rows fetched (and written) per batch by the exports
+EXPORT_BATCH = 10000
+
+
+def pack_features(row: Dict[str, Any], features: List[str] = FEATURES) -> int:
+    return sum(1 << index for index, feature in enumerate(features) if int(row.get(feature) or 0))
+
+
+def unpack_features(mask: int, features: List[str] = FEATURES) -> Dict[str, int]:
+    return {feature: mask >> index & 1 for index, feature in enumerate(features)}
+
+
+def pack_details(code_results: Optional[Dict[str, Any]]) -> Optional[bytes]:
+    """The LLM's details/improvements texts as compressed JSON (None when there are none)."""
+    texts = {}
+    for feature, result in (code_results or {}).items():
+        details, improvements = result.get("details") or "", result.get("improvements") or ""
+        if details or improvements:
+            texts[feature] = [details, improvements]
+    return zlib.compress(json.dumps(texts, sort_keys=True).encode('utf-8')) if texts else None
+
+
+def unpack_details(blob: Optional[bytes]) -> Dict[str, List[str]]:
+    return json.loads(zlib.decompress(blob)) if blob else {}
+
+
+class ResultsStore:
+    """SQLite store of analysis results: current rows for aggregation, every version as history."""
+
+    def __init__(self, path: str = DEFAULT_RESULTS_PATH, config: str = "", settings: Optional[Dict[str, Any]] = None):
+        if path != ":memory:" and os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.path = path
+        self.config = config
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS labels (id INTEGER PRIMARY KEY, name TEXT NOT NULL UNIQUE)")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS configs (config TEXT PRIMARY KEY, settings TEXT, first_seen REAL NOT NULL)")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS results ("
+            " id INTEGER PRIMARY KEY, repo TEXT NOT NULL, version INTEGER NOT NULL, config TEXT NOT NULL,"
+            " recorded REAL NOT NULL, content_hash TEXT, deployment INTEGER NOT NULL, framework INTEGER NOT NULL,"
+            " features INTEGER NOT NULL, details BLOB, UNIQUE (repo, version))"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS results_config ON results(config, repo, version)")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS current ("
+            " repo TEXT PRIMARY KEY, result INTEGER NOT NULL, deployment INTEGER NOT NULL,"
+            " framework INTEGER NOT NULL, features INTEGER NOT NULL) WITHOUT ROWID"
+        )
+        # Current repositories per (deployment, framework) and, per feature bit, how many have it
+        # (bit -1: all of them); kept up to date by record() so aggregations need no scan
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS tallies ("
+            " deployment INTEGER NOT NULL, framework INTEGER NOT NULL, bit INTEGER NOT NULL,"
+            " repositories INTEGER NOT NULL, PRIMARY KEY (deployment, framework, bit)) WITHOUT ROWID"
+        )
+        self._labels: Dict[str, int] = {}
+        self._names: Dict[int, str] = {}
+        self._load_labels()
+        self._check_layout()
+        if config:
+            self._conn.execute("INSERT OR IGNORE INTO configs (config, settings, first_seen) VALUES (?, ?, ?)",
+                               (config, json.dumps(settings, sort_keys=True) if settings else None, time.time()))
+
+    def _check_layout(self):
+        """Re-pack stored feature masks when the feature list changed since they were written."""
+        found = self._conn.execute("SELECT value FROM meta WHERE key = 'features'").fetchone()
+        stored = json.loads(found[0]) if found else None
+        if stored == FEATURES:
+            return
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            if stored is not None:
+                print(f"[RESULTS] Feature list changed; re-packing the stored results of {self.path}")
+                for table, key in (("results", "id"), ("current", "repo")):
+                    rows = self._conn.execute(f"SELECT {key}, features FROM {table}").fetchall()
+                    self._conn.executemany(
+                        f"UPDATE {table} SET features = ? WHERE {key} = ?",
+                        [(pack_features(unpack_features(mask, stored)), row_key) for row_key, mask in rows])
+                self._conn.execute("DELETE FROM tallies")
+                for deployment, framework, features in self._conn.execute(
+                        "SELECT deployment, framework, features FROM current").fetchall():
+                    self._tally(deployment, framework, features, 1)
+            self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('features', ?)",
+                               (json.dumps(FEATURES),))
+            self._conn.execute("COMMIT")
+        except BaseException:
+            self._conn.execute("ROLLBACK")
+            raise
+
+    def _tally(self, deployment: int, framework: int, features: int, change: int):
+        bits = [-1] + [bit for bit in range(features.bit_length()) if features >> bit & 1]
+        self._conn.executemany(
+            "INSERT INTO tallies (deployment, framework, bit, repositories) VALUES (?, ?, ?, ?)"
+            " ON CONFLICT(deployment, framework, bit)"
+            " DO UPDATE SET repositories = repositories + excluded.repositories",
+            [(deployment, framework, bit, change) for bit in bits])
+
+    def _load_labels(self):
+        for label_id, name in self._conn.execute("SELECT id, name FROM labels"):
+            self._labels[name], self._names[label_id] = label_id, name
+
+    def _name(self, label_id: int) -> str:
+        if label_id not in self._names:
+            # Written by another process since the labels were loaded
+            self._load_labels()
+        return self._names[label_id]
+
+    def _label(self, name: str) -> int:
+        label_id = self._labels.get(name)
+        if label_id is None:
+            self._conn.execute("INSERT OR IGNORE INTO labels (name) VALUES (?)", (name,))
+            label_id = self._conn.execute("SELECT id FROM labels WHERE name = ?", (name,)).fetchone()[0]
+            self._labels[name], self._names[label_id] = label_id, name
+        return label_id
+
+    def record(self, repo: str, row: Dict[str, Any], code_results: Optional[Dict[str, Any]] = None,
+               content_hash: Optional[str] = None) -> int:
+        """Upsert a repository's CSV row (and the LLM's texts); returns its version.
+
+        An unchanged result (same configuration, input and values) keeps its version.
+        """
+        features = pack_features(row)
+        details = pack_details(code_results)
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                deployment = self._label(row.get("deployment") or "")
+                framework = self._label(row.get("framework") or "")
+                latest = self._conn.execute(
+                    "SELECT id, version, config, content_hash, deployment, framework, features, details FROM results"
+                    " WHERE repo = ? ORDER BY version DESC LIMIT 1", (repo,)).fetchone()
+                if latest is not None and latest[2:] == (self.config, content_hash, deployment, framework, features,
+                                                         details):
+                    result_id, version = latest[0], latest[1]
+                else:
+                    version = latest[1] + 1 if latest else 1
+                    result_id = self._conn.execute(
+                        "INSERT INTO results (repo, version, config, recorded, content_hash, deployment, framework,"
+                        " features, details) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                        (repo, version, self.config, time.time(), content_hash, deployment, framework, features,
+                         details)).lastrowid
+                previous = self._conn.execute("SELECT deployment, framework, features FROM current WHERE repo = ?",
+                                              (repo,)).fetchone()
+                if previous != (deployment, framework, features):
+                    if previous is not None:
+                        self._tally(*previous, -1)
+                    self._tally(deployment, framework, features, 1)
+                self._conn.execute(
+                    "INSERT INTO current (repo, result, deployment, framework, features) VALUES (?, ?, ?, ?, ?)"
+                    " ON CONFLICT(repo) DO UPDATE SET result = excluded.result, deployment = excluded.deployment,"
+                    " framework = excluded.framework, features = excluded.features",
+                    (repo, result_id, deployment, framework, features))
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                # Labels inserted in this transaction are gone again
+                self._labels.clear()
+                self._names.clear()
+                raise
+        return version
+
+    def _row(self, repo: str, deployment: int, framework: int, features: int) -> Dict[str, Any]:
+        row = {"repository": repo, "deployment": self._name(deployment), "framework": self._name(framework)}
+        row.update(unpack_features(features))
+        return row
+
+    def get(self, repo: str) -> Optional[Dict[str, Any]]:
+        """The current CSV row of a repository, or None."""
+        with self._lock:
+            found = self._conn.execute("SELECT deployment, framework, features FROM current WHERE repo = ?",
+                                       (repo,)).fetchone()
+        return self._row(repo, *found) if found else None
+
+    def history(self, repo: str) -> List[Dict[str, Any]]:
+        """Every recorded version of a repository, oldest first, with its configuration and texts."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT r.version, r.config, c.settings, r.recorded, r.content_hash, r.deployment, r.framework,"
+                " r.features, r.details FROM results r LEFT JOIN configs c ON c.config = r.config"
+                " WHERE r.repo = ? ORDER BY r.version", (repo,)).fetchall()
+        return [dict(version=version, config=config, settings=json.loads(settings) if settings else None,
+                     recorded=recorded, content_hash=digest, row=self._row(repo, deployment, framework, features),
+                     details=unpack_details(details))
+                for version, config, settings, recorded, digest, deployment, framework, features, details in rows]
+
+    def rows(self, config: Optional[str] = None, all_versions: bool = False,
+             repos: Optional[Iterable[str]] = None) -> Iterator[Tuple[Dict[str, Any], Dict[str, Any]]]:
+        """Stream (CSV row, extra) pairs, where extra holds version, config, recorded, content_hash and details.
+
+        By default the current row of every repository; with config, each repository's newest result
+        under that configuration; with all_versions, every version. repos restricts (and orders) the output.
+        """
+        columns = ("r.repo, r.deployment, r.framework, r.features, r.version, r.config, r.recorded, r.content_hash,"
+                   " r.details")
+        if all_versions:
+            sql, params = f"SELECT {columns} FROM results r WHERE 1", ()
+        elif config is not None:
+            sql = (f"SELECT {columns} FROM results r WHERE r.config = ? AND r.version ="
+                   " (SELECT MAX(version) FROM results WHERE repo = r.repo AND config = r.config)")
+            params = (config,)
+        else:
+            sql, params = f"SELECT {columns} FROM current c JOIN results r ON r.id = c.result WHERE 1", ()
+        if repos is not None:
+            queries = [(sql + " AND r.repo = ? ORDER BY r.version", params + (repo,)) for repo in repos]
+        else:
+            queries = [(sql + " ORDER BY r.repo, r.version", params)]
+        # A connection of its own, so that a long export neither blocks nor sees half of an upsert
+        conn = sqlite3.connect(self.path, check_same_thread=False) if self.path != ":memory:" else self._conn
+        try:
+            for query, query_params in queries:
+                cursor = conn.execute(query, query_params)
+                while True:
+                    batch = cursor.fetchmany(EXPORT_BATCH)
+                    if not batch:
+                        break
+                    for repo, deployment, framework, features, version, config_, recorded, digest, details in batch:
+                        yield (self._row(repo, deployment, framework, features),
+                               {"version": version, "config": config_, "recorded": recorded, "content_hash": digest,
+                                "details": details})
+        finally:
+            if conn is not self._conn:
+                conn.close()
+
+    def export_csv(self, path: str, details: bool = False, **selection) -> int:
+        """Write rows (see rows()) as a CSV with the analysis_results.csv columns; returns the row count.
+
+        With details, every code feature gets <feature>_details and <feature>_improvements columns;
+        with all_versions, each row also names its version, configuration, input and time.
+        """
+        fieldnames = list(CSV_HEADERS)
+        versions = ["version", "config", "content_hash", "recorded"] if selection.get("all_versions") else []
+        fieldnames += versions
+        if details:
+            fieldnames += [f"{feature}_{kind}" for feature in CODE_FEATURES for kind in ("details", "improvements")]
+        count = 0
+        temp_path = f"{path}.tmp"
+        with open(temp_path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.DictWriter(f, fieldnames=fieldnames)
+            writer.writeheader()
+            for row, extra in self.rows(**selection):
+                row.update((name, extra[name]) for name in versions)
+                if details:
+                    for feature, (text, improvements) in unpack_details(extra["details"]).items():
+                        row[f"{feature}_details"], row[f"{feature}_improvements"] = text, improvements
+                writer.writerow(row)
+                count += 1
+        os.replace(temp_path, path)
+        return count
+
+    def export_parquet(self, path: str, details: bool = False, **selection) -> int:
+        """Write rows (see rows()) as Parquet, one row group per batch; returns the row count."""
+        if not PYARROW_AVAILABLE:
+            raise RuntimeError("Parquet export needs the pyarrow package (pip install pyarrow)")
+        # Labels are dictionary-encoded and features stored as bit-packed booleans
+        label = pyarrow.dictionary(pyarrow.int32(), pyarrow.string())
+        fields = [("repository", pyarrow.string()), ("deployment", label), ("framework", label)]
+        fields += [(feature, pyarrow.bool_()) for feature in FEATURES]
+        fields += [("version", pyarrow.int32()), ("config", pyarrow.string()), ("recorded", pyarrow.float64()),
+                   ("content_hash", pyarrow.string())]
+        if details:
+            fields.append(("details", pyarrow.string()))
+        schema = pyarrow.schema(fields)
+        count = 0
+        temp_path = f"{path}.tmp"
+        with pyarrow.parquet.ParquetWriter(temp_path, schema, compression="zstd") as writer:
+            columns: Dict[str, List[Any]] = {name: [] for name, _ in fields}
+
+            def flush():
+                writer.write_table(pyarrow.Table.from_pydict(columns, schema=schema))
+                for values in columns.values():
+                    values.clear()
+
+            for row, extra in self.rows(**selection):
+                for name in CSV_HEADERS:
+                    columns[name].append(bool(row[name]) if name in FEATURES else row[name])
+                for name in ("version", "config", "recorded", "content_hash"):
+                    columns[name].append(extra[name])
+                if details:
+                    texts = unpack_details(extra["details"])
+                    columns["details"].append(json.dumps(texts) if texts else None)
+                count += 1
+                if len(columns["repository"]) >= EXPORT_BATCH:
+                    flush()
+            if columns["repository"]:
+                flush()
+        os.replace(temp_path, path)
+        return count
+
+    def prevalence(self, by: Optional[str] = None, features: Optional[List[str]] = None) -> Dict[str, Dict[str, Any]]:
+        """Per deployment platform or framework (by), or overall: repository count and share of each feature."""
+        features = features or FEATURES
+        if by not in (None, "deployment", "framework"):
+            raise ValueError(f"Cannot group by {by!r}")
+        group = by or "NULL"
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {group}, bit, SUM(repositories) FROM tallies GROUP BY {group}, bit").fetchall()
+        counts: Dict[Any, Dict[int, int]] = {}
+        for group_id, bit, count in rows:
+            counts.setdefault(group_id, {})[bit] = count
+        result = {}
+        for group_id, bits in counts.items():
+            total = bits.get(-1, 0)
+            if not total:
+                continue
+            name = self._name(group_id) if by else "all"
+            result[name] = {"repositories": total}
+            result[name].update({feature: bits.get(FEATURES.index(feature), 0) / total for feature in features})
+        return result
+
+    def repositories_with(self, features: Iterable[str] = (), deployment: Optional[str] = None,
+                          framework: Optional[str] = None) -> List[str]:
+        """Repositories (current results) having every one of features, on a platform and framework if given."""
+        mask = pack_features({feature: 1 for feature in features})
+        sql, params = "SELECT repo FROM current WHERE (features & ?) = ?", [mask, mask]
+        for column, name in (("deployment", deployment), ("framework", framework)):
+            if name is not None:
+                if name not in self._labels:
+                    self._load_labels()
+                if name not in self._labels:
+                    return []
+                sql += f" AND {column} = ?"
+                params.append(self._labels[name])
+        with self._lock:
+            return [repo for repo, in self._conn.execute(sql + " ORDER BY repo", params)]
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM current").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def import_csv(store: ResultsStore, path: str) -> int:
+    """Record the rows of an analysis_results.csv written before the store existed."""
+    with open(path, newline='', encoding='utf-8') as f:
+        rows = list(csv.DictReader(f))
+    for row in rows:
+        store.record(row["repository"], row)
+    return len(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--results-path', default=DEFAULT_RESULTS_PATH, help='Results store file')
+    commands = parser.add_subparsers(dest='command', required=True)
+    prevalence = commands.add_parser('prevalence', help='Share of repositories with each feature')
+    prevalence.add_argument('--by', choices=['deployment', 'framework'], default=None)
+    query = commands.add_parser('query', help='Repositories having all of the given features')
+    query.add_argument('features', nargs='*', choices=FEATURES, metavar='FEATURE')
+    query.add_argument('--deployment', default=None)
+    query.add_argument('--framework', default=None)
+    history = commands.add_parser('history', help='Every recorded result of a repository')
+    history.add_argument('repo')
+    export = commands.add_parser('export', help='Write results as CSV or, for a .parquet path, Parquet')
+    export.add_argument('path')
+    export.add_argument('--details', action='store_true', help="Include the LLM's details and improvements")
+    export.add_argument('--config', default=None, help='Newest results of this configuration fingerprint')
+    export.add_argument('--all-versions', action='store_true', help='Every recorded version')
+    importer = commands.add_parser('import', help='Record the rows of an existing analysis_results.csv')
+    importer.add_argument('csv_path')
+    args = parser.parse_args()
+
+    store = ResultsStore(args.results_path)
+    started = time.perf_counter()
+    if args.command == 'prevalence':
+        result = store.prevalence(args.by)
+        width = max((len(name) for name in result), default=0)
+        for name, shares in sorted(result.items(), key=lambda item: -item[1]["repositories"]):
+            top = sorted(FEATURES, key=lambda feature: -shares[feature])[:5]
+            print(f"{name:<{width}}  {shares['repositories']:>7}  "
+                  + ", ".join(f"{feature} {shares[feature]:.0%}" for feature in top))
+    elif args.command == 'query':
+        for repo in store.repositories_with(args.features, args.deployment, args.framework):
+            print(repo)
+    elif args.command == 'history':
+        for entry in store.history(args.repo):
+            present = [feature for feature in FEATURES if entry["row"][feature]]
+            print(f"v{entry['version']} {time.strftime('%Y-%m-%d %H:%M', time.localtime(entry['recorded']))} "
+                  f"config {entry['config'] or '-'} content {(entry['content_hash'] or '-')[:12]} "
+                  f"{entry['row']['deployment']}/{entry['row']['framework']}: {', '.join(present) or 'no features'}")
+            for feature, (details, improvements) in entry["details"].items():
+                if entry["row"].get(feature) or improvements:
+                    print(f"    {feature}: {details}" + (f" (improve: {improvements})" if improvements else ""))
+    elif args.command == 'export':
+        if args.path.endswith('.parquet') and not PYARROW_AVAILABLE:
+            print("[ERROR] Parquet export needs the pyarrow package (pip install pyarrow)")
+            sys.exit(1)
+        export_to = store.export_parquet if args.path.endswith('.parquet') else store.export_csv
+        count = export_to(args.path, args.details, config=args.config, all_versions=args.all_versions)
+        print(f"[RESULTS] Wrote {count} rows to {args.path}")
+    elif args.command == 'import':
+        print(f"[RESULTS] Recorded {import_csv(store, args.csv_path)} rows from {args.csv_path}")
+    print(f"[RESULTS] {(time.perf_counter() - started) * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
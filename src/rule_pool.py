@@ -0,0 +1,120 @@
+"""Process pool for the rule-based detectors, so they use every core instead of one.
+
+Workers receive file paths only: each memory-maps the saved dump
+(temp/<owner>_<repo>_code_content.txt) itself, so no dump is pickled across
+processes. With a corpus (corpus_store.CorpusStore), a worker opens the
+corpus file itself and rebuilds the dump from it into a memory-mapped
+temporary file. A worker returns a compact tuple of deployment, framework, a
+bitmask of the infrastructure features and, on request, the content hash.
+The parent expands it back into a CSV row, in input order.
+
+The pool starts its workers with forkserver (spawn where that is missing)
+rather than fork: it is created while the event loop's threads and the
+manifest, cache and corpus connections are live, and forking a threaded
+process can deadlock a child on a lock it inherited held.
+"""
+import multiprocessing
+import os
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Any, Dict, List, NamedTuple, Optional
+from feature_analyzer import DIRECTORY_FEATURES, FeatureAnalyzer
+from corpus_store import CorpusStore
+from repo_index import RepositoryDump
+from results import INFRASTRUCTURE_FEATURES, apply_rules
+from rules import RuleEngine, DEPLOYMENT_RULES, FRAMEWORK_RULES, directory_rules
+from run_manifest import content_hash
+
+START_METHOD = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+
+
+class RuleResult(NamedTuple):
+    deployment: str
+    framework: str
+    infrastructure: int             # bit i set when INFRASTRUCTURE_FEATURES[i] was detected
+    content_hash: Optional[str]
+
+
+class _Detectors:
+    """The detector methods of FeatureAnalyzer over a rule engine, without its clients and caches."""
+
+    analyze_directory_structure = FeatureAnalyzer.analyze_directory_structure
+    determine_deployment_platform = FeatureAnalyzer.determine_deployment_platform
+    determine_framework = FeatureAnalyzer.determine_framework
+
+    def __init__(self, directory_features: Dict[str, List[str]] = DIRECTORY_FEATURES):
+        self.rule_engine = RuleEngine({
+            "deployment": DEPLOYMENT_RULES,
+            "framework": FRAMEWORK_RULES,
+            "directory": directory_rules(directory_features),
+        })
+
+
+_detectors: Optional[_Detectors] = None
+_corpus: Optional[CorpusStore] = None
+
+
+def _init_worker(directory_features: Dict[str, List[str]], corpus_path: Optional[str] = None):
+    global _detectors, _corpus
+    # Rule tables are compiled once per worker, not per repository
+    _detectors = _Detectors(directory_features)
+    if corpus_path is not None:
+        _corpus = CorpusStore(corpus_path)
+
+
+def _open_dump(repo: str, code_path: Optional[str], directory_structure: Optional[str]) -> RepositoryDump:
+    if code_path is not None:
+        return RepositoryDump.open(code_path, directory_structure)
+    saved = _corpus.get(repo, streaming=True) if _corpus is not None else None
+    if saved is None:
+        raise FileNotFoundError(f"{repo} has no saved dump")
+    return saved[1]
+
+
+def _run_rules(repo: str, code_path: Optional[str], directory_path: Optional[str],
+               directory_structure: Optional[str], with_hash: bool) -> RuleResult:
+    if directory_structure is None and directory_path is not None:
+        with open(directory_path, 'r', encoding='utf-8') as f:
+            directory_structure = f.read()
+    with _open_dump(repo, code_path, directory_structure) as code_content:
+        directory_structure = code_content.directory_structure
+        row = apply_rules(_detectors, repo, directory_structure, code_content)
+        digest = content_hash(directory_structure, code_content) if with_hash else None
+    infrastructure = sum(1 << index for index, feature in enumerate(INFRASTRUCTURE_FEATURES) if row[feature])
+    return RuleResult(row["deployment"], row["framework"], infrastructure, digest)
+
+
+def rule_row(repo: str, result: RuleResult) -> Dict[str, Any]:
+    """The non-LLM part of a CSV row, as apply_rules returns it."""
+    row_data = {"repository": repo, "deployment": result.deployment}
+    for index, feature in enumerate(INFRASTRUCTURE_FEATURES):
+        row_data[feature] = 1 if result.infrastructure >> index & 1 else 0
+    row_data["framework"] = result.framework
+    return row_data
+
+
+class RulePool:
+    """ProcessPoolExecutor running apply_rules on saved dumps; use as a context manager."""
+
+    def __init__(self, workers: int, directory_features: Dict[str, List[str]] = DIRECTORY_FEATURES,
+                 corpus_path: Optional[str] = None):
+        self.workers = workers or os.cpu_count() or 1
+        self._executor = ProcessPoolExecutor(max_workers=self.workers,
+                                             mp_context=multiprocessing.get_context(START_METHOD),
+                                             initializer=_init_worker, initargs=(directory_features, corpus_path))
+
+    def submit(self, repo: str, code_path: Optional[str], directory_path: Optional[str] = None,
+               directory_structure: Optional[str] = None, with_hash: bool = False) -> Future:
+        """Run the detectors on a saved dump; the directory structure is passed as text or as a file path.
+
+        Without a code_path, the repository (and its directory structure) is read from the pool's corpus.
+        """
+        return self._executor.submit(_run_rules, repo, code_path, directory_path, directory_structure, with_hash)
+
+    def close(self):
+        self._executor.shutdown(cancel_futures=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
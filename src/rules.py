@@ -0,0 +1,276 @@
+"""Deployment and framework detection rules expressed as data.
+
+A condition is one of
+    ("file", text)      text occurs in the directory structure
+    ("content", text)   text occurs anywhere in the code content
+    ("repo", text)      text occurs in the owner/repo name
+    ("in_file", (name, text))  a file with that base name contains text; for
+                        dumps without file headers this falls back to
+                        ("file", name) and ("content", text)
+    ("all", [conditions]), ("any", [conditions]), ("not", condition)
+All matching is case-insensitive. A rule table is an ordered list of
+(label, condition); the first rule that matches wins.
+"""
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple, Union
+from repo_index import RepositoryDump
+
+try:
+    import ahocorasick
+    AHOCORASICK_AVAILABLE = True
+except ImportError:
+    AHOCORASICK_AVAILABLE = False
+
+Condition = Tuple[Any, ...]
+
+
+def file(text): return ("file", text)
+def content(text): return ("content", text)
+def repo(text): return ("repo", text)
+def in_file(name, text): return ("in_file", (name, text))
+def all_of(*conditions): return ("all", list(conditions))
+def any_of(*conditions): return ("any", list(conditions))
+def not_(condition): return ("not", condition)
+
+
+DEPLOYMENT_RULES = [
+    # Streamlit - check both repo name and content
+    ("Streamlit", any_of(repo("/streamlit"), content("streamlit"))),
+    ("Vercel", any_of(
+        file("vercel.json"),
+        file(".vercel"),
+        content(".vercel.app"),
+        content("vercel deploy"),
+        content("vercel.com"),
+        all_of(file("next.config.js"), not_(content("aws"))),
+        in_file("package.json", "vercel"),
+        in_file("package.json", "next.js"),
+    )),
+    ("Firebase", any_of(
+        file("firebase.json"),
+        file(".firebaserc"),
+        content("firebase.initializeApp"),
+        content(".firebaseapp.com"),
+        content(".web.app"),
+        all_of(content("firebase"), content("config")),
+        in_file("package.json", "firebase"),
+        content("firebase deploy"),
+    )),
+    ("AWS", any_of(
+        file("serverless.yml"),
+        file("amplify.yml"),
+        file("buildspec.yml"),
+        file("cloudformation.yml"),
+        file("elastic-beanstalk"),
+        all_of(file("docker-compose.yml"), content("aws-sdk")),
+    )),
+    ("GitHub Pages", any_of(
+        all_of(file("_config.yml"), content("github.io")),
+        all_of(content(".github.io"), content("gh-pages")),
+    )),
+    ("Netlify", any_of(file("netlify.toml"), file(".netlify"), content(".netlify.app"))),
+    ("Digital Ocean", any_of(file("do.yaml"), all_of(content("digitalocean"), content("deploy")))),
+    ("Google Cloud", any_of(all_of(file("app.yaml"), content("google")), content("appspot.com"))),
+    ("NPM", all_of(in_file("package.json", '"private": false'), content("npm publish"))),
+    ("Heroku", any_of(file("Procfile"), file("heroku.yml"))),
+    ("CodeSandbox", file("sandbox.config.json")),
+    ("Stackblitz", file(".stackblitzrc")),
+    ("Replit", file(".replit")),
+    ("Glitch", file(".glitch-assets")),
+    # No clear deployment indicators but has package.json: check for specific frameworks
+    ("Vercel", any_of(in_file("package.json", "next"), in_file("package.json", "vercel"))),
+    ("Firebase", in_file("package.json", "firebase")),
+]
+
+FRAMEWORK_RULES = [
+    ("Next.js", file("next.config.js")),
+    ("Nuxt.js", file("nuxt.config.js")),
+    ("Gatsby", file("gatsby-config.js")),
+    ("Angular", file("angular.json")),
+    ("Vue", any_of(file("vue.config.js"), all_of(content("createapp"), content("vue")))),
+    ("Svelte", file("svelte.config.js")),
+    ("Remix", file("remix.config.js")),
+    ("Astro", file("astro.config.mjs")),
+    ("Streamlit", all_of(content("streamlit"), content("st."))),
+    ("Django", file("django")),
+    ("Flask", file("flask")),
+    ("Express", file("express")),
+    ("Spring", file("spring")),
+    ("Laravel", file("laravel")),
+    ("Ruby on Rails", file("rails")),
+    # Check package.json for dependencies
+    ("React", all_of(in_file("package.json", '"react"'),
+                     not_(any_of(in_file("package.json", "next"), in_file("package.json", "gatsby"),
+                                 in_file("package.json", "remix"))))),
+    ("Angular", in_file("package.json", '"@angular')),
+    ("Vue", in_file("package.json", '"vue"')),
+]
+
+
+class SignalMatcher:
+    """Finds which of a fixed set of lowercase patterns occur in a text.
+
+    With pyahocorasick installed every pattern is found in a single pass of
+    an Aho-Corasick automaton. Otherwise each pattern is checked with
+    CPython's substring search, which is still faster than a pure-Python
+    automaton.
+    """
+
+    def __init__(self, patterns: Iterable[str]):
+        self.patterns = sorted(set(patterns))
+        self.automaton = None
+        if AHOCORASICK_AVAILABLE and self.patterns:
+            self.automaton = ahocorasick.Automaton()
+            for pattern in self.patterns:
+                self.automaton.add_word(pattern, pattern)
+            self.automaton.make_automaton()
+
+    def find(self, lowered_text: str) -> Set[str]:
+        if self.automaton is not None:
+            found = set()
+            for _, pattern in self.automaton.iter(lowered_text):
+                found.add(pattern)
+                if len(found) == len(self.patterns):
+                    break
+            return found
+        return {pattern for pattern in self.patterns if pattern in lowered_text}
+
+    @property
+    def overlap(self) -> int:
+        """Bytes consecutive windows must share so no pattern is split between them."""
+        return max((len(p.encode('utf-8')) for p in self.patterns), default=1) - 1
+
+    def find_in_windows(self, windows: Iterable[str]) -> Set[str]:
+        found: Set[str] = set()
+        for window in windows:
+            found |= self.find(window)
+            if len(found) == len(self.patterns):
+                break
+        return found
+
+
+class Signals:
+    """Set of (source, pattern) signals found in one repository."""
+
+    def __init__(self, found: Dict[str, Set[str]], dump: Optional[RepositoryDump] = None):
+        self.found = found
+        self.dump = dump
+        self._in_file: Dict[tuple, bool] = {}
+
+    def in_file(self, name: str, text: str) -> bool:
+        if self.dump is None or not len(self.dump):
+            return self.has("file", name) and self.has("content", text)
+        key = (name, text)
+        if key not in self._in_file:
+            # Only the matching files are searched, not the whole dump
+            self._in_file[key] = self.dump.file_contains(name, text)
+        return self._in_file[key]
+
+    def has(self, source: str, pattern: str) -> bool:
+        return pattern in self.found.get(source, ())
+
+    def evaluate(self, condition: Condition) -> bool:
+        kind = condition[0]
+        if kind == "all":
+            return all(self.evaluate(c) for c in condition[1])
+        if kind == "any":
+            return any(self.evaluate(c) for c in condition[1])
+        if kind == "not":
+            return not self.evaluate(condition[1])
+        if kind == "in_file":
+            return self.in_file(*condition[1])
+        return self.has(kind, condition[1])
+
+
+def _lowered(condition: Condition) -> Condition:
+    kind = condition[0]
+    if kind in ("all", "any"):
+        return (kind, [_lowered(c) for c in condition[1]])
+    if kind == "not":
+        return (kind, _lowered(condition[1]))
+    if kind == "in_file":
+        return (kind, (condition[1][0].lower(), condition[1][1].lower()))
+    return (kind, condition[1].lower())
+
+
+def _collect_patterns(condition: Condition, patterns: Dict[str, Set[str]]):
+    kind = condition[0]
+    if kind in ("all", "any"):
+        for c in condition[1]:
+            _collect_patterns(c, patterns)
+    elif kind == "not":
+        _collect_patterns(condition[1], patterns)
+    elif kind == "in_file":
+        # Needed for the fallback on dumps without file headers
+        patterns.setdefault("file", set()).add(condition[1][0])
+        patterns.setdefault("content", set()).add(condition[1][1])
+    else:
+        patterns.setdefault(kind, set()).add(condition[1])
+
+
+class RuleEngine:
+    """Compiles condition tables once and evaluates them against one scan per source.
+
+    The last scan of each source is remembered by identity, so running the
+    deployment and framework tables over the same dump scans it only once.
+    """
+
+    def __init__(self, tables: Dict[str, List[Tuple[str, Condition]]]):
+        self.tables = {name: [(label, _lowered(condition)) for label, condition in rules]
+                       for name, rules in tables.items()}
+        self.sources: Dict[str, Set[str]] = {}
+        patterns: Dict[str, Set[str]] = {}
+        for name, rules in self.tables.items():
+            table_patterns: Dict[str, Set[str]] = {}
+            for _, condition in rules:
+                _collect_patterns(condition, table_patterns)
+            self.sources[name] = set(table_patterns)
+            for source, found in table_patterns.items():
+                patterns.setdefault(source, set()).update(found)
+        self.matchers = {source: SignalMatcher(p) for source, p in patterns.items()}
+        self._memo: Dict[str, Tuple[Any, Set[str]]] = {}
+        self._dump_memo = None
+
+    def _find(self, source: str, key: Any, lowered_windows) -> Set[str]:
+        memo = self._memo.get(source)
+        if memo is not None and memo[0] is key:
+            return memo[1]
+        # Each text is lowercased exactly once, a window at a time
+        matcher = self.matchers[source]
+        found = matcher.find_in_windows(lowered_windows(matcher.overlap))
+        self._memo[source] = (key, found)
+        return found
+
+    def _dump(self, code_content: Union[str, RepositoryDump]) -> RepositoryDump:
+        if isinstance(code_content, RepositoryDump):
+            return code_content
+        memo = self._dump_memo
+        if memo is None or memo[0] is not code_content:
+            memo = self._dump_memo = (code_content, RepositoryDump.from_text(code_content))
+        return memo[1]
+
+    def signals(self, table: str, directory_structure: str = "",
+                code_content: Union[str, RepositoryDump] = "", repo: str = "") -> Signals:
+        sources = self.sources[table]
+        dump = self._dump(code_content) if "content" in sources else None
+        texts = {
+            "file": (directory_structure, lambda overlap: [(directory_structure or "").lower()]),
+            "content": (dump, lambda overlap: dump.iter_lowered_windows(overlap)),
+            "repo": (repo, lambda overlap: [(repo or "").lower()]),
+        }
+        found = {source: self._find(source, *texts[source]) for source in sources if source in self.matchers}
+        return Signals(found, dump)
+
+    def first_match(self, table: str, signals: Signals, default: Optional[str] = "Unknown") -> Optional[str]:
+        for label, condition in self.tables[table]:
+            if signals.evaluate(condition):
+                return label
+        return default
+
+    def matching_labels(self, table: str, signals: Signals) -> Dict[str, bool]:
+        """Evaluate every rule of a table independently (feature -> present)."""
+        return {label: signals.evaluate(condition) for label, condition in self.tables[table]}
+
+
+def directory_rules(directory_features: Dict[str, List[str]]) -> List[Tuple[str, Condition]]:
+    """Turn FeatureAnalyzer.directory_features into a rule table."""
+    return [(feature, any_of(*(file(p) for p in patterns))) for feature, patterns in directory_features.items()]
@@ -0,0 +1,166 @@
+"""Run manifest: per-repository stage status, input hashes and outputs, kept across runs.
+
+A repository analyzed to completion with the same analyzer configuration is
+skipped on the next run, so an interrupted or extended run only redoes the
+repositories that failed, never finished or are new. With recheck, finished
+repositories are fetched again and re-analyzed only when their content hash
+changed.
+"""
+import csv
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional
+from repo_index import RepositoryDump, SEGMENT_SIZE
+
+DEFAULT_MANIFEST_PATH = os.path.join("temp", "run_manifest.sqlite")
+
+
+def content_hash(directory_structure: str, code_content: RepositoryDump) -> str:
+    """Digest of the scraped inputs of one repository (tree and filtered dump)."""
+    digest = hashlib.sha256(directory_structure.encode('utf-8', 'surrogatepass'))
+    digest.update(b'\0')
+    data = code_content.data
+    for position in range(0, len(data), SEGMENT_SIZE):
+        digest.update(data[position:position + SEGMENT_SIZE])
+    return digest.hexdigest()
+
+
+class RunManifest:
+    """SQLite table of repository -> status, stage, content and config hashes, CSV row."""
+
+    def __init__(self, path: str = DEFAULT_MANIFEST_PATH, config: str = ""):
+        if path != ":memory:" and os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.path = path
+        self.config = config
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS repositories ("
+            " repo TEXT PRIMARY KEY, status TEXT NOT NULL, stage TEXT NOT NULL, content_hash TEXT,"
+            " config_hash TEXT, row TEXT, error TEXT, updated REAL NOT NULL)"
+        )
+
+    def get(self, repo: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            found = self._conn.execute(
+                "SELECT status, stage, content_hash, config_hash, row, error FROM repositories WHERE repo = ?", (repo,)
+            ).fetchone()
+        if found is None:
+            return None
+        status, stage, digest, config, row, error = found
+        return {"status": status, "stage": stage, "content_hash": digest, "config_hash": config,
+                "row": json.loads(row) if row else None, "error": error}
+
+    def is_done(self, repo: str, digest: Optional[str] = None) -> bool:
+        """Finished with this configuration (and, when given, from the same content)."""
+        entry = self.get(repo)
+        return (entry is not None and entry["status"] == "done" and entry["config_hash"] == self.config
+                and (digest is None or entry["content_hash"] == digest))
+
+    def _upsert(self, repo: str, **fields):
+        fields["updated"] = time.time()
+        columns = ", ".join(fields)
+        updates = ", ".join(f"{column} = excluded.{column}" for column in fields)
+        with self._lock:
+            self._conn.execute(
+                f"INSERT INTO repositories (repo, {columns}) VALUES (?{', ?' * len(fields)})"
+                f" ON CONFLICT(repo) DO UPDATE SET {updates}",
+                (repo, *fields.values()),
+            )
+
+    def start(self, repo: str, stage: str):
+        self._upsert(repo, status="running", stage=stage, error=None)
+
+    def fail(self, repo: str, stage: str, error: str):
+        self._upsert(repo, status="failed", stage=stage, error=error)
+
+    def keep(self, repo: str):
+        """Mark a rechecked repository finished again without touching its row."""
+        self._upsert(repo, status="done", stage="done", error=None)
+
+    def set_content_hash(self, repo: str, digest: str):
+        self._upsert(repo, status="running", stage="filter", content_hash=digest)
+
+    def complete(self, repo: str, row: Dict[str, Any], digest: Optional[str] = None):
+        fields = {"status": "done", "stage": "done", "config_hash": self.config, "row": json.dumps(row), "error": None}
+        if digest is not None:
+            fields["content_hash"] = digest
+        self._upsert(repo, **fields)
+
+    def done_rows(self, repos: Iterable[str]) -> List[Dict[str, Any]]:
+        rows = []
+        for repo in repos:
+            entry = self.get(repo)
+            if entry is not None and entry["status"] == "done" and entry["row"]:
+                rows.append(entry["row"])
+        return rows
+
+    def summary(self, repos: Iterable[str]) -> Counter:
+        counts: Counter = Counter()
+        for repo in repos:
+            entry = self.get(repo)
+            counts[entry["status"] if entry else "new"] += 1
+        return counts
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM repositories")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def open_results_csv(path: str, fieldnames: List[str]):
+    """Open the results CSV for appending, writing the header only into a new file.
+
+    A file with a different header (an older CSV layout) is moved aside to <path>.bak.
+    """
+    if os.path.exists(path) and os.path.getsize(path) > 0:
+        with open(path, newline='') as f:
+            header = next(csv.reader(f), [])
+        if header == fieldnames:
+            csvfile = open(path, 'a', newline='')
+            return csvfile, csv.DictWriter(csvfile, fieldnames=fieldnames)
+        print(f"[RESUME] {path} has a different header; moving it to {path}.bak")
+        os.replace(path, f"{path}.bak")
+    csvfile = open(path, 'w', newline='')
+    writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
+    writer.writeheader()
+    csvfile.flush()
+    return csvfile, writer
+
+
+def upsert_results_csv(path: str, fieldnames: List[str], rows: Iterable[Dict[str, Any]]):
+    """Make the CSV hold exactly one row per repository: the newest one, at its first position.
+
+    Rows of finished repositories missing from the file (e.g. a deleted CSV)
+    are appended. The file is rewritten (atomically) only when it has duplicates.
+    """
+    with open(path, newline='') as f:
+        existing = list(csv.DictReader(f))
+    latest: Dict[str, Dict[str, Any]] = {}
+    for row in existing:
+        latest[row["repository"]] = row
+    missing = [row for row in rows if row["repository"] not in latest]
+    if len(latest) == len(existing):
+        if missing:
+            with open(path, 'a', newline='') as f:
+                csv.DictWriter(f, fieldnames=fieldnames).writerows(missing)
+        return
+    for row in missing:
+        latest[row["repository"]] = row
+    temp_path = f"{path}.tmp"
+    with open(temp_path, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=fieldnames)
+        writer.writeheader()
+        writer.writerows(latest.values())
+    os.replace(temp_path, path)
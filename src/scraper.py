@@ -2,19 +2,33 @@ from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
+from selenium.common.exceptions import TimeoutException
 from bs4 import BeautifulSoup
+from repo_index import RepositoryDump
+from corpus_store import CorpusStore, DEFAULT_CORPUS_PATH
 import json
 import sys
 import argparse
 import os
 
+GITINGEST_URL = "https://gitingest.com"
+
 class GitIngestScraper:
-    def __init__(self, owner_repo):
-        self.base_url = f"https://gitingest.com/{owner_repo}"
-        self.driver = webdriver.Chrome()
+    def __init__(self, owner_repo, driver=None, base_url=GITINGEST_URL):
+        self.base_url = f"{base_url.rstrip('/')}/{owner_repo}"
+        # A driver passed in (e.g. from a DriverPool) is borrowed, not owned
+        self.owns_driver = driver is None
+        self._driver = driver
         # Add a list of file extensions to skip
         self.skip_extensions = ['.css', '.map', '.svg', '.ico', '.gltf']
 
+    @property
+    def driver(self):
+        # Started on first use so parsing/filtering never launches a browser
+        if self._driver is None:
+            self._driver = webdriver.Chrome()
+        return self._driver
+
     def fetch_page(self, url):
         try:
             self.driver.get(url)
@@ -25,10 +39,15 @@ class GitIngestScraper:
                 EC.presence_of_element_located((By.TAG_NAME, "textarea"))
             )
             return self.driver.page_source
-        except Exception as e:
+        except TimeoutException as e:
             print(f"Error fetching page: {e}")
             return None
 
+    @staticmethod
+    def has_repository_data(html):
+        """Cheap check that a page already holds the rendered ingest output."""
+        return bool(html) and 'directory-structure-content' in html and html.count('<textarea') >= 2
+
     def parse_repository_data(self, html):
         soup = BeautifulSoup(html, 'html.parser')
         # Get directory structure
@@ -52,38 +71,33 @@ class GitIngestScraper:
             return self.parse_repository_data(html)
         return None
 
-    def __del__(self):
-        # Clean up the browser when done
-        if hasattr(self, 'driver'):
-            self.driver.quit()
+    def close(self):
+        # Clean up the browser when done, unless it belongs to a pool
+        if self.owns_driver and self._driver is not None:
+            self._driver.quit()
+        self._driver = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def keep_file_body(self, entry):
+        return not any(entry.path.endswith(ext) for ext in self.skip_extensions)
 
     def filter_css_content(self, content):
-        lines = content.split('\n')
-        filtered_lines = []
-        skip_mode = False
-
-        i = 0
-        while i < len(lines):
-            line = lines[i]
-
-            # Check for header
-            if line.startswith('=' * 48):
-                if i + 1 < len(lines):  # Check if next line exists
-                    file_line = lines[i + 1]
-                    if file_line.startswith('File:'):
-                        # Check if file ends with any of the skip extensions
-                        should_skip = any(file_line.endswith(ext) for ext in self.skip_extensions)
-                        skip_mode = should_skip
-                        # Add the header lines
-                        filtered_lines.append(line)
-                        filtered_lines.append(file_line)
-                        filtered_lines.append(lines[i + 2])  # Add the closing '=' line
-                        i += 2  # Skip the next two lines as we've handled them
-            elif not skip_mode:
-                filtered_lines.append(line)
-            i += 1
-
-        return '\n'.join(filtered_lines)
+        # Drop the bodies of files with skipped extensions, keeping their headers
+        return RepositoryDump.coerce(content).render(self.keep_file_body)
+
+    def filter_dump(self, content, directory_structure=None):
+        """Like filter_css_content, but returns an indexed RepositoryDump."""
+        return RepositoryDump.coerce(content, directory_structure).filtered(self.keep_file_body)
+
+    def write_filtered_dump(self, content, path):
+        """Filter content straight into a file; returns the number of bytes written."""
+        with open(path, 'wb') as f:
+            return RepositoryDump.coerce(content).write_filtered(f, self.keep_file_body)
 
 if __name__ == "__main__":
     # Create temp directory if it doesn't exist
@@ -94,6 +108,8 @@ if __name__ == "__main__":
     group = parser.add_mutually_exclusive_group(required=True)
     group.add_argument('repo', nargs='?', help='Single repository in format owner/repo')
     group.add_argument('-f', '--file', help='File containing owner/repo entries, one per line')
+    parser.add_argument('--corpus', nargs='?', const=DEFAULT_CORPUS_PATH, default=None, metavar='PATH',
+                        help=f'Save to the corpus store (default: {DEFAULT_CORPUS_PATH}) instead of text files')
 
     args = parser.parse_args()
 
@@ -108,15 +124,22 @@ if __name__ == "__main__":
     else:
         repos = [args.repo]
 
+    corpus = CorpusStore(args.corpus) if args.corpus else None
     for repo in repos:
         print(f"Processing repository: {repo}")
-        scraper = GitIngestScraper(repo)
-        results = scraper.scrape()
+        with GitIngestScraper(repo) as scraper:
+            results = scraper.scrape()
 
         if not results:
             print(f"Failed to fetch repository data for {repo}")
             continue
 
+        if corpus is not None:
+            corpus.put(repo, results['directory_structure'],
+                       scraper.filter_dump(results['textarea_content'], results['directory_structure']))
+            print(f"Completed processing {repo}")
+            continue
+
         # Create repo-specific filenames with temp directory
         base_filename = os.path.join(output_dir, repo.replace('/', '_'))
 
@@ -0,0 +1,177 @@
+"""Pre-LLM triage: decide per file whether it is worth sending to the LLM.
+
+Files are skipped when their path says they are lockfiles, vendored,
+build output, fixtures or binary assets, when their content looks
+minified, generated or like an encoded blob, or when the same body was
+already seen earlier in the dump. The rule detectors still see every file;
+triage only shrinks what gets chunked and billed.
+"""
+import csv
+import hashlib
+import math
+from collections import Counter
+from typing import Dict, Iterable, List, Optional
+from chunking import CHARS_PER_TOKEN
+from repo_index import FileEntry, RepositoryDump, SEGMENT_SIZE
+
+LOCKFILES = {
+    "package-lock.json", "yarn.lock", "pnpm-lock.yaml", "npm-shrinkwrap.json", "bun.lockb",
+    "poetry.lock", "pipfile.lock", "pdm.lock", "uv.lock", "cargo.lock", "composer.lock",
+    "gemfile.lock", "go.sum", "mix.lock", "pubspec.lock", "podfile.lock", "packages.lock.json",
+}
+
+SKIP_DIRECTORIES = (
+    "node_modules/", "vendor/", "vendors/", "third_party/", "third-party/", "bower_components/",
+    "dist/", "build/", ".next/", "out/", "coverage/", ".cache/", "__pycache__/", "site-packages/",
+    "__snapshots__/", "__fixtures__/", "fixtures/", "testdata/", "test-data/",
+)
+
+SKIP_SUFFIXES = (
+    ".min.js", ".min.css", ".min.mjs", ".bundle.js", ".chunk.js", ".map", ".snap", ".lock",
+    ".pb.go", "_pb2.py", "_pb2_grpc.py", ".g.dart", ".designer.cs", ".generated.ts", ".generated.js",
+    ".png", ".jpg", ".jpeg", ".gif", ".webp", ".bmp", ".ico", ".svg", ".woff", ".woff2", ".ttf",
+    ".otf", ".eot", ".mp3", ".mp4", ".wav", ".webm", ".pdf", ".zip", ".gz", ".tgz", ".jar",
+    ".wasm", ".exe", ".dll", ".so", ".dylib", ".pyc", ".class", ".gltf", ".glb", ".bin", ".dat",
+)
+
+# Searched for in the first bytes of a file
+GENERATED_MARKERS = (b"@generated", b"do not edit", b"auto-generated", b"autogenerated",
+                     b"code generated by", b"this file was generated", b"generated by the protocol buffer")
+
+# Manifests and deployment descriptors always reach the LLM
+ALWAYS_KEEP = {
+    "package.json", "requirements.txt", "pyproject.toml", "setup.py", "go.mod", "gemfile", "cargo.toml",
+    "composer.json", "dockerfile", "docker-compose.yml", "docker-compose.yaml", "procfile",
+}
+
+DATA_SUFFIXES = (".csv", ".tsv", ".json", ".xml", ".sql", ".txt", ".ndjson", ".jsonl")
+
+
+class TriageReport:
+    """What triage kept and skipped for one repository."""
+
+    def __init__(self, repo: Optional[str] = None):
+        self.repo = repo
+        self.files = 0
+        self.bytes = 0
+        self.skipped: Dict[str, str] = {}  # path -> reason
+        self.skipped_bytes = 0
+        self.skipped_tokens = 0
+        self.reasons: Counter = Counter()
+
+    def keep(self, entry: FileEntry) -> bool:
+        return entry.path not in self.skipped
+
+    def summary(self) -> str:
+        reasons = ", ".join(f"{reason}: {count}" for reason, count in self.reasons.most_common())
+        return (f"Skipped {len(self.skipped)}/{self.files} files, {self.skipped_bytes / 1024:.0f}/"
+                f"{self.bytes / 1024:.0f} KB, ~{self.skipped_tokens} tokens" + (f" ({reasons})" if reasons else ""))
+
+    def row(self) -> Dict[str, object]:
+        return {
+            "repository": self.repo or "",
+            "files": self.files,
+            "skipped_files": len(self.skipped),
+            "bytes": self.bytes,
+            "skipped_bytes": self.skipped_bytes,
+            "skipped_tokens": self.skipped_tokens,
+            "reasons": ";".join(f"{reason}={count}" for reason, count in sorted(self.reasons.items())),
+        }
+
+
+def byte_entropy(data: bytes) -> float:
+    """Shannon entropy in bits per byte (source code is typically 4-5.5, base64/binary close to 6-8)."""
+    if not data:
+        return 0.0
+    total = len(data)
+    return -sum(count / total * math.log2(count / total) for count in Counter(data).values())
+
+
+class FileTriage:
+    """Scores every file of a dump and decides which ones reach the LLM."""
+
+    def __init__(self, max_line_length: int = 1000, max_average_line_length: int = 200,
+                 max_entropy: float = 5.8, max_data_file_bytes: int = 100 * 1024, sample_bytes: int = 64 * 1024,
+                 entropy_sample_bytes: int = 4096):
+        self.max_line_length = max_line_length
+        self.max_average_line_length = max_average_line_length
+        self.max_entropy = max_entropy
+        self.max_data_file_bytes = max_data_file_bytes
+        self.sample_bytes = sample_bytes
+        self.entropy_sample_bytes = entropy_sample_bytes
+
+    def path_reason(self, path: str) -> Optional[str]:
+        lowered = path.lower()
+        name = lowered.rsplit('/', 1)[-1]
+        if name in LOCKFILES:
+            return "lockfile"
+        wrapped = f"/{lowered}"
+        if any(f"/{directory}" in wrapped for directory in SKIP_DIRECTORIES):
+            return "vendored/build"
+        if lowered.endswith(SKIP_SUFFIXES):
+            return "asset/generated"
+        return None
+
+    def content_reason(self, entry: FileEntry, sample: bytes) -> Optional[str]:
+        """Judge a file from the first sample_bytes of its body."""
+        if not sample.strip() and entry.length <= len(sample):
+            return "empty"
+        head = sample[:1024].lower()
+        if any(marker in head for marker in GENERATED_MARKERS):
+            return "generated"
+        if b"\x00" in sample:
+            return "binary"
+        lines = sample.count(b"\n") + 1
+        longest = max(len(line) for line in sample.split(b"\n"))
+        if longest > self.max_line_length or (len(sample) >= 2048 and len(sample) / lines > self.max_average_line_length):
+            return "minified"
+        if len(sample) >= 1024 and byte_entropy(sample[:self.entropy_sample_bytes]) > self.max_entropy:
+            return "high-entropy"
+        if entry.length > self.max_data_file_bytes and entry.extension in DATA_SUFFIXES:
+            return "large data file"
+        return None
+
+    @staticmethod
+    def digest(dump: RepositoryDump, entry: FileEntry) -> bytes:
+        hasher = hashlib.sha1()
+        end = entry.offset + entry.length
+        for position in range(entry.offset, end, SEGMENT_SIZE):
+            hasher.update(dump.data[position:min(end, position + SEGMENT_SIZE)])
+        return hasher.digest()
+
+    def run(self, dump: RepositoryDump, repo: Optional[str] = None) -> TriageReport:
+        report = TriageReport(repo)
+        seen = set()
+        for entry in dump:
+            report.files += 1
+            report.bytes += entry.length
+            if entry.path.rsplit('/', 1)[-1].lower() in ALWAYS_KEEP:
+                continue
+            reason = self.path_reason(entry.path)
+            if reason is None:
+                sample = dump.data[entry.offset:entry.offset + min(entry.length, self.sample_bytes)]
+                reason = self.content_reason(entry, sample)
+                if reason is None:
+                    # The first copy of a duplicated file is kept
+                    digest = self.digest(dump, entry)
+                    reason = "duplicate" if digest in seen else None
+                    seen.add(digest)
+            if reason is None:
+                continue
+            report.skipped[entry.path] = reason
+            report.reasons[reason] += 1
+            report.skipped_bytes += entry.length
+            # Estimated from the size: skipped files are never decoded or tokenized in full
+            report.skipped_tokens += entry.length // CHARS_PER_TOKEN
+        return report
+
+
+def write_triage_report(path: str, reports: Iterable[TriageReport]) -> List[TriageReport]:
+    """Write one CSV row per repository and return the reports written."""
+    reports = list(reports)
+    with open(path, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=list(TriageReport().row()))
+        writer.writeheader()
+        for report in reports:
+            writer.writerow(report.row())
+    return reports
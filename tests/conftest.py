@@ -0,0 +1,131 @@
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+
+import pytest
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(TESTS_DIR)
+# The modules live flat in src/ (run as scripts); the fake LLM server and synthetic dumps in benchmarks/
+sys.path.insert(0, os.path.join(ROOT, 'src'))
+sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
+
+DATA_DIR = os.path.join(TESTS_DIR, 'data')
+# User-Agent of the fake browser in test_fetchers.py; it gets the JavaScript-rendered variant of a page
+FAKE_BROWSER_AGENT = "stand-in-browser"
+
+
+def read_data(name: str) -> str:
+    with open(os.path.join(DATA_DIR, name), encoding='utf-8') as f:
+        return f.read()
+
+
+class Route:
+    """What the stand-in answers for one path.
+
+    The first requests get the given statuses and delays, one each; later ones
+    get the page with status 200 after the default delay.
+    """
+
+    def __init__(self, body: str = "", statuses: Optional[List[int]] = None, delay: float = 0.0,
+                 delays: Optional[List[float]] = None, browser_body: Optional[str] = None):
+        self.body = body
+        self.statuses = list(statuses or [])
+        self.delay = delay
+        self.delays = list(delays or [])
+        # Served instead of body to the fake browser, for pages that only render with JavaScript
+        self.browser_body = browser_body
+
+
+class StandInGitIngest(ThreadingHTTPServer):
+    """Local stand-in for gitingest.com serving canned pages per /owner/repo path."""
+
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), StandInHandler)
+        self.routes: Dict[str, Route] = {}
+        self.lock = threading.Lock()
+        self.requests: List[str] = []
+        self.in_flight = 0
+        self.peak_in_flight = 0
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def route(self, repo: str, body: str = "", **options) -> str:
+        """Serve body at /<repo>; returns the page URL."""
+        self.routes[f"/{repo}"] = Route(body, **options)
+        return f"{self.base_url}/{repo}"
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.requests.append(self.path)
+            server.in_flight += 1
+            server.peak_in_flight = max(server.peak_in_flight, server.in_flight)
+            route = server.routes.get(self.path)
+            status = route.statuses.pop(0) if route is not None and route.statuses else 200
+            delay = (route.delays.pop(0) if route.delays else route.delay) if route is not None else 0.0
+        try:
+            time.sleep(delay)
+            if route is None:
+                status, body = 404, "Not found"
+            elif status != 200:
+                body = f"<html><body>Error {status}</body></html>"
+            else:
+                browser = self.headers.get("User-Agent") == FAKE_BROWSER_AGENT
+                body = route.browser_body if browser and route.browser_body is not None else route.body
+            payload = body.encode('utf-8')
+            self.send_response(status)
+            if status == 429:
+                self.send_header("Retry-After", "1")
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+        except (BrokenPipeError, ConnectionResetError):
+            # The client gave up (e.g. a timeout test)
+            pass
+        finally:
+            with server.lock:
+                server.in_flight -= 1
+
+
+@pytest.fixture
+def gitingest_server():
+    server = StandInGitIngest()
+    threading.Thread(target=server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def fake_openai(monkeypatch):
+    """benchmarks/fake_openai.py in a thread, with the OpenAI clients pointed at it."""
+    from fake_openai import start_server
+    server = start_server()
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    monkeypatch.setenv("OPENAI_BASE_URL", server.base_url)
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def gitingest_page() -> str:
+    """A gitingest.com result page saved for acme/shop."""
+    return read_data('gitingest_page.html')
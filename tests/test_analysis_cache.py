@@ -0,0 +1,93 @@
+import time
+
+import pytest
+
+from analysis_cache import AnalysisCache, cache_key
+from feature_analyzer import FeatureAnalyzer
+
+ANALYSIS = {"caching": {"present": True, "details": "Redis", "improvements": ""}}
+# The fake server reports a feature present when its name appears in the code
+CHUNKS = [f"File: src/{name}.py\n" + f"# {name}\n" + "def handler():\n    return 'ok'\n" * 10
+          for name in ("caching", "storage", "plain", "database")]
+
+
+def test_cache_key_depends_on_model_prompt_and_chunk():
+    key = cache_key("gpt-3.5-turbo", "v1", "chunk")
+
+    assert key == cache_key("gpt-3.5-turbo", "v1", "chunk")
+    assert len({key, cache_key("gpt-4o", "v1", "chunk"), cache_key("gpt-3.5-turbo", "v2", "chunk"),
+                cache_key("gpt-3.5-turbo", "v1", "chunk ")}) == 4
+
+
+def test_get_put_and_counters(tmp_path):
+    cache = AnalysisCache(str(tmp_path / "cache.sqlite"))
+
+    assert cache.get("a") is None
+    cache.put("a", ANALYSIS)
+    assert cache.get("a") == ANALYSIS
+    # Membership tests are not lookups
+    assert "a" in cache and "b" not in cache
+    assert (cache.hits, cache.misses, len(cache)) == (1, 1, 1)
+    cache.close()
+
+    # Entries survive the process
+    reopened = AnalysisCache(str(tmp_path / "cache.sqlite"))
+    assert reopened.get("a") == ANALYSIS and reopened.total_bytes == cache.total_bytes
+
+
+def test_least_recently_used_entries_are_evicted_first():
+    value = {"details": "x" * 100}
+    cache = AnalysisCache(":memory:", max_bytes=400)
+    for key in ("a", "b", "c"):
+        cache.put(key, value)
+        time.sleep(0.01)
+    cache.get("a")
+    time.sleep(0.01)
+
+    cache.put("d", value)
+
+    assert "a" in cache and "d" in cache
+    assert "b" not in cache
+    assert cache.evictions >= 1 and cache.total_bytes <= 400
+
+
+def test_oversized_cache_is_trimmed_on_open(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    cache = AnalysisCache(path)
+    for index in range(10):
+        cache.put(str(index), {"details": "x" * 100})
+    cache.close()
+
+    trimmed = AnalysisCache(path, max_bytes=500)
+
+    assert trimmed.total_bytes <= 500 and len(trimmed) < 10
+    assert "9" in trimmed
+
+
+@pytest.fixture
+def analyzer(fake_openai, tmp_path):
+    return FeatureAnalyzer(cache_path=str(tmp_path / "cache.sqlite"))
+
+
+def test_cache_hits_merge_like_fresh_results(analyzer, fake_openai):
+    fresh = analyzer.analyze_chunks(CHUNKS, repo="acme/shop")
+    requests = fake_openai.stats["requests"]
+
+    cached = analyzer.analyze_chunks(CHUNKS, repo="acme/shop")
+
+    assert cached == fresh
+    assert fresh["caching"]["present"] and fresh["storage"]["present"] and not fresh["monolith"]["present"]
+    assert fake_openai.stats["requests"] == requests == len(CHUNKS)
+    assert analyzer.metrics.repositories["acme/shop"]["cache_hits"] == len(CHUNKS)
+
+
+def test_partly_cached_batch_merges_in_chunk_order(analyzer, fake_openai, tmp_path):
+    fresh = FeatureAnalyzer(cache_path=str(tmp_path / "fresh.sqlite")).analyze_chunks(CHUNKS, repo="acme/shop")
+    # Only every other chunk is cached
+    analyzer.analyze_chunks(CHUNKS[::2], repo="acme/other")
+    requests = fake_openai.stats["requests"]
+
+    mixed = analyzer.analyze_chunks(CHUNKS, repo="acme/shop")
+
+    assert mixed == fresh
+    assert fake_openai.stats["requests"] - requests == len(CHUNKS[1::2])
@@ -0,0 +1,152 @@
+import csv
+import json
+import os
+import shutil
+
+import pytest
+
+from batch_mode import BatchRunner
+from feature_analyzer import FeatureAnalyzer
+from main import analyze_repositories, batch_chunk_requests, run_batch, saved_repository_paths
+from run_manifest import RunManifest
+from scraper import GitIngestScraper
+from synthetic import generate_dump
+
+REPOSITORIES = [("acme/shop", "Vercel"), ("acme/big", "Unknown")]
+
+
+@pytest.fixture
+def output_dir(tmp_path, gitingest_page):
+    """Both repositories saved as the scraping phase leaves them."""
+    scraped = GitIngestScraper("acme/shop").parse_repository_data(gitingest_page)
+    saved = {
+        "acme/shop": (scraped['directory_structure'],
+                      GitIngestScraper("acme/shop").filter_css_content(scraped['textarea_content'])),
+        # Large enough for several chunks
+        "acme/big": generate_dump(200 * 1024, seed=3),
+    }
+    directory = tmp_path / "temp"
+    directory.mkdir()
+    for repo, (directory_structure, code_content) in saved.items():
+        directory_path, code_path = saved_repository_paths(str(directory), repo)
+        with open(directory_path, 'w', encoding='utf-8') as f:
+            f.write(directory_structure)
+        with open(code_path, 'w', encoding='utf-8') as f:
+            f.write(code_content)
+    return str(directory)
+
+
+def new_analyzer(tmp_path, name="cache"):
+    return FeatureAnalyzer(cache_path=str(tmp_path / f"{name}.sqlite"))
+
+
+def new_runner(analyzer, tmp_path):
+    return BatchRunner(analyzer, str(tmp_path / "batch"), poll_interval=0.01)
+
+
+def analyze(output_dir, analyzer, tmp_path):
+    manifest = RunManifest(str(tmp_path / "manifest.sqlite"), analyzer.config_fingerprint())
+    csv_path = analyze_repositories(REPOSITORIES, output_dir, analyzer=analyzer, manifest=manifest)
+    manifest.close()
+    with open(csv_path, newline='') as f:
+        return list(csv.DictReader(f))
+
+
+@pytest.fixture
+def online_rows(fake_openai, output_dir, tmp_path_factory):
+    """The CSV rows of an ordinary online run, which batch runs must reproduce."""
+    workdir = tmp_path_factory.mktemp("online")
+    online_dir = shutil.copytree(output_dir, str(workdir / "temp"))
+    rows = analyze(online_dir, new_analyzer(workdir), workdir)
+    fake_openai.stats["requests"] = 0
+    return rows
+
+
+def run_batch_phase(analyzer, runner, output_dir, tmp_path):
+    manifest = RunManifest(str(tmp_path / "manifest.sqlite"), analyzer.config_fingerprint())
+    run_batch(REPOSITORIES, output_dir, analyzer, manifest, runner)
+    manifest.close()
+
+
+def test_batch_run_end_to_end(fake_openai, output_dir, online_rows, tmp_path):
+    fake_openai.batch_polls = 3
+    analyzer = new_analyzer(tmp_path)
+    runner = new_runner(analyzer, tmp_path)
+
+    run_batch_phase(analyzer, runner, output_dir, tmp_path)
+
+    [batch] = runner.state.data["batches"]
+    assert batch["status"] == "completed" and batch["ingested"]
+    assert batch["requests"] == len(runner.state.data["features"]) > 1
+    assert fake_openai.batches[batch["batch_id"]]["polls"] == 3
+    with open(batch["input"], encoding='utf-8') as f:
+        lines = [json.loads(line) for line in f]
+    assert [line["custom_id"] for line in lines] == list(runner.state.data["features"])
+    assert all(custom_id in analyzer.analysis_cache for custom_id in runner.state.data["features"])
+
+    # The analysis pass merges the batch answers as cache hits and sends nothing online
+    assert analyze(output_dir, analyzer, tmp_path) == online_rows
+    assert fake_openai.stats["requests"] == 0
+
+    runner.finish()
+    assert not os.path.exists(runner.state.path) and not os.path.exists(batch["input"])
+
+
+def test_resume_from_state_json(fake_openai, output_dir, online_rows, tmp_path):
+    fake_openai.batch_polls = 2
+    analyzer = new_analyzer(tmp_path)
+    runner = new_runner(analyzer, tmp_path)
+    manifest = RunManifest(str(tmp_path / "manifest.sqlite"), analyzer.config_fingerprint())
+    runner.build(batch_chunk_requests(REPOSITORIES, output_dir, analyzer, manifest),
+                 [repo for repo, _ in REPOSITORIES])
+    manifest.close()
+    runner.submit()
+    # The process stops here; a new one picks the run up from state.json
+    analyzer.analysis_cache.close()
+
+    analyzer = new_analyzer(tmp_path)
+    runner = new_runner(analyzer, tmp_path)
+    assert runner.pending_repositories() == ["acme/shop", "acme/big"]
+    run_batch_phase(analyzer, runner, output_dir, tmp_path)
+
+    # Nothing was uploaded or submitted again
+    assert fake_openai.stats["files"] == 2 and fake_openai.stats["batches"] == 1
+    assert runner.state.data["batches"][0]["status"] == "completed"
+    assert analyze(output_dir, analyzer, tmp_path) == online_rows
+    assert fake_openai.stats["requests"] == 0
+
+
+def test_resume_after_upload_submits_without_uploading_again(fake_openai, output_dir, tmp_path):
+    analyzer = new_analyzer(tmp_path)
+    runner = new_runner(analyzer, tmp_path)
+    run_batch_phase(analyzer, runner, output_dir, tmp_path)
+    batch = runner.state.data["batches"][0]
+    # As if the process died between uploading the file and creating the batch
+    batch.update(batch_id=None, status="built", ingested=False)
+    runner.state.save()
+
+    runner = new_runner(analyzer, tmp_path)
+    runner.run(iter([]), [repo for repo, _ in REPOSITORIES])
+
+    assert fake_openai.stats["batches"] == 2
+    assert sum(1 for stored in fake_openai.files.values() if stored["purpose"] == "batch") == 1
+    assert runner.state.data["batches"][0]["batch_id"] == "batch_2"
+
+
+@pytest.mark.parametrize("outcome", ["failed", "expired"])
+def test_unfinished_batch_falls_back_to_online_requests(fake_openai, output_dir, online_rows, tmp_path, outcome):
+    fake_openai.batch_outcome = outcome
+    analyzer = new_analyzer(tmp_path)
+    runner = new_runner(analyzer, tmp_path)
+
+    run_batch_phase(analyzer, runner, output_dir, tmp_path)
+
+    [batch] = runner.state.data["batches"]
+    assert batch["status"] == outcome and batch["ingested"]
+    custom_ids = list(runner.state.data["features"])
+    stored = [custom_id for custom_id in custom_ids if custom_id in analyzer.analysis_cache]
+    assert len(stored) == (0 if outcome == "failed" else len(custom_ids) // 2)
+
+    # Failed and missing answers are requested online, and the rows come out the same
+    assert analyze(output_dir, analyzer, tmp_path) == online_rows
+    assert fake_openai.stats["requests"] == len(custom_ids) - len(stored)
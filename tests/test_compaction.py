@@ -0,0 +1,26 @@
+from feature_analyzer import FeatureAnalyzer
+from repo_index import RepositoryDump
+from synthetic import generate_dump
+
+
+def test_compacted_spill_file_is_closed_after_analysis(fake_openai, tmp_path, monkeypatch):
+    _, code_content = generate_dump(200 * 1024, seed=5)
+    path = tmp_path / "dump.txt"
+    path.write_text(code_content, encoding='utf-8')
+    analyzer = FeatureAnalyzer(cache_path=str(tmp_path / "cache.sqlite"), streaming=True, early_stop=True)
+    compacted = []
+    compact_files = analyzer.compact_files
+
+    def recording_compact_files(*args, **kwargs):
+        compacted.append(compact_files(*args, **kwargs))
+        return compacted[-1]
+
+    monkeypatch.setattr(analyzer, "compact_files", recording_compact_files)
+
+    with RepositoryDump.open(str(path)) as dump:
+        analyzer.analyze_with_llm(dump, "acme/big")
+
+    [dump] = compacted
+    assert fake_openai.stats["requests"] > 0
+    # The memory-mapped temporary file was released, even if early stop left chunks unread
+    assert not dump.streaming and dump._file is None
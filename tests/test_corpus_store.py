@@ -0,0 +1,109 @@
+import pytest
+
+import corpus_store
+from corpus_store import CorpusStore, compress, decompress, read_saved, saved_repositories
+from repo_index import RepositoryDump
+
+SEPARATOR = "=" * 48
+
+
+def dump_text(files, preamble=""):
+    return preamble + "\n".join(f"{SEPARATOR}\nFile: {path}\n{SEPARATOR}\n{body}\n" for path, body in files.items())
+
+
+SHOP = {"package.json": '{"dependencies": {"kafkajs": "^2.0.0"}}',
+        "src/queue.js": "const { Kafka } = require('kafkajs')\nconst producer = kafka.producer()",
+        "src/util.js": "export const retry = (fn) => fn()\n" * 40}
+BLOG = {"src/util.js": SHOP["src/util.js"], "src/post.js": "// event sourcing for posts\nexport default {}"}
+
+
+@pytest.fixture
+def corpus(tmp_path):
+    corpus = CorpusStore(str(tmp_path / "corpus.sqlite"))
+    yield corpus
+    corpus.close()
+
+
+def test_round_trip_is_byte_for_byte(corpus):
+    # A preamble, a header that is not gitingest's and no trailing newline all survive
+    text = dump_text(SHOP, preamble="Directory listing follows\n") + \
+        f"{SEPARATOR}\nFile:  odd name.txt \n{SEPARATOR}\ntext without newline"
+    corpus.put("acme/shop", "Directory structure:\n└── acme-shop/", text)
+
+    tree, dump = corpus.get("acme/shop")
+    assert tree == "Directory structure:\n└── acme-shop/"
+    assert bytes(dump.data) == text.encode()
+    assert [entry.path for entry in dump] == [entry.path for entry in RepositoryDump.from_text(text)]
+
+    tree, streamed = corpus.get("acme/shop", streaming=True)
+    with streamed:
+        assert streamed.streaming and bytes(streamed.data) == text.encode()
+    assert corpus.get("acme/gone") is None
+
+
+def test_shared_bodies_are_stored_once(corpus):
+    corpus.put("acme/shop", "", dump_text(SHOP))
+    corpus.put("acme/blog", "", dump_text(BLOG))
+
+    stats = corpus.stats()
+    assert (stats["repositories"], stats["files"], stats["blobs"]) == (2, 5, 4)
+    assert stats["compressed_body_bytes"] < stats["unique_body_bytes"]
+    assert corpus.repositories() == ["acme/blog", "acme/shop"] and "acme/blog" in corpus
+
+
+def test_search(corpus):
+    corpus.put("acme/shop", "", dump_text(SHOP))
+    corpus.put("acme/blog", "", dump_text(BLOG))
+
+    assert corpus.repositories_matching("kafkajs") == ["acme/shop"]
+    assert corpus.search("KafkaJS") == [("acme/shop", "package.json"), ("acme/shop", "src/queue.js")]
+    # Phrases must appear in a row, as whole words
+    assert corpus.repositories_matching("event sourcing") == ["acme/blog"]
+    assert corpus.repositories_matching("sourcing event") == []
+    assert corpus.repositories_matching("retry") == ["acme/blog", "acme/shop"]
+    assert corpus.repositories_matching("kafka* NOT producer", raw=True) == ["acme/shop"]
+    assert corpus.search("kafka* NOT producer", raw=True) == [("acme/shop", "package.json")]
+    with pytest.raises(ValueError):
+        corpus.search("--")
+
+
+def test_replace_and_delete_drop_orphaned_bodies(corpus):
+    corpus.put("acme/shop", "", dump_text(SHOP))
+    corpus.put("acme/blog", "", dump_text(BLOG))
+    first, _ = corpus.scraped("acme/shop")
+
+    corpus.put("acme/shop", "", dump_text({"src/queue.js": "import { Kafka } from 'kafkajs'"}))
+    assert corpus.scraped("acme/shop")[0] == first
+    assert corpus.search("producer") == []
+    assert corpus.stats()["blobs"] == 3
+
+    corpus.delete("acme/blog")
+    assert corpus.repositories() == ["acme/shop"]
+    assert corpus.repositories_matching("retry") == [] and corpus.stats()["blobs"] == 1
+
+
+def test_codecs(monkeypatch):
+    body = b"export const retry = (fn) => fn()\n" * 40
+    codec, packed = compress(body)
+    assert codec == ("zstd" if corpus_store.ZSTD_AVAILABLE else "zlib") and len(packed) < len(body)
+    assert decompress(codec, packed) == body
+    # Tiny bodies are not worth compressing
+    assert compress(b"x") == ("raw", b"x")
+
+    monkeypatch.setattr(corpus_store, "ZSTD_AVAILABLE", False)
+    with pytest.raises(RuntimeError, match="zstandard"):
+        decompress("zstd", b"")
+
+
+def test_saved_text_files(tmp_path):
+    with open(tmp_path / "acme_my_shop_directory_structure.txt", "w", encoding="utf-8") as f:
+        f.write("Directory structure:")
+    with open(tmp_path / "acme_my_shop_code_content.txt", "w", encoding="utf-8") as f:
+        f.write(dump_text(SHOP))
+
+    # The first underscore is taken as the slash
+    assert saved_repositories(str(tmp_path)) == ["acme/my_shop"]
+    tree, dump = read_saved(str(tmp_path), "acme/my_shop")
+    with dump:
+        assert tree == "Directory structure:" and bytes(dump.data) == dump_text(SHOP).encode()
+    assert read_saved(str(tmp_path), "acme/gone") is None
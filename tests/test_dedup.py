@@ -0,0 +1,112 @@
+import pytest
+
+from dedup import ContentStore, minhash
+from feature_analyzer import FeatureAnalyzer
+from incremental import file_digest
+from repo_index import RepositoryDump
+
+SEPARATOR = "=" * 48
+# Room for about one of the files below per chunk
+CONTEXT_TOKENS = 3000
+
+
+def dump_of(files):
+    return RepositoryDump.from_text("\n".join(f"{SEPARATOR}\nFile: {path}\n{SEPARATOR}\n{body}\n"
+                                              for path, body in files.items()))
+
+
+def body(name, release=0):
+    # The fake server reports a feature present when its name appears in the code
+    return f"RELEASE = {release}\n\n" + "".join(
+        f"def {name}_handler_{index}(request):\n    return process(request, {index})\n\n" for index in range(30))
+
+
+def similarity(a, b):
+    return float((minhash(a.encode()) == minhash(b.encode())).mean())
+
+
+def presence(analysis):
+    return {feature: result["present"] for feature, result in analysis.items()}
+
+
+def test_minhash_estimates_similarity():
+    assert similarity(body("caching"), body("caching")) == 1.0
+    assert similarity(body("caching"), body("caching", release=2)) >= 0.9
+    assert similarity(body("caching"), body("storage")) < 0.5
+    assert minhash(b"x = 1") is None
+
+
+def test_content_store_resolves_exact_and_near_duplicates(tmp_path):
+    store = ContentStore(str(tmp_path / "content.sqlite"))
+    dump = dump_of({"lib.py": body("caching"), "copy.py": body("caching"), "fork.py": body("caching", release=2),
+                    "other.py": body("storage")})
+    resolved = {entry.path: store.resolve(file_digest(dump, entry), lambda entry=entry: dump.text(entry).encode())
+                for entry in dump}
+
+    original = resolved["lib.py"][0]
+    assert resolved == {"lib.py": (original, "new"), "copy.py": (original, "exact"),
+                        "fork.py": (original, "near"), "other.py": (resolved["other.py"][0], "new")}
+    assert resolved["other.py"][0] != original
+
+
+@pytest.fixture
+def new_analyzer(fake_openai, tmp_path):
+    def new(name, **options):
+        options.setdefault("dedup_path", str(tmp_path / "content.sqlite"))
+        return FeatureAnalyzer(cache_path=str(tmp_path / f"{name}.sqlite"), context_tokens=CONTEXT_TOKENS, **options)
+    return new
+
+
+# Neutral paths, since the headers are sent too
+FILES = {"lib/module0.py": body("caching"), "lib/module1.py": body("database")}
+
+
+def test_exact_duplicates_in_another_repository_are_reused(new_analyzer, fake_openai):
+    first = new_analyzer("first").analyze_with_llm(dump_of(FILES), "acme/shop")
+    requests = fake_openai.stats["requests"]
+
+    # Same files under other paths, with a fresh analysis cache so only the content store can answer
+    moved = {path.replace("lib/", "shared/"): text for path, text in FILES.items()}
+    analyzer = new_analyzer("second")
+    second = analyzer.analyze_with_llm(dump_of(moved), "acme/store")
+
+    assert requests == len(FILES)
+    assert fake_openai.stats["requests"] == requests
+    assert presence(second) == presence(first)
+    [ledger] = analyzer.dedup_ledgers
+    assert ledger.count("exact") == len(FILES) and ledger.reused_files == len(FILES)
+
+
+def test_near_duplicates_are_reused_and_new_files_analyzed(new_analyzer, fake_openai):
+    new_analyzer("first").analyze_with_llm(dump_of(FILES), "acme/shop")
+    requests = fake_openai.stats["requests"]
+    files = {"src/module0.py": body("caching", release=7), "src/module1.py": body("database"),
+             "src/module2.py": body("storage")}
+    analyzer = new_analyzer("second")
+
+    analysis = analyzer.analyze_with_llm(dump_of(files), "acme/fork")
+
+    # Only the new file is sent
+    assert fake_openai.stats["requests"] - requests == 1
+    assert analysis["caching"]["present"] and analysis["database"]["present"] and analysis["storage"]["present"]
+    [ledger] = analyzer.dedup_ledgers
+    assert (ledger.count("near"), ledger.count("exact"), ledger.count("new")) == (1, 1, 1)
+    assert ledger.row()["reused_files"] == 2 and ledger.row()["analyzed_chunks"] == 1
+
+
+def test_fingerprint_covers_dedup_and_incremental_settings(tmp_path, monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+
+    def fingerprint(**options):
+        return FeatureAnalyzer(cache_path=str(tmp_path / "cache.sqlite"), **options).config_fingerprint()
+
+    plain = fingerprint()
+    dedup = fingerprint(dedup_path=str(tmp_path / "content.sqlite"))
+    incremental = fingerprint(incremental_path=str(tmp_path / "chunk_results.sqlite"))
+    assert len({plain, dedup, incremental}) == 3
+    # Where the stores live does not matter
+    assert fingerprint(dedup_path=str(tmp_path / "elsewhere.sqlite")) == dedup
+
+    analyzer = FeatureAnalyzer(cache_path=str(tmp_path / "cache.sqlite"), dedup_path=str(tmp_path / "content.sqlite"))
+    analyzer.content_store.threshold = 0.8
+    assert analyzer.config_fingerprint() != dedup
@@ -0,0 +1,87 @@
+import pytest
+
+from feature_analyzer import FEATURE_PROMPT, LLM_FEATURES, FeatureAnalyzer, build_feature_prompt
+
+FEATURES = [key for _, key, _ in LLM_FEATURES]
+
+
+def chunk(name, *features):
+    # The fake server reports a feature present when its name appears in the code
+    return f"File: src/{name}.py\n" + "".join(f"# {feature}\n" for feature in features) + \
+        "def handler():\n    return 'ok'\n" * 8
+
+
+# Every feature but monolith shows up in the first chunks; the tail adds nothing new
+EARLY = [chunk("a", *FEATURES[:6]), chunk("b", *FEATURES[6:7]), chunk("c", *FEATURES[8:])] + \
+        [chunk(f"tail{index}", "caching") for index in range(8)]
+ALL_FOUND = EARLY[:2] + [chunk("c", *FEATURES[7:])] + EARLY[3:]
+
+
+class CountingChunks:
+    """Lazy chunks that count how many were drawn."""
+
+    def __init__(self, chunks):
+        self.chunks = chunks
+        self.drawn = 0
+
+    def __iter__(self):
+        for item in self.chunks:
+            self.drawn += 1
+            yield item
+
+
+def presence(analysis):
+    return {feature: result["present"] for feature, result in analysis.items()}
+
+
+def analyze(tmp_path, chunks, name, **options):
+    analyzer = FeatureAnalyzer(cache_path=str(tmp_path / f"{name}.sqlite"), **options)
+    return analyzer.analyze_chunks(chunks, repo="acme/shop")
+
+
+def test_subset_prompt_covers_only_the_requested_features():
+    assert build_feature_prompt() == FEATURE_PROMPT == build_feature_prompt(None)
+    prompt = build_feature_prompt(["caching", "storage"])
+
+    assert '"caching": {"present"' in prompt and '"storage": {"present"' in prompt
+    assert '"database": {"present"' not in prompt
+    assert "1. Storage" in prompt and "2. Caching" in prompt
+
+
+@pytest.mark.parametrize("max_in_flight", [1, 4])
+@pytest.mark.parametrize("chunks", [EARLY, ALL_FOUND], ids=["monolith-missing", "all-found"])
+def test_early_stop_gives_the_full_or_merge(fake_openai, tmp_path, chunks, max_in_flight):
+    full = analyze(tmp_path, chunks, "full", max_in_flight=max_in_flight)
+    full_requests = fake_openai.stats["requests"]
+
+    early = analyze(tmp_path, chunks, "early", max_in_flight=max_in_flight, early_stop=True)
+
+    assert presence(early) == presence(full)
+    assert early["monolith"]["present"] == (chunks is ALL_FOUND)
+    assert full_requests == len(chunks)
+    if chunks is ALL_FOUND:
+        assert fake_openai.stats["requests"] - full_requests <= 3 + max_in_flight
+
+
+def test_early_stop_stops_drawing_chunks(fake_openai, tmp_path):
+    chunks = CountingChunks(ALL_FOUND)
+
+    analysis = analyze(tmp_path, chunks, "early", early_stop=True)
+
+    assert all(presence(analysis).values())
+    # The batch after the last answer is drawn, then dropped unsent; the rest never is
+    assert chunks.drawn == 4
+    assert fake_openai.stats["requests"] == 3
+
+
+def test_subset_answers_are_cached_under_their_own_key(fake_openai, tmp_path):
+    analyzer = FeatureAnalyzer(cache_path=str(tmp_path / "cache.sqlite"), early_stop=True)
+    first = analyzer.analyze_chunks(ALL_FOUND, repo="acme/shop")
+    requests = fake_openai.stats["requests"]
+
+    assert analyzer.analyze_chunks(ALL_FOUND, repo="acme/shop") == first
+    assert fake_openai.stats["requests"] == requests
+    # A full run asks about every feature, so the subset answers are no hits for it
+    analyzer.early_stop = False
+    analyzer.analyze_chunks(ALL_FOUND[1:3], repo="acme/shop")
+    assert fake_openai.stats["requests"] == requests + 2
@@ -0,0 +1,138 @@
+import asyncio
+import time
+import urllib.request
+
+import pytest
+from selenium.common.exceptions import NoSuchElementException
+from selenium.webdriver.common.by import By
+
+from conftest import FAKE_BROWSER_AGENT
+from driver_pool import DriverPool
+from fetchers import FallbackFetchBackend, HttpFetchBackend, SeleniumFetchBackend, build_fetch_backend
+from local_ingest import LocalIngestBackend
+from scraper import GitIngestScraper
+
+# What gitingest serves before its JavaScript has rendered the result
+SHELL_PAGE = '<html><body><div id="app">Loading...</div><script src="/static/app.js"></script></body></html>'
+
+
+class FakeBrowser:
+    """WebDriver stand-in: loads pages from the stand-in server as a browser that runs their JavaScript."""
+
+    def __init__(self):
+        self.page_source = ""
+        self.pages = 0
+        self.quit_calls = 0
+
+    def get(self, url):
+        request = urllib.request.Request(url, headers={"User-Agent": FAKE_BROWSER_AGENT})
+        with urllib.request.urlopen(request, timeout=5) as response:
+            self.page_source = response.read().decode('utf-8')
+        self.pages += 1
+
+    def find_element(self, by, value):
+        marker = f'id="{value}"' if by == By.ID else f"<{value}"
+        if marker not in self.page_source:
+            raise NoSuchElementException(value)
+        return object()
+
+    def quit(self):
+        self.quit_calls += 1
+
+
+class FakeBrowserFactory:
+    def __init__(self):
+        self.browsers = []
+
+    def __call__(self):
+        self.browsers.append(FakeBrowser())
+        return self.browsers[-1]
+
+
+def fetch_all(backend, urls):
+    async def run():
+        async with backend:
+            return await asyncio.gather(*(backend.fetch(url) for url in urls))
+    return asyncio.run(run())
+
+
+@pytest.fixture
+def browsers():
+    return FakeBrowserFactory()
+
+
+@pytest.fixture
+def fallback_backend(browsers):
+    return FallbackFetchBackend(HttpFetchBackend(max_concurrency=4, timeout=0.5),
+                                SeleniumFetchBackend(DriverPool(size=1, driver_factory=browsers)))
+
+
+def test_http_backend_fetches_canned_page(gitingest_server, gitingest_page):
+    url = gitingest_server.route("acme/shop", gitingest_page)
+
+    [html] = fetch_all(HttpFetchBackend(max_concurrency=2), [url])
+
+    assert html == gitingest_page
+    result = GitIngestScraper("acme/shop").parse_repository_data(html)
+    assert "File: src/api.py" in result['textarea_content']
+
+
+@pytest.mark.parametrize("status", [429, 500, 503])
+def test_http_backend_gives_up_on_error_status(gitingest_server, gitingest_page, status):
+    url = gitingest_server.route("acme/shop", gitingest_page, statuses=[status])
+
+    assert fetch_all(HttpFetchBackend(), [url]) == [None]
+
+
+def test_http_backend_times_out_on_slow_page(gitingest_server, gitingest_page):
+    url = gitingest_server.route("acme/shop", gitingest_page, delay=2.0)
+
+    started = time.perf_counter()
+    assert fetch_all(HttpFetchBackend(timeout=0.2), [url]) == [None]
+    assert time.perf_counter() - started < 1.5
+
+
+def test_http_backend_bounds_concurrent_requests(gitingest_server, gitingest_page):
+    urls = [gitingest_server.route(f"acme/shop{index}", gitingest_page, delay=0.2) for index in range(9)]
+
+    pages = fetch_all(HttpFetchBackend(max_concurrency=3), urls)
+
+    assert pages == [gitingest_page] * 9
+    assert 2 <= gitingest_server.peak_in_flight <= 3
+
+
+def test_fallback_renders_javascript_only_page(gitingest_server, gitingest_page, fallback_backend, browsers):
+    url = gitingest_server.route("acme/shop", SHELL_PAGE, browser_body=gitingest_page)
+
+    assert fetch_all(fallback_backend, [url]) == [gitingest_page]
+    assert fallback_backend.fallbacks_used == 1
+    assert gitingest_server.requests == ["/acme/shop", "/acme/shop"]
+    # The pool is closed with the backend
+    assert [browser.quit_calls for browser in browsers.browsers] == [1]
+
+
+@pytest.mark.parametrize("options", [{"statuses": [429]}, {"statuses": [503]}, {"delays": [2.0]}],
+                         ids=["rate-limited", "server-error", "slow"])
+def test_fallback_after_failed_http_fetch(gitingest_server, gitingest_page, fallback_backend, options):
+    # Only the first (plain HTTP) request fails or is slow
+    url = gitingest_server.route("acme/shop", gitingest_page, **options)
+
+    assert fetch_all(fallback_backend, [url]) == [gitingest_page]
+    assert fallback_backend.fallbacks_used == 1
+
+
+def test_complete_pages_never_start_a_browser(gitingest_server, gitingest_page, fallback_backend, browsers):
+    urls = [gitingest_server.route(f"acme/shop{index}", gitingest_page) for index in range(5)]
+
+    assert fetch_all(fallback_backend, urls) == [gitingest_page] * 5
+    assert fallback_backend.fallbacks_used == 0
+    assert browsers.browsers == []
+
+
+def test_build_fetch_backend():
+    assert build_fetch_backend("http").name == "http+selenium"
+    assert build_fetch_backend("http-only", http_concurrency=5).max_concurrency == 5
+    assert build_fetch_backend("selenium", workers=3).pool.size == 3
+    assert isinstance(build_fetch_backend("local", local_root="."), LocalIngestBackend)
+    with pytest.raises(ValueError):
+        build_fetch_backend("curl")
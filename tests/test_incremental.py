@@ -0,0 +1,105 @@
+import pytest
+
+from feature_analyzer import FeatureAnalyzer
+from incremental import ChunkRecord, ChunkResultStore, IncrementalLedger
+from repo_index import RepositoryDump
+
+SEPARATOR = "=" * 48
+# Room for about one of the files below per chunk
+CONTEXT_TOKENS = 3000
+
+
+def dump_of(files):
+    return RepositoryDump.from_text("\n".join(f"{SEPARATOR}\nFile: {path}\n{SEPARATOR}\n{body}\n"
+                                              for path, body in files.items()))
+
+
+def body(name):
+    # The fake server reports a feature present when its name appears in the code
+    return "".join(f"def {name}_handler_{index}(request):\n    return process(request, {index})\n\n"
+                   for index in range(30))
+
+
+# Neutral paths, since the headers are sent too
+FILES = {f"src/module{index}.py": body(name) for index, name in enumerate(("caching", "storage", "database", "plain"))}
+
+
+def presence(analysis):
+    return {feature: result["present"] for feature, result in analysis.items()}
+
+
+@pytest.fixture
+def new_analyzer(fake_openai, tmp_path):
+    def new(name="cache", **options):
+        options.setdefault("incremental_path", str(tmp_path / "chunk_results.sqlite"))
+        return FeatureAnalyzer(cache_path=str(tmp_path / f"{name}.sqlite"), context_tokens=CONTEXT_TOKENS,
+                               **options)
+    return new
+
+
+def test_unchanged_repository_reuses_every_chunk(new_analyzer, fake_openai):
+    first = new_analyzer().analyze_with_llm(dump_of(FILES), "acme/shop")
+    requests = fake_openai.stats["requests"]
+
+    # A fresh analysis cache, so only the stored chunk results can answer
+    again = new_analyzer("other").analyze_with_llm(dump_of(FILES), "acme/shop")
+
+    assert requests == len(FILES)
+    assert fake_openai.stats["requests"] == requests
+    assert presence(again) == presence(first)
+
+
+def test_modified_and_deleted_files(new_analyzer, fake_openai):
+    new_analyzer().analyze_with_llm(dump_of(FILES), "acme/shop")
+    requests = fake_openai.stats["requests"]
+    files = dict(FILES)
+    files["src/module1.py"] = body("realtime_events")
+    del files["src/module2.py"]
+
+    updated = new_analyzer("other").analyze_with_llm(dump_of(files), "acme/shop")
+
+    # Only the modified file is sent again
+    assert fake_openai.stats["requests"] - requests == 1
+    assert updated["caching"]["present"] and updated["realtime_events"]["present"]
+    # The modified file's old answer and the deleted file's answer no longer count
+    assert not updated["storage"]["present"] and not updated["database"]["present"]
+    full = new_analyzer("full", incremental_path=None).analyze_with_llm(dump_of(files), "acme/other")
+    assert presence(updated) == presence(full)
+
+
+def test_repositories_are_stored_apart(new_analyzer, fake_openai):
+    new_analyzer().analyze_with_llm(dump_of(FILES), "acme/shop")
+    requests = fake_openai.stats["requests"]
+
+    new_analyzer("other").analyze_with_llm(dump_of(FILES), "acme/store")
+
+    assert fake_openai.stats["requests"] - requests == len(FILES)
+
+
+def test_ledger_drops_chunks_sharing_a_changed_file(tmp_path):
+    store = ChunkResultStore(str(tmp_path / "chunk_results.sqlite"))
+    dump = dump_of({"a.py": "a = 1\n", "b.py": "b = 2\n", "c.py": "c = 3\n"})
+    hashes = IncrementalLedger(store, "acme/shop", "v1", dump).hashes
+    store.save("acme/shop", "v1", [
+        ChunkRecord({"a.py": hashes["a.py"], "b.py": "stale"}, None, {"caching": {"present": True}}),
+        ChunkRecord({"c.py": hashes["c.py"]}, None, {"storage": {"present": True}}),
+    ])
+
+    ledger = IncrementalLedger(store, "acme/shop", "v1", dump)
+
+    assert [record.files for record in ledger.stable] == [{"c.py": hashes["c.py"]}]
+    # a.py is unchanged but shared its chunk with the changed b.py, so both go out again
+    assert ledger.dirty == {"a.py", "b.py"}
+    assert ledger.dropped == 1
+    assert IncrementalLedger(store, "acme/shop", "v2", dump).dirty == {"a.py", "b.py", "c.py"}
+
+
+def test_ledger_reuses_subset_answers_only_for_the_same_features(tmp_path):
+    store = ChunkResultStore(str(tmp_path / "chunk_results.sqlite"))
+    dump = dump_of({"a.py": "a = 1\n"})
+    digest = IncrementalLedger(store, "acme/shop", "v1", dump).hashes["a.py"]
+    store.save("acme/shop", "v1", [ChunkRecord({"a.py": digest}, ["caching"], {"caching": {"present": False}})])
+
+    assert len(IncrementalLedger(store, "acme/shop", "v1", dump, needed=["caching"]).stable) == 1
+    assert IncrementalLedger(store, "acme/shop", "v1", dump, needed=["caching", "storage"]).dirty == {"a.py"}
+    assert IncrementalLedger(store, "acme/shop", "v1", dump).dirty == {"a.py"}
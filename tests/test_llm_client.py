@@ -0,0 +1,108 @@
+import asyncio
+import time
+
+import pytest
+
+from feature_analyzer import FeatureAnalyzer
+from llm_client import RateLimitedLLMClient, RateLimiter, TokenBucket, parse_reset_seconds
+
+MESSAGES = [{"role": "user", "content": 'Return {"caching": {"present": false}}\nCode to analyze:\n# caching\nimport redis'}]
+
+
+def elapsed(coroutine):
+    started = time.perf_counter()
+    asyncio.run(coroutine)
+    return time.perf_counter() - started
+
+
+@pytest.mark.parametrize("value, seconds", [("1s", 1.0), ("6m0s", 360.0), ("20ms", 0.02), ("0.5", 0.5),
+                                            ("1h2m", 3720.0), (None, None), ("soon", None)])
+def test_parse_reset_seconds(value, seconds):
+    assert parse_reset_seconds(value) == (pytest.approx(seconds) if seconds is not None else None)
+
+
+def test_token_bucket_waits_for_refill():
+    bucket = TokenBucket(per_minute=6000)  # 100 per second
+
+    async def drain():
+        await bucket.acquire(6000)
+        await bucket.acquire(20)
+
+    assert 0.15 <= elapsed(drain()) < 0.6
+
+
+def test_token_bucket_without_rate_never_blocks():
+    bucket = TokenBucket()
+
+    async def many():
+        for _ in range(1000):
+            await bucket.acquire(10 ** 6)
+
+    assert elapsed(many()) < 0.2
+
+
+def test_token_bucket_adopts_server_limits_and_waits_for_reset():
+    bucket = TokenBucket()
+    bucket.sync(limit=500, remaining=0, reset_seconds=0.2)
+
+    assert bucket.per_minute == 500 and bucket.tokens == 0
+    # Blocked until the reset, then waits for 1 / (500 / 60) s of refill
+    assert 0.2 <= elapsed(bucket.acquire(1)) < 0.7
+
+
+def new_client(**options):
+    return RateLimitedLLMClient("test", RateLimiter(), base_delay=0.01, **options)
+
+
+def complete(**options):
+    async def run():
+        async with new_client(**options) as llm:
+            return await llm.complete(MESSAGES, model="gpt-3.5-turbo"), llm.retries
+    return asyncio.run(run())
+
+
+def test_retries_rate_limits_and_server_errors(fake_openai):
+    fake_openai.statuses = [429, 500]
+
+    content, retries = complete()
+
+    assert '"caching": {"present": true' in content
+    assert retries == 2
+    assert (fake_openai.stats["requests"], fake_openai.stats["rate_limited"], fake_openai.stats["errors"]) == (3, 1, 1)
+
+
+def test_retry_after_pauses_the_shared_limiter(fake_openai):
+    fake_openai.statuses = [429]
+    limiter = RateLimiter()
+
+    async def run():
+        async with RateLimitedLLMClient("test", limiter, base_delay=0.01) as llm:
+            await llm.complete(MESSAGES, model="gpt-3.5-turbo")
+
+    # The fake server asks for 0.2 s
+    assert elapsed(run()) >= 0.2
+    assert limiter.requests.blocked_until > 0
+
+
+def test_gives_up_after_max_retries(fake_openai):
+    fake_openai.statuses = [500, 500, 500]
+
+    with pytest.raises(RuntimeError, match="Giving up after 3 attempts"):
+        complete(max_retries=2)
+
+
+def test_single_requests_go_through_the_rate_limited_client(fake_openai, tmp_path):
+    # One request in flight at a time still gets backoff and the --rpm limit
+    analyzer = FeatureAnalyzer(cache_path=str(tmp_path / "cache.sqlite"), max_in_flight=1,
+                               requests_per_minute=6000)
+    fake_openai.statuses = [429]
+    # The fake server reports a feature present when its name appears in the code
+    chunk = "File: src/caching.py\n" + "import redis\ncache = redis.Redis()\n" * 10
+
+    results = analyzer.analyze_chunks([chunk], repo="acme/shop")
+
+    assert results["caching"]["present"]
+    assert fake_openai.stats["requests"] == 2
+    assert analyzer.metrics.totals["retries"] == 1
+    # The limiter charged the request and adopted the server's reported state
+    assert analyzer.rate_limiter.requests.tokens < 6000
@@ -0,0 +1,130 @@
+import asyncio
+import os
+import subprocess
+import tarfile
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from local_ingest import HEADER, GitIgnore, LocalIngestBackend, LocalIngester
+
+SKIP_EXTENSIONS = ['.css', '.map', '.svg', '.ico', '.gltf']
+
+FILES = {
+    ".gitignore": "*.log\nbuild/\n/secrets.txt\n!keep.log\n",
+    "README.md": "# Shop\n",
+    "secrets.txt": "token\n",
+    "debug.log": "noise\n",
+    "keep.log": "kept\n",
+    "build/out.js": "compiled()\n",
+    "src/app.py": "import redis\n",
+    "src/style.css": "body { color: red; }\n",
+    "src/logo.png": b"\x89PNG\r\n\x1a\n\0\0\0\rIHDR",
+    "src/big.json": "x" * 2048,
+    "src/secrets.txt": "not anchored here\n",
+    "web/.gitignore": "generated/\n",
+    "web/generated/api.ts": "export {}\n",
+    "web/index.ts": "export const app = 1\n",
+}
+KEPT = [".gitignore", "README.md", "keep.log", "src/app.py", "src/big.json", "src/logo.png", "src/secrets.txt",
+        "src/style.css", "web/.gitignore", "web/index.ts"]
+
+
+def write_tree(root, files):
+    for path, content in files.items():
+        target = os.path.join(root, path)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        with open(target, 'wb') as f:
+            f.write(content if isinstance(content, bytes) else content.encode())
+
+
+@pytest.fixture
+def checkout(tmp_path):
+    root = str(tmp_path / "shop")
+    write_tree(root, FILES)
+    return root
+
+
+def ingest(source, executor=None):
+    ingester = LocalIngester(SKIP_EXTENSIONS, max_file_bytes=1024, executor=executor)
+    return ingester.ingest(source, "acme-shop"), ingester.stats
+
+
+def files_in(dump):
+    return [line[len("File: "):] for line in dump.split("\n") if line.startswith("File: ")]
+
+
+def test_gitignore_rules():
+    ignore = GitIgnore()
+    ignore.add('', "*.log\n!keep.log\nbuild/\n/top.txt\ndocs/**/*.tmp\n# comment\n")
+    ignore.add('web', "dist\n")
+
+    assert ignore.ignored("debug.log") and ignore.ignored("src/deep/debug.log")
+    assert not ignore.ignored("keep.log")
+    assert ignore.ignored("build", is_dir=True) and not ignore.ignored("build")
+    assert ignore.ignored("top.txt") and not ignore.ignored("src/top.txt")
+    assert ignore.ignored("docs/a/b/c.tmp") and ignore.ignored("docs/c.tmp") and not ignore.ignored("c.tmp")
+    # Rules of a nested .gitignore only apply below it
+    assert ignore.ignored("web/dist") and not ignore.ignored("dist")
+    assert ignore.ignored_path("build/out.js") and ignore.ignored_path("web/dist/app.js")
+    assert not ignore.ignored_path("src/app.py")
+
+
+def test_checkout(checkout):
+    data, stats = ingest(checkout)
+    dump = data['textarea_content']
+
+    assert files_in(dump) == [path for path in KEPT if path not in ("src/big.json", "src/logo.png")]
+    assert f"{HEADER}\nFile: src/app.py\n{HEADER}\nimport redis\n" in dump
+    # Skipped extensions keep their header with an empty body
+    assert f"File: src/style.css\n{HEADER}\n\n" in dump
+    assert (stats.files, stats.binary, stats.oversized, stats.ignored) == (len(KEPT), 1, 1, 4)
+    # Ignored, binary and oversized files are never in the dump; only ignored ones are missing from the tree
+    tree = data['directory_structure']
+    assert tree.startswith("Directory structure:\n└── acme-shop/\n")
+    assert "big.json" in tree and "logo.png" in tree
+    assert "debug.log" not in tree and "build" not in tree and "generated" not in tree
+
+
+def test_parallel_reads_match(checkout):
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        assert ingest(checkout, executor)[0] == ingest(checkout)[0]
+
+
+def test_tarball_matches_checkout(checkout, tmp_path):
+    tarball = str(tmp_path / "shop.tar.gz")
+    with tarfile.open(tarball, "w:gz") as archive:
+        archive.add(checkout, arcname="shop-main")
+
+    data, stats = ingest(tarball)
+
+    assert data == ingest(checkout)[0]
+    assert stats.ignored == 4
+
+
+def test_bare_repository_matches_checkout(checkout, tmp_path):
+    git = ["git", "-c", "user.name=test", "-c", "user.email=test@example.com", "-c", "init.defaultBranch=main"]
+    subprocess.run(git + ["init", "-q", checkout], check=True)
+    subprocess.run(git + ["-C", checkout, "add", "-A"], check=True)
+    subprocess.run(git + ["-C", checkout, "commit", "-qm", "init"], check=True)
+    bare = str(tmp_path / "shop.git")
+    subprocess.run(git + ["clone", "-q", "--bare", checkout, bare], check=True)
+
+    assert LocalIngester.is_bare(bare) and not LocalIngester.is_bare(checkout)
+    assert ingest(bare)[0] == ingest(checkout)[0]
+
+
+def test_backend_resolves_mirrors(tmp_path):
+    write_tree(str(tmp_path / "acme" / "shop"), {"src/app.py": "import redis\n"})
+    write_tree(str(tmp_path / "acme" / "assets"), {"logo.png": b"\0\0\0"})
+    backend = LocalIngestBackend(str(tmp_path))
+
+    async def run():
+        async with backend:
+            return await asyncio.gather(*(backend.ingest(repo) for repo in ("acme/shop", "acme/assets", "acme/gone")))
+
+    shop, assets, gone = asyncio.run(run())
+    assert files_in(shop['textarea_content']) == ["src/app.py"]
+    assert shop['directory_structure'].startswith("Directory structure:\n└── acme-shop/\n")
+    # Nothing readable, or no mirror at all, fails like an empty gitingest page
+    assert assets is None and gone is None
@@ -0,0 +1,152 @@
+import json
+
+from feature_analyzer import FeatureAnalyzer
+from manifests import (iter_manifests, manifest_features, parse_gemfile, parse_go_mod, parse_package_json,
+                       parse_pyproject, parse_requirements)
+from repo_index import RepositoryDump
+from scraper import GitIngestScraper
+
+SEPARATOR = "=" * 48
+
+
+def dump_of(files):
+    return RepositoryDump.from_text("\n".join(f"{SEPARATOR}\nFile: {path}\n{SEPARATOR}\n{body}\n"
+                                              for path, body in files.items()))
+
+
+def test_package_json_counts_runtime_dependencies_only():
+    text = json.dumps({
+        "dependencies": {"Express": "^4", "ioredis": "^5"},
+        "devDependencies": {"jest": "^29", "ws": "^8"},
+        "peerDependencies": {"react": "^18"},
+        "optionalDependencies": {"bufferutil": "^4"},
+    })
+
+    assert parse_package_json(text) == ["express", "ioredis"]
+    assert parse_package_json("{not json") == [] and parse_package_json("[1, 2]") == []
+
+
+def test_requirements():
+    text = """
+# web
+Django>=4.2  # pinned below
+flask_sqlalchemy==3.1
+celery[redis] ; python_version >= "3.9"
+-r base.txt
+-e git+https://github.com/acme/lib.git#egg=lib
+https://example.com/pkg.whl
+--index-url https://pypi.example.com
+"""
+    assert parse_requirements(text) == ["django", "flask-sqlalchemy", "celery"]
+
+
+def test_pyproject_counts_runtime_dependencies_only():
+    text = """
+[project]
+dependencies = ["SQLAlchemy>=2", "redis[hiredis]"]
+
+[project.optional-dependencies]
+ai = ["openai"]
+
+[tool.poetry.dependencies]
+python = "^3.11"
+Celery = "^5"
+
+[tool.poetry.dev-dependencies]
+pytest = "*"
+
+[tool.poetry.group.test.dependencies]
+moto = "*"
+"""
+    assert parse_pyproject(text) == ["sqlalchemy", "redis", "celery"]
+    assert parse_pyproject("[project\n") == []
+
+
+def test_go_mod_skips_indirect_requirements():
+    text = """module github.com/acme/api
+
+go 1.22
+
+require github.com/gin-gonic/gin v1.9.1
+
+require (
+    github.com/redis/go-redis/v9 v9.5.1
+    gorm.io/gorm v1.25.7 // direct
+    golang.org/x/crypto v0.21.0 // indirect
+)
+"""
+    assert parse_go_mod(text) == ["github.com/gin-gonic/gin", "github.com/redis/go-redis", "gorm.io/gorm"]
+
+
+def test_gemfile_skips_development_and_test_groups():
+    text = """source "https://rubygems.org"
+gem "rails", "~> 7.1"
+gem 'pg'
+gem "sidekiq", group: :production
+gem "rspec-rails", group: [:development, :test]
+
+group :development, :test do
+  gem "debug"
+  gem "redis"
+end
+
+group :production do
+  gem "dalli"
+end
+
+platforms :jruby do
+  gem "activerecord-jdbc-adapter"
+end
+# gem "devise"
+"""
+    assert parse_gemfile(text) == ["rails", "pg", "sidekiq", "dalli", "activerecord-jdbc-adapter"]
+
+
+def test_manifests_are_found_by_name_outside_vendored_directories():
+    dump = dump_of({
+        "package.json": "{}",
+        "api/requirements.txt": "",
+        "requirements-dev.txt": "",
+        "requirements/test.txt": "",
+        "pyproject.toml": "",
+        "go.mod": "",
+        "Gemfile": "",
+        "node_modules/redis/package.json": "{}",
+        "vendor/github.com/x/go.mod": "",
+        "src/package.json.bak": "",
+    })
+
+    found = [(entry.path, ecosystem) for entry, ecosystem, _ in iter_manifests(dump)]
+
+    assert found == [("package.json", "npm"), ("api/requirements.txt", "pypi"), ("pyproject.toml", "pypi"),
+                     ("go.mod", "go"), ("Gemfile", "gem")]
+
+
+def test_manifest_features_maps_dependencies_to_features():
+    dump = dump_of({
+        "package.json": json.dumps({"dependencies": {"@langchain/openai": "^0.1", "ws": "^8", "bullmq": "^5"},
+                                    "devDependencies": {"redis": "^4"}}),
+        "requirements.txt": "itsdangerous\npsycopg2-binary\n",
+        "go.mod": "module x\nrequire golang.org/x/crypto v0.21.0\n",
+    })
+
+    assert manifest_features(dump) == {
+        "ai_implementation": ["@langchain/openai (package.json)"],
+        "message_queues": ["bullmq (package.json)"],
+        "background_jobs": ["bullmq (package.json)"],
+        "database": ["psycopg2-binary (requirements.txt)"],
+    }
+
+
+def test_declared_dependencies_settle_features_before_the_llm(gitingest_page, tmp_path, monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    content = GitIngestScraper("acme/shop").parse_repository_data(gitingest_page)['textarea_content']
+    analyzer = FeatureAnalyzer(cache_path=str(tmp_path / "cache.sqlite"))
+
+    settled = analyzer.settle_features(content)
+
+    assert settled == {"database": {"present": True,
+                                    "details": ["Declared dependency: @supabase/supabase-js (package.json)"],
+                                    "source": "manifest"}}
+    disabled = FeatureAnalyzer(cache_path=str(tmp_path / "off.sqlite"), manifest_fast_path=False)
+    assert disabled.settle_features(content) == {}
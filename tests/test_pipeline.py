@@ -0,0 +1,113 @@
+import asyncio
+import csv
+import os
+import threading
+
+import pytest
+
+from feature_analyzer import FeatureAnalyzer
+from fetchers import HttpFetchBackend
+from pipeline import RepositoryPipeline, Stage, run_stages
+
+REPOSITORIES = [("acme/shop", "Vercel"), ("acme/broken", "Unknown"), ("acme/store", "Vercel")]
+
+
+async def passthrough(item):
+    return item
+
+
+async def fail_on_broken(item):
+    if item['repo'] == "acme/broken":
+        raise RuntimeError("chunking failed")
+    return item
+
+
+def test_failing_stage_drops_item_and_calls_on_error():
+    dropped, finished = [], []
+    stages = [Stage("chunk", fail_on_broken, 2, on_error=dropped.append), Stage("rules", passthrough)]
+
+    failed = asyncio.run(run_stages([{'repo': repo} for repo, _ in REPOSITORIES], stages, finished.append))
+
+    assert dropped == [{'repo': "acme/broken"}]
+    assert sorted(item['repo'] for item in finished) == ["acme/shop", "acme/store"]
+    assert (stages[0].processed, stages[0].failed, failed) == (3, 1, 0)
+
+
+def test_failing_sink_is_counted_and_the_run_goes_on():
+    written = []
+
+    def sink(item):
+        if item['repo'] == "acme/broken":
+            raise KeyError('content_hash')
+        written.append(item['repo'])
+
+    failed = asyncio.run(run_stages([{'repo': repo} for repo, _ in REPOSITORIES], [Stage("rules", passthrough)], sink))
+
+    assert failed == 1
+    assert written == ["acme/shop", "acme/store"]
+
+
+class FailingResultsStore:
+    def __init__(self):
+        self.recorded = []
+
+    def record(self, repo, row, code_results=None, content_hash=None):
+        if repo == "acme/store":
+            raise RuntimeError("database is locked")
+        self.recorded.append(repo)
+
+
+@pytest.fixture
+def pipeline(gitingest_server, gitingest_page, fake_openai, tmp_path):
+    for repo, _ in REPOSITORIES:
+        gitingest_server.route(repo, gitingest_page)
+    analyzer = FeatureAnalyzer(cache_path=str(tmp_path / "cache.sqlite"), streaming=True)
+    return RepositoryPipeline(analyzer, HttpFetchBackend(), str(tmp_path), base_url=gitingest_server.base_url,
+                              save_intermediates=False, results_store=FailingResultsStore())
+
+
+def test_pipeline_releases_failed_repositories_and_survives_sink_errors(pipeline, tmp_path, monkeypatch):
+    prepare_chunks = pipeline.analyzer.prepare_chunks
+
+    def failing_prepare_chunks(code_content, repo, settled):
+        if repo == "acme/broken":
+            raise RuntimeError("chunking failed")
+        return prepare_chunks(code_content, repo, settled)
+
+    monkeypatch.setattr(pipeline.analyzer, "prepare_chunks", failing_prepare_chunks)
+
+    csv_path = pipeline.run(REPOSITORIES)
+
+    with open(csv_path, newline='') as f:
+        assert sorted(row['repository'] for row in csv.DictReader(f)) == ["acme/shop", "acme/store"]
+    assert pipeline.results_store.recorded == ["acme/shop"]
+    assert pipeline.write_failed == 1
+    # The spill files of finished and failed repositories are all gone
+    assert [name for name in os.listdir(tmp_path) if name.startswith("dump_")] == []
+
+
+def test_blocking_llm_stage_work_runs_off_the_event_loop(fake_openai, tmp_path, monkeypatch):
+    analyzer = FeatureAnalyzer(cache_path=str(tmp_path / "cache.sqlite"), streaming=True)
+    threads = []
+
+    def recording(name):
+        func = getattr(analyzer, name)
+
+        def run(*args, **kwargs):
+            threads.append((name, threading.current_thread() is threading.main_thread()))
+            return func(*args, **kwargs)
+        monkeypatch.setattr(analyzer, name, run)
+
+    for name in ("_lookup_cached", "_merge_batch", "_finalize_analysis"):
+        recording(name)
+    chunks = (f"File: src/module{index}.py\n" + "def handler():\n    return 'ok'\n" * 20 for index in range(3))
+
+    async def run():
+        async with analyzer.create_llm_client() as llm:
+            return await analyzer.analyze_chunks_async(chunks, llm, repo="acme/shop")
+
+    asyncio.run(run())
+
+    assert [name for name, _ in threads] == ["_lookup_cached", "_merge_batch", "_finalize_analysis"]
+    assert not any(on_loop for _, on_loop in threads)
+    assert fake_openai.stats["requests"] == 3
@@ -0,0 +1,81 @@
+import asyncio
+import json
+
+import pytest
+
+from feature_analyzer import FeatureAnalyzer
+
+REPOS = {"acme/portfolio": "caching", "acme/blog": "storage", "acme/notes": "database"}
+
+
+def chunk(name):
+    # The fake server reports a feature present when its name appears in the code
+    return "File: src/app.py\n" + "".join(f"def {name}_handler_{index}(request):\n    return process(request)\n\n"
+                                          for index in range(5))
+
+
+@pytest.fixture
+def analyzer(fake_openai, tmp_path):
+    analyzer = FeatureAnalyzer(cache_path=str(tmp_path / "cache.sqlite"), pack_sections=8)
+    # Do not wait long for more small chunks
+    analyzer.packer.linger = 0.05
+    return analyzer
+
+
+def analyze_together(analyzer):
+    async def run():
+        async with analyzer.create_llm_client() as llm:
+            results = await asyncio.gather(*(analyzer.analyze_chunks_async([chunk(name)], llm, repo=repo)
+                                             for repo, name in REPOS.items()))
+            await analyzer.packer.close(llm)
+        return dict(zip(REPOS, results))
+    return asyncio.run(run())
+
+
+def present(analysis):
+    return {feature for feature, result in analysis.items() if result["present"]}
+
+
+def test_small_repositories_share_one_request(analyzer, fake_openai):
+    results = analyze_together(analyzer)
+
+    assert fake_openai.stats["requests"] == 1
+    assert (analyzer.packer.requests, analyzer.packer.sections, analyzer.packer.resplits) == (1, 3, 0)
+    # Each repository gets the answer to its own section
+    assert {repo: present(analysis) for repo, analysis in results.items()} == \
+        {repo: {name} for repo, name in REPOS.items()}
+
+
+def test_failed_section_is_resplit(analyzer, fake_openai):
+    parse = analyzer._parse_packed_response
+    damaged = []
+
+    def drop_second_section(label, raw_response, section_ids, features=None):
+        if not damaged:
+            answers = json.loads(raw_response)
+            damaged.append(answers.pop("s2"))
+            raw_response = json.dumps(answers)
+        return parse(label, raw_response, section_ids, features)
+
+    analyzer._parse_packed_response = drop_second_section
+    results = analyze_together(analyzer)
+
+    # The packed request, then the failed section alone as an ordinary request
+    assert fake_openai.stats["requests"] == 2
+    assert (analyzer.packer.requests, analyzer.packer.resplits) == (1, 1)
+    assert {repo: present(analysis) for repo, analysis in results.items()} == \
+        {repo: {name} for repo, name in REPOS.items()}
+
+
+def test_packed_response_validation(analyzer):
+    features = ["caching", "storage"]
+    valid = {"present": True, "details": "", "improvements": ""}
+
+    assert analyzer._parse_packed_response("[PACK]", "not json", ["s1"], features) == {}
+    assert analyzer._parse_packed_response("[PACK]", "[]", ["s1"], features) == {}
+    answers = analyzer._parse_packed_response("[PACK]", json.dumps({
+        "S1": {"Caching": valid, "storage": valid},
+        "s2": {"caching": valid},
+        "s3": {"caching": valid, "storage": {"present": "yes"}},
+    }), ["s1", "s2", "s3", "s4"], features)
+    assert answers == {"s1": {"caching": valid, "storage": valid}, "s2": None, "s3": None, "s4": None}
@@ -0,0 +1,119 @@
+import csv
+import json
+import sqlite3
+
+import pytest
+
+from results import CODE_FEATURES, CSV_HEADERS
+from results_store import FEATURES, ResultsStore, import_csv, pack_features, unpack_features
+
+
+def row_of(repo, deployment="Vercel", framework="Next.js", features=()):
+    row = {"repository": repo, "deployment": deployment, "framework": framework}
+    row.update({feature: int(feature in features) for feature in FEATURES})
+    return row
+
+
+def code_results(**texts):
+    return {feature: {"present": True, "details": details, "improvements": ""} for feature, details in texts.items()}
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "results.sqlite")
+
+
+def test_pack_features_round_trip():
+    row = row_of("acme/shop", features=("has_frontend", "caching", "storage"))
+    mask = pack_features(row)
+    assert bin(mask).count("1") == 3
+    assert unpack_features(mask) == {feature: row[feature] for feature in FEATURES}
+
+
+def test_upsert_and_history(path):
+    store = ResultsStore(path, config="a", settings={"model": "gpt-3.5-turbo"})
+    assert store.record("acme/shop", row_of("acme/shop", features=("caching",)), code_results(caching="redis"),
+                        "hash1") == 1
+    # Unchanged results keep their version
+    assert store.record("acme/shop", row_of("acme/shop", features=("caching",)), code_results(caching="redis"),
+                        "hash1") == 1
+    assert store.record("acme/shop", row_of("acme/shop", features=("caching", "storage")), None, "hash2") == 2
+    store.close()
+
+    store = ResultsStore(path, config="b", settings={"model": "gpt-4o-mini"})
+    assert store.record("acme/shop", row_of("acme/shop", features=("storage",)), None, "hash2") == 3
+    assert store.get("acme/shop") == row_of("acme/shop", features=("storage",)) and len(store) == 1
+    history = store.history("acme/shop")
+    assert [(entry["version"], entry["config"], entry["content_hash"]) for entry in history] == \
+        [(1, "a", "hash1"), (2, "a", "hash2"), (3, "b", "hash2")]
+    assert history[0]["settings"] == {"model": "gpt-3.5-turbo"}
+    # The texts the CSV drops are kept with each version
+    assert history[0]["details"] == {"caching": ["redis", ""]} and history[1]["details"] == {}
+    # Each configuration's newest result stays available
+    [(row, extra)] = store.rows(config="a")
+    assert row == row_of("acme/shop", features=("caching", "storage")) and extra["version"] == 2
+    assert [extra["version"] for _, extra in store.rows(all_versions=True)] == [1, 2, 3]
+    assert store.get("acme/gone") is None
+
+
+def test_tallies_follow_upserts(path):
+    store = ResultsStore(path)
+    store.record("acme/shop", row_of("acme/shop", features=("caching", "database")))
+    store.record("acme/blog", row_of("acme/blog", features=("caching",)))
+    store.record("acme/docs", row_of("acme/docs", deployment="Netlify", framework="Astro"))
+    # Moving a repository to another platform takes it out of the old group
+    store.record("acme/blog", row_of("acme/blog", deployment="Netlify", features=("caching",)))
+
+    by_deployment = store.prevalence("deployment", ["caching", "database"])
+    assert by_deployment == {"Vercel": {"repositories": 1, "caching": 1.0, "database": 1.0},
+                             "Netlify": {"repositories": 2, "caching": 0.5, "database": 0.0}}
+    assert store.prevalence(features=["caching"]) == {"all": {"repositories": 3, "caching": 2 / 3}}
+    assert set(store.prevalence("framework")) == {"Next.js", "Astro"}
+    assert store.repositories_with(["caching"]) == ["acme/blog", "acme/shop"]
+    assert store.repositories_with(["caching"], deployment="Netlify") == ["acme/blog"]
+    assert store.repositories_with(deployment="Heroku") == []
+    with pytest.raises(ValueError):
+        store.prevalence("repository")
+
+
+def test_csv_export_and_import(path, tmp_path):
+    store = ResultsStore(path)
+    store.record("acme/shop", row_of("acme/shop", features=("caching",)), code_results(caching="redis"))
+    store.record("acme/blog", row_of("acme/blog", deployment="Netlify"))
+    exported = str(tmp_path / "results.csv")
+
+    assert store.export_csv(exported, details=True) == 2
+    with open(exported, newline='', encoding='utf-8') as f:
+        rows = list(csv.DictReader(f))
+    assert [row["repository"] for row in rows] == ["acme/blog", "acme/shop"]
+    assert list(rows[0])[:len(CSV_HEADERS)] == CSV_HEADERS
+    assert rows[1]["caching"] == "1" and rows[1]["caching_details"] == "redis" and rows[0]["caching_details"] == ""
+    assert len(rows[0]) == len(CSV_HEADERS) + 2 * len(CODE_FEATURES)
+
+    other = ResultsStore(str(tmp_path / "imported.sqlite"))
+    assert import_csv(other, exported) == 2
+    assert other.get("acme/shop") == store.get("acme/shop") and other.get("acme/blog") == store.get("acme/blog")
+
+
+def test_feature_list_change_repacks(path):
+    store = ResultsStore(path)
+    store.record("acme/shop", row_of("acme/shop", features=("has_frontend", "caching")))
+    store.record("acme/blog", row_of("acme/blog", features=("caching",)))
+    store.close()
+    # Pretend the results were written with the features in another order
+    older = list(reversed(FEATURES))
+    conn = sqlite3.connect(path)
+    conn.execute("UPDATE meta SET value = ? WHERE key = 'features'", (json.dumps(older),))
+    for table in ("results", "current"):
+        for repo, mask in conn.execute(f"SELECT repo, features FROM {table}").fetchall():
+            conn.execute(f"UPDATE {table} SET features = ? WHERE repo = ?",
+                         (pack_features(unpack_features(mask), older), repo))
+    conn.execute("DELETE FROM tallies")
+    conn.commit()
+    conn.close()
+
+    store = ResultsStore(path)
+    assert store.get("acme/shop") == row_of("acme/shop", features=("has_frontend", "caching"))
+    assert store.history("acme/blog")[0]["row"] == row_of("acme/blog", features=("caching",))
+    assert store.prevalence(features=["caching", "has_frontend"]) == \
+        {"all": {"repositories": 2, "caching": 1.0, "has_frontend": 0.5}}
@@ -0,0 +1,96 @@
+import pytest
+
+import rules
+from bench_rules import LegacyDetectors, check_equivalence, run_compiled, run_legacy
+from feature_analyzer import DIRECTORY_FEATURES
+from rules import DEPLOYMENT_RULES, FRAMEWORK_RULES, RuleEngine, directory_rules
+from scraper import GitIngestScraper
+
+# (directory structure, code content without file headers, repo) -> legacy labels
+FIXTURES = [
+    ("streamlit_app.py", "import streamlit as st\nst.title('x')", "acme/dash"),
+    ("README.md", "", "acme/streamlit-demo"),
+    ("vercel.json\npackage.json", "", "acme/shop"),
+    ("next.config.js\npackage.json", '"next": "14.0.0"', "acme/shop"),
+    ("next.config.js", "const aws = require('aws-sdk')", "acme/shop"),
+    ("package.json", '"firebase": "^10"', "acme/app"),
+    ("src/", "firebase.initializeApp(config)", "acme/app"),
+    ("docker-compose.yml", "require('aws-sdk')", "acme/api"),
+    ("_config.yml", "url: acme.github.io", "acme/blog"),
+    ("netlify.toml", "", "acme/site"),
+    ("app.yaml", "runtime: python39 # google", "acme/gae"),
+    ("package.json", '"private": false\nnpm publish', "acme/lib"),
+    ("Procfile\nrequirements.txt\ndjango/", "", "acme/web"),
+    ("angular.json\npackage.json", '"@angular/core": "17"', "acme/ng"),
+    ("package.json", '"react": "18", "react-dom": "18"', "acme/spa"),
+    ("package.json", '"vue": "3"\ncreateApp(App)', "acme/vue"),
+    ("svelte.config.js", "", "acme/svelte"),
+    ("src/flask/app.py", "", "acme/flask"),
+    ("", "", "acme/empty"),
+]
+
+
+@pytest.fixture
+def engine():
+    return RuleEngine({"deployment": DEPLOYMENT_RULES, "framework": FRAMEWORK_RULES})
+
+
+@pytest.mark.parametrize("directory_structure, code_content, repo", FIXTURES)
+def test_rule_engine_matches_legacy_detectors(engine, directory_structure, code_content, repo):
+    expected = run_legacy(LegacyDetectors(), directory_structure, code_content, repo)
+
+    assert run_compiled(engine, directory_structure, code_content, repo) == expected
+
+
+def test_fixtures_cover_many_labels():
+    legacy = LegacyDetectors()
+    labels = {run_legacy(legacy, *fixture) for fixture in FIXTURES}
+
+    assert len({deployment for deployment, _ in labels}) >= 10
+    assert len({framework for _, framework in labels}) >= 8
+
+
+def test_randomized_inputs_match_legacy_detectors():
+    assert check_equivalence(trials=300) == 0
+
+
+def test_substring_fallback_matches_automaton(monkeypatch):
+    automaton = RuleEngine({"deployment": DEPLOYMENT_RULES, "framework": FRAMEWORK_RULES})
+    monkeypatch.setattr(rules, "AHOCORASICK_AVAILABLE", False)
+    substring = RuleEngine({"deployment": DEPLOYMENT_RULES, "framework": FRAMEWORK_RULES})
+
+    assert all(matcher.automaton is None for matcher in substring.matchers.values())
+    for fixture in FIXTURES:
+        assert run_compiled(substring, *fixture) == run_compiled(automaton, *fixture)
+
+
+def test_saved_page_matches_legacy_detectors(engine, gitingest_page):
+    scraped = GitIngestScraper("acme/shop").parse_repository_data(gitingest_page)
+    directory_structure, code_content = scraped['directory_structure'], scraped['textarea_content']
+
+    assert run_compiled(engine, directory_structure, code_content, "acme/shop") == \
+        run_legacy(LegacyDetectors(), directory_structure, code_content, "acme/shop") == ("Vercel", "Unknown")
+
+
+def test_package_json_rules_only_look_inside_package_json(engine):
+    # With file headers, "firebase" elsewhere no longer counts as a package.json dependency
+    directory_structure = "package.json\nREADME.md"
+    code_content = ("=" * 48 + "\nFile: package.json\n" + "=" * 48 + '\n{"name": "app"}\n\n'
+                    + "=" * 48 + "\nFile: README.md\n" + "=" * 48 + "\nWe moved off firebase.\n")
+
+    assert run_legacy(LegacyDetectors(), directory_structure, code_content, "acme/app")[0] == "Firebase"
+    assert run_compiled(engine, directory_structure, code_content, "acme/app")[0] == "Unknown"
+
+
+@pytest.mark.parametrize("directory_structure", [
+    "Dockerfile\n.github/workflows/ci.yml\nterraform/main.tf",
+    "k8s/kubernetes.yaml\npublic/index.html\n.env.production",
+    "src/app.py",
+])
+def test_directory_rules_match_substring_checks(directory_structure):
+    engine = RuleEngine({"directory": directory_rules(DIRECTORY_FEATURES)})
+    lowered = directory_structure.lower()
+    expected = {feature: any(pattern.lower() in lowered for pattern in patterns)
+                for feature, patterns in DIRECTORY_FEATURES.items()}
+
+    assert engine.matching_labels("directory", engine.signals("directory", directory_structure)) == expected
@@ -0,0 +1,150 @@
+import csv
+
+import pytest
+
+from feature_analyzer import FeatureAnalyzer
+from fetchers import HttpFetchBackend
+from pipeline import RepositoryPipeline
+from repo_index import RepositoryDump
+from run_manifest import RunManifest, content_hash, open_results_csv, upsert_results_csv
+
+FIELDS = ["repository", "deployment"]
+REPOSITORIES = [("acme/shop", "Vercel"), ("acme/store", "Unknown")]
+
+
+def read_rows(path):
+    with open(path, newline='') as f:
+        return list(csv.DictReader(f))
+
+
+def test_content_hash_covers_tree_and_dump():
+    dump = RepositoryDump.from_text("File: a.py\nprint(1)\n")
+
+    assert content_hash("tree", dump) == content_hash("tree", RepositoryDump.from_text("File: a.py\nprint(1)\n"))
+    assert content_hash("tree", dump) != content_hash("tree2", dump)
+    assert content_hash("tree", dump) != content_hash("tree", RepositoryDump.from_text("File: a.py\nprint(2)\n"))
+
+
+def test_is_done_needs_same_configuration_and_content(tmp_path):
+    path = str(tmp_path / "manifest.sqlite")
+    manifest = RunManifest(path, "config-a")
+    manifest.start("acme/shop", "fetch")
+    manifest.fail("acme/store", "llm", "timeout")
+    manifest.complete("acme/shop", {"repository": "acme/shop"}, "hash-1")
+
+    assert manifest.is_done("acme/shop") and manifest.is_done("acme/shop", "hash-1")
+    assert not manifest.is_done("acme/shop", "hash-2")
+    assert not manifest.is_done("acme/store")
+    assert manifest.get("acme/store")["error"] == "timeout"
+    assert manifest.summary(["acme/shop", "acme/store", "acme/new"]) == {"done": 1, "failed": 1, "new": 1}
+    manifest.close()
+
+    # Another configuration analyzes everything again
+    assert not RunManifest(path, "config-b").is_done("acme/shop")
+
+
+def test_keep_leaves_the_row_alone(tmp_path):
+    manifest = RunManifest(str(tmp_path / "manifest.sqlite"), "config")
+    manifest.complete("acme/shop", {"repository": "acme/shop", "deployment": "Vercel"}, "hash-1")
+    manifest.set_content_hash("acme/shop", "hash-1")
+    assert not manifest.is_done("acme/shop")
+
+    manifest.keep("acme/shop")
+
+    assert manifest.is_done("acme/shop", "hash-1")
+    assert manifest.done_rows(["acme/shop"]) == [{"repository": "acme/shop", "deployment": "Vercel"}]
+
+
+def test_open_results_csv_appends_and_moves_other_layouts_aside(tmp_path):
+    path = str(tmp_path / "results.csv")
+    for deployment in ("Vercel", "Heroku"):
+        csvfile, writer = open_results_csv(path, FIELDS)
+        with csvfile:
+            writer.writerow({"repository": "acme/shop", "deployment": deployment})
+    assert [row["deployment"] for row in read_rows(path)] == ["Vercel", "Heroku"]
+
+    csvfile, _ = open_results_csv(path, FIELDS + ["framework"])
+    csvfile.close()
+
+    assert read_rows(path) == []
+    assert len(read_rows(f"{path}.bak")) == 2
+
+
+def test_upsert_results_csv_keeps_the_newest_row_at_its_first_position(tmp_path):
+    path = str(tmp_path / "results.csv")
+    with open(path, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=FIELDS)
+        writer.writeheader()
+        writer.writerows([{"repository": "acme/shop", "deployment": "Unknown"},
+                          {"repository": "acme/store", "deployment": "Netlify"},
+                          {"repository": "acme/shop", "deployment": "Vercel"}])
+
+    upsert_results_csv(path, FIELDS, [{"repository": "acme/blog", "deployment": "GitHub Pages"}])
+
+    assert read_rows(path) == [{"repository": "acme/shop", "deployment": "Vercel"},
+                               {"repository": "acme/store", "deployment": "Netlify"},
+                               {"repository": "acme/blog", "deployment": "GitHub Pages"}]
+
+
+def test_upsert_results_csv_appends_missing_rows_without_rewriting(tmp_path):
+    path = str(tmp_path / "results.csv")
+    csvfile, writer = open_results_csv(path, FIELDS)
+    with csvfile:
+        writer.writerow({"repository": "acme/shop", "deployment": "Vercel"})
+
+    upsert_results_csv(path, FIELDS, [{"repository": "acme/shop", "deployment": "Vercel"},
+                                      {"repository": "acme/store", "deployment": "Netlify"}])
+
+    assert [row["repository"] for row in read_rows(path)] == ["acme/shop", "acme/store"]
+
+
+@pytest.fixture
+def run_pipeline(gitingest_server, gitingest_page, fake_openai, tmp_path):
+    for repo, _ in REPOSITORIES + [("acme/blog", "Unknown")]:
+        gitingest_server.route(repo, gitingest_page)
+
+    def run(repositories, recheck=False, **analyzer_options):
+        analyzer = FeatureAnalyzer(cache_path=str(tmp_path / "cache.sqlite"), streaming=True, **analyzer_options)
+        manifest = RunManifest(str(tmp_path / "manifest.sqlite"), analyzer.config_fingerprint())
+        pipeline = RepositoryPipeline(analyzer, HttpFetchBackend(), str(tmp_path),
+                                      base_url=gitingest_server.base_url, save_intermediates=False,
+                                      manifest=manifest, recheck=recheck)
+        try:
+            return read_rows(pipeline.run(repositories))
+        finally:
+            manifest.close()
+    return run
+
+
+def test_resume_skips_finished_repositories(run_pipeline, gitingest_server):
+    first = run_pipeline(REPOSITORIES)
+    fetched = len(gitingest_server.requests)
+
+    again = run_pipeline(REPOSITORIES)
+
+    assert again == first and len(gitingest_server.requests) == fetched
+    # An extended list only fetches the new repository; every repository keeps one row
+    extended = run_pipeline(REPOSITORIES + [("acme/blog", "Unknown")])
+    assert gitingest_server.requests[fetched:] == ["/acme/blog"]
+    assert sorted(row["repository"] for row in extended) == ["acme/blog", "acme/shop", "acme/store"]
+
+
+def test_changed_configuration_analyzes_again(run_pipeline, gitingest_server):
+    run_pipeline(REPOSITORIES)
+    fetched = len(gitingest_server.requests)
+
+    rows = run_pipeline(REPOSITORIES, early_stop=True)
+
+    assert len(gitingest_server.requests) == fetched + 2
+    assert sorted(row["repository"] for row in rows) == ["acme/shop", "acme/store"]
+
+
+def test_recheck_refetches_but_keeps_unchanged_rows(run_pipeline, gitingest_server, fake_openai):
+    first = run_pipeline(REPOSITORIES)
+    requests = fake_openai.stats["requests"]
+
+    rows = run_pipeline(REPOSITORIES, recheck=True)
+
+    assert len(gitingest_server.requests) == 4
+    assert fake_openai.stats["requests"] == requests
+    assert rows == first
@@ -0,0 +1,203 @@
+import pytest
+from selenium.common.exceptions import WebDriverException
+
+from driver_pool import DriverPool
+from repo_index import RepositoryDump
+from scraper import GitIngestScraper
+
+EMPTY_CONTENT_PAGE = """<html><body>
+<textarea readonly>Repository: acme/empty</textarea>
+<input type="hidden" id="directory-structure-content" value="Directory structure:
+└── acme-empty/
+">
+<textarea readonly></textarea>
+</body></html>"""
+
+NO_HEADER_PAGE = """<html><body>
+<textarea readonly>Repository: acme/notes</textarea>
+<input type="hidden" id="directory-structure-content" value="Directory structure:
+└── acme-notes/
+">
+<textarea readonly>Directory structure:
+└── acme-notes/
+
+This repository has no readable files.
+</textarea>
+</body></html>"""
+
+
+def line_filter(scraper, content):
+    """The line-by-line filter filter_css_content replaced, as the reference for its output."""
+    lines = content.split('\n')
+    filtered_lines = []
+    skip_mode = False
+    i = 0
+    while i < len(lines):
+        line = lines[i]
+        if line.startswith('=' * 48):
+            if i + 1 < len(lines) and lines[i + 1].startswith('File:'):
+                skip_mode = any(lines[i + 1].endswith(ext) for ext in scraper.skip_extensions)
+                filtered_lines.extend(lines[i:i + 3])
+                i += 2
+        elif not skip_mode:
+            filtered_lines.append(line)
+        i += 1
+    return '\n'.join(filtered_lines)
+
+
+@pytest.fixture
+def scraper():
+    # Parsing and filtering never start a browser
+    return GitIngestScraper("acme/shop", base_url="http://127.0.0.1:9")
+
+
+def test_parse_saved_page(scraper, gitingest_page):
+    result = scraper.parse_repository_data(gitingest_page)
+
+    assert result['directory_structure'].startswith("Directory structure:\n└── acme-shop/\n")
+    assert "        └── styles.css" in result['directory_structure']
+    content = result['textarea_content']
+    assert content.startswith("=" * 48 + "\nFile: README.md\n")
+    # Entities are decoded, so the dump holds the files' real text
+    assert '"name": "acme-shop"' in content
+    assert "return <main className=\"shop\">Café & bakery</main>;" in content
+    assert scraper._driver is None
+
+
+def test_has_repository_data(gitingest_page):
+    assert GitIngestScraper.has_repository_data(gitingest_page)
+    assert not GitIngestScraper.has_repository_data('<html><div id="app"></div></html>')
+    assert not GitIngestScraper.has_repository_data(None)
+
+
+def test_filter_css_content_drops_skipped_bodies(scraper, gitingest_page):
+    content = scraper.parse_repository_data(gitingest_page)['textarea_content']
+
+    filtered = scraper.filter_css_content(content)
+
+    assert filtered == line_filter(scraper, content)
+    # Headers of skipped files stay, their bodies go
+    assert "File: src/styles.css" in filtered and ".shop {" not in filtered
+    assert "File: public/logo.svg" in filtered and "<svg" not in filtered
+    assert "cache = redis.Redis()" in filtered
+    assert "import { createClient } from '@supabase/supabase-js';" in filtered
+
+
+def test_filter_dump_indexes_the_filtered_content(scraper, gitingest_page):
+    result = scraper.parse_repository_data(gitingest_page)
+
+    dump = scraper.filter_dump(result['textarea_content'], result['directory_structure'])
+
+    assert dump.data.decode('utf-8') == scraper.filter_css_content(result['textarea_content'])
+    assert [entry.path for entry in dump] == ["README.md", "package.json", "vercel.json", "public/logo.svg",
+                                              "src/App.jsx", "src/api.py", "src/styles.css"]
+    assert dump.files["src/styles.css"].length == 0
+    assert dump.text("src/api.py") == "import redis\n\ncache = redis.Redis()\n\n"
+    assert "src/App.jsx" in dump.tree
+
+
+def test_write_filtered_dump_matches_filter_css_content(scraper, gitingest_page, tmp_path):
+    content = scraper.parse_repository_data(gitingest_page)['textarea_content']
+    path = tmp_path / "dump.txt"
+
+    written = scraper.write_filtered_dump(content, str(path))
+
+    assert path.read_bytes().decode('utf-8') == scraper.filter_css_content(content)
+    assert written == path.stat().st_size
+
+
+def test_empty_textarea(scraper):
+    result = scraper.parse_repository_data(EMPTY_CONTENT_PAGE)
+
+    assert result['directory_structure'] == "Directory structure:\n└── acme-empty/\n"
+    assert result['textarea_content'] == ""
+    assert scraper.filter_css_content(result['textarea_content']) == ""
+    assert len(scraper.filter_dump(result['textarea_content'])) == 0
+
+
+def test_content_without_file_headers(scraper):
+    content = scraper.parse_repository_data(NO_HEADER_PAGE)['textarea_content']
+
+    assert scraper.filter_css_content(content) == content == line_filter(scraper, content)
+    dump = RepositoryDump.from_text(content)
+    assert len(dump) == 0
+    assert dump.preamble_length == len(content.encode('utf-8'))
+
+
+def test_missing_directory_structure(scraper):
+    result = scraper.parse_repository_data("<html><textarea></textarea><textarea>text</textarea></html>")
+
+    assert result == {'directory_structure': None, 'textarea_content': "text"}
+
+
+class FakeDriver:
+    def __init__(self, name):
+        self.name = name
+        self.quit_calls = 0
+
+    def quit(self):
+        self.quit_calls += 1
+
+
+class FakeDriverFactory:
+    def __init__(self):
+        self.drivers = []
+
+    def __call__(self):
+        driver = FakeDriver(f"driver-{len(self.drivers)}")
+        self.drivers.append(driver)
+        return driver
+
+
+def test_driver_pool_reuses_and_recycles_after_max_pages():
+    factory = FakeDriverFactory()
+    pool = DriverPool(size=1, max_pages=2, driver_factory=factory)
+
+    for _ in range(3):
+        with pool.driver():
+            pass
+
+    assert [driver.name for driver in factory.drivers] == ["driver-0", "driver-1"]
+    assert factory.drivers[0].quit_calls == 1
+    assert pool.created == 2 and pool.recycled == 1
+    pool.close()
+    assert factory.drivers[1].quit_calls == 1
+
+
+def test_driver_pool_recycles_crashed_driver():
+    factory = FakeDriverFactory()
+    pool = DriverPool(size=2, max_pages=0, driver_factory=factory)
+
+    with pytest.raises(WebDriverException):
+        with pool.driver():
+            raise WebDriverException("chrome not reachable")
+    with pool.driver() as driver:
+        assert driver is factory.drivers[1]
+
+    assert factory.drivers[0].quit_calls == 1
+    assert pool.recycled == 1
+
+
+def test_driver_pool_is_bounded_and_closes_every_driver():
+    factory = FakeDriverFactory()
+    pool = DriverPool(size=2, driver_factory=factory)
+
+    first, second = pool.acquire(), pool.acquire()
+    with pytest.raises(TimeoutError):
+        pool.acquire(timeout=0.05)
+    pool.release(first)
+    pool.close()
+
+    assert all(driver.quit_calls == 1 for driver in factory.drivers)
+    assert second.driver.quit_calls == 1
+    with pytest.raises(RuntimeError):
+        pool.acquire()
+
+
+def test_borrowed_driver_is_not_quit():
+    driver = FakeDriver("borrowed")
+
+    with GitIngestScraper("acme/shop", driver=driver):
+        pass
+
+    assert driver.quit_calls == 0